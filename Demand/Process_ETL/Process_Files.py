@@ -8,6 +8,7 @@ Contiene las siguientes funciones:
 - asign_country_code: Asigna el código de país a cada fila del DataFrame df usando el DataFrame country como referencia.
 - process_columns: Procesa las columnas relevantes del DataFrame df y las convierte a mayúsculas.
 - group_parquet: Guarda un DataFrame consolidado en archivos Parquet segmentados por año-mes.
+- write_incremental: Reescribe solo los periodos cuyo contenido cambió y registra el snapshot (ver Snapshot_Store).
 '''
 
 #--------------------------------------------------
@@ -23,7 +24,17 @@ from pathlib import Path
 import sys
 
 from Fill_Rate.Process_ETL.Process_Files import read_files, group_parquet,format_columns
+from Fill_Rate.Process_ETL.Delta_Store import discard_deltas
+from Fill_Rate.Process_ETL.Snapshot_Store import write_incremental
+from Fill_Rate.Process_ETL.Parquet_Dataset import publish_dataset, PUBLISHED_PARTITION_COLS, DEFAULT_ROW_GROUP_SIZE
+from Fill_Rate.Process_ETL.Excel_Cache import file_hash
 from Sales.Process_ETL.Process_Files import assign_nsv
+from Shared_Information_for_Projects.Normalization import normalize_series, normalize_columns
+from Shared_Information_for_Projects.Reference_Data import read_reference
+
+# Opciones del dataset particionado de Demand (carga completa y actualizaciones, ver publish_dataset)
+DEMAND_DATASET_OPTIONS = {'partition_cols': PUBLISHED_PARTITION_COLS, 'compression': 'snappy',
+                          'row_group_size': DEFAULT_ROW_GROUP_SIZE}
 
 # Asgina pais segun el demand group
 def asign_country_code(df_consolidated, df_country):
@@ -106,8 +117,7 @@ def process_columns(df_consolidated,lst_columns):
         
         df_processed = df_consolidated[lst_columns].copy()                                                                                                                                                                           
         # Convertir todas las columnas a mayúsculas y eliminar espacios
-        for col in df_processed.columns:        
-            df_processed[col] = df_processed[col].astype(str).str.upper().str.strip() 
+        normalize_columns(df_processed, df_processed.columns)
        
     except KeyError as e:
                 print(f"Error: La columna {e} no se encontró en los archivos. ")
@@ -116,11 +126,11 @@ def process_columns(df_consolidated,lst_columns):
 def assign_local_currency(df_consolidated,df_fx_rate):
      df_consolidated['fk_YearMonthCountry']=(df_consolidated['fk_year_month'] + '-' +
                                                             df_consolidated['fk_Country'])
-     df_consolidated['fk_YearMonthCountry']=df_consolidated['fk_YearMonthCountry'].str.upper().str.strip()
+     df_consolidated['fk_YearMonthCountry']=normalize_series(df_consolidated['fk_YearMonthCountry'], as_str=False)
      df_fx_rate['fk_YearMonthCountry']=(df_fx_rate['Year']+'-'+
                                         df_fx_rate['Month']+'-'+
                                         df_fx_rate['Country'])
-     df_fx_rate['fk_YearMonthCountry']=df_fx_rate['fk_YearMonthCountry'].str.upper().str.strip()
+     df_fx_rate['fk_YearMonthCountry']=normalize_series(df_fx_rate['fk_YearMonthCountry'], as_str=False)
      df_consolidated=pd.merge(
           df_consolidated,
           df_fx_rate[['fk_YearMonthCountry','OP Rate']],
@@ -175,8 +185,7 @@ def delete_parquet_files(folder_path: str):
         sys.exit(1)
 
 # Función principal que ejecuta el script.
-# Esta función no recibe parámetros y no devuelve ningún valor.
-def main():
+def main(incremental=True, dataset_options=None):
     print("=" * 55)
     print("---  INICIANDO PROCESO: DEMAND FULL LOAD ETL ---")
     print("=" * 55)
@@ -184,6 +193,13 @@ def main():
     Función principal que orquesta el flujo ETL de Carga Completa para los datos de Demanda.	
     Inicializa las rutas, lee los archivos, realiza la adaptación específica de mapeo de país y	
     procesamiento de claves para Demanda, y guarda el resultado particionado.
+    Args:
+        incremental (bool, optional): Si es True compara la foto con el último snapshot y reescribe solo los
+                                      periodos cuyo contenido cambió, guardando la versión en el historial de
+                                      snapshots (ver Snapshot_Store). Si es False reemplaza todos los archivos.
+                                      Por defecto True.
+        dataset_options (dict, optional): Opciones del dataset particionado publicado (partition_cols, compression,
+                                          row_group_size, ... ver publish_dataset). Por defecto DEMAND_DATASET_OPTIONS.
     Returns: None: La función orquesta el proceso y no devuelve un valor.
     """
     # Importar las rutas de acceso rápido desde config_paths.py.,
@@ -191,6 +207,7 @@ def main():
     demand_update_raw_dir = DemandPaths.INPUT_RAW_UPDATE_DIR
     country_code_file = DemandPaths.INPUT_PROCESSED_COUNTRY_CODES_FILE
     processed_parquet_dir = DemandPaths.OUTPUT_PROCESSED_PARQUETS_DIR
+    processed_dataset_dir = DemandPaths.OUTPUT_PROCESSED_DATASET_DIR
     fx_rate=DemandPaths.INPUT_PROCESSED_FX_RATE_FILE
     path_gpp=MasterProductsPaths.INPUT_PROCESSED_GPP_BRAND_FILE
     path_sku_name=MasterProductsPaths.INPUT_RAW_SkuName_FILE
@@ -201,21 +218,26 @@ def main():
     # --- Lectura de archivos 
     #===============================
     # Leer los archivos de datos históricos y consolidarlos en un DataFrame.
-    df_consolidated = pd.read_parquet(demand_update_raw_dir/'QueryDemand.parquet', engine='pyarrow')
+    # La extracción en streaming (Snowflake.Conection.QueryDemand) deja un archivo por periodo fiscal en
+    # 'QueryDemand/'; si no existe se lee el archivo único de extracciones anteriores.
+    query_demand_path = demand_update_raw_dir/'QueryDemand'
+    if not query_demand_path.is_dir():
+        query_demand_path = demand_update_raw_dir/'QueryDemand.parquet'
+    lst_source_files = sorted(glob.glob(os.path.join(query_demand_path, 'QueryDemand_*.parquet'))) \
+        if query_demand_path.is_dir() else [str(query_demand_path)]
+    df_consolidated = pd.read_parquet(lst_source_files, engine='pyarrow')
     len_initial=len(df_consolidated)
 
     # Leer el archivo de códigos de país.
-    df_country = pd.read_excel(country_code_file,
-                               sheet_name='Code Country Demand', dtype=str, engine='openpyxl')
-    df_country_nsv = pd.read_excel(country_code_file,
-                               sheet_name='Code Country Fillrate-Sales', dtype=str, engine='openpyxl')
+    df_country = read_reference(country_code_file, sheet_name='Code Country Demand')
+    df_country_nsv = read_reference(country_code_file, sheet_name='Code Country Fillrate-Sales')
     
-    #df_fx_rate = pd.read_excel(fx_rate, dtype=str, engine='openpyxl')
-    df_gpp=pd.read_excel(path_gpp, dtype=str, engine='openpyxl',sheet_name='GPP')
+    #df_fx_rate = read_reference(fx_rate)
+    df_gpp=read_reference(path_gpp, sheet_name='GPP')
     df_skuName=pd.read_parquet(path_sku_name, engine='pyarrow')
 
-    df_md_product=pd.read_excel(md_product_processed_file,dtype=str, engine='openpyxl')
-    df_gross_to_net=pd.read_excel(processed_gross_to_net,dtype=str, engine='openpyxl')
+    df_md_product=read_reference(md_product_processed_file)
+    df_gross_to_net=read_reference(processed_gross_to_net)
 
     # Definir las columnas relevantes para el procesamiento.    
     lst_columns = ['fk_Date','fk_year_month', 'fk_Country', 'fk_SKU','SKU Description','BRAND',
@@ -237,7 +259,9 @@ def main():
                        'GPP SBU','GPP Division Description','GPP Category Description','GPP Portfolio Description']
     lst_columns_float=['FCST_QTY', 'FORECAST_VALUE_GSV','NSV',
                   'CURRENT_STANDARD_COST']
-    df_processed=format_columns(df_processed,lst_columns_str,lst_columns_float)
+    lst_columns_category = ['fk_Date','fk_year_month', 'fk_Country', 'fk_SKU','BRAND','GPP SBU',
+                            'GPP Division Description','GPP Category Description','GPP Portfolio Description']
+    df_processed=format_columns(df_processed,lst_columns_str,lst_columns_float,lst_columns_category)
     #=========================================================
     #--- ASIGNACIÓN COLUMNAS CALCULADAS
     #=========================================================
@@ -256,10 +280,23 @@ def main():
     #=========================================================
     #--- ACTUALIZACION CARPETA
     #=========================================================
-    #---- Elimina todos los archivos existentes
-    delete_parquet_files(processed_parquet_dir)
-    # --- Agrupacion en archivos parquets
-    group_parquet(df_processed, processed_parquet_dir,name='demand')
+    if incremental:
+        # --- Escritura incremental: solo los periodos cuyo hash cambió (normalmente el actual y los futuros)
+        dict_result = write_incremental(df_processed, processed_parquet_dir, name='demand',
+                                        source={os.path.basename(path): file_hash(path)
+                                                for path in lst_source_files})
+        print(f"Periodos reescritos: {len(dict_result['changed'])} | sin cambios: {len(dict_result['unchanged'])} | "
+              f"eliminados: {len(dict_result['removed'])}")
+    else:
+        # --- Agrupacion en archivos parquets: reemplaza todos los existentes en una sola confirmacion
+        # (los periodos que ya no existen se eliminan solo cuando los nuevos archivos estan completos)
+        group_parquet(df_processed, processed_parquet_dir,name='demand', replace_all=True)
+    # La carga completa reemplaza la base: los deltas de actualizaciones anteriores quedan obsoletos
+    discard_deltas(processed_parquet_dir, 'demand')
+    # Dataset particionado: la escritura incremental solo republica los periodos que cambiaron o se eliminaron
+    publish_dataset(processed_parquet_dir, processed_dataset_dir, 'demand',
+                    periods=dict_result['changed'] + dict_result['removed'] if incremental else None,
+                    **(dataset_options or DEMAND_DATASET_OPTIONS))
 
 
 # --- EJECUCION DEL SCRIPT ---
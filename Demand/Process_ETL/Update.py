@@ -14,17 +14,32 @@ import sys
 # La importación debe ser relativa al paquete actual.
 from Fill_Rate.Process_ETL.Process_Files import read_files, group_parquet,format_columns
 from Fill_Rate.Process_ETL.Update import read_parquets_to_update,update_parquets
-from Demand.Process_ETL.Process_Files import asign_country_code, process_columns
+from Fill_Rate.Process_ETL.Delta_Store import (append_deltas, compact_deltas, validate_storage_mode,
+                                              DEFAULT_STORAGE_MODE, MAX_DELTAS_PER_PERIOD)
+from Fill_Rate.Process_ETL.Parquet_Dataset import publish_dataset
+from Fill_Rate.Process_ETL.Manifest import (manifest_path, load_manifest, save_manifest,
+                                            pending_files, summarize_files, record_files)
+from Demand.Process_ETL.Process_Files import asign_country_code, process_columns, DEMAND_DATASET_OPTIONS
+from Shared_Information_for_Projects.Reference_Data import read_reference
 
-def main():
+def main(force=False, storage_mode=DEFAULT_STORAGE_MODE, dataset_options=None):
     """
     Orquesta el flujo de actualización incremental para los datos de Demanda.
-        1. Procesa los archivos brutos de la actualización utilizando la lógica de transformación de Demand.
+        1. Procesa los archivos brutos nuevos o modificados (según el manifiesto) utilizando la lógica de transformación de Demand.
         2. Determina los periodos afectados.
-        3. Aplica el Upsert utilizando la clave única 'fk_date_country_clasification'.
-        4. Guarda los archivos Parquet actualizados, sobrescribiendo los periodos históricos.
+        3. Modo 'upsert': aplica el Upsert utilizando la clave única 'fk_date_country_clasification' y guarda
+           los archivos Parquet actualizados, sobrescribiendo los periodos históricos.
+        4. Modo 'delta': agrega la actualización como deltas con lápidas (ver Delta_Store).
+        5. Registra los archivos procesados en el manifiesto.
+    Args:
+        force (bool, optional): Si es True reprocesa todos los archivos ignorando el manifiesto. Por defecto False.
+        storage_mode (str, optional): 'upsert' (reemplazo de periodos) o 'delta' (deltas con lápidas, compactados
+                                      por Delta_Store). Por defecto DEFAULT_STORAGE_MODE.
+        dataset_options (dict, optional): Opciones del dataset particionado publicado (partition_cols, compression,
+                                          row_group_size, ... ver publish_dataset). Por defecto DEMAND_DATASET_OPTIONS.
     Returns: None: La función orquesta el proceso y no devuelve un valor.
     """
+    validate_storage_mode(storage_mode)
     print("=" * 55)
     print("---  INICIANDO PROCESO: DEMAND UPDATE ETL ---")
     print("=" * 55)
@@ -32,41 +47,72 @@ def main():
     try:
         from config_paths import DemandPaths
         demand_historic_processed_dir = DemandPaths.OUTPUT_PROCESSED_PARQUETS_DIR
+        demand_dataset_dir = DemandPaths.OUTPUT_PROCESSED_DATASET_DIR
         #demand_historic_processed_dir = DemandPaths.OUTPUT_PROCESSED_PARQUETS_DIR_PRUEBA
         
         demand_update_raw_dir = DemandPaths.INPUT_RAW_UPDATE_DIR
         country_code_file = DemandPaths.INPUT_PROCESSED_COUNTRY_CODES_FILE
         
         # --- PROCESAMIENTO DE ARCHIVOS DE ACTUALIZACIÓN ---
-        df_country = pd.read_excel(country_code_file,
-                                sheet_name='Code Country Demand', dtype=str, engine='openpyxl')
+        df_country = read_reference(country_code_file, sheet_name='Code Country Demand')
         lst_columns = ['fk_Date','fk_year_month', 'fk_Country', 'fk_SKU',
                     'fk_date_country_clasification',
                     'Demand History & Forecast-QTY', 'Shipment History& Forecast-Qty',
                     'Demand History & Forecast-GSV', 'Shipment History&Forecast-GSV']
-        df_update = read_files(demand_update_raw_dir)
+        path_manifest = manifest_path(demand_historic_processed_dir, 'demand')
+        manifest = {'files': {}} if force else load_manifest(path_manifest)
+        lst_pending, dict_hashes = pending_files(demand_update_raw_dir, manifest)
+        if not lst_pending:
+            save_manifest(path_manifest, manifest)
+            print("No hay archivos nuevos o modificados para actualizar. Finalizando proceso.")
+            return
+
+        df_update = read_files(demand_update_raw_dir, files=lst_pending, add_source_column=True)
+        # Archivos leídos sin error (incluso sin filas); los que fallaron se reintentan en la próxima ejecución
+        dict_stats = summarize_files(df_update) if df_update is not None else {}
         if df_update is None or df_update.empty:
+            save_manifest(path_manifest, record_files(manifest, dict_hashes, dict_stats))
             print("No hay archivos para actualizar. Finalizando proceso.")
             return
 
         df_update = asign_country_code(df_update, df_country)
         df_update = process_columns(df_update, lst_columns)
 
-        # --- LECTURA Y ACTUALIZACIÓN DE DATOS HISTÓRICOS ---
-        lst_year_month_files_update = df_update['fk_year_month'].unique().tolist()
-        df_parquets_historic = read_parquets_to_update(demand_historic_processed_dir, lst_year_month_files_update,lst_columns)
-        
-        df_final = update_parquets(df_parquets_historic, df_update,fk_column='fk_date_country_clasification')
         #--- Formato de columnas ----
         lst_columns_str = ['fk_Date','fk_year_month', 'fk_Country', 'fk_SKU',
                     'fk_date_country_clasification']
         lst_columns_float=['Demand History & Forecast-QTY', 'Shipment History& Forecast-Qty',
                     'Demand History & Forecast-GSV', 'Shipment History&Forecast-GSV']
         
-        df_final=format_columns(df_final,lst_columns_str,lst_columns_float)
-        
-        # --- ESCRITURA DE LOS DATOS ACTUALIZADOS ---
-        group_parquet(df_final, demand_historic_processed_dir,name='demand')
+        lst_columns_category = ['fk_Date','fk_year_month', 'fk_Country', 'fk_SKU']
+
+        lst_year_month_files_update = df_update['fk_year_month'].unique().tolist()
+        if storage_mode == 'delta':
+            # --- MODO DELTA: la actualización se agrega como deltas (registros + lápidas), ver Delta_Store ---
+            df_update_formatted = format_columns(df_update,lst_columns_str,lst_columns_float,lst_columns_category)
+            lst_periods = append_deltas(demand_historic_processed_dir, df_update_formatted, name='demand',
+                                        fk_column='fk_date_country_clasification')
+            compact_deltas(demand_historic_processed_dir, 'demand', fk_column='fk_date_country_clasification',
+                           periods=lst_periods, min_deltas=MAX_DELTAS_PER_PERIOD)
+        else:
+            # Los deltas pendientes se incorporan a la base antes de reemplazar registros en ella
+            compact_deltas(demand_historic_processed_dir, 'demand', fk_column='fk_date_country_clasification',
+                           periods=lst_year_month_files_update)
+            # --- LECTURA Y ACTUALIZACIÓN DE DATOS HISTÓRICOS ---
+            df_parquets_historic = read_parquets_to_update(demand_historic_processed_dir, lst_year_month_files_update,lst_columns,
+                                                           name='demand')
+            
+            df_final = update_parquets(df_parquets_historic, df_update,fk_column='fk_date_country_clasification')
+            df_final=format_columns(df_final,lst_columns_str,lst_columns_float,lst_columns_category)
+            
+            # --- ESCRITURA DE LOS DATOS ACTUALIZADOS ---
+            group_parquet(df_final, demand_historic_processed_dir,name='demand')
+
+        # --- DATASET PARTICIONADO: se publican solo los periodos actualizados (base + deltas) ---
+        publish_dataset(demand_historic_processed_dir, demand_dataset_dir, 'demand',
+                        periods=lst_year_month_files_update, fk_column='fk_date_country_clasification',
+                        **(dataset_options or DEMAND_DATASET_OPTIONS))
+        save_manifest(path_manifest, record_files(manifest, dict_hashes, dict_stats))
         print("Demand ETL Update completed successfully.")
         pass
     except Exception as e:
@@ -0,0 +1,326 @@
+'''
+Módulo de almacenamiento delta (merge-on-read) para los hechos mensuales (Sales, Fill Rate, Demand).
+En lugar de reescribir el archivo '{name}_YYYY-MM.parquet' de cada periodo en cada actualización,
+el modo 'delta' agrega archivos pequeños en '_delta/{name}_YYYY-MM/':
+
+- 'NNNNNN-<run_id>.parquet': los registros nuevos de la actualización (ya formateados).
+- 'NNNNNN-<run_id>.tombstones.parquet': las claves reemplazadas ('key' = clave sustituta,
+  'fk' = clave legible normalizada). Una lápida elimina las filas con esa clave de la base y de los
+  deltas anteriores, con la misma lógica de update_parquets.
+
+El costo de una actualización depende del tamaño de la actualización y no del histórico.
+read_merged combina la base y los deltas al leer (ej. la lectura de Demand en Generate_sku_review), y
+compact_deltas incorpora los deltas a la base (con el protocolo de Parquet_Commit). Los lectores que leen
+los Parquet directamente (Power BI) solo ven la base, por lo que la compactación debe ejecutarse antes de
+publicar (main de este módulo).
+
+Contiene las siguientes funciones:
+- list_deltas: Deltas pendientes de un periodo, en orden de escritura.
+- delta_periods: Periodos con deltas pendientes.
+- append_deltas: Escribe una actualización como deltas (registros + lápidas) por periodo.
+- read_merged: Lee periodos combinando la base con sus deltas.
+- compact_deltas: Incorpora los deltas pendientes a los archivos base.
+- discard_deltas: Elimina los deltas de un proceso (tras una carga completa).
+- validate_storage_mode: Verifica que un modo de almacenamiento sea válido.
+'''
+
+#--------------------------------------------------
+#---------------- LIBRERIAS -----------------------
+#--------------------------------------------------
+import pandas as pd
+import numpy as np
+
+import glob
+import os
+import shutil
+
+from Shared_Information_for_Projects.Normalization import normalize_series
+from .Parquet_Commit import recover_parquet_dir, new_run_id, staging_path, commit_staged
+from .Key_Index import key_index_name, build_key_index, KEY_INDEX_ROW_GROUP_SIZE
+
+# Directorio de los deltas y sufijo de los archivos de lápidas
+DELTA_DIR = '_delta'
+TOMBSTONE_SUFFIX = '.tombstones.parquet'
+# Modos de almacenamiento de las actualizaciones: reemplazo de registros en la base o deltas
+STORAGE_MODES = ('upsert', 'delta')
+DEFAULT_STORAGE_MODE = 'upsert'
+# Deltas por periodo a partir de los cuales la actualización compacta el periodo
+MAX_DELTAS_PER_PERIOD = 8
+
+
+def validate_storage_mode(storage_mode):
+    """
+    Verifica que el modo de almacenamiento de una actualización esté en STORAGE_MODES.
+
+    Args:
+        storage_mode (str): Modo solicitado ('upsert' o 'delta').
+
+    Returns:
+        str: El mismo modo, si es válido.
+    """
+    if storage_mode not in STORAGE_MODES:
+        raise ValueError(f"Modo de almacenamiento '{storage_mode}' no válido. Opciones: {STORAGE_MODES}")
+    return storage_mode
+
+
+def _period_dir(name, period):
+    """Ruta relativa del directorio de deltas de un periodo, ej. '_delta/sales_2024-01'."""
+    return os.path.join(DELTA_DIR, f"{name}_{period}")
+
+
+def list_deltas(output_path, name, period):
+    """
+    Devuelve los deltas pendientes de un periodo, en orden de escritura.
+
+    Args:
+        output_path (str): Directorio de los Parquet.
+        name (str): Prefijo de los archivos (ej. 'sales').
+        period (str): Periodo 'YYYY-MM'.
+
+    Returns:
+        list: Pares (archivo de registros, archivo de lápidas), rutas relativas a output_path.
+    """
+    period_dir = _period_dir(name, period)
+    lst_files = sorted(glob.glob(os.path.join(output_path, glob.escape(period_dir), '*.parquet')))
+    lst_deltas = []
+    for path in lst_files:
+        if path.endswith(TOMBSTONE_SUFFIX):
+            continue
+        rows_file = os.path.join(period_dir, os.path.basename(path))
+        lst_deltas.append((rows_file, rows_file[:-len('.parquet')] + TOMBSTONE_SUFFIX))
+    return lst_deltas
+
+
+def delta_periods(output_path, name):
+    """Periodos 'YYYY-MM' de un proceso con deltas pendientes."""
+    prefix = f"{name}_"
+    lst_periods = []
+    for path in sorted(glob.glob(os.path.join(output_path, DELTA_DIR, glob.escape(prefix) + '*'))):
+        period = os.path.basename(path)[len(prefix):]
+        if list_deltas(output_path, name, period):
+            lst_periods.append(period)
+    return lst_periods
+
+
+def _build_tombstones(df_update, key_column, fk_column):
+    """Lápidas de una actualización: claves sustitutas y claves legibles (normalizadas) reemplazadas."""
+    df_tombstones = pd.DataFrame(index=range(len(df_update)))
+    if key_column is not None and key_column in df_update.columns:
+        df_tombstones['key'] = df_update[key_column].astype('UInt64').to_numpy()
+    else:
+        df_tombstones['key'] = pd.array([pd.NA] * len(df_update), dtype='UInt64')
+    if fk_column is not None and fk_column in df_update.columns:
+        df_tombstones['fk'] = normalize_series(df_update[fk_column].astype(str), as_str=False).to_numpy()
+    else:
+        df_tombstones['fk'] = pd.Series([None] * len(df_update), dtype=object)
+    return df_tombstones.drop_duplicates(ignore_index=True)
+
+
+def append_deltas(output_path, df_update, name, key_column=None, fk_column=None):
+    """
+    Escribe una actualización como deltas: por cada periodo, un archivo con los registros nuevos y otro
+    con sus claves como lápidas. Todos los deltas se confirman juntos (Parquet_Commit).
+
+    Args:
+        output_path (str): Directorio de los Parquet.
+        df_update (pd.DataFrame): Registros nuevos ya formateados (format_columns), con 'fk_year_month'.
+        name (str): Prefijo de los archivos (ej. 'sales').
+        key_column (str, optional): Columna de clave sustituta. Por defecto None.
+        fk_column (str, optional): Clave legible (filas sin clave sustituta y procesos sin ella). Por defecto None.
+
+    Returns:
+        list: Periodos actualizados.
+    """
+    recover_parquet_dir(output_path)
+    run_id = new_run_id()
+    staging = staging_path(output_path, run_id)
+    lst_files = []
+    lst_periods = []
+    lst_columns_category = df_update.select_dtypes(include='category').columns
+    for period, df_period in df_update.groupby('fk_year_month', observed=True):
+        df_period = df_period.copy()
+        for col in lst_columns_category:
+            df_period[col] = df_period[col].cat.remove_unused_categories()
+        # Número de secuencia: los deltas se aplican en el orden de sus nombres
+        lst_existing = list_deltas(output_path, name, period)
+        seq = int(os.path.basename(lst_existing[-1][0]).split('-')[0]) + 1 if lst_existing else 1
+        rows_file = os.path.join(_period_dir(name, period), f"{seq:06d}-{run_id}.parquet")
+        tombstones_file = rows_file[:-len('.parquet')] + TOMBSTONE_SUFFIX
+        os.makedirs(os.path.join(staging, _period_dir(name, period)), exist_ok=True)
+        df_period.to_parquet(os.path.join(staging, rows_file), index=False)
+        _build_tombstones(df_period, key_column, fk_column).to_parquet(os.path.join(staging, tombstones_file),
+                                                                       index=False)
+        print(f"Delta {period}: {len(df_period)} registros en {rows_file}\n")
+        lst_files.extend([rows_file, tombstones_file])
+        lst_periods.append(period)
+    if lst_files:
+        commit_staged(output_path, run_id, lst_files)
+    return lst_periods
+
+
+def _mask_tombstoned(df, set_keys, set_fk, key_column, fk_column):
+    """Filas de df eliminadas por las lápidas acumuladas (clave sustituta o, si no la tienen, clave legible)."""
+    mask = np.zeros(len(df), dtype=bool)
+    mask_legacy = np.ones(len(df), dtype=bool)
+    if key_column is not None and key_column in df.columns and set_keys:
+        keys = df[key_column].astype('UInt64')
+        mask = keys.isin(list(set_keys)).fillna(False).to_numpy(dtype=bool)
+        mask_legacy = keys.isna().to_numpy()
+    elif key_column is not None and key_column in df.columns:
+        mask_legacy = df[key_column].isna().to_numpy()
+    if set_fk and fk_column is not None and fk_column in df.columns and mask_legacy.any():
+        fk = normalize_series(df.loc[mask_legacy, fk_column].astype(str), as_str=False)
+        mask[mask_legacy] = fk.isin(set_fk).to_numpy()
+    return mask
+
+
+def _merge_period(output_path, name, period, key_column, fk_column, columns=None):
+    """Combina la base de un periodo con sus deltas (None si el periodo no tiene datos)."""
+    base_file = os.path.join(output_path, f"{name}_{period}.parquet")
+    lst_layers = []
+    if os.path.exists(base_file):
+        lst_layers.append((pd.read_parquet(base_file, columns=columns), None))
+    for rows_file, tombstones_file in list_deltas(output_path, name, period):
+        lst_layers.append((pd.read_parquet(os.path.join(output_path, rows_file), columns=columns),
+                           pd.read_parquet(os.path.join(output_path, tombstones_file))))
+    if not lst_layers:
+        return None
+
+    # De la capa más reciente a la más antigua: cada capa se filtra con las lápidas de las posteriores
+    set_keys, set_fk = set(), set()
+    lst_kept = []
+    for df_layer, df_tombstones in reversed(lst_layers):
+        lst_kept.append(df_layer[~_mask_tombstoned(df_layer, set_keys, set_fk, key_column, fk_column)])
+        if df_tombstones is not None:
+            set_keys.update(df_tombstones['key'].dropna().tolist())
+            set_fk.update(df_tombstones['fk'].dropna().tolist())
+
+    return _concat_keeping_categories(lst_kept[::-1])
+
+
+def _concat_keeping_categories(lst_frames):
+    """Concatena DataFrames conservando como categóricas las columnas que lo son en alguno de ellos."""
+    lst_columns_category = set().union(*[df.select_dtypes(include='category').columns for df in lst_frames])
+    df_concat = pd.concat(lst_frames, ignore_index=True)
+    # concat convierte a texto las categóricas con categorías distintas entre archivos
+    for col in lst_columns_category:
+        df_concat[col] = df_concat[col].astype('category')
+    return df_concat
+
+
+def read_merged(output_path, name, periods, key_column=None, fk_column=None, columns=None):
+    """
+    Lee los periodos indicados combinando el archivo base con sus deltas pendientes (merge-on-read).
+
+    Args:
+        output_path (str): Directorio de los Parquet.
+        name (str): Prefijo de los archivos (ej. 'sales').
+        periods (list): Periodos 'YYYY-MM' a leer.
+        key_column (str, optional): Columna de clave sustituta. Por defecto None.
+        fk_column (str, optional): Clave legible. Por defecto None.
+        columns (list, optional): Columnas a leer (deben incluir las claves usadas). Por defecto todas.
+
+    Returns:
+        pd.DataFrame: Registros vigentes de los periodos (vacío si no hay datos).
+    """
+    lst_frames = [_merge_period(output_path, name, period, key_column, fk_column, columns) for period in periods]
+    lst_frames = [df for df in lst_frames if df is not None]
+    if not lst_frames:
+        return pd.DataFrame(columns=columns)
+    return _concat_keeping_categories(lst_frames)
+
+
+def compact_deltas(output_path, name, key_column=None, fk_column=None, periods=None, min_deltas=1):
+    """
+    Incorpora los deltas pendientes a los archivos base: cada periodo se combina (read_merged), se
+    escribe como nuevo '{name}_YYYY-MM.parquet' en row groups de KEY_INDEX_ROW_GROUP_SIZE filas (con su
+    índice de claves si hay key_column) y sus deltas se eliminan en la misma confirmación.
+
+    Args:
+        output_path (str): Directorio de los Parquet.
+        name (str): Prefijo de los archivos (ej. 'sales').
+        key_column (str, optional): Columna de clave sustituta. Por defecto None.
+        fk_column (str, optional): Clave legible. Por defecto None.
+        periods (list, optional): Periodos a compactar. Por defecto todos los que tienen deltas.
+        min_deltas (int, optional): Compacta solo los periodos con al menos este número de deltas. Por defecto 1.
+
+    Returns:
+        list: Periodos compactados.
+    """
+    recover_parquet_dir(output_path)
+    lst_candidates = delta_periods(output_path, name) if periods is None else list(periods)
+    run_id = new_run_id()
+    staging = staging_path(output_path, run_id)
+    lst_files, lst_delete, lst_periods = [], [], []
+    for period in lst_candidates:
+        lst_deltas = list_deltas(output_path, name, period)
+        if not lst_deltas or len(lst_deltas) < min_deltas:
+            continue
+        df_merged = _merge_period(output_path, name, period, key_column, fk_column)
+        filename = f"{name}_{period}.parquet"
+        os.makedirs(staging, exist_ok=True)
+        df_merged.to_parquet(os.path.join(staging, filename), index=False, row_group_size=KEY_INDEX_ROW_GROUP_SIZE)
+        lst_files.append(filename)
+        if key_column is not None and key_column in df_merged.columns:
+            os.makedirs(os.path.join(staging, os.path.dirname(key_index_name(filename))), exist_ok=True)
+            build_key_index(df_merged[key_column]).to_parquet(os.path.join(staging, key_index_name(filename)),
+                                                              index=False)
+            lst_files.append(key_index_name(filename))
+        lst_delete.extend([path for pair in lst_deltas for path in pair])
+        lst_periods.append(period)
+        print(f"Compactando {filename}: {len(lst_deltas)} deltas incorporados ({len(df_merged)} registros)\n")
+    if lst_files:
+        commit_staged(output_path, run_id, lst_files, lst_delete)
+        _remove_empty_dirs(output_path, name, lst_periods)
+    return lst_periods
+
+
+def discard_deltas(output_path, name):
+    """
+    Elimina todos los deltas de un proceso. Se usa después de una carga completa, que reescribe la base
+    desde los archivos históricos (igual que antes sobrescribía los periodos actualizados).
+
+    Returns:
+        list: Periodos cuyos deltas se eliminaron.
+    """
+    lst_periods = delta_periods(output_path, name)
+    for period in lst_periods:
+        shutil.rmtree(os.path.join(output_path, _period_dir(name, period)), ignore_errors=True)
+    return lst_periods
+
+
+def _remove_empty_dirs(output_path, name, periods):
+    """Elimina los directorios de deltas que quedaron vacíos tras la compactación."""
+    for period in periods:
+        try:
+            os.rmdir(os.path.join(output_path, _period_dir(name, period)))
+        except OSError:
+            pass
+
+
+def main():
+    """
+    Compactación programada: incorpora los deltas pendientes de Fill Rate, Sales y Demand a sus
+    archivos base. Se ejecuta como paso independiente (ej. al final del pipeline o por la noche).
+
+    Returns: None: La función orquesta el proceso y no devuelve un valor.
+    """
+    from config_paths import FillRatePaths, SalesPaths, DemandPaths
+    lst_facts = [
+        (FillRatePaths.OUTPUT_PROCESSED_PARQUETS_DIR, 'fill_rate',
+         'sk_date_country_customer_clasification', 'fk_date_country_customer_clasification'),
+        (SalesPaths.OUTPUT_PROCESSED_PARQUETS_DIR, 'sales',
+         'sk_date_country_customer_clasification', 'fk_date_country_customer_clasification'),
+        (DemandPaths.OUTPUT_PROCESSED_PARQUETS_DIR, 'demand', None, 'fk_date_country_clasification'),
+    ]
+    for output_path, name, key_column, fk_column in lst_facts:
+        lst_periods = compact_deltas(str(output_path), name, key_column, fk_column)
+        print(f"{name}: {len(lst_periods)} periodos compactados")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+        print("Compactación de deltas ejecutada correctamente.")
+    except Exception as e:
+        print(f"Error en la compactación de deltas: {e}")
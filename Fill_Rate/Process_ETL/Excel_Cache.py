@@ -0,0 +1,158 @@
+'''
+Módulo de caché Parquet para los archivos Excel de entrada.
+Convierte cada libro Excel a Parquet una sola vez y reutiliza esa copia en las lecturas
+posteriores (en la misma ejecución o en ejecuciones futuras), evitando volver a parsear
+con openpyxl los mismos archivos de 'Mothly_Update' desde varios módulos.
+
+La entrada de caché se identifica por el hash del contenido del archivo más su fecha de
+modificación (mtime). Cuando el archivo fuente cambia o deja de existir, las entradas
+antiguas se eliminan automáticamente. Dentro de una ejecución el hash de cada archivo se
+calcula una sola vez y se reutiliza mientras os.stat no cambie (tamaño, mtime, ctime e inodo).
+
+Contiene las siguientes funciones:
+- file_hash: Calcula el hash SHA-256 del contenido de un archivo.
+- cache_key: Construye la clave de caché (hash del contenido + mtime) de un archivo.
+- read_excel_cached: Lee un Excel (dtype=str) usando la copia Parquet si existe y está vigente.
+- evict_stale_entries: Elimina las entradas de caché cuyos archivos fuente ya no existen.
+'''
+
+#--------------------------------------------------
+#---------------- LIBRERIAS -----------------------
+#--------------------------------------------------
+import pandas as pd
+import numpy as np
+import pyarrow.parquet as pq
+
+import glob
+import hashlib
+import os
+
+# Separador entre el nombre del archivo fuente, la hoja y la clave en el nombre de la entrada
+CACHE_SEPARATOR = '__'
+
+# Hashes de contenido ya calculados en esta ejecución: {ruta absoluta: (firma os.stat, hash)}
+_DICT_HASHES = {}
+
+
+def file_hash(filename, chunk_size=1024 * 1024):
+    """
+    Calcula el hash SHA-256 del contenido de un archivo leyéndolo por bloques.
+
+    Args:
+        filename (str): Ruta del archivo.
+        chunk_size (int, optional): Tamaño en bytes de cada bloque leído. Por defecto 1 MB.
+
+    Returns:
+        str: Hash hexadecimal del contenido.
+    """
+    sha = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def cache_key(filename):
+    """
+    Construye la clave de caché de un archivo combinando el hash de su contenido y su mtime.
+    El hash solo se recalcula si la firma de os.stat (tamaño, mtime, ctime, inodo) cambió desde la
+    última llamada: una reescritura que conserva tamaño y mtime cambia igualmente el ctime.
+    En Windows ctime es la fecha de creación, por lo que esa reescritura solo se detecta en la
+    siguiente ejecución.
+
+    Args:
+        filename (str): Ruta del archivo fuente.
+
+    Returns:
+        str: Clave hexadecimal de 24 caracteres.
+    """
+    stat = os.stat(filename)
+    path = os.path.abspath(filename)
+    signature = (stat.st_size, stat.st_mtime_ns, stat.st_ctime_ns, stat.st_ino)
+    cached = _DICT_HASHES.get(path)
+    if cached is None or cached[0] != signature:
+        cached = _DICT_HASHES[path] = (signature, file_hash(filename))
+    key = hashlib.sha256(f"{cached[1]}-{stat.st_mtime_ns}".encode('utf-8')).hexdigest()
+    return key[:24]
+
+
+def _entry_prefix(filename, sheet_name):
+    """Prefijo común a todas las entradas de caché de un archivo/hoja."""
+    return f"{os.path.basename(filename)}{CACHE_SEPARATOR}{sheet_name}{CACHE_SEPARATOR}"
+
+
+def read_excel_cached(filename, cache_dir, sheet_name=0, columns=None):
+    """
+    Lee un archivo Excel con dtype=str usando su copia Parquet en caché si está vigente.
+    Si no existe una entrada con la clave actual, lee el Excel con openpyxl, guarda la copia
+    Parquet (escritura temporal + renombrado) y elimina las entradas anteriores del mismo archivo.
+    Los errores al escribir la caché no interrumpen la lectura; los errores al leer el archivo
+    fuente (ej. PermissionError) se propagan al llamador.
+    La caché siempre guarda el libro completo para que sirva a cualquier proyección; con
+    columns solo se cargan desde el Parquet las columnas pedidas que existan en el archivo.
+
+    Args:
+        filename (str): Ruta del archivo Excel (.xlsx).
+        cache_dir (str): Directorio donde se guardan las copias Parquet.
+        sheet_name (str or int, optional): Hoja a leer. Por defecto la primera (0).
+        columns (list, optional): Columnas a cargar. Las que no existan en el archivo se ignoran.
+
+    Returns:
+        pd.DataFrame: Contenido del archivo con todas las columnas como texto (NaN en celdas vacías),
+                      igual que pd.read_excel(filename, dtype=str).
+    """
+    prefix = _entry_prefix(filename, sheet_name)
+    cache_file = os.path.join(cache_dir, f"{prefix}{cache_key(filename)}.parquet")
+
+    # --- LECTURA DESDE CACHÉ ---
+    if os.path.exists(cache_file):
+        try:
+            read_columns = None
+            if columns is not None:
+                available = set(pq.read_schema(cache_file).names)
+                read_columns = [col for col in columns if col in available]
+            df = pd.read_parquet(cache_file, engine='pyarrow', columns=read_columns)
+            # Parquet devuelve None en los nulos; se restablece NaN como en read_excel(dtype=str)
+            return df.astype(object).where(df.notna(), np.nan)
+        except Exception as e:
+            print(f"  [ADVERTENCIA] Caché corrupta para {os.path.basename(filename)}, se vuelve a leer el Excel: {e}")
+
+    # --- LECTURA DEL EXCEL Y ESCRITURA DE LA CACHÉ ---
+    df = pd.read_excel(filename, sheet_name=sheet_name, dtype=str, engine='openpyxl')
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_file = cache_file + '.tmp'
+        df.to_parquet(tmp_file, index=False, engine='pyarrow')
+        os.replace(tmp_file, cache_file)
+        # Eliminar las entradas anteriores (contenido o mtime distintos) del mismo archivo
+        for old_file in glob.glob(os.path.join(cache_dir, glob.escape(prefix) + '*.parquet')):
+            if old_file != cache_file:
+                os.remove(old_file)
+    except Exception as e:
+        print(f"  [ADVERTENCIA] No se pudo guardar la caché de {os.path.basename(filename)}: {e}")
+    if columns is not None:
+        df = df[[col for col in columns if col in df.columns]]
+    return df
+
+
+def evict_stale_entries(cache_dir, lst_source_files):
+    """
+    Elimina las entradas de caché cuyo archivo fuente ya no está en el directorio de entrada.
+
+    Args:
+        cache_dir (str): Directorio de la caché Parquet.
+        lst_source_files (list): Rutas de los archivos fuente vigentes.
+
+    Returns:
+        None: La función elimina los archivos obsoletos del disco.
+    """
+    if not os.path.isdir(cache_dir):
+        return
+    valid_names = {os.path.basename(f) for f in lst_source_files}
+    for entry in glob.glob(os.path.join(cache_dir, '*.parquet')):
+        source_name = os.path.basename(entry).rsplit(CACHE_SEPARATOR, 2)[0]
+        if source_name not in valid_names:
+            try:
+                os.remove(entry)
+            except OSError as e:
+                print(f"  [ADVERTENCIA] No se pudo eliminar la entrada de caché {os.path.basename(entry)}: {e}")
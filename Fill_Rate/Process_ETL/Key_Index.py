@@ -0,0 +1,282 @@
+'''
+Módulo de índices de claves (sidecar) para los archivos Parquet mensuales.
+Cada archivo '{name}_YYYY-MM.parquet' escrito con clave sustituta (ver Surrogate_Keys) lleva un
+índice compacto en '_key_index/{name}_YYYY-MM.keyidx': las claves enteras ordenadas y la posición
+de cada fila en el archivo. La posición se traduce a row group con los metadatos del Parquet.
+
+Con el índice, upsert_partitions reemplaza los registros de una actualización sin cargar el
+histórico en pandas ni comparar la clave de texto fila a fila:
+1. Busca las claves de la actualización en el índice (búsqueda binaria) -> filas a reemplazar.
+2. Copia tal cual los row groups sin filas reemplazadas y filtra solo los row groups afectados.
+3. Agrega los registros nuevos y escribe el índice del archivo resultante.
+Los archivos se confirman con el protocolo de Parquet_Commit (preparar -> confirmar).
+
+Las filas históricas sin clave sustituta (archivos anteriores) quedan al final del índice con clave
+nula; para ellas se lee solo la columna de clave legible de los row groups donde están. Los archivos
+de una carga completa actual no guardan la clave legible (ver stores_readable_key).
+
+Contiene las siguientes funciones:
+- key_index_name: Ruta relativa del índice de un archivo Parquet.
+- build_key_index: Construye el índice (clave ordenada -> fila) a partir de la columna de clave.
+- read_key_index: Lee el índice de un archivo (o lo reconstruye si falta o está desactualizado).
+- find_rows: Posiciones de las filas cuyas claves están en una lista.
+- upsert_partitions: Reemplaza los registros de una actualización en los archivos mensuales.
+- stores_readable_key: Indica si los archivos mensuales guardan la clave legible.
+'''
+
+#--------------------------------------------------
+#---------------- LIBRERIAS -----------------------
+#--------------------------------------------------
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import glob
+import os
+import shutil
+
+from Shared_Information_for_Projects.Normalization import normalize_series
+from .Parquet_Commit import recover_parquet_dir, new_run_id, staging_path, commit_staged
+
+# Directorio y extensión de los índices dentro del directorio de los Parquet
+KEY_INDEX_DIR = '_key_index'
+KEY_INDEX_SUFFIX = '.keyidx'
+# Filas por row group de los archivos con índice: un upsert reescribe solo los row groups afectados
+KEY_INDEX_ROW_GROUP_SIZE = 100_000
+
+
+def key_index_name(filename):
+    """Ruta relativa del índice de un archivo Parquet, ej. '_key_index/sales_2024-01.keyidx'."""
+    base = os.path.splitext(os.path.basename(filename))[0]
+    return os.path.join(KEY_INDEX_DIR, base + KEY_INDEX_SUFFIX)
+
+
+def _key_index_path(parquet_file):
+    """Ruta absoluta del índice de un archivo Parquet."""
+    return os.path.join(os.path.dirname(parquet_file), key_index_name(parquet_file))
+
+
+def build_key_index(keys):
+    """
+    Construye el índice de claves de un archivo a partir de su columna de clave sustituta.
+
+    Args:
+        keys (array-like): Claves en el orden de las filas del archivo (nulos para filas sin clave).
+
+    Returns:
+        pd.DataFrame: Columnas 'key' (UInt64, ordenada, nulos al final) y 'row' (posición en el archivo).
+    """
+    keys = pd.array(keys, dtype='UInt64')
+    df_index = pd.DataFrame({'key': keys, 'row': np.arange(len(keys), dtype=np.int64)})
+    return df_index.sort_values('key', kind='stable', na_position='last', ignore_index=True)
+
+
+def _read_keys(parquet_file, key_column):
+    """Lee solo la columna de clave de un archivo (nulos si el archivo no la tiene)."""
+    pf = pq.ParquetFile(parquet_file)
+    if key_column not in pf.schema_arrow.names:
+        return pd.array([pd.NA] * pf.metadata.num_rows, dtype='UInt64')
+    return pf.read(columns=[key_column]).column(0).to_pandas().astype('UInt64').array
+
+
+def _write_key_index(path, df_index):
+    """Guarda un índice (archivo temporal + renombrado)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df_index.to_parquet(path + '.tmp', index=False, engine='pyarrow')
+    os.replace(path + '.tmp', path)
+
+
+def read_key_index(parquet_file, key_column):
+    """
+    Lee el índice de claves de un archivo Parquet. Si no existe, no corresponde al número de filas del
+    archivo o es anterior a él (el archivo se reescribió sin índice), se reconstruye leyendo solo la
+    columna de clave y se guarda.
+
+    Args:
+        parquet_file (str): Ruta del archivo Parquet mensual.
+        key_column (str): Columna de clave sustituta.
+
+    Returns:
+        pd.DataFrame: Índice con 'key' y 'row' (ver build_key_index).
+    """
+    path = _key_index_path(parquet_file)
+    num_rows = pq.ParquetFile(parquet_file).metadata.num_rows
+    if os.path.exists(path) and os.stat(path).st_mtime_ns >= os.stat(parquet_file).st_mtime_ns:
+        try:
+            df_index = pd.read_parquet(path, engine='pyarrow')
+            if len(df_index) == num_rows:
+                df_index['key'] = df_index['key'].astype('UInt64')
+                return df_index
+        except Exception as e:
+            print(f"  [ADVERTENCIA] Índice corrupto para {os.path.basename(parquet_file)}, se reconstruye: {e}")
+
+    df_index = build_key_index(_read_keys(parquet_file, key_column))
+    try:
+        _write_key_index(path, df_index)
+    except Exception as e:
+        print(f"  [ADVERTENCIA] No se pudo guardar el índice de {os.path.basename(parquet_file)}: {e}")
+    return df_index
+
+
+def find_rows(df_index, keys):
+    """
+    Devuelve las posiciones (en el archivo) de las filas cuyas claves están en keys, con búsqueda
+    binaria sobre el índice ordenado.
+
+    Args:
+        df_index (pd.DataFrame): Índice de claves (ver build_key_index).
+        keys (array-like): Claves a buscar (los nulos se ignoran).
+
+    Returns:
+        np.ndarray: Posiciones ordenadas de las filas encontradas.
+    """
+    n_valid = int(df_index['key'].notna().sum())
+    sorted_keys = df_index['key'].iloc[:n_valid].to_numpy(dtype=np.uint64)
+    search = np.unique(pd.array(keys, dtype='UInt64').dropna().to_numpy(dtype=np.uint64))
+    left = np.searchsorted(sorted_keys, search, side='left')
+    counts = np.searchsorted(sorted_keys, search, side='right') - left
+    # Expande los rangos [left, left + count) de cada clave encontrada
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    positions = np.repeat(left, counts) + offsets
+    return np.sort(df_index['row'].to_numpy()[positions])
+
+
+def _legacy_rows(df_index):
+    """Posiciones de las filas sin clave sustituta (al final del índice)."""
+    return np.sort(df_index.loc[df_index['key'].isna(), 'row'].to_numpy())
+
+
+def _rewrite_partition(source, target, df_period, key_column, fk_column, row_group_size):
+    """
+    Escribe en target el contenido de source sin las filas reemplazadas por df_period, más las filas
+    de df_period. Los row groups sin filas reemplazadas se copian sin pasar por pandas.
+
+    Returns:
+        tuple: (filas reemplazadas, row groups afectados, row groups del archivo original).
+    """
+    pf = pq.ParquetFile(source)
+    schema = pf.schema_arrow
+    if key_column not in schema.names:
+        raise KeyError(f"el archivo no tiene la columna '{key_column}'")
+    # Las columnas y tipos de la actualización deben coincidir con los del archivo
+    table_update = pa.Table.from_pandas(df_period[schema.names], preserve_index=False).cast(schema)
+
+    df_index = read_key_index(source, key_column)
+    mask_drop = np.zeros(pf.metadata.num_rows, dtype=bool)
+    mask_drop[find_rows(df_index, df_period[key_column])] = True
+
+    sizes = np.array([pf.metadata.row_group(i).num_rows for i in range(pf.num_row_groups)], dtype=np.int64)
+    ends = np.cumsum(sizes)
+    starts = ends - sizes
+
+    # Filas sin clave sustituta: se comparan por la clave legible, leyendo solo sus row groups
+    legacy_rows = _legacy_rows(df_index)
+    if len(legacy_rows) and fk_column in schema.names:
+        keys_to_update = normalize_series(df_period[fk_column].astype(str), as_str=False).unique()
+        lst_groups = np.unique(np.searchsorted(ends, legacy_rows, side='right')).tolist()
+        fk_historic = pf.read_row_groups(lst_groups, columns=[fk_column]).column(0).to_pandas().astype(str)
+        positions = np.concatenate([np.arange(starts[i], ends[i]) for i in lst_groups])
+        mask_legacy = np.isin(positions, legacy_rows)
+        mask_match = normalize_series(fk_historic[mask_legacy], as_str=False).isin(keys_to_update).to_numpy()
+        mask_drop[positions[mask_legacy][mask_match]] = True
+
+    n_affected = 0
+    with pq.ParquetWriter(target, schema) as writer:
+        for i in range(pf.num_row_groups):
+            table = pf.read_row_group(i)
+            drop = mask_drop[starts[i]:ends[i]]
+            if drop.any():
+                n_affected += 1
+                table = table.filter(pa.array(~drop))
+            if table.num_rows:
+                writer.write_table(table, row_group_size=row_group_size)
+        writer.write_table(table_update, row_group_size=row_group_size)
+    return int(mask_drop.sum()), n_affected, pf.num_row_groups
+
+
+def upsert_partitions(output_path, df_update, name, key_column, fk_column=None,
+                      row_group_size=KEY_INDEX_ROW_GROUP_SIZE):
+    """
+    Reemplaza en los archivos '{name}_YYYY-MM.parquet' los registros de df_update (misma lógica de
+    update_parquets: se eliminan las filas históricas con la misma clave y se agregan las nuevas),
+    usando el índice de claves de cada archivo. Todos los archivos modificados y sus índices se
+    confirman juntos (Parquet_Commit).
+
+    Los periodos cuyo archivo no se puede actualizar así (ej. archivos anteriores sin la columna de
+    clave sustituta) se devuelven para que el llamador use la ruta completa (read_parquets_to_update +
+    update_parquets + group_parquet).
+
+    Args:
+        output_path (str): Directorio de los Parquet mensuales.
+        df_update (pd.DataFrame): Registros nuevos ya formateados (format_columns), con 'fk_year_month'.
+        name (str): Prefijo de los archivos (ej. 'sales').
+        key_column (str): Columna de clave sustituta (ej. 'sk_date_country_customer_clasification').
+        fk_column (str, optional): Clave legible, usada para las filas históricas sin clave sustituta.
+        row_group_size (int, optional): Filas por row group de los archivos escritos. Por defecto 100.000.
+
+    Returns:
+        list: Periodos no actualizados que requieren la ruta completa.
+    """
+    recover_parquet_dir(output_path)
+    run_id = new_run_id()
+    staging = staging_path(output_path, run_id)
+    os.makedirs(os.path.join(staging, KEY_INDEX_DIR), exist_ok=True)
+
+    lst_files = []
+    lst_periods_fallback = []
+    lst_columns_category = df_update.select_dtypes(include='category').columns
+    for period, df_period in df_update.groupby('fk_year_month', observed=True):
+        filename = f"{name}_{period}.parquet"
+        source = os.path.join(output_path, filename)
+        target = os.path.join(staging, filename)
+        # Cada archivo guarda solo el diccionario de categorías usadas en su periodo
+        df_period = df_period.copy()
+        for col in lst_columns_category:
+            df_period[col] = df_period[col].cat.remove_unused_categories()
+
+        if not os.path.exists(source):
+            print(f"Periodo nuevo {period}: guardando en {source}\n")
+            df_period.to_parquet(target, index=False, row_group_size=row_group_size)
+        else:
+            try:
+                n_replaced, n_affected, n_groups = _rewrite_partition(source, target, df_period, key_column,
+                                                                      fk_column, row_group_size)
+            except (KeyError, ValueError, NotImplementedError, pa.ArrowInvalid) as e:
+                print(f"  [ADVERTENCIA] {filename} no se puede actualizar por índice, se usa la ruta completa: {e}")
+                if os.path.exists(target):
+                    os.remove(target)
+                lst_periods_fallback.append(period)
+                continue
+            print(f"Actualizando {filename}: {n_replaced} filas reemplazadas, "
+                  f"{n_affected} de {n_groups} row groups reescritos, {len(df_period)} filas nuevas\n")
+        _write_key_index(os.path.join(staging, key_index_name(filename)),
+                         build_key_index(_read_keys(target, key_column)))
+        lst_files.extend([filename, key_index_name(filename)])
+
+    if lst_files:
+        commit_staged(output_path, run_id, lst_files)
+    else:
+        shutil.rmtree(staging, ignore_errors=True)
+    return lst_periods_fallback
+
+
+def stores_readable_key(output_path, name, fk_column):
+    """
+    Indica si algún archivo '{name}_YYYY-MM.parquet' guarda la clave legible. Los archivos escritos antes
+    de la clave sustituta la necesitan para reemplazar sus filas, y los que la tienen deben seguir
+    recibiéndola para conservar el mismo esquema en todos los periodos. Si ninguno la guarda (carga
+    completa con clave sustituta), la actualización no necesita construirla. Solo se leen los esquemas.
+
+    Args:
+        output_path (str): Directorio de los Parquet mensuales.
+        name (str): Prefijo de los archivos (ej. 'sales').
+        fk_column (str): Clave legible (ej. 'fk_date_country_customer_clasification').
+
+    Returns:
+        bool: True si algún archivo tiene la columna fk_column.
+    """
+    for path in glob.glob(os.path.join(glob.escape(str(output_path)), glob.escape(name) + '_*.parquet')):
+        if fk_column in pq.read_schema(path).names:
+            return True
+    return False
@@ -0,0 +1,176 @@
+'''
+Módulo de manifiesto de archivos procesados para las actualizaciones incrementales.
+Registra, por cada archivo de 'Mothly_Update' ya incorporado a los Parquet históricos,
+su hash de contenido, número de filas, periodos (fk_year_month) afectados y la fecha de
+finalización. Los módulos Update lo usan para procesar solo los archivos nuevos o modificados.
+
+El manifiesto es un archivo JSON guardado junto a los Parquet procesados
+(ej. '_manifest_sales.json'); se reescribe de forma atómica (archivo temporal + renombrado).
+
+Contiene las siguientes funciones:
+- manifest_path: Construye la ruta del manifiesto de un proceso.
+- load_manifest: Lee el manifiesto (o devuelve uno vacío si no existe).
+- save_manifest: Guarda el manifiesto de forma atómica.
+- pending_files: Identifica los archivos nuevos o modificados respecto al manifiesto.
+- summarize_files: Calcula filas y periodos por archivo fuente de un DataFrame leído con read_files.
+- record_files: Registra en el manifiesto los archivos procesados con éxito.
+'''
+
+#--------------------------------------------------
+#---------------- LIBRERIAS -----------------------
+#--------------------------------------------------
+import pandas as pd
+
+import glob
+import json
+import os
+from datetime import datetime
+
+from .Excel_Cache import file_hash
+
+
+def manifest_path(output_path, name):
+    """
+    Construye la ruta del manifiesto de un proceso dentro del directorio de Parquet procesados.
+
+    Args:
+        output_path (str): Directorio de los Parquet procesados.
+        name (str): Nombre del proceso (ej. 'fill_rate', 'sales', 'demand').
+
+    Returns:
+        str: Ruta completa del manifiesto.
+    """
+    return os.path.join(output_path, f"_manifest_{name}.json")
+
+
+def load_manifest(path):
+    """
+    Lee el manifiesto de archivos procesados.
+
+    Args:
+        path (str): Ruta del manifiesto.
+
+    Returns:
+        dict: Manifiesto con la clave 'files' ({nombre_archivo: registro}). Vacío si no existe o no se puede leer.
+    """
+    if not os.path.exists(path):
+        return {'files': {}}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        manifest.setdefault('files', {})
+        return manifest
+    except Exception as e:
+        print(f"Advertencia: No se pudo leer el manifiesto '{path}', se procesarán todos los archivos: {e}")
+        return {'files': {}}
+
+
+def save_manifest(path, manifest):
+    """
+    Guarda el manifiesto de forma atómica (archivo temporal + renombrado).
+
+    Args:
+        path (str): Ruta del manifiesto.
+        manifest (dict): Manifiesto a guardar.
+
+    Returns:
+        None: La función escribe el archivo en disco.
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def pending_files(input_path, manifest):
+    """
+    Identifica los archivos .xlsx del directorio que no están en el manifiesto o cuyo contenido cambió.
+    Si el tamaño y la fecha de modificación coinciden con el registro, el archivo se da por procesado
+    sin calcular su hash; si no, se compara el hash del contenido.
+
+    Args:
+        input_path (str): Directorio de los archivos de actualización.
+        manifest (dict): Manifiesto leído con load_manifest.
+
+    Returns:
+        tuple: (lst_pending, dict_hashes). lst_pending es la lista ordenada de rutas a procesar y
+               dict_hashes el hash de contenido de cada una.
+    """
+    lst_pending = []
+    dict_hashes = {}
+    for filename in sorted(glob.glob(os.path.join(input_path, "*.xlsx"))):
+        entry = manifest['files'].get(os.path.basename(filename))
+        stat = os.stat(filename)
+        if entry and entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns:
+            continue
+        content_hash = file_hash(filename)
+        if entry and entry.get('hash') == content_hash:
+            # Mismo contenido con otra fecha de modificación: solo se actualiza el registro
+            entry['size'] = stat.st_size
+            entry['mtime_ns'] = stat.st_mtime_ns
+            continue
+        lst_pending.append(filename)
+        dict_hashes[filename] = content_hash
+    return lst_pending, dict_hashes
+
+
+def summarize_files(df_update, source_column='source_file'):
+    """
+    Calcula el número de filas y los periodos (fk_year_month) de cada archivo fuente. Si la columna de
+    origen es categórica (read_files), las categorías sin filas se incluyen con 'rows': 0: el archivo se
+    leyó sin error aunque no tenga registros.
+
+    Args:
+        df_update (pd.DataFrame): DataFrame leído con read_files(..., add_source_column=True), puede estar vacío.
+                                  Los periodos se calculan si contiene 'Fiscal Year' y 'Fiscal Period'.
+        source_column (str, optional): Columna con el nombre del archivo fuente. Por defecto 'source_file'.
+
+    Returns:
+        dict: {nombre_archivo: {'rows': int, 'periods': list}}.
+    """
+    dict_stats = {}
+    sr_source = df_update[source_column]
+    if isinstance(sr_source.dtype, pd.CategoricalDtype):
+        dict_stats = {source: {'rows': 0, 'periods': []} for source in sr_source.cat.categories}
+    has_periods = 'Fiscal Year' in df_update.columns and 'Fiscal Period' in df_update.columns
+    for source, group in df_update.groupby(source_column, sort=False, observed=True):
+        periods = []
+        if has_periods:
+            periods = sorted((group['Fiscal Year'].astype(str) + '-' +
+                              group['Fiscal Period'].astype(str).str.zfill(2)).dropna().unique().tolist())
+        dict_stats[source] = {'rows': int(len(group)), 'periods': periods}
+    return dict_stats
+
+
+def record_files(manifest, dict_hashes, dict_stats):
+    """
+    Registra en el manifiesto los archivos procesados con éxito: solo los que aparecen en dict_stats, es decir,
+    los que read_files leyó sin error (también los que no tienen filas, con 'rows': 0). Los archivos pendientes que fallaron en la lectura (permiso
+    denegado, archivo dañado, ...) no se registran y se vuelven a intentar en la siguiente ejecución.
+
+    Args:
+        manifest (dict): Manifiesto a actualizar (se modifica en el lugar).
+        dict_hashes (dict): Hash de contenido por ruta de archivo (de pending_files).
+        dict_stats (dict): Filas y periodos por nombre de archivo (de summarize_files).
+
+    Returns:
+        dict: El manifiesto actualizado.
+    """
+    completed_at = datetime.now().isoformat(timespec='seconds')
+    for filename, content_hash in dict_hashes.items():
+        name = os.path.basename(filename)
+        stats = dict_stats.get(name)
+        if stats is None:
+            print(f"  [ADVERTENCIA] El archivo {name} no se leyó; no se registra en el manifiesto y se "
+                  "reintentará en la próxima ejecución.")
+            continue
+        stat = os.stat(filename)
+        manifest['files'][name] = {
+            'hash': content_hash,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'rows': stats['rows'],
+            'periods': stats['periods'],
+            'completed_at': completed_at,
+        }
+    return manifest
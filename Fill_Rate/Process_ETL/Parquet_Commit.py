@@ -0,0 +1,223 @@
+'''
+Módulo de escritura atómica de particiones Parquet (protocolo preparar -> confirmar).
+Evita que una ejecución interrumpida (cierre del proceso, suspensión del equipo, sincronización de
+OneDrive) deje archivos 'sales_YYYY-MM.parquet' truncados:
+
+1. Cada archivo nuevo se escribe completo en '<output>/_staging/<run_id>/' (nunca sobre el original).
+2. Con todos los archivos en disco se registra 'prepared' en '<output>/_commit_log.jsonl' con la lista
+   de archivos a reemplazar y a eliminar.
+3. Los archivos se mueven a su destino con os.replace (atómico por archivo) y se registra 'committed'.
+
+Si el proceso muere antes del paso 2 la ejecución se descarta (los Parquet originales no se tocaron);
+si muere después, recover_parquet_dir completa los reemplazos pendientes a partir del registro. En
+ambos casos no es necesario recargar el histórico completo.
+
+Contiene las siguientes funciones:
+- new_run_id: Genera el identificador de una ejecución.
+- staging_path: Directorio temporal de una ejecución.
+- read_commit_log: Lee los registros del log de confirmaciones.
+- commit_staged: Registra y aplica (mueve) los archivos preparados de una ejecución.
+- recover_parquet_dir: Completa o descarta las ejecuciones interrumpidas de un directorio.
+- write_parquet_files_atomic: Escribe varios DataFrames como archivos Parquet con el protocolo completo.
+'''
+
+#--------------------------------------------------
+#---------------- LIBRERIAS -----------------------
+#--------------------------------------------------
+import glob
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime
+
+# Directorio de escritura temporal y log de confirmaciones dentro del directorio de salida
+STAGING_DIR = '_staging'
+COMMIT_LOG_NAME = '_commit_log.jsonl'
+# Registros que se conservan al compactar el log
+MAX_LOG_RECORDS = 200
+
+
+def new_run_id():
+    """Genera un identificador único y ordenable para una ejecución de escritura."""
+    return f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+
+def staging_path(output_path, run_id):
+    """Devuelve el directorio temporal donde se escriben los archivos de una ejecución."""
+    return os.path.join(output_path, STAGING_DIR, run_id)
+
+
+def _fsync_file(path):
+    """Fuerza la escritura a disco de un archivo ya cerrado."""
+    with open(path, 'ab') as f:
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _append_log(output_path, record):
+    """Agrega un registro al log de confirmaciones y lo fuerza a disco."""
+    record = dict(record, time=datetime.now().isoformat(timespec='seconds'))
+    with open(os.path.join(output_path, COMMIT_LOG_NAME), 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_commit_log(output_path):
+    """
+    Lee los registros del log de confirmaciones de un directorio.
+    Una última línea incompleta (escritura interrumpida) se ignora.
+
+    Args:
+        output_path (str): Directorio de los Parquet.
+
+    Returns:
+        list: Registros (dict) en orden de escritura.
+    """
+    log_path = os.path.join(output_path, COMMIT_LOG_NAME)
+    if not os.path.exists(log_path):
+        return []
+    lst_records = []
+    with open(log_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                lst_records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return lst_records
+
+
+def _compact_log(output_path):
+    """Reescribe el log conservando los últimos MAX_LOG_RECORDS registros (temporal + renombrado)."""
+    lst_records = read_commit_log(output_path)
+    if len(lst_records) <= MAX_LOG_RECORDS:
+        return
+    log_path = os.path.join(output_path, COMMIT_LOG_NAME)
+    with open(log_path + '.tmp', 'w', encoding='utf-8') as f:
+        for record in lst_records[-MAX_LOG_RECORDS:]:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    os.replace(log_path + '.tmp', log_path)
+
+
+def _apply(output_path, run_id, lst_files, lst_delete):
+    """
+    Mueve los archivos preparados a su destino y elimina los reemplazados. Es idempotente: los
+    archivos ya movidos o eliminados en un intento anterior se omiten.
+    """
+    staging = staging_path(output_path, run_id)
+    for relative_path in lst_files:
+        source = os.path.join(staging, relative_path)
+        target = os.path.join(output_path, relative_path)
+        if os.path.exists(source):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(source, target)
+        elif not os.path.exists(target):
+            raise FileNotFoundError(f"Falta el archivo preparado '{relative_path}' de la ejecución {run_id}")
+    for relative_path in lst_delete:
+        target = os.path.join(output_path, relative_path)
+        if os.path.exists(target):
+            os.remove(target)
+    shutil.rmtree(staging, ignore_errors=True)
+
+
+def commit_staged(output_path, run_id, lst_files, lst_delete=None):
+    """
+    Confirma una ejecución cuyos archivos ya están completos en el directorio temporal:
+    registra 'prepared', los mueve a su destino y registra 'committed'.
+
+    Args:
+        output_path (str): Directorio de los Parquet.
+        run_id (str): Identificador de la ejecución (ver new_run_id).
+        lst_files (list): Rutas relativas (respecto a output_path y al directorio temporal) de los archivos nuevos.
+        lst_delete (list, optional): Rutas relativas de archivos existentes que deben eliminarse.
+
+    Returns:
+        None: La función mueve los archivos y actualiza el log.
+    """
+    lst_delete = [path for path in (lst_delete or []) if path not in set(lst_files)]
+    for relative_path in lst_files:
+        _fsync_file(os.path.join(staging_path(output_path, run_id), relative_path))
+    _append_log(output_path, {'run_id': run_id, 'status': 'prepared', 'files': lst_files, 'delete': lst_delete})
+    _apply(output_path, run_id, lst_files, lst_delete)
+    _append_log(output_path, {'run_id': run_id, 'status': 'committed'})
+    _compact_log(output_path)
+
+
+def recover_parquet_dir(output_path):
+    """
+    Revisa el log de un directorio y resuelve las ejecuciones interrumpidas:
+    - 'prepared' sin 'committed': se completan los reemplazos pendientes (roll forward).
+    - Directorios temporales sin 'prepared': se eliminan (roll back; los originales no se modificaron).
+
+    Args:
+        output_path (str): Directorio de los Parquet.
+
+    Returns:
+        dict: {'recovered': [run_id, ...], 'rolled_back': [run_id, ...]}.
+    """
+    result = {'recovered': [], 'rolled_back': []}
+    if not os.path.isdir(output_path):
+        return result
+    dict_prepared = {}
+    set_committed = set()
+    for record in read_commit_log(output_path):
+        if record.get('status') == 'prepared':
+            dict_prepared[record['run_id']] = record
+        elif record.get('status') == 'committed':
+            set_committed.add(record['run_id'])
+
+    for run_id, record in dict_prepared.items():
+        if run_id in set_committed:
+            continue
+        print(f"  [RECUPERACIÓN] Completando la escritura interrumpida {run_id} en '{output_path}'")
+        _apply(output_path, run_id, record['files'], record.get('delete', []))
+        _append_log(output_path, {'run_id': run_id, 'status': 'committed', 'recovered': True})
+        result['recovered'].append(run_id)
+
+    staging_root = os.path.join(output_path, STAGING_DIR)
+    if os.path.isdir(staging_root):
+        for run_id in os.listdir(staging_root):
+            if run_id in dict_prepared:
+                # Ejecución ya confirmada: solo queda limpiar el directorio temporal
+                shutil.rmtree(os.path.join(staging_root, run_id), ignore_errors=True)
+                continue
+            print(f"  [RECUPERACIÓN] Descartando la escritura incompleta {run_id} en '{output_path}'")
+            shutil.rmtree(os.path.join(staging_root, run_id), ignore_errors=True)
+            result['rolled_back'].append(run_id)
+    return result
+
+
+def write_parquet_files_atomic(iter_frames, output_path, delete_pattern=None, **parquet_options):
+    """
+    Escribe varios DataFrames como archivos Parquet del directorio de salida de forma atómica:
+    primero se resuelven las ejecuciones interrumpidas anteriores, luego se escriben todos los
+    archivos en el directorio temporal y finalmente se confirman con commit_staged.
+
+    Args:
+        iter_frames (iterable): Pares (ruta_relativa, DataFrame), ej. ('sales_2024-01.parquet', df).
+                                Se consumen de a uno, sin mantener todos los DataFrames en memoria.
+        output_path (str): Directorio de los Parquet.
+        delete_pattern (str, optional): Patrón glob (ej. 'demand_*.parquet'); los archivos existentes que lo
+                                        cumplan y no se hayan escrito en esta ejecución se eliminan en la misma
+                                        confirmación (reemplazo completo del directorio). Por defecto None.
+        **parquet_options: Opciones de DataFrame.to_parquet (ej. compression).
+
+    Returns:
+        str: Identificador de la ejecución confirmada.
+    """
+    recover_parquet_dir(output_path)
+    run_id = new_run_id()
+    staging = staging_path(output_path, run_id)
+    os.makedirs(staging, exist_ok=True)
+    lst_files = []
+    for filename, df in iter_frames:
+        os.makedirs(os.path.dirname(os.path.join(staging, filename)), exist_ok=True)
+        df.to_parquet(os.path.join(staging, filename), index=False, **parquet_options)
+        lst_files.append(filename)
+    lst_delete = []
+    if delete_pattern is not None:
+        lst_delete = [os.path.basename(path) for path in glob.glob(os.path.join(output_path, delete_pattern))
+                      if os.path.basename(path) not in lst_files]
+    commit_staged(output_path, run_id, lst_files, lst_delete)
+    return run_id
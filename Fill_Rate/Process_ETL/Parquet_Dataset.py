@@ -0,0 +1,200 @@
+'''
+Módulo de escritura de datasets Parquet particionados (estilo Hive) con pyarrow.dataset.
+Alternativa a la escritura plana de group_parquet ('{name}_{periodo}.parquet'): los datos se
+escriben en carpetas 'columna=valor' (ej. 'year=2024/month=01/fk_Country=co/'), en paralelo,
+con tamaño de row group, codificación por diccionario, compresión y estadísticas configurables.
+Los lectores (pyarrow.dataset, Power BI, DuckDB) pueden así descartar particiones y row groups
+completos en lugar de abrir todos los archivos mensuales.
+
+Las columnas de partición 'year' y 'month' se derivan de 'fk_year_month' ('YYYY-MM') si no existen.
+
+El dataset es la copia de lectura de cada hecho (Fill Rate, Sales, Demand) y se publica en un directorio
+propio (ej. 'Sales_Dataset'). Los archivos planos de group_parquet se conservan porque son la base de
+escritura de las actualizaciones: el índice de claves (Key_Index), los deltas (Delta_Store) y la
+confirmación atómica (Parquet_Commit) trabajan sobre un archivo por periodo. publish_dataset copia en
+el dataset solo los periodos escritos por cada ejecución, leyéndolos ya combinados con sus deltas
+pendientes (ver Delta_Store.read_merged). El particionamiento (ej. por país), el códec y el tamaño de
+row group los elige cada proceso (ej. SALES_DATASET_OPTIONS en Sales/Process_ETL/Process_Files.py).
+
+Contiene las siguientes funciones:
+- add_partition_columns: Agrega las columnas derivadas 'year' / 'month' a partir de 'fk_year_month'.
+- write_parquet_dataset: Escribe un DataFrame como dataset Parquet particionado (estilo Hive).
+- stored_periods: Periodos 'YYYY-MM' guardados en un directorio de archivos planos (base o deltas).
+- publish_dataset: Publica periodos de los archivos planos en el dataset particionado.
+'''
+
+#--------------------------------------------------
+#---------------- LIBRERIAS -----------------------
+#--------------------------------------------------
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+import glob
+import os
+import re
+import shutil
+
+from .Delta_Store import read_merged, delta_periods
+
+# Particionamiento por defecto: un directorio por periodo, equivalente a los archivos de group_parquet
+DEFAULT_PARTITION_COLS = ['fk_year_month']
+# Filas por row group: suficientemente grande para comprimir bien y pequeño para podar por estadísticas
+DEFAULT_ROW_GROUP_SIZE = 250_000
+# Particionamiento del dataset publicado: carpetas 'year=YYYY/month=MM'
+PUBLISHED_PARTITION_COLS = ['year', 'month']
+
+
+def add_partition_columns(df, partition_cols, period_column='fk_year_month'):
+    """
+    Agrega las columnas de partición derivadas del periodo que no existan en el DataFrame:
+    'year' (4 primeros caracteres) y 'month' (2 últimos caracteres) de period_column ('YYYY-MM').
+
+    Args:
+        df (pd.DataFrame): DataFrame a escribir.
+        partition_cols (list): Columnas de partición pedidas.
+        period_column (str, optional): Columna de periodo. Por defecto 'fk_year_month'.
+
+    Returns:
+        pd.DataFrame: El DataFrame (copia si se agregó alguna columna).
+    """
+    derived = {'year': lambda serie: serie.str[:4], 'month': lambda serie: serie.str[-2:]}
+    missing = [col for col in partition_cols if col not in df.columns and col in derived]
+    if not missing:
+        return df
+    period = df[period_column].astype(str)
+    return df.assign(**{col: derived[col](period) for col in missing})
+
+
+def write_parquet_dataset(df, output_path, name='fill_rate', partition_cols=None, compression='snappy',
+                          row_group_size=DEFAULT_ROW_GROUP_SIZE, use_dictionary=True, write_statistics=True,
+                          existing_data_behavior='delete_matching', use_threads=True):
+    """
+    Escribe un DataFrame como dataset Parquet particionado estilo Hive con pyarrow.dataset.
+    Con existing_data_behavior='delete_matching' (por defecto) cada partición escrita reemplaza a la
+    existente y las demás se conservan, igual que group_parquet sobrescribe solo los periodos presentes.
+
+    Args:
+        df (pd.DataFrame): DataFrame procesado (ej. salida de format_columns).
+        output_path (str): Directorio raíz del dataset.
+        name (str, optional): Prefijo de los archivos de cada partición. Por defecto 'fill_rate'.
+        partition_cols (list, optional): Columnas de partición, en orden de anidamiento
+                                         (ej. ['year', 'month', 'fk_Country']). Por defecto ['fk_year_month'].
+        compression (str, optional): Códec ('snappy', 'zstd', 'gzip', 'lz4', 'brotli' o 'none'). Por defecto 'snappy'.
+        row_group_size (int, optional): Máximo de filas por row group. Por defecto 250.000.
+        use_dictionary (bool, optional): Codificación por diccionario de las columnas. Por defecto True.
+        write_statistics (bool, optional): Guarda estadísticas min/max por row group. Por defecto True.
+        existing_data_behavior (str, optional): 'delete_matching', 'overwrite_or_ignore' o 'error'.
+        use_threads (bool, optional): Escribe las particiones en paralelo. Por defecto True.
+
+    Returns:
+        list: Rutas de los archivos escritos.
+    """
+    partition_cols = list(partition_cols or DEFAULT_PARTITION_COLS)
+    df = add_partition_columns(df, partition_cols)
+
+    # Las columnas de partición se escriben como texto (los valores forman los nombres de carpeta)
+    df = df.assign(**{col: df[col].astype(str) for col in partition_cols})
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    partitioning = ds.partitioning(pa.schema([table.schema.field(col) for col in partition_cols]), flavor='hive')
+    file_format = ds.ParquetFileFormat()
+    file_options = file_format.make_write_options(compression=compression,
+                                                  use_dictionary=use_dictionary,
+                                                  write_statistics=write_statistics)
+    lst_written = []
+    os.makedirs(output_path, exist_ok=True)
+    ds.write_dataset(table, output_path, format=file_format, file_options=file_options,
+                     partitioning=partitioning,
+                     basename_template=f"{name}-{{i}}.parquet",
+                     max_rows_per_group=row_group_size,
+                     min_rows_per_group=min(row_group_size, 1024 * 64),
+                     existing_data_behavior=existing_data_behavior,
+                     use_threads=use_threads,
+                     file_visitor=lambda written_file: lst_written.append(written_file.path))
+    print(f"Dataset Parquet escrito en: {output_path} ({len(lst_written)} archivos, particiones: {partition_cols})\n")
+    return lst_written
+
+
+def _period_partition_dir(dataset_path, period, partition_cols):
+    """Carpeta de un periodo dentro del dataset; las primeras columnas de partición deben ser las del periodo."""
+    if partition_cols[:1] == ['fk_year_month']:
+        return os.path.join(dataset_path, f"fk_year_month={period}")
+    if partition_cols[:2] == ['year', 'month']:
+        return os.path.join(dataset_path, f"year={period[:4]}", f"month={period[-2:]}")
+    raise ValueError(f"El dataset debe particionarse primero por 'fk_year_month' o por 'year', 'month': {partition_cols}")
+
+
+def stored_periods(output_path, name):
+    """
+    Devuelve los periodos 'YYYY-MM' guardados en un directorio de archivos planos: los de los archivos
+    base '{name}_YYYY-MM.parquet' y los que solo tienen deltas pendientes.
+
+    Args:
+        output_path (str): Directorio de los Parquet planos.
+        name (str): Prefijo de los archivos (ej. 'fill_rate').
+
+    Returns:
+        list: Periodos ordenados.
+    """
+    pattern = re.compile(rf"^{re.escape(name)}_(\d{{4}}-\d{{2}})\.parquet$")
+    set_periods = set(delta_periods(output_path, name))
+    for path in glob.glob(os.path.join(output_path, glob.escape(name) + '_*.parquet')):
+        match = pattern.match(os.path.basename(path))
+        if match:
+            set_periods.add(match.group(1))
+    return sorted(set_periods)
+
+
+def publish_dataset(output_path, dataset_path, name, periods=None, key_column=None, fk_column=None,
+                    partition_cols=None, **dataset_options):
+    """
+    Publica en el dataset particionado los periodos indicados de un directorio de archivos planos.
+    Cada periodo se lee combinado con sus deltas (read_merged) y reemplaza por completo su carpeta en
+    el dataset; los periodos sin datos se eliminan del dataset. Se procesa un periodo a la vez, por lo
+    que la memoria usada no depende del tamaño del histórico.
+
+    Args:
+        output_path (str): Directorio de los Parquet planos ('{name}_YYYY-MM.parquet').
+        dataset_path (str): Directorio raíz del dataset particionado.
+        name (str): Prefijo de los archivos (ej. 'fill_rate').
+        periods (list, optional): Periodos 'YYYY-MM' a publicar. Si es None se publican todos los periodos
+                                  guardados y se eliminan del dataset los que ya no existen (carga completa).
+        key_column (str, optional): Columna de clave sustituta (para aplicar las lápidas). Por defecto None.
+        fk_column (str, optional): Clave legible (para aplicar las lápidas). Por defecto None.
+        partition_cols (list, optional): Columnas de partición; deben empezar por las del periodo.
+                                         Por defecto ['year', 'month'].
+        **dataset_options: Opciones de write_parquet_dataset (compression, row_group_size, ...).
+
+    Returns:
+        list: Periodos publicados con datos.
+    """
+    partition_cols = list(partition_cols or PUBLISHED_PARTITION_COLS)
+    full_load = periods is None
+    lst_periods = stored_periods(output_path, name) if full_load else sorted(set(map(str, periods)))
+
+    if full_load and os.path.isdir(dataset_path):
+        # Carga completa: se eliminan las carpetas de periodos que ya no existen en los archivos planos
+        set_expected = {os.path.normpath(_period_partition_dir(dataset_path, period, partition_cols))
+                        for period in lst_periods}
+        depth = 1 if partition_cols[0] == 'fk_year_month' else 2
+        for path in glob.glob(os.path.join(dataset_path, *['*'] * depth)):
+            if os.path.isdir(path) and os.path.normpath(path) not in set_expected:
+                shutil.rmtree(path)
+                # Carpeta 'year=YYYY' que queda vacía
+                parent = os.path.dirname(path)
+                if depth == 2 and not os.listdir(parent):
+                    os.rmdir(parent)
+
+    lst_published = []
+    for period in lst_periods:
+        df_period = read_merged(output_path, name, [period], key_column=key_column, fk_column=fk_column)
+        # La carpeta del periodo se reemplaza completa (incluidas las subparticiones que ya no tengan datos)
+        shutil.rmtree(_period_partition_dir(dataset_path, period, partition_cols), ignore_errors=True)
+        if df_period.empty:
+            continue
+        write_parquet_dataset(df_period, dataset_path, name=name, partition_cols=partition_cols,
+                              existing_data_behavior='overwrite_or_ignore', **dataset_options)
+        lst_published.append(period)
+    print(f"Dataset particionado actualizado en: {dataset_path} ({len(lst_published)} periodos publicados)\n")
+    return lst_published
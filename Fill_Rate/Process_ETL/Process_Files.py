@@ -6,7 +6,8 @@ realizar transformaciones clave y guardar los datos limpios en formato Parquet
 particionado por año-mes.
 
 Contiene las siguientes funciones:
-- read_files: Lee archivos Excel de un directorio y los consolida en un DataFrame   
+- read_files: Lee archivos Excel de un directorio (en paralelo) y los consolida en un DataFrame   
+- iter_read_files: Lee archivos Excel por streaming y entrega lotes de filas de tamaño acotado.
 - asign_country_code: Asigna el código de país a cada fila del DataFrame df usando el DataFrame country como referencia.
 - process_columns: Procesa las columnas relevantes del DataFrame df y las convierte a mayúsculas.
 - group_parquet: Guarda un DataFrame consolidado en archivos Parquet segmentados por año-mes.
@@ -22,15 +23,122 @@ import numpy as np
 # Permite buscar y recuperar una lista de nombres de archivos que coinciden con un patrón específico.
 import glob
 import os
+# Lectura de archivos en paralelo (un proceso por archivo)
+from concurrent.futures import ProcessPoolExecutor
+
+# Normalización de texto compartida (mayúsculas / sin espacios) con marcas de columnas normalizadas
+from Shared_Information_for_Projects.Normalization import (normalize_series, normalize_columns,
+                                                           unmark_columns, rename_marks)
+# Claves sustitutas enteras a partir de las columnas componentes
+from Shared_Information_for_Projects.Surrogate_Keys import build_surrogate_key, build_readable_key
+
+# Caché Parquet de los archivos Excel de entrada
+from .Excel_Cache import read_excel_cached, evict_stale_entries
+# Publicación del dataset Parquet particionado (estilo Hive)
+from .Parquet_Dataset import publish_dataset, PUBLISHED_PARTITION_COLS, DEFAULT_ROW_GROUP_SIZE
+# Reemplazo atómico de archivos Parquet (preparar -> confirmar) con log de confirmaciones
+from .Parquet_Commit import write_parquet_files_atomic
+# Índices de claves (sidecar) para upserts por row group
+from .Key_Index import key_index_name, build_key_index, KEY_INDEX_ROW_GROUP_SIZE
+# Deltas de las actualizaciones (modo merge-on-read)
+from .Delta_Store import discard_deltas
+
+# Lectura por streaming: openpyxl en modo read-only o python-calamine (Rust) si está instalado
+from openpyxl import load_workbook
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:
+    CalamineWorkbook = None
+
+# Componentes de la clave sustituta y de la clave legible 'fk_date_country_customer_clasification'.
+# Se guardan en los Parquet para poder reconstruir la clave legible (ver Surrogate_Keys.rebuild_readable_key)
+LST_KEY_COLUMNS = ['fk_year_month', 'fk_Country', 'fk_Sold_To_Customer_Code', 'clasification']
+
+# Opciones del dataset particionado de Fill Rate (carga completa y actualizaciones, ver publish_dataset)
+FILL_RATE_DATASET_OPTIONS = {'partition_cols': PUBLISHED_PARTITION_COLS, 'compression': 'snappy',
+                             'row_group_size': DEFAULT_ROW_GROUP_SIZE}
+
+
+# Lectura de un archivo (se ejecuta dentro de los procesos del pool)
+def _read_single_file(filename, cache_dir=None, columns=None, filters=None):
+    """
+    Lee un único archivo Excel como texto. Se define a nivel de módulo para que pueda ser
+    enviado a los procesos del ProcessPoolExecutor.
+
+    Args:
+        filename (str): Ruta completa del archivo .xlsx a leer.
+        cache_dir (str, optional): Directorio de la caché Parquet. Si es None se lee directamente el Excel.
+        columns (list, optional): Proyección de columnas a materializar (ver read_files).
+        filters (dict, optional): Filtros de filas {columna: valor o lista de valores} (ver read_files).
 
+    Returns:
+        tuple: (df, tipo_error, mensaje). Si la lectura es exitosa df es el DataFrame leído y
+               tipo_error es None; si falla df es None y tipo_error es 'permission' u 'other'.
+    """
+    try:
+        # Las columnas de los filtros se leen aunque no estén en la proyección
+        read_columns = None
+        if columns is not None:
+            read_columns = list(columns) + [col for col in (filters or {}) if col not in columns]
+
+        if cache_dir is not None:
+            df = read_excel_cached(filename, cache_dir, columns=read_columns)
+        elif read_columns is not None:
+            set_columns = set(read_columns)
+            df = pd.read_excel(filename, dtype=str, engine='openpyxl', usecols=lambda col: col in set_columns)
+        else:
+            df = pd.read_excel(filename, dtype=str, engine='openpyxl')
+
+        # --- FILTRO DE FILAS ---
+        # Se compara sobre el valor normalizado (mayúsculas y sin espacios en los extremos)
+        if filters:
+            mask = pd.Series(True, index=df.index)
+            for col, values in filters.items():
+                if col not in df.columns:
+                    mask &= False
+                    continue
+                if isinstance(values, (list, tuple, set)):
+                    lst_values = [str(value).upper().strip() for value in values]
+                else:
+                    lst_values = [str(values).upper().strip()]
+                mask &= df[col].astype(str).str.upper().str.strip().isin(lst_values)
+            df = df[mask].reset_index(drop=True)
+            if columns is not None:
+                df = df[[col for col in columns if col in df.columns]]
+        return df, None, None
+    except PermissionError:
+        return None, 'permission', None
+    except Exception as e:
+        return None, 'other', str(e)
 
 # Lectura de archivos
-def read_files(input_path):
+def read_files(input_path, max_workers=None, use_cache=True, cache_dir=None, columns=None, filters=None,
+               files=None, add_source_column=False):
     """
-    Lee archivos Excel de un directorio, los consolida en un dataframe
+    Lee archivos Excel de un directorio, los consolida en un dataframe.
+    Cuando hay más de un archivo, la lectura se reparte entre varios procesos (un archivo por
+    tarea) y los resultados se consolidan en orden alfabético de nombre de archivo, de forma
+    que el resultado es el mismo que en la lectura secuencial.
+    Cada libro se convierte a Parquet la primera vez que se lee (ver Excel_Cache); las lecturas
+    posteriores del mismo contenido cargan el Parquet en lugar de volver a parsear el Excel.
     
     Args:
         input_path (str): Ruta del directorio donde se encuentran los archivos Excel (.xlsx) a consolidar.
+        max_workers (int, optional): Número máximo de procesos de lectura. Por defecto (None) se usa
+                                     min(número de archivos, núcleos disponibles). Con 1 la lectura es secuencial.
+        use_cache (bool, optional): Si es True (por defecto) usa la caché Parquet de los archivos Excel.
+        cache_dir (str, optional): Directorio de la caché. Por defecto '<input_path>/_cache_parquet'.
+        columns (list, optional): Proyección de columnas. Solo estas columnas se materializan y normalizan;
+                                  las que no existan en un archivo se ignoran. Por defecto todas.
+        filters (dict, optional): Filtros de filas {columna: valor o lista de valores}, aplicados por archivo
+                                  antes de consolidar. La comparación no distingue mayúsculas ni espacios
+                                  en los extremos (ej. {'Fiscal Year': ['2024', '2025']}).
+        files (list, optional): Rutas de los archivos a leer dentro de input_path (ej. solo los pendientes
+                                según el manifiesto). Por defecto todos los .xlsx del directorio.
+        add_source_column (bool, optional): Si es True agrega la columna categórica 'source_file' con el nombre
+                                            del archivo de origen de cada fila; sus categorías son todos los
+                                            archivos leídos sin error, incluso los que no tienen filas.
+                                            Por defecto False.
     
     Returns:
         pd.DataFrame or None: DataFrame consolidado con todos los datos de los archivos, o None si no se encuentran
@@ -38,41 +146,200 @@ def read_files(input_path):
      """
     
     # --- LECTURA Y CONSOLIDACION DE ARCHIVOS ---
-    # Buscar todos los archivos .xlsx en el directorio de entrada.
-    all_files_xlsx = glob.glob(os.path.join(input_path, "*.xlsx"))
+    # Buscar todos los archivos .xlsx en el directorio de entrada (orden determinista).
+    dir_files_xlsx = sorted(glob.glob(os.path.join(input_path, "*.xlsx")))
+    all_files_xlsx = sorted(files) if files is not None else dir_files_xlsx
 
     if not all_files_xlsx:
         print(f"Advertencia: No se encontraron archivos .xlsx en '{input_path}'.")
         return
 
-    # Leer cada archivo y agregarlo a una lista de DataFrames:
-    lst_files_xlsx = []
+    if max_workers is None:
+        max_workers = min(len(all_files_xlsx), os.cpu_count() or 1)
+    if use_cache and cache_dir is None:
+        cache_dir = os.path.join(input_path, '_cache_parquet')
+    elif not use_cache:
+        cache_dir = None
+    lst_cache_dir = [cache_dir] * len(all_files_xlsx)
+    lst_columns = [columns] * len(all_files_xlsx)
+    lst_filters = [filters] * len(all_files_xlsx)
+
     for filename in all_files_xlsx:
-        try:
-            print(f"Leyendo archivo: {os.path.basename(filename)}")
-            # Usar pd.read_excel para archivos .xlsx, no pd.read_csv
-            df = pd.read_excel(filename, dtype=str, engine='openpyxl')
-            lst_files_xlsx.append(df)
-        except PermissionError:
+        print(f"Leyendo archivo: {os.path.basename(filename)}")
+
+    # Leer cada archivo (en paralelo si aplica); map conserva el orden de all_files_xlsx
+    if max_workers > 1 and len(all_files_xlsx) > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_read_single_file, all_files_xlsx, lst_cache_dir,
+                                        lst_columns, lst_filters))
+    else:
+        results = [_read_single_file(filename, cache_dir, columns, filters) for filename in all_files_xlsx]
+
+    # Eliminar de la caché los archivos que ya no están en el directorio de entrada
+    if cache_dir is not None:
+        evict_stale_entries(cache_dir, dir_files_xlsx)
+
+    # Agregar los DataFrames leídos a una lista y reportar los errores por archivo:
+    lst_files_xlsx = []
+    lst_sources = []
+    for filename, (df, error_type, error_msg) in zip(all_files_xlsx, results):
+        if error_type == 'permission':
             print(f"  [ERROR] Permiso denegado para leer el archivo: {os.path.basename(filename)}."
                   "\n  Asegúrate de que no esté abierto en Excel y vuelve a intentarlo.")
-        except Exception as e:
-            print(f"  [ERROR] No se pudo procesar el archivo {os.path.basename(filename)}: {e}")
+        elif error_type is not None:
+            print(f"  [ERROR] No se pudo procesar el archivo {os.path.basename(filename)}: {error_msg}")
+        else:
+            lst_files_xlsx.append(df)
+            lst_sources.append(os.path.basename(filename))
 
     # Concatenar todos los DataFrames en uno solo
     if len(lst_files_xlsx) == 0:
+        return
+    elif len(lst_files_xlsx) == 1:
         df_consolidated = lst_files_xlsx[0]
     else:
          df_consolidated = pd.concat(lst_files_xlsx, axis=0, ignore_index=True)
 
 
-    for col in df_consolidated.columns:
-        df_consolidated[col] = df_consolidated[col].astype(str).str.upper().str.strip()
+    # Normalizar todas las columnas (cada valor distinto se procesa una sola vez) y marcarlas
+    normalize_columns(df_consolidated, df_consolidated.columns)
+
+    if add_source_column:
+        df_consolidated['source_file'] = pd.Categorical(np.repeat(lst_sources, [len(df) for df in lst_files_xlsx]),
+                                                        categories=lst_sources)
 
     return df_consolidated
 
+def _cell_to_str(value):
+    """
+    Convierte el valor de una celda al texto que produciría pd.read_excel(dtype=str):
+    celdas vacías a NaN y números enteros sin decimales (ej. 2024.0 -> '2024').
+    """
+    if value is None or value == '':
+        return np.nan
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def _iter_excel_rows(filename):
+    """
+    Itera las filas (tuplas de valores) de la primera hoja de un libro Excel sin cargarlo completo
+    en memoria. Usa python-calamine si está instalado; si no, openpyxl en modo read_only.
+
+    Args:
+        filename (str): Ruta del archivo .xlsx.
+
+    Yields:
+        tuple: Valores de cada fila, incluyendo la fila de encabezados.
+    """
+    if CalamineWorkbook is not None:
+        workbook = CalamineWorkbook.from_path(filename)
+        yield from workbook.get_sheet_by_index(0).iter_rows()
+        return
+
+    workbook = load_workbook(filename, read_only=True, data_only=True)
+    try:
+        yield from workbook.worksheets[0].iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+def _build_header(row):
+    """
+    Construye los nombres de columna como lo hace pd.read_excel: celdas vacías como
+    'Unnamed: i' y nombres repetidos con sufijo '.1', '.2', etc.
+    """
+    header = []
+    seen = {}
+    for i, value in enumerate(row):
+        name = f"Unnamed: {i}" if value is None or value == '' else _cell_to_str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        header.append(name)
+    return header
+
+def _rows_to_batch(rows, header, idx_columns, filters):
+    """
+    Convierte una lista de filas en un DataFrame de texto normalizado (mayúsculas y sin espacios
+    en los extremos), aplicando la proyección de columnas y los filtros de read_files.
+    """
+    df = pd.DataFrame([[_cell_to_str(row[i]) if i < len(row) else np.nan for i in idx_columns] for row in rows],
+                      columns=[header[i] for i in idx_columns], dtype=object)
+    normalize_columns(df, df.columns)
+    if filters:
+        mask = pd.Series(True, index=df.index)
+        for col, values in filters.items():
+            if col not in df.columns:
+                mask &= False
+                continue
+            if not isinstance(values, (list, tuple, set)):
+                values = [values]
+            mask &= df[col].isin([str(value).upper().strip() for value in values])
+        df = df[mask].reset_index(drop=True)
+    return df
+
+# Lectura de archivos por lotes (streaming)
+def iter_read_files(input_path, chunk_size=50000, columns=None, filters=None):
+    """
+    Lee los archivos Excel de un directorio por streaming y entrega DataFrames de como máximo
+    chunk_size filas, de modo que la memoria pico no depende del tamaño del libro. Cada lote viene
+    de un único archivo y tiene el mismo formato que read_files (texto en mayúsculas y sin espacios
+    en los extremos). Los errores por archivo se reportan igual que en read_files y la lectura
+    continúa con el siguiente archivo.
+
+    Args:
+        input_path (str): Ruta del directorio donde se encuentran los archivos Excel (.xlsx).
+        chunk_size (int, optional): Número máximo de filas por lote. Por defecto 50000.
+        columns (list, optional): Proyección de columnas (ver read_files). Los filtros solo pueden
+                                  usar columnas incluidas en la proyección.
+        filters (dict, optional): Filtros de filas {columna: valor o lista de valores} (ver read_files).
+
+    Yields:
+        pd.DataFrame: Lotes de filas de cada archivo, en orden alfabético de nombre de archivo.
+    """
+    all_files_xlsx = sorted(glob.glob(os.path.join(input_path, "*.xlsx")))
+    if not all_files_xlsx:
+        print(f"Advertencia: No se encontraron archivos .xlsx en '{input_path}'.")
+        return
+
+    for filename in all_files_xlsx:
+        print(f"Leyendo archivo por lotes: {os.path.basename(filename)}")
+        try:
+            rows_iter = _iter_excel_rows(filename)
+            header = None
+            rows = []
+            empty_rows = []
+            for row in rows_iter:
+                # Las filas vacías solo se conservan si no están al final de la hoja, igual que pd.read_excel
+                if all(value is None or value == '' for value in row):
+                    if header is not None:
+                        empty_rows.append(row)
+                    continue
+                if header is None:
+                    header = _build_header(row)
+                    if columns is None:
+                        idx_columns = list(range(len(header)))
+                    else:
+                        idx_columns = [header.index(col) for col in columns if col in header]
+                    continue
+                rows.extend(empty_rows)
+                empty_rows = []
+                rows.append(row)
+                if len(rows) >= chunk_size:
+                    yield _rows_to_batch(rows, header, idx_columns, filters)
+                    rows = []
+            if rows:
+                yield _rows_to_batch(rows, header, idx_columns, filters)
+        except PermissionError:
+            print(f"  [ERROR] Permiso denegado para leer el archivo: {os.path.basename(filename)}."
+                  "\n  Asegúrate de que no esté abierto en Excel y vuelve a intentarlo.")
+        except Exception as e:
+            print(f"  [ERROR] No se pudo procesar el archivo {os.path.basename(filename)}: {e}")
+
 # Asignacion pais
-def asign_country_code(df_consolidated, df_country):
+def asign_country_code(df_consolidated, df_country, export_unmatched=True):
         """
         Asigna el código de país a cada fila del DataFrame df
         usando el DataFrame country como referencia.
@@ -82,6 +349,9 @@ def asign_country_code(df_consolidated, df_country):
                                             Debe contener las columnas 'Country Code' y 'Destination Country'.
             df_country (pd.DataFrame): DataFrame de referencia para el mapeo de países.
                                        Debe contener 'Country Code Concat' y 'Country'.
+            export_unmatched (bool, optional): Si es True (por defecto) exporta a Excel el control de códigos
+                                               de país asignados. Los procesos de la carga por partes lo omiten
+                                               para no escribir el mismo archivo en paralelo.
 
         Returns:
             pd.DataFrame: El DataFrame df_consolidated original, modificado con las nuevas columnas 'code concat country'
@@ -91,8 +361,8 @@ def asign_country_code(df_consolidated, df_country):
         df_consolidated['code concat country'] = df_consolidated['Country Code'].astype(str) + df_consolidated['Destination Country'].astype(str)
 
         # Crear un mapa de códigos de país a nombres de país
-        for col in df_country.columns:
-            df_country[col] = df_country[col].astype(str).str.upper().str.strip()
+        # Se omite si df_country ya fue normalizado por el llamador
+        normalize_columns(df_country, df_country.columns)
         country_map = df_country.set_index('Country Code Concat')['Country']
 
         # Usar .map() para crear la nueva columna 'new country'
@@ -103,12 +373,13 @@ def asign_country_code(df_consolidated, df_country):
         '''
         df_consolidated['pais']=df_consolidated['code concat country']+'-'+df_consolidated['fk_Country']
         
-        paises_unicos = df_consolidated['pais'].unique()
-        df_paises = pd.DataFrame(paises_unicos, columns=['code concat country-fk_Country'])
-        df_paises.to_excel(
-            r'C:\Users\SSN0609\OneDrive - Stanley Black & Decker\Latin America - Regional Marketing - Marketing Analytics\Data\Processed-Dataflow\Shared_Information_for_Projects\Country\result-code concat country-fk_Country.xlsx', 
-            index=False
-        )
+        if export_unmatched:
+            paises_unicos = df_consolidated['pais'].unique()
+            df_paises = pd.DataFrame(paises_unicos, columns=['code concat country-fk_Country'])
+            df_paises.to_excel(
+                r'C:\Users\SSN0609\OneDrive - Stanley Black & Decker\Latin America - Regional Marketing - Marketing Analytics\Data\Processed-Dataflow\Shared_Information_for_Projects\Country\result-code concat country-fk_Country.xlsx', 
+                index=False
+            )
         
       
         '''FIN DE LA LINEA'''
@@ -120,6 +391,8 @@ def process_columns(df_consolidated,lst_columns):
     """    
         Renombra, calcula columnas clave ('fk_year_month', 'clasification', 'fk_date_country_customer_clasification',
         'fk_Date'), y selecciona el subconjunto final de columnas para el DataFrame procesado.
+        La clave sustituta entera 'sk_date_country_customer_clasification' (ver Surrogate_Keys) se calcula si está en
+        lst_columns; la clave legible solo se construye si también se pide en lst_columns.
     Args:
         df_consolidated (pd.DataFrame): DataFrame consolidado que contiene todas las columnas sin procesar.
         lst_columns (list): Lista de strings con los nombres de las columnas finales deseadas, incluyendo las recién creadas (e.g., 'fk_Date', 'fk_Country').
@@ -151,6 +424,7 @@ def process_columns(df_consolidated,lst_columns):
         }
 
         df_consolidated.rename(columns=mapeo_filtrado, inplace=True)    
+        rename_marks(df_consolidated, mapeo_filtrado)
 
         df_consolidated['fk_year_month'] = (df_consolidated['Fiscal Year'].astype(str) + '-' +
                                             df_consolidated['Fiscal Period'].astype(str).str.zfill(2))
@@ -159,31 +433,43 @@ def process_columns(df_consolidated,lst_columns):
                                          df_consolidated['GPP Portfolio'])
         
         
-        df_consolidated['fk_date_country_customer_clasification'] = (df_consolidated['fk_year_month'] + '-' +
-                                                            df_consolidated['fk_Country']+ '-' +
-                                                            df_consolidated['fk_Sold_To_Customer_Code']+ '-' +
-                                                            df_consolidated['clasification']).str.upper().str.strip()
+        # Las claves se calculan sobre los valores originales, antes de format_columns (ver Surrogate_Keys)
+        if 'fk_date_country_customer_clasification' in lst_columns:
+            df_consolidated['fk_date_country_customer_clasification'] = build_readable_key(df_consolidated,
+                                                                                           LST_KEY_COLUMNS)
+        if 'sk_date_country_customer_clasification' in lst_columns:
+            df_consolidated['sk_date_country_customer_clasification'] = build_surrogate_key(df_consolidated,
+                                                                                            LST_KEY_COLUMNS)
         df_consolidated['fk_Date']=pd.to_datetime(df_consolidated['fk_year_month'],
                                                   format='%Y-%b',
                                                   errors='coerce')
+        unmark_columns(df_consolidated, ['fk_year_month', 'clasification',
+                                         'fk_date_country_customer_clasification', 'fk_Date'])
        
         df_processed = df_consolidated[lst_columns].copy()                                                                                                                                                                           
-        # Convertir todas las columnas a mayúsculas y eliminar espacios
-        for col in df_processed.columns:        
-            df_processed.loc[:,col] = df_consolidated[col].astype(str).str.upper().str.strip()    
+        # Convertir todas las columnas a mayúsculas y eliminar espacios (se omiten las ya normalizadas).
+        # La clave sustituta es entera: se excluye explícitamente para que no se convierta a texto
+        normalize_columns(df_processed, [col for col in df_processed.columns
+                                         if col != 'sk_date_country_customer_clasification'])
        
     except KeyError as e:
                 print(f"Error: La columna {e} no se encontró en los archivos. ")
     return df_processed
 
-def format_columns(df: pd.DataFrame, lst_columns_str: list, lst_columns_float: list) -> pd.DataFrame:
+def format_columns(df: pd.DataFrame, lst_columns_str: list, lst_columns_float: list,
+                   lst_columns_category: list = None, lst_columns_key: list = None) -> pd.DataFrame:
     """
     Convierte las columnas especificadas a str o float, manejando errores de conversión:
     - Los errores en float se convierten a NaN y luego a 0.
     - Los valores NaN/nulos/errores en str se convierten a la cadena vacía "".
+    - Las columnas de lst_columns_category (subconjunto de lst_columns_str, ej. dimensiones con pocos
+      valores distintos como país, SKU o periodo) se guardan como categóricas; en Parquet quedan
+      codificadas por diccionario, lo que reduce la memoria y el tamaño de los archivos.
+    - Las columnas de lst_columns_key (claves sustitutas) se conservan como enteros 'UInt64'.
     """
+    lst_columns_key = [col for col in (lst_columns_key or []) if col in df.columns]
     df=df.copy()
-    df=df[lst_columns_str+lst_columns_float]
+    df=df[lst_columns_str+lst_columns_float+lst_columns_key]
     # 1. CONVERSIÓN Y LIMPIEZA DE CADENAS (STR)
     for col in lst_columns_str:
         # 1.1. Convertir a str
@@ -205,35 +491,68 @@ def format_columns(df: pd.DataFrame, lst_columns_str: list, lst_columns_float: l
         df[col]=df[col].fillna(np.nan)  # Asegurar que los NaN se manejen correctamente
         # 2.2. Reemplazar NaN (errores de conversión) por 0, y asegurar dtype float
         df[col] = df[col].fillna(0).astype(np.float32)
-        
+
+    # 3. CLAVES SUSTITUTAS: enteros nulables (las filas históricas sin clave quedan en <NA>)
+    for col in lst_columns_key:
+        df[col] = df[col].astype('UInt64')
+
+    # 4. CONVERSIÓN A CATEGÓRICA (opcional) de las columnas de dimensión ya limpias
+    for col in lst_columns_category or []:
+        df[col] = df[col].astype('category')
+
+    # Las columnas quedan en minúsculas / numéricas: ya no cumplen la normalización de read_files
+    unmark_columns(df)
     return df
 
-def group_parquet(df_processed, output_path,name='fill_rate'):
+def group_parquet(df_processed, output_path,name='fill_rate', replace_all=False, key_column=None):
     """ Guarda un dataframe consolidado en archivos Parquet segmentados por año-mes.
     Args:
         df_processed (pd.DataFrame): DataFrame ya limpio y procesado. Debe contener la columna 'fk_year_month'.
         output_path (str): Ruta del directorio donde se guardarán los archivos Parquet particionados.
         name (str, optional): Prefijo para los nombres de los archivos Parquet generados. Por defecto es 'fill_rate'. 
+        replace_all (bool, optional): Si es True, los archivos '{name}_*.parquet' de periodos no presentes en
+                                      df_processed se eliminan en la misma confirmación (carga completa). Por defecto False.
+        key_column (str, optional): Columna de clave sustituta; si se indica, cada archivo se escribe en row groups de
+                                    KEY_INDEX_ROW_GROUP_SIZE filas junto con su índice de claves (ver Key_Index),
+                                    usado por upsert_partitions. Por defecto None.
 
     Returns:
         None: La función no devuelve un valor, sino que guarda los archivos en el disco.
     """
     # --- ESCRITURA DE ARCHIVOS PARQUET SEGMENTADOS ---
     # Agrupar el DataFrame por 'year_month' y guardar cada grupo en un archivo Parquet.
-    for period, group in df_processed.groupby('fk_year_month'):
-        # Crear un nombre de archivo descriptivo, ej: sales_2023-01.parquet
-        output_filename = f"{name}_{period}.parquet"
-        output_full_path = os.path.join(output_path, output_filename)
-        print(f"Guardando grupo {period} en: {output_full_path}\n")
-        # Guardar el grupo en formato Parquet, excluyendo el índice.
-        group.to_parquet(output_full_path, index=False)
-        #print("\nProceso completado. Archivos Parquet generados exitosamente.")
-
-def main():
+    # observed=True: con columnas categóricas solo se generan los periodos presentes
+    lst_columns_category = df_processed.select_dtypes(include='category').columns
+    def iter_groups():
+        for period, group in df_processed.groupby('fk_year_month', observed=True):
+            # Crear un nombre de archivo descriptivo, ej: sales_2023-01.parquet
+            output_filename = f"{name}_{period}.parquet"
+            print(f"Guardando grupo {period} en: {os.path.join(output_path, output_filename)}\n")
+            # Cada archivo guarda solo el diccionario de categorías usadas en su periodo
+            if len(lst_columns_category):
+                group = group.copy()
+                for col in lst_columns_category:
+                    group[col] = group[col].cat.remove_unused_categories()
+            yield output_filename, group
+            # Índice de claves del archivo (se escribe después del archivo, ver read_key_index)
+            if key_column is not None:
+                yield key_index_name(output_filename), build_key_index(group[key_column])
+    # Escritura atómica: los archivos se preparan en '_staging' y reemplazan a los existentes solo
+    # cuando todos están completos (ver Parquet_Commit); una ejecución interrumpida no deja archivos truncados.
+    parquet_options = {'row_group_size': KEY_INDEX_ROW_GROUP_SIZE} if key_column is not None else {}
+    write_parquet_files_atomic(iter_groups(), output_path,
+                               delete_pattern=f"{name}_*.parquet" if replace_all else None, **parquet_options)
+    #print("\nProceso completado. Archivos Parquet generados exitosamente.")
+
+def main(dataset_options=None):
     """
     Función principal que orquesta el flujo ETL completo para los datos de Fill Rate.
-    Lee las rutas de configuración, ejecuta la lectura, el mapeo de países,
-    el procesamiento de columnas y la segmentación en archivos Parquet.
+    Lee las rutas de configuración, ejecuta la lectura por lotes (iter_read_files), el mapeo de países,
+    el procesamiento de columnas, la segmentación en archivos Parquet y la publicación del dataset particionado.
+
+    Args:
+        dataset_options (dict, optional): Opciones del dataset particionado publicado (partition_cols, compression,
+                                          row_group_size, ... ver publish_dataset). Por defecto FILL_RATE_DATASET_OPTIONS.
 
     Returns: None: La función orquesta el proceso completo y no devuelve un valor.
     """
@@ -242,28 +561,54 @@ def main():
     fil_rate_historic_raw_dir = FillRatePaths.INPUT_RAW_HISTORIC_DIR
     country_code_file = FillRatePaths.INPUT_PROCESSED_COUNTRY_CODES_FILE
     processed_parquet_dir = FillRatePaths.OUTPUT_PROCESSED_PARQUETS_DIR
+    processed_dataset_dir = FillRatePaths.OUTPUT_PROCESSED_DATASET_DIR
 
-    # Leer los archivos de datos históricos y consolidarlos en un DataFrame.
-    df_consolidated = read_files(fil_rate_historic_raw_dir)
     # Leer el archivo de códigos de país.
     df_country = pd.read_excel(country_code_file,
                                sheet_name='Code Country Fillrate-Sales', dtype=str, engine='openpyxl')
     # Definir las columnas relevantes para el procesamiento.    
+    # La carga completa guarda la clave sustituta y 'clasification' (la clave legible se reconstruye con
+    # Surrogate_Keys.rebuild_readable_key a partir de LST_KEY_COLUMNS, ver Key_Index.stores_readable_key)
     lst_columns = ['fk_Date','fk_year_month', 'fk_Country', 'fk_Sold_To_Customer_Code', 'fk_SKU',
-                   'fk_date_country_customer_clasification',
+                   'clasification', 'sk_date_country_customer_clasification',
                    'Fill Rate First Pass Order Qty', 'Fill Rate First Pass Invoice Qty',
                    'Fill Rate First Pass Order $', 'Fill Rate First Pass Invoice $']
-    df_consolidated = asign_country_code(df_consolidated, df_country)
-    df_processed=process_columns(df_consolidated,lst_columns)
     # Defino formato de las columnas
     lst_columns_str=['fk_Date', 'fk_year_month', 'fk_Country', 'fk_Sold_To_Customer_Code',
-       'fk_SKU', 'fk_date_country_customer_clasification']
+       'fk_SKU', 'clasification']
     
     lst_columns_float=['Fill Rate First Pass Order Qty', 'Fill Rate First Pass Invoice Qty',
        'Fill Rate First Pass Order $', 'Fill Rate First Pass Invoice $']
-    df_processed=format_columns(df_processed,lst_columns_str,lst_columns_float)
+    lst_columns_category=['fk_Date', 'fk_year_month', 'fk_Country', 'fk_Sold_To_Customer_Code', 'fk_SKU',
+                          'clasification']
+    lst_columns_key=['sk_date_country_customer_clasification']
+
+    # Leer los archivos históricos por lotes (iter_read_files) y procesar cada lote: en memoria solo se
+    # acumulan los lotes ya formateados (categóricos / float32), no el texto completo de los libros.
+    # Como en la carga por partes de Sales, el control de países sin asignación no se exporta por lote.
+    lst_processed = []
+    for df_batch in iter_read_files(fil_rate_historic_raw_dir):
+        df_batch = asign_country_code(df_batch, df_country, export_unmatched=False)
+        df_batch = process_columns(df_batch, lst_columns)
+        lst_processed.append(format_columns(df_batch, lst_columns_str, lst_columns_float,
+                                            lst_columns_category, lst_columns_key))
+    if not lst_processed:
+        print("[ADVERTENCIA] No se leyeron archivos históricos de Fill Rate. Finalizando proceso.")
+        return
+    df_processed = pd.concat(lst_processed, ignore_index=True)
+    del lst_processed
+    # concat convierte a texto las categóricas con categorías distintas entre lotes
+    for col in lst_columns_category:
+        df_processed[col] = df_processed[col].astype('category')
     
-    group_parquet(df_processed, processed_parquet_dir, name='fill_rate')
+    group_parquet(df_processed, processed_parquet_dir, name='fill_rate',
+                  key_column='sk_date_country_customer_clasification')
+    # La carga completa reemplaza la base: los deltas de actualizaciones anteriores quedan obsoletos
+    discard_deltas(processed_parquet_dir, 'fill_rate')
+    # Dataset particionado: se publica completo (los periodos que ya no existen se eliminan)
+    publish_dataset(processed_parquet_dir, processed_dataset_dir, 'fill_rate',
+                    key_column='sk_date_country_customer_clasification',
+                    **(dataset_options or FILL_RATE_DATASET_OPTIONS))
 
 
 
@@ -0,0 +1,322 @@
+'''
+Módulo de carga incremental por hash de partición e historial de snapshots.
+Pensado para fuentes que se reciben como una foto completa (ej. 'QueryDemand.parquet' de Demand),
+donde cada entrega repite todos los periodos aunque solo cambien el actual y los futuros:
+
+1. Cada periodo procesado se resume en un hash de contenido (hash_partition), independiente del orden
+   de las filas.
+2. Solo se reescriben los archivos '{name}_YYYY-MM.parquet' cuyo hash difiere del registrado en la
+   ejecución anterior (o cuyo archivo fue modificado desde entonces, ej. por Update o por deltas
+   pendientes). Los periodos que ya no vienen en la foto se eliminan, igual que en la carga completa.
+3. El contenido de cada periodo se guarda una sola vez por hash en '_snapshots/{name}_YYYY-MM/<hash>.parquet'
+   y cada ejecución agrega un registro a '_snapshots/_history_{name}.jsonl' con el hash de cada periodo.
+   Así una versión anterior del forecast se reconstruye (read_snapshot) y se compara con otra
+   (compare_snapshots) leyendo solo los periodos que cambiaron, sin recargar el histórico.
+
+Los archivos base y los de snapshot se confirman juntos con el protocolo de Parquet_Commit.
+
+Contiene las siguientes funciones:
+- hash_partition: Hash de contenido de un periodo.
+- read_snapshot_history: Registros del historial de snapshots de un proceso.
+- write_incremental: Escribe solo los periodos modificados y registra el snapshot.
+- read_snapshot: Reconstruye los periodos de un snapshot.
+- compare_snapshots: Compara dos snapshots por clave, solo en los periodos que cambiaron.
+'''
+
+#--------------------------------------------------
+#---------------- LIBRERIAS -----------------------
+#--------------------------------------------------
+import pandas as pd
+import numpy as np
+
+import glob
+import hashlib
+import json
+import os
+from datetime import datetime
+
+from .Parquet_Commit import recover_parquet_dir, new_run_id, staging_path, commit_staged
+from .Delta_Store import delta_periods, _concat_keeping_categories
+
+# Directorio de los snapshots dentro del directorio de salida
+SNAPSHOT_DIR = '_snapshots'
+# Snapshots que se conservan en el historial (los archivos que ya no usa ninguno se eliminan)
+MAX_SNAPSHOTS = 24
+
+
+def hash_partition(df):
+    """
+    Calcula un hash de contenido de un periodo: columnas, tipos y valores de las filas.
+    Las filas se resumen con pd.util.hash_pandas_object y se ordenan, por lo que el hash no
+    depende del orden en que llegan los registros.
+
+    Args:
+        df (pd.DataFrame): Registros de un periodo (tal como se escriben en el Parquet).
+
+    Returns:
+        str: Hash hexadecimal SHA-256.
+    """
+    sha = hashlib.sha256()
+    sha.update(json.dumps([[str(col), str(dtype)] for col, dtype in df.dtypes.items()]).encode('utf-8'))
+    row_hashes = np.sort(pd.util.hash_pandas_object(df, index=False).to_numpy())
+    sha.update(row_hashes.tobytes())
+    return sha.hexdigest()
+
+
+def _history_path(output_path, name):
+    """Ruta del historial de snapshots de un proceso, ej. '_snapshots/_history_demand.jsonl'."""
+    return os.path.join(output_path, SNAPSHOT_DIR, f"_history_{name}.jsonl")
+
+
+def _snapshot_file(name, period, hash_value):
+    """Ruta relativa del contenido de un periodo, ej. '_snapshots/demand_2024-01/<hash>.parquet'."""
+    return os.path.join(SNAPSHOT_DIR, f"{name}_{period}", f"{hash_value}.parquet")
+
+
+def _file_stats(path):
+    """Tamaño y fecha de modificación (ns) de un archivo, o None si no existe."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def read_snapshot_history(output_path, name):
+    """
+    Lee el historial de snapshots de un proceso. Una última línea incompleta se ignora.
+
+    Args:
+        output_path (str): Directorio de los Parquet.
+        name (str): Prefijo de los archivos (ej. 'demand').
+
+    Returns:
+        list: Registros (dict) en orden de escritura, con 'snapshot_id', 'time', 'source',
+              'periods' ({periodo: hash}), 'files' ({periodo: [tamaño, mtime]}), 'changed' y 'removed'.
+    """
+    path = _history_path(output_path, name)
+    if not os.path.exists(path):
+        return []
+    lst_records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                lst_records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return lst_records
+
+
+def _save_history(output_path, name, lst_records):
+    """Reescribe el historial de forma atómica (archivo temporal + renombrado)."""
+    path = _history_path(output_path, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        for record in lst_records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + '.tmp', path)
+
+
+def _prune_snapshots(output_path, name, lst_records):
+    """Elimina los archivos de snapshot que no usa ningún registro conservado."""
+    set_used = {os.path.normpath(_snapshot_file(name, period, hash_value))
+                for record in lst_records for period, hash_value in record['periods'].items()}
+    pattern = os.path.join(output_path, SNAPSHOT_DIR, glob.escape(f"{name}_") + '*', '*.parquet')
+    for path in glob.glob(pattern):
+        if os.path.normpath(os.path.relpath(path, output_path)) not in set_used:
+            os.remove(path)
+            try:
+                os.rmdir(os.path.dirname(path))
+            except OSError:
+                pass
+
+
+def _stored_hash(output_path, name, period, last_record):
+    """
+    Hash del archivo base vigente de un periodo: el registrado en el último snapshot si el archivo no
+    cambió desde entonces; si no hay registro (primera ejecución) se calcula leyendo el archivo.
+    """
+    path = os.path.join(output_path, f"{name}_{period}.parquet")
+    stats = _file_stats(path)
+    if stats is None:
+        return None
+    if last_record is not None and period in last_record['periods']:
+        if last_record.get('files', {}).get(period) == stats:
+            return last_record['periods'][period]
+        return None
+    try:
+        return hash_partition(pd.read_parquet(path, engine='pyarrow'))
+    except Exception:
+        return None
+
+
+def write_incremental(df_processed, output_path, name, source=None, max_snapshots=MAX_SNAPSHOTS):
+    """
+    Escribe una foto completa de forma incremental: solo se reescriben los periodos cuyo contenido cambió,
+    se eliminan los periodos que ya no vienen en la foto y se registra el snapshot en el historial.
+
+    Un periodo se considera sin cambios si su hash coincide con el del último snapshot, su archivo base no
+    fue modificado desde entonces y no tiene deltas pendientes (ver Delta_Store); los deltas quedan
+    obsoletos con la foto y deben descartarse después (discard_deltas).
+
+    Args:
+        df_processed (pd.DataFrame): Foto completa ya procesada y formateada. Debe contener 'fk_year_month'.
+        output_path (str): Directorio de los Parquet.
+        name (str): Prefijo de los archivos (ej. 'demand').
+        source (dict, optional): Datos de la fuente a registrar en el historial (ej. archivo y hash). Por defecto None.
+        max_snapshots (int, optional): Snapshots que se conservan en el historial. Por defecto MAX_SNAPSHOTS.
+
+    Returns:
+        dict: {'snapshot_id': str o None, 'changed': [...], 'unchanged': [...], 'removed': [...]}.
+              snapshot_id es None si la foto es idéntica al último snapshot.
+    """
+    output_path = str(output_path)
+    os.makedirs(output_path, exist_ok=True)
+    recover_parquet_dir(output_path)
+    lst_history = read_snapshot_history(output_path, name)
+    last_record = lst_history[-1] if lst_history else None
+    set_delta_periods = set(delta_periods(output_path, name))
+
+    run_id = new_run_id()
+    staging = staging_path(output_path, run_id)
+    lst_files, dict_hashes = [], {}
+    result = {'snapshot_id': None, 'changed': [], 'unchanged': [], 'removed': []}
+    lst_columns_category = df_processed.select_dtypes(include='category').columns
+    for period, group in df_processed.groupby('fk_year_month', observed=True):
+        period = str(period)
+        # Igual que group_parquet: cada archivo guarda solo las categorías usadas en su periodo
+        if len(lst_columns_category):
+            group = group.copy()
+            for col in lst_columns_category:
+                group[col] = group[col].cat.remove_unused_categories()
+        group = group.reset_index(drop=True)
+        hash_value = hash_partition(group)
+        dict_hashes[period] = hash_value
+
+        lst_outputs = []
+        if period in set_delta_periods or _stored_hash(output_path, name, period, last_record) != hash_value:
+            lst_outputs.append(f"{name}_{period}.parquet")
+            result['changed'].append(period)
+        else:
+            result['unchanged'].append(period)
+        if not os.path.exists(os.path.join(output_path, _snapshot_file(name, period, hash_value))):
+            lst_outputs.append(_snapshot_file(name, period, hash_value))
+        for filename in lst_outputs:
+            os.makedirs(os.path.dirname(os.path.join(staging, filename)), exist_ok=True)
+            group.to_parquet(os.path.join(staging, filename), index=False)
+            lst_files.append(filename)
+        if period in result['changed']:
+            print(f"Periodo {period} modificado: se reescribe {name}_{period}.parquet\n")
+
+    prefix = f"{name}_"
+    result['removed'] = sorted(os.path.basename(path)[len(prefix):-len('.parquet')]
+                               for path in glob.glob(os.path.join(output_path, glob.escape(prefix) + '*.parquet'))
+                               if os.path.basename(path)[len(prefix):-len('.parquet')] not in dict_hashes)
+    lst_delete = [f"{name}_{period}.parquet" for period in result['removed']]
+
+    if not lst_files and not lst_delete and last_record is not None and last_record['periods'] == dict_hashes:
+        print(f"La foto de '{name}' no tiene cambios respecto al snapshot {last_record['snapshot_id']}.")
+        return result
+    if lst_files or lst_delete:
+        commit_staged(output_path, run_id, lst_files, lst_delete)
+
+    # --- REGISTRO DEL SNAPSHOT (después de la confirmación, con el estado final de los archivos base) ---
+    lst_history.append({
+        'snapshot_id': run_id,
+        'time': datetime.now().isoformat(timespec='seconds'),
+        'source': source,
+        'periods': dict_hashes,
+        'files': {period: _file_stats(os.path.join(output_path, f"{name}_{period}.parquet"))
+                  for period in dict_hashes},
+        'changed': result['changed'],
+        'removed': result['removed'],
+    })
+    lst_history = lst_history[-max_snapshots:]
+    _save_history(output_path, name, lst_history)
+    _prune_snapshots(output_path, name, lst_history)
+    result['snapshot_id'] = run_id
+    return result
+
+
+def _find_record(lst_history, snapshot_id):
+    """Registro de un snapshot: por identificador, por posición (ej. -1 el último) o el último si es None."""
+    if not lst_history:
+        raise ValueError("No hay snapshots registrados.")
+    if snapshot_id is None:
+        return lst_history[-1]
+    if isinstance(snapshot_id, int):
+        return lst_history[snapshot_id]
+    for record in lst_history:
+        if record['snapshot_id'] == snapshot_id:
+            return record
+    raise ValueError(f"El snapshot '{snapshot_id}' no existe en el historial.")
+
+
+def read_snapshot(output_path, name, snapshot_id=None, periods=None, columns=None):
+    """
+    Reconstruye los periodos de un snapshot a partir de los archivos guardados por hash.
+
+    Args:
+        output_path (str): Directorio de los Parquet.
+        name (str): Prefijo de los archivos (ej. 'demand').
+        snapshot_id (str o int, optional): Identificador del snapshot o posición en el historial
+                                           (ej. -2 el penúltimo). Por defecto el último.
+        periods (list, optional): Periodos 'YYYY-MM' a leer. Por defecto todos los del snapshot.
+        columns (list, optional): Columnas a leer. Por defecto todas.
+
+    Returns:
+        pd.DataFrame: Registros del snapshot (vacío si no hay datos en los periodos indicados).
+    """
+    record = _find_record(read_snapshot_history(str(output_path), name), snapshot_id)
+    lst_periods = sorted(record['periods']) if periods is None else [p for p in periods if p in record['periods']]
+    lst_frames = [pd.read_parquet(os.path.join(output_path, _snapshot_file(name, period, record['periods'][period])),
+                                  engine='pyarrow', columns=columns)
+                  for period in lst_periods]
+    if not lst_frames:
+        return pd.DataFrame(columns=columns)
+    return _concat_keeping_categories(lst_frames)
+
+
+def compare_snapshots(output_path, name, key_columns, value_columns, old_snapshot_id=-2, new_snapshot_id=-1,
+                      periods=None):
+    """
+    Compara dos snapshots (ej. dos versiones del forecast) sumando los valores por clave.
+    Solo se leen los periodos cuyo hash difiere entre ambos; los demás son idénticos.
+
+    Args:
+        output_path (str): Directorio de los Parquet.
+        name (str): Prefijo de los archivos (ej. 'demand').
+        key_columns (list): Columnas de agrupación (ej. ['fk_year_month', 'fk_Country', 'fk_SKU']).
+        value_columns (list): Columnas numéricas a comparar (ej. ['FCST_QTY']).
+        old_snapshot_id (str o int, optional): Snapshot base. Por defecto el penúltimo.
+        new_snapshot_id (str o int, optional): Snapshot a comparar. Por defecto el último.
+        periods (list, optional): Limita la comparación a estos periodos. Por defecto todos los que cambiaron.
+
+    Returns:
+        pd.DataFrame: Por clave, las columnas '<valor>_old', '<valor>_new' y '<valor>_diff'
+                      (solo claves con alguna diferencia).
+    """
+    lst_history = read_snapshot_history(str(output_path), name)
+    old_record = _find_record(lst_history, old_snapshot_id)
+    new_record = _find_record(lst_history, new_snapshot_id)
+    lst_periods = sorted(period for period in set(old_record['periods']) | set(new_record['periods'])
+                         if old_record['periods'].get(period) != new_record['periods'].get(period))
+    if periods is not None:
+        lst_periods = [period for period in lst_periods if period in set(periods)]
+
+    lst_columns = list(key_columns) + list(value_columns)
+    lst_totals = []
+    for record in (old_record, new_record):
+        df = read_snapshot(output_path, name, record['snapshot_id'], periods=lst_periods, columns=lst_columns)
+        lst_totals.append(df.groupby(list(key_columns), observed=True, as_index=False)[list(value_columns)].sum())
+
+    df_compare = pd.merge(lst_totals[0], lst_totals[1], on=list(key_columns), how='outer', suffixes=('_old', '_new'))
+    mask_diff = pd.Series(False, index=df_compare.index)
+    for col in value_columns:
+        df_compare[f"{col}_old"] = df_compare[f"{col}_old"].fillna(0)
+        df_compare[f"{col}_new"] = df_compare[f"{col}_new"].fillna(0)
+        df_compare[f"{col}_diff"] = df_compare[f"{col}_new"] - df_compare[f"{col}_old"]
+        mask_diff |= df_compare[f"{col}_diff"] != 0
+    return df_compare[mask_diff].reset_index(drop=True)
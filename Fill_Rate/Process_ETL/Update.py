@@ -7,62 +7,130 @@ la integridad y actualidad de los archivos Parquet históricos.
 
 # Librerias
 import pandas as pd
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 import glob
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 # Importamos las funciones ya creadas que usaremos nuevamente
-from .Process_Files import read_files, asign_country_code, process_columns, group_parquet, format_columns
+from .Process_Files import (read_files, asign_country_code, process_columns, group_parquet, format_columns,
+                            FILL_RATE_DATASET_OPTIONS)
+from .Key_Index import upsert_partitions, stores_readable_key
+from .Parquet_Dataset import publish_dataset
+from .Delta_Store import (append_deltas, compact_deltas, validate_storage_mode, DEFAULT_STORAGE_MODE,
+                          MAX_DELTAS_PER_PERIOD)
+from .Manifest import manifest_path, load_manifest, save_manifest, pending_files, summarize_files, record_files
+from Shared_Information_for_Projects.Normalization import normalize_columns, normalize_series
+from Shared_Information_for_Projects.Reference_Data import read_reference
 
 
+def _period_files(path_parquets_historics, lst_year_month_files_update, name=None):
+    """
+    Devuelve los archivos Parquet de los periodos indicados. El periodo debe coincidir exactamente con
+    el sufijo del archivo ('{name}_YYYY-MM.parquet'), de modo que '2024-1' no encuentra '..._2024-10.parquet'.
+    """
+    lst_files = []
+    for year_month in lst_year_month_files_update:
+        if name is not None:
+            found_files = [os.path.join(path_parquets_historics, f"{name}_{year_month}.parquet")]
+            found_files = [file for file in found_files if os.path.exists(file)]
+        else:
+            found_files = sorted(glob.glob(os.path.join(glob.escape(str(path_parquets_historics)),
+                                                        f"*_{glob.escape(str(year_month))}.parquet")))
+        if not found_files:
+            print(f"Advertencia: No se encontró archivo parquet para el periodo {year_month} en '{path_parquets_historics}'\n")
+        lst_files.extend(found_files)
+    return lst_files
+
+def _read_parquet_file(file, columns=None, filter_expression=None):
+    """Lee un archivo Parquet con pyarrow.dataset, solo con las columnas pedidas que existan en el archivo."""
+    dataset = ds.dataset(file, format='parquet')
+    if columns is not None:
+        columns = [col for col in columns if col in dataset.schema.names]
+    return dataset.to_table(columns=columns, filter=filter_expression).to_pandas()
+
 # Leer los archivos Parquet históricos que se van a actualizar segun:fk_year_month y concatenarlos en un DataFrame
-def read_parquets_to_update(path_parquets_historics, lst_year_month_files_update,lst_columns):
+def read_parquets_to_update(path_parquets_historics, lst_year_month_files_update,lst_columns, name=None,
+                            columns=None, filters=None, max_workers=None):
     """Lee los archivos parquet históricos que corresponden a los periodos a actualizar.
+    Los archivos se leen en paralelo con pyarrow.dataset: solo se decodifican las columnas pedidas y
+    los filtros se aplican al leer (descartando row groups por sus estadísticas).
     Args:
         path_parquets_historics (str): Ruta del directorio que contiene los archivos Parquet históricos.
         lst_year_month_files_update (list): Lista de strings con los periodos 'YYYY-MM' (fk_year_month) a buscar y cargar.
         lst_columns (list): Lista de columnas esperadas. Usada para inicializar un DataFrame vacío si no se encuentran archivos.
+        name (str, optional): Prefijo de los archivos (ej. 'sales'); si se indica solo se lee '{name}_YYYY-MM.parquet'.
+                              Por defecto None (cualquier archivo terminado en '_YYYY-MM.parquet').
+        columns (list, optional): Columnas a leer (las que no existan en un archivo se omiten). Por defecto todas.
+        filters (list or pyarrow.compute.Expression, optional): Filtro a aplicar al leer, como expresión de pyarrow o
+                              en formato de pandas/pyarrow, ej. [('fk_Country', 'in', ['co', 'pe'])]. Por defecto None.
+        max_workers (int, optional): Número de hilos de lectura. Por defecto el de ThreadPoolExecutor.
     Returns:
         pd.DataFrame: DataFrame consolidado con los datos históricos de los periodos a actualizar, o un DataFrame
-                      vacío con las lst_columns si no hay archivos.
+                      vacío con las columnas (columns o lst_columns) si no hay archivos.
     """
-    lst_files = []
-    for year_month in lst_year_month_files_update:
-        # Busca archivos que coincidan con el patrón, ej: 'fill_rate_2023-01.parquet'
-        pattern = os.path.join(path_parquets_historics, f"*{year_month}*.parquet")
-        found_files = glob.glob(pattern)
-        if not found_files:
-            print(f"Advertencia: No se encontró archivo parquet para el periodo {year_month} en '{path_parquets_historics}'\n")
-        lst_files.extend(found_files)
-    
+    lst_files = _period_files(path_parquets_historics, lst_year_month_files_update, name)
     if not lst_files:
         print("No se encontraron archivos parquet para actualizar.")
-        return pd.DataFrame(columns=lst_columns)
+        return pd.DataFrame(columns=columns if columns is not None else lst_columns)
         
     print(f"Archivos parquet a actualizar encontrados: {len(lst_files)}\n")
 
-    return pd.concat([pd.read_parquet(file) for file in lst_files], ignore_index=True)
+    filter_expression = filters
+    if filters is not None and not isinstance(filters, pc.Expression):
+        filter_expression = pq.filters_to_expression(filters)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        lst_frames = list(executor.map(lambda file: _read_parquet_file(file, columns, filter_expression), lst_files))
+    return pd.concat(lst_frames, ignore_index=True)
 
-def update_parquets(df_parquets_historic, df_update,fk_column='fk_date_country_customer_clasification'):
+def update_parquets(df_parquets_historic, df_update,fk_column='fk_date_country_customer_clasification',
+                    sk_column=None):
     """
     Implementa la lógica de 'delete and insert' (o upsert). Identifica los registros a actualizar en el histórico
     usando la clave compuesta y los reemplaza concatenando los nuevos registros de df_update.
+    Si se indica sk_column (clave sustituta entera, ver Surrogate_Keys) la comparación se hace sobre enteros; las
+    filas históricas sin clave sustituta (archivos anteriores) se comparan por la clave legible fk_column.
+    La clave legible se compara sin distinguir mayúsculas, ya que el histórico se guarda en minúsculas
+    (format_columns) y la actualización llega en mayúsculas (process_columns).
     Args:
         df_parquets_historic (pd.DataFrame): DataFrame que contiene los datos históricos leídos de los archivos Parquet de los periodos a actualizar.
         df_update (pd.DataFrame): DataFrame con los nuevos registros que deben reemplazar a los existentes.
         fk_column (str, optional): Nombre de la columna que actúa como clave única/compuesta para la deduplicación/reemplazo. Por defecto es 'fk_date_country_customer_clasification'.
+        sk_column (str, optional): Nombre de la columna de clave sustituta entera. Por defecto None (solo clave legible).
     Returns:
         pd.DataFrame: El DataFrame final que contiene los registros históricos que no se actualizaron, más los
                       nuevos registros de df_update.
     
     """
-    # Obtener la lista de claves únicas a actualizar/reemplazar.
-    #print(f'columnas df_update: {df_update.columns}')
-    #print(f'columnas df_parquets_historic: {df_parquets_historic.columns}')
-    keys_to_update = df_update[fk_column].unique()
-    
-    # Filtrar el dataframe histórico para excluir los registros que NO serán actualizados.
-    df_parquets_filtered = df_parquets_historic[~df_parquets_historic[fk_column].isin(keys_to_update)]
+    use_sk = sk_column is not None and sk_column in df_update.columns
+    if use_sk:
+        df_update = df_update.copy()
+        df_update[sk_column] = df_update[sk_column].astype('UInt64')
+        df_parquets_historic = df_parquets_historic.copy()
+        if sk_column not in df_parquets_historic.columns:
+            df_parquets_historic[sk_column] = pd.Series(pd.NA, index=df_parquets_historic.index, dtype='UInt64')
+        else:
+            df_parquets_historic[sk_column] = df_parquets_historic[sk_column].astype('UInt64')
+
+    # Filas históricas a reemplazar
+    mask_replace = pd.Series(False, index=df_parquets_historic.index)
+    mask_legacy = pd.Series(True, index=df_parquets_historic.index)
+    if use_sk:
+        # Comparación entera sobre la clave sustituta
+        keys_to_update = df_update[sk_column].dropna().unique()
+        mask_replace = df_parquets_historic[sk_column].isin(keys_to_update).fillna(False).astype(bool)
+        mask_legacy = df_parquets_historic[sk_column].isna()
+    if mask_legacy.any() and fk_column in df_parquets_historic.columns:
+        # Obtener la lista de claves legibles únicas a actualizar/reemplazar (sin distinguir mayúsculas)
+        keys_to_update = normalize_series(df_update[fk_column], as_str=False).unique()
+        fk_historic = normalize_series(df_parquets_historic.loc[mask_legacy, fk_column], as_str=False)
+        mask_replace.loc[mask_legacy] = fk_historic.isin(keys_to_update).to_numpy()
+
+    # Filtrar el dataframe histórico para excluir los registros que serán actualizados.
+    df_parquets_filtered = df_parquets_historic[~mask_replace]
         
     # Combinar los datos históricos filtrados con los nuevos datos.
     if df_parquets_filtered.empty:
@@ -72,17 +140,26 @@ def update_parquets(df_parquets_historic, df_update,fk_column='fk_date_country_c
         df_final = pd.concat([df_parquets_filtered, df_update], ignore_index=True)
     return df_final
 
-def main():
+def main(force=False, storage_mode=DEFAULT_STORAGE_MODE, dataset_options=None):
     """ 
     Orquesta el proceso de actualización incremental de Fill Rate.
+        0. Consulta el manifiesto para procesar solo los archivos nuevos o modificados.
         1. Procesa los archivos brutos de la actualización (usando funciones de Process_Files).
-        2. Determina los periodos ('fk_year_month') afectados.
-        3. Carga los archivos Parquet históricos correspondientes.
-        4. Ejecuta la lógica de update_parquets para reemplazar los registros.
-        5. Guarda el resultado final, sobrescribiendo los archivos Parquet originales (particionamiento).
+        2. Reemplaza los registros en los archivos Parquet de cada periodo usando su índice de claves
+           (upsert_partitions: solo se reescriben los row groups afectados).
+        3. Para los periodos que no tienen índice utilizable (archivos anteriores), carga los archivos
+           Parquet históricos, ejecuta update_parquets y los sobrescribe (particionamiento).
+        4. Registra los archivos procesados en el manifiesto.
+    Args:
+        force (bool, optional): Si es True reprocesa todos los archivos ignorando el manifiesto. Por defecto False.
+        storage_mode (str, optional): 'upsert' (reemplazo de registros en la base) o 'delta' (deltas con lápidas,
+                                      compactados por Delta_Store). Por defecto DEFAULT_STORAGE_MODE.
+        dataset_options (dict, optional): Opciones del dataset particionado publicado (partition_cols, compression,
+                                          row_group_size, ... ver publish_dataset). Por defecto FILL_RATE_DATASET_OPTIONS.
     Returns: None: La función orquesta el proceso y no devuelve un valor.
     """
 
+    validate_storage_mode(storage_mode)
     print("=" * 55)
     print("--- INICIANDO PROCESO: FILL RATE UPDATE ETL ---")
     print("=" * 55)
@@ -92,46 +169,99 @@ def main():
         from config_paths import FillRatePaths
         #fill_rate_historic_processed_dir = FillRatePaths.OUTPUT_PROCESSED_PARQUETS_DIR_PRUEBA #  PRUEBA
         fill_rate_historic_processed_dir = FillRatePaths.OUTPUT_PROCESSED_PARQUETS_DIR
+        fill_rate_dataset_dir = FillRatePaths.OUTPUT_PROCESSED_DATASET_DIR
         
         fill_rate_update_raw_dir = FillRatePaths.INPUT_RAW_UPDATE_DIR
         country_code_file = FillRatePaths.INPUT_PROCESSED_COUNTRY_CODES_FILE
         
         # --- PROCESAMIENTO DE ARCHIVOS DE ACTUALIZACIÓN ---
-        df_country = pd.read_excel(country_code_file, sheet_name='Code Country Fillrate-Sales', dtype=str, engine='openpyxl')
-        for col in df_country.columns:
-            df_country[col] = df_country[col].astype(str).str.upper().str.strip()
+        df_country = read_reference(country_code_file, sheet_name='Code Country Fillrate-Sales')
+        normalize_columns(df_country, df_country.columns)
 
+        # La clave legible solo se construye si los archivos históricos la guardan (filas sin clave sustituta)
+        fk_column = 'fk_date_country_customer_clasification' \
+            if stores_readable_key(fill_rate_historic_processed_dir, 'fill_rate',
+                                   'fk_date_country_customer_clasification') else None
+        lst_columns_fk = [fk_column] if fk_column is not None else []
         lst_columns = ['fk_Date','fk_year_month', 'fk_Country', 'fk_Sold_To_Customer_Code', 'fk_SKU',
-                    'fk_date_country_customer_clasification',
+                    'clasification', *lst_columns_fk, 'sk_date_country_customer_clasification',
                     'Fill Rate First Pass Order Qty', 'Fill Rate First Pass Invoice Qty',
                     'Fill Rate First Pass Order $', 'Fill Rate First Pass Invoice $']
 
-        df_update = read_files(fill_rate_update_raw_dir)
+        # --- ARCHIVOS PENDIENTES SEGÚN EL MANIFIESTO ---
+        path_manifest = manifest_path(fill_rate_historic_processed_dir, 'fill_rate')
+        manifest = {'files': {}} if force else load_manifest(path_manifest)
+        lst_pending, dict_hashes = pending_files(fill_rate_update_raw_dir, manifest)
+        if not lst_pending:
+            save_manifest(path_manifest, manifest)
+            print("No hay archivos nuevos o modificados para actualizar. Finalizando proceso.")
+            return
+
+        df_update = read_files(fill_rate_update_raw_dir, files=lst_pending, add_source_column=True)
+        # Archivos leídos sin error (incluso sin filas); los que fallaron se reintentan en la próxima ejecución
+        dict_stats = summarize_files(df_update) if df_update is not None else {}
         if df_update is None or df_update.empty:
+            save_manifest(path_manifest, record_files(manifest, dict_hashes, dict_stats))
             print("No hay archivos para actualizar. Finalizando proceso.")
             return
 
         df_update = asign_country_code(df_update, df_country)
         df_update = process_columns(df_update, lst_columns)
         
-        # --- LECTURA Y ACTUALIZACIÓN DE DATOS HISTÓRICOS ---
-        lst_year_month_files_update = df_update['fk_year_month'].unique().tolist()
-        
-        df_parquets_historic = read_parquets_to_update(fill_rate_historic_processed_dir, lst_year_month_files_update,lst_columns)
-        
-        df_final = update_parquets(df_parquets_historic, df_update,fk_column='fk_date_country_customer_clasification')
         # Defino formato de las columnas
         lst_columns_str=['fk_Date', 'fk_year_month', 'fk_Country', 'fk_Sold_To_Customer_Code',
-        'fk_SKU', 'fk_date_country_customer_clasification']
+        'fk_SKU', 'clasification', *lst_columns_fk]
         
         lst_columns_float=['Fill Rate First Pass Order Qty', 'Fill Rate First Pass Invoice Qty',
         'Fill Rate First Pass Order $', 'Fill Rate First Pass Invoice $']
         
         
-        df_final=format_columns(df_final,lst_columns_str,lst_columns_float)
-        
-        # --- ESCRITURA DE LOS DATOS ACTUALIZADOS ---
-        group_parquet(df_final, fill_rate_historic_processed_dir,name='fill_rate')
+        lst_columns_category=['fk_Date', 'fk_year_month', 'fk_Country', 'fk_Sold_To_Customer_Code', 'fk_SKU',
+                              'clasification']
+        lst_columns_key=['sk_date_country_customer_clasification']
+
+        # --- ACTUALIZACIÓN DE LOS PARQUET: ÍNDICE DE CLAVES O DELTAS ---
+        df_update_formatted = format_columns(df_update,lst_columns_str,lst_columns_float,lst_columns_category,lst_columns_key)
+        if storage_mode == 'delta':
+            # Modo delta: la actualización se agrega como deltas (registros + lápidas), ver Delta_Store
+            lst_periods = append_deltas(fill_rate_historic_processed_dir, df_update_formatted, name='fill_rate',
+                                        key_column='sk_date_country_customer_clasification',
+                                        fk_column=fk_column)
+            compact_deltas(fill_rate_historic_processed_dir, 'fill_rate', 'sk_date_country_customer_clasification',
+                           fk_column, periods=lst_periods,
+                           min_deltas=MAX_DELTAS_PER_PERIOD)
+            lst_year_month_files_update = []
+        else:
+            # Los deltas pendientes se incorporan a la base antes de reemplazar registros en ella
+            compact_deltas(fill_rate_historic_processed_dir, 'fill_rate', 'sk_date_country_customer_clasification',
+                           fk_column,
+                           periods=df_update_formatted['fk_year_month'].unique().tolist())
+            # Solo se reescriben los row groups con registros reemplazados (ver Key_Index)
+            lst_year_month_files_update = upsert_partitions(fill_rate_historic_processed_dir, df_update_formatted,
+                                                            name='fill_rate',
+                                                            key_column='sk_date_country_customer_clasification',
+                                                            fk_column=fk_column)
+
+        # --- RUTA COMPLETA: periodos que no se pudieron actualizar por índice (ej. archivos sin clave sustituta) ---
+        if lst_year_month_files_update:
+            df_update = df_update[df_update['fk_year_month'].isin(lst_year_month_files_update)]
+            df_parquets_historic = read_parquets_to_update(fill_rate_historic_processed_dir, lst_year_month_files_update,lst_columns,
+                                                           name='fill_rate')
+            
+            df_final = update_parquets(df_parquets_historic, df_update,fk_column=fk_column,
+                                       sk_column='sk_date_country_customer_clasification')
+            df_final=format_columns(df_final,lst_columns_str,lst_columns_float,lst_columns_category,lst_columns_key)
+            
+            # --- ESCRITURA DE LOS DATOS ACTUALIZADOS ---
+            group_parquet(df_final, fill_rate_historic_processed_dir,name='fill_rate',
+                          key_column='sk_date_country_customer_clasification')
+
+        # --- DATASET PARTICIONADO: se publican solo los periodos actualizados (base + deltas) ---
+        publish_dataset(fill_rate_historic_processed_dir, fill_rate_dataset_dir, 'fill_rate',
+                        periods=df_update_formatted['fk_year_month'].unique().tolist(),
+                        key_column='sk_date_country_customer_clasification',
+                        fk_column=fk_column, **(dataset_options or FILL_RATE_DATASET_OPTIONS))
+        save_manifest(path_manifest, record_files(manifest, dict_hashes, dict_stats))
         print("Fill Rate ETL Update completed successfully.")
         pass
     except Exception as e:
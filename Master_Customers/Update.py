@@ -17,6 +17,8 @@ import os
 import sys
 
 from Fill_Rate.Process_ETL.Process_Files import asign_country_code, read_files
+from Shared_Information_for_Projects.Normalization import normalize_series
+from Shared_Information_for_Projects.Reference_Data import read_reference
 
 def complete_clasification(df_consolidated, df_customers_shared, df_customers_clasifications, df_country):
     """
@@ -50,28 +52,28 @@ def complete_clasification(df_consolidated, df_customers_shared, df_customers_cl
 
     # Crea las fk para relacionar info de clientes compartidos con los nuevos clientes
     df_customers_shared['fk_country_customer'] = df_customers_shared['Country'].astype(str) + '-' + df_customers_shared['fk_Customer_Code'].astype(str) 
-    df_customers_shared['fk_country_customer'] = df_customers_shared['fk_country_customer'].str.upper().str.strip().str.replace(' ', '')
+    df_customers_shared['fk_country_customer'] = normalize_series(df_customers_shared['fk_country_customer'], remove_spaces=True, as_str=False)
    
    
     df_consolidated['fk_country_customer'] = df_consolidated['fk_Country'] + '-' + df_consolidated['code_customer'].astype(str)    
-    df_consolidated['fk_country_customer'] = df_consolidated['fk_country_customer'].str.upper().str.strip().str.replace(' ', '')
+    df_consolidated['fk_country_customer'] = normalize_series(df_consolidated['fk_country_customer'], remove_spaces=True, as_str=False)
    
     
     df_customers_clasifications['fk_channel']=df_customers_clasifications['pk_Sold-To Dist Channel']
-    df_customers_clasifications['fk_channel'] = df_customers_clasifications['fk_channel'].astype(str).str.upper().str.strip().str.replace(' ', '')
+    df_customers_clasifications['fk_channel'] = normalize_series(df_customers_clasifications['fk_channel'], remove_spaces=True)
    
     df_consolidated=pd.merge(df_consolidated,
              df_customers_shared[['fk_country_customer', 'Sold-To Dist Channel Shared']],
              how='left',
              on='fk_country_customer')
     df_consolidated['Sold-To Dist Channel Shared']=df_consolidated['Sold-To Dist Channel Shared'].fillna('NOTFOUND')
-    df_consolidated['Sold-To Dist Channel Shared'] = df_consolidated['Sold-To Dist Channel Shared'].str.upper().str.strip().str.replace(' ', '')
+    df_consolidated['Sold-To Dist Channel Shared'] = normalize_series(df_consolidated['Sold-To Dist Channel Shared'], remove_spaces=True, as_str=False)
    
     condicion_not_found = df_consolidated['Sold-To Dist Channel Shared'].str.contains('NOTFOUND|NOT', regex=True)
     df_consolidated['Sold-To Dist Channel Shared']=np.where(~condicion_not_found,
                                                              df_consolidated['Sold-To Dist Channel Shared'],
                                                              df_consolidated['Sold-To Dist Channel'])
-    df_consolidated['Sold-To Dist Channel Shared'] = df_consolidated['Sold-To Dist Channel Shared'].str.upper().str.strip().str.replace(' ', '')
+    df_consolidated['Sold-To Dist Channel Shared'] = normalize_series(df_consolidated['Sold-To Dist Channel Shared'], remove_spaces=True, as_str=False)
 
     diccionario_map = {'MESSMERCHANT':'MASSMERCHANT'}
     df_consolidated['Sold-To Dist Channel Shared']=df_consolidated['Sold-To Dist Channel Shared'].replace(diccionario_map)
@@ -154,12 +156,12 @@ def update_excel_file(df_master, df_consolidated,name='master_customers'):
     #Creo la fk en el maste
     if name=='master_customers':
         df_master['fk_country_customer']=df_master['fk_Country']+'-'+df_master['fk_Sold-To Customer']
-        df_master['fk_country_customer']=df_master['fk_country_customer'].str.upper().str.strip().str.replace(' ',  '')
+        df_master['fk_country_customer'] = normalize_series(df_master['fk_country_customer'], remove_spaces=True, as_str=False)
         df_consolidated['fk_country_customer']=df_consolidated['fk_Country']+'-'+df_consolidated['fk_Sold-To Customer']
-        df_consolidated['fk_country_customer']=df_consolidated['fk_country_customer'].str.upper().str.strip().str.replace(' ',  '')
+        df_consolidated['fk_country_customer'] = normalize_series(df_consolidated['fk_country_customer'], remove_spaces=True, as_str=False)
     else:
         df_master['fk_country_customer']=df_master['fk_Country']+'-'+df_master['fk_Sold-To Customer Code']
-        df_master['fk_country_customer']=df_master['fk_country_customer'].str.upper().str.strip().str.replace(' ',  '')
+        df_master['fk_country_customer'] = normalize_series(df_master['fk_country_customer'], remove_spaces=True, as_str=False)
     
     keys_to_update = df_consolidated['fk_country_customer'].unique()
     # Filtrar el dataframe histórico para excluir los registros que NO serán actualizados.
@@ -193,8 +195,8 @@ def notation_customers(df_update, df_notation_customers):
     """
     #  Preparación de llaves 
     # Se crea la columna 'fk_customer' en ambos DataFrames, con la misma limpieza.
-    df_notation_customers['fk_customer'] = df_notation_customers['Text Condition'].str.upper().str.strip().str.replace(' ', '')
-    df_update['fk_customer'] = df_update['Sold-To Customer Name'].str.upper().str.strip().str.replace(' ', '')
+    df_notation_customers['fk_customer'] = normalize_series(df_notation_customers['Text Condition'], remove_spaces=True, as_str=False)
+    df_update['fk_customer'] = normalize_series(df_update['Sold-To Customer Name'], remove_spaces=True, as_str=False)
     
     # Crear un diccionario de mapeo
     mapeo_clientes = df_notation_customers.set_index('fk_customer')['Result'].to_dict()
@@ -248,16 +250,17 @@ def main():
         sales_update=MasterCustomersPaths.INPUT_RAW_UPDATE_SALES_DIR
         
         # --- LECTURA DE ARCHIVOS DE CONFIGURACIÓN ---
-        df_customers_shared = pd.read_excel(customers_shared,sheet_name='Customers_Shared_by_Country', dtype=str, engine='openpyxl')
-        df_customers_clasifications = pd.read_excel(customers_shared,sheet_name='Clasifications', dtype=str, engine='openpyxl')
-        df_country = pd.read_excel(country_code_file,
-                                    sheet_name='Code Country Fillrate-Sales', dtype=str, engine='openpyxl')
-        df_notation_customers=pd.read_excel(notation_customers_file, dtype=str, engine='openpyxl')
-        df_fill_rate=read_files(fill_rate_update)
-        df_sales=read_files(sales_update)
-        df_master=pd.read_excel(md_customers, dtype=str, engine='openpyxl')
+        df_customers_shared = read_reference(customers_shared, sheet_name='Customers_Shared_by_Country')
+        df_customers_clasifications = read_reference(customers_shared, sheet_name='Clasifications')
+        df_country = read_reference(country_code_file, sheet_name='Code Country Fillrate-Sales')
+        df_notation_customers=read_reference(notation_customers_file)
         # --- LECTURA Y CONSOLIDACIÓN DE DATOS DE ACTUALIZACIÓN --
+        # Solo se materializan las columnas necesarias de los archivos de actualización
         lst_columns=['Country Code', 'Destination Country','Sold-To Customer Code','Sold-To Customer','Sold-To Dist Channel']
+        df_fill_rate=read_files(fill_rate_update, columns=lst_columns)
+        df_sales=read_files(sales_update, columns=lst_columns)
+        # El Maestro de Clientes se reescribe al final de este proceso: se lee sin la caché de referencia
+        df_master=pd.read_excel(md_customers, dtype=str, engine='openpyxl')
         
         df_fill_rate=df_fill_rate[lst_columns]
         df_sales=df_sales[lst_columns]
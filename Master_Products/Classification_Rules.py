@@ -0,0 +1,564 @@
+"""
+Módulo de reglas de clasificación de atributos de producto (Corded / Cordless / Gas, baterías, voltaje, Bare y Sub-Brand).
+Las palabras clave de clasificación no están en el código: se leen de una tabla de reglas versionada
+('classification_rules.json', junto a este módulo) que se compila una sola vez en estructuras de búsqueda
+(expresiones regulares de alternativas literales, tuplas de prefijos y conjuntos) y se evalúa sobre columnas completas:
+
+- Cada regla indica el campo normalizado que revisa ('sku', 'sku_raw', 'description', 'brand' o 'category_portfolio'),
+  el tipo de coincidencia ('prefix', 'contains' o 'equals'), sus palabras clave, la etiqueta que asigna y,
+  opcionalmente, palabras que la excluyen ('exclude') y condiciones adicionales que deben cumplirse ('and').
+- Las reglas de un grupo se evalúan todas de forma vectorizada y np.select asigna a cada fila la etiqueta de la
+  primera regla que se cumple; si ninguna se cumple se conserva el valor por defecto.
+- La tabla compilada se guarda en memoria por hash del archivo. get_rules revisa en cada llamada el tamaño y la fecha
+  de modificación del archivo: si cambió, la tabla se vuelve a leer y compilar sin reiniciar el proceso (si la nueva
+  versión no es válida se conserva la anterior).
+- Las funciones fila a fila de column_processing evalúan la misma tabla (evaluate_rules_row) y la consultan con
+  get_rules en cada llamada: no hay palabras clave en el código ni copias cargadas al importar.
+
+Contiene las siguientes funciones:
+- normalize_text: Normaliza una columna de texto como las funciones fila a fila (strip, mayúsculas, sin espacios).
+- load_rule_table: Lee y valida la tabla de reglas.
+- compile_rules: Compila una lista de reglas en patrones reutilizables.
+- compile_rule_table: Compila todos los grupos de la tabla de reglas.
+- get_rules: Devuelve la tabla compilada vigente, recargándola si el archivo cambió.
+- clear_rules_cache: Vacía la caché de tablas compiladas.
+- rule_keywords: Palabras clave de una regla por su identificador.
+- evaluate_rules: Evalúa reglas compiladas sobre columnas y devuelve la etiqueta de mayor prioridad.
+- evaluate_rules_row: Evalúa reglas compiladas sobre los valores de una fila (funciones fila a fila).
+- classify_corded_or_cordless: Versión vectorizada de corded_or_cordless_or_gas para un DataFrame.
+- benchmark_corded_or_cordless: Compara tiempos y resultados con la versión fila a fila.
+- infer_product_attributes: Versión vectorizada de assing_qty_batteries, assing_voltaje, assign_bare y assign_sub_brand.
+- benchmark_product_attributes: Compara tiempos y resultados de los cuatro atributos con la versión fila a fila.
+- reclassify_products: Vuelve a clasificar un maestro completo con la tabla de reglas vigente.
+"""
+
+#--------------------------------------------------
+#---------------- LIBRERIAS -----------------------
+#--------------------------------------------------
+import pandas as pd
+import numpy as np
+
+import json
+import os
+import re
+import time
+
+from Fill_Rate.Process_ETL.Excel_Cache import file_hash
+
+# Tabla de reglas por defecto (versionada junto al código)
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'classification_rules.json')
+# Campos normalizados que pueden revisar las reglas y tipos de coincidencia admitidos
+RULE_FIELDS = ('sku', 'sku_raw', 'description', 'brand', 'category_portfolio')
+RULE_MATCHES = ('prefix', 'contains', 'equals')
+# Columnas calculadas por infer_product_attributes
+LST_ATTRIBUTE_COLUMNS = ['Batteries Qty', 'Voltaje', 'Bare', 'Sub-Brand']
+
+# Caché en memoria: {hash del archivo: tabla compilada} y {ruta: ((tamaño, mtime_ns), hash vigente)}
+_DICT_RULE_SETS = {}
+_DICT_ACTIVE_RULES = {}
+
+
+def normalize_text(sr_text):
+    """
+    Normaliza una columna de texto igual que las funciones fila a fila: strip, mayúsculas y sin espacios.
+    Los nulos se tratan como texto vacío.
+
+    Args:
+        sr_text (pd.Series): Columna de texto.
+
+    Returns:
+        pd.Series: Columna normalizada (texto).
+    """
+    sr_text = pd.Series(sr_text).astype(object)
+    sr_text = sr_text.where(sr_text.notna(), '').astype(str)
+    return sr_text.str.strip().str.upper().str.replace(' ', '', regex=False)
+
+
+#--------------------------------------------------
+#---- TABLA DE REGLAS -----------------------------
+#--------------------------------------------------
+def _validate_rule(rule, group):
+    """Verifica la estructura de una regla (o de una condición 'and') y lanza ValueError si no es válida."""
+    if rule.get('field') not in RULE_FIELDS:
+        raise ValueError(f"Campo '{rule.get('field')}' no válido en la regla {rule} del grupo '{group}'")
+    if rule.get('match') not in RULE_MATCHES:
+        raise ValueError(f"Tipo de coincidencia '{rule.get('match')}' no válido en la regla {rule} del grupo '{group}'")
+    if not rule.get('keywords') or not all(isinstance(keyword, str) for keyword in rule['keywords']):
+        raise ValueError(f"La regla {rule} del grupo '{group}' debe tener una lista de palabras clave (texto)")
+    for condition in rule.get('and', []):
+        _validate_rule(condition, group)
+
+
+def load_rule_table(path=DEFAULT_RULES_PATH):
+    """
+    Lee la tabla de reglas (JSON) y valida su estructura: 'version', los grupos de reglas 'corded_cordless' y
+    'sub_brand', 'battery_sku_suffixes' y 'voltages' ({'values', 'exclude'}).
+
+    Args:
+        path (str, optional): Ruta de la tabla. Por defecto DEFAULT_RULES_PATH.
+
+    Returns:
+        dict: Contenido de la tabla.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        dict_table = json.load(f)
+    for key in ('version', 'corded_cordless', 'sub_brand', 'battery_sku_suffixes', 'voltages'):
+        if key not in dict_table:
+            raise ValueError(f"La tabla de reglas '{path}' no tiene la clave '{key}'")
+    for group in ('corded_cordless', 'sub_brand'):
+        for rule in dict_table[group]:
+            _validate_rule(rule, group)
+            if not rule.get('label'):
+                raise ValueError(f"La regla {rule} del grupo '{group}' no tiene etiqueta ('label')")
+    if not dict_table['voltages'].get('values'):
+        raise ValueError(f"La tabla de reglas '{path}' no tiene voltajes ('voltages.values')")
+    return dict_table
+
+
+def _compile_keywords(lst_keywords):
+    """Expresión regular con las palabras clave como alternativas literales."""
+    return '|'.join(re.escape(keyword) for keyword in lst_keywords)
+
+
+def _compile_condition(rule):
+    """Patrón de una regla o condición: tupla de prefijos, expresión regular o conjunto de valores exactos."""
+    if rule['match'] == 'prefix':
+        return tuple(rule['keywords'])
+    if rule['match'] == 'equals':
+        return frozenset(rule['keywords'])
+    return _compile_keywords(rule['keywords'])
+
+
+def compile_rules(lst_rules):
+    """
+    Compila las reglas: las palabras clave de cada regla 'contains' se unen en una sola expresión regular, las
+    de 'prefix' en una tupla (str.startswith) y las de 'equals' en un conjunto. Se hace una vez, no por fila.
+
+    Args:
+        lst_rules (list): Reglas (dict con 'field', 'match', 'keywords', 'label' y opcionalmente 'id', 'exclude' y 'and').
+
+    Returns:
+        list: Reglas compiladas, en el mismo orden.
+    """
+    lst_compiled = []
+    for rule in lst_rules:
+        if rule['match'] not in RULE_MATCHES:
+            raise ValueError(f"Tipo de coincidencia '{rule['match']}' no válido en la regla {rule}")
+        lst_compiled.append({
+            'id': rule.get('id'),
+            'field': rule['field'],
+            'match': rule['match'],
+            'keywords': list(rule['keywords']),
+            'pattern': _compile_condition(rule),
+            'exclude': _compile_keywords(rule['exclude']) if rule.get('exclude') else None,
+            'and': compile_rules([dict(condition, label=None) for condition in rule.get('and', [])]),
+            'label': rule['label'],
+        })
+    return lst_compiled
+
+
+def compile_rule_table(dict_table):
+    """
+    Compila todos los grupos de la tabla de reglas.
+
+    Args:
+        dict_table (dict): Tabla de reglas (ver load_rule_table).
+
+    Returns:
+        dict: {'version', 'corded_cordless', 'sub_brand' (reglas compiladas), 'battery_sku_suffixes' (frozenset),
+               'voltages' (lista en orden de prioridad), 'voltage_exclude' (texto o None)}.
+    """
+    return {
+        'version': dict_table['version'],
+        'corded_cordless': compile_rules(dict_table['corded_cordless']),
+        'sub_brand': compile_rules(dict_table['sub_brand']),
+        'battery_sku_suffixes': frozenset(dict_table['battery_sku_suffixes']),
+        'voltages': list(dict_table['voltages']['values']),
+        'voltage_exclude': dict_table['voltages'].get('exclude'),
+    }
+
+
+def get_rules(path=None, force_reload=False):
+    """
+    Devuelve la tabla de reglas compilada vigente. Si el archivo cambió (tamaño o fecha de modificación) desde la
+    última llamada se calcula su hash: una versión ya compilada se reutiliza y una nueva se lee y compila. Si la
+    nueva versión no es válida se conserva la anterior con una advertencia.
+
+    Args:
+        path (str, optional): Ruta de la tabla. Por defecto DEFAULT_RULES_PATH.
+        force_reload (bool, optional): Vuelve a leer y compilar el archivo aunque no haya cambiado. Por defecto False.
+
+    Returns:
+        dict: Tabla compilada (ver compile_rule_table), con 'path' y 'hash' del archivo.
+    """
+    path = os.path.abspath(path or DEFAULT_RULES_PATH)
+    stat = os.stat(path)
+    signature = (stat.st_size, stat.st_mtime_ns)
+    active = _DICT_ACTIVE_RULES.get(path)
+    if active is not None and active[0] == signature and not force_reload:
+        return _DICT_RULE_SETS[active[1]]
+
+    sha = file_hash(path)
+    if sha not in _DICT_RULE_SETS or force_reload:
+        try:
+            rules = compile_rule_table(load_rule_table(path))
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            if active is None:
+                raise
+            print(f"[ADVERTENCIA] La tabla de reglas '{path}' no es válida: {e}. "
+                  f"Se conserva la versión {_DICT_RULE_SETS[active[1]]['version']}.")
+            # No se reintenta hasta que el archivo vuelva a cambiar
+            _DICT_ACTIVE_RULES[path] = (signature, active[1])
+            return _DICT_RULE_SETS[active[1]]
+        rules.update(path=path, hash=sha)
+        _DICT_RULE_SETS[sha] = rules
+    if active is not None and active[1] != sha:
+        print(f"Tabla de reglas recargada: versión {_DICT_RULE_SETS[sha]['version']} ({sha[:12]})")
+    _DICT_ACTIVE_RULES[path] = (signature, sha)
+    return _DICT_RULE_SETS[sha]
+
+
+def clear_rules_cache():
+    """Vacía la caché de tablas de reglas compiladas (la siguiente llamada a get_rules vuelve a leer el archivo)."""
+    _DICT_RULE_SETS.clear()
+    _DICT_ACTIVE_RULES.clear()
+
+
+def rule_keywords(rules, group, rule_id):
+    """
+    Palabras clave de una regla de la tabla por su identificador.
+
+    Args:
+        rules (dict): Tabla compilada (ver get_rules).
+        group (str): Grupo de reglas ('corded_cordless' o 'sub_brand').
+        rule_id (str): Identificador de la regla (ej. 'cdl_sku').
+
+    Returns:
+        list: Palabras clave de la regla.
+    """
+    for rule in rules[group]:
+        if rule['id'] == rule_id:
+            return rule['keywords']
+    raise KeyError(f"La regla '{rule_id}' no existe en el grupo '{group}'")
+
+
+#--------------------------------------------------
+#---- EVALUACIÓN ----------------------------------
+#--------------------------------------------------
+def _rule_fields(df_products, set_fields, dict_fields=None):
+    """
+    Calcula (una vez cada uno) los campos normalizados que usan las reglas. dict_fields permite reutilizar
+    campos ya calculados.
+    """
+    dict_builders = {
+        'sku': lambda: normalize_text(df_products['SKU']),
+        'sku_raw': lambda: pd.Series(df_products['SKU'], dtype=object).astype(str),
+        'description': lambda: normalize_text(df_products['SKU Description']),
+        'brand': lambda: normalize_text(df_products['Brand']),
+        'category_portfolio': lambda: (normalize_text(df_products['GPP Category Description'])
+                                       + normalize_text(df_products['GPP Portfolio Description'])),
+    }
+    dict_fields = dict(dict_fields or {})
+    for field in set_fields:
+        if field not in dict_fields:
+            dict_fields[field] = dict_builders[field]()
+    return dict_fields
+
+
+def _used_fields(lst_compiled):
+    """Campos que revisa un grupo de reglas compiladas (incluidas sus condiciones 'and')."""
+    set_fields = set()
+    for rule in lst_compiled:
+        set_fields.add(rule['field'])
+        set_fields |= _used_fields(rule['and'])
+    return set_fields
+
+
+def _rule_mask(dict_fields, rule):
+    """Máscara booleana de las filas que cumplen una regla compilada."""
+    sr_field = dict_fields[rule['field']]
+    if rule['match'] == 'prefix':
+        mask = sr_field.str.startswith(rule['pattern'])
+    elif rule['match'] == 'equals':
+        mask = sr_field.isin(rule['pattern'])
+    else:
+        mask = sr_field.str.contains(rule['pattern'], regex=True)
+    mask = mask.fillna(False).to_numpy(dtype=bool)
+    if rule['exclude'] is not None:
+        mask = mask & ~sr_field.str.contains(rule['exclude'], regex=True).fillna(False).to_numpy(dtype=bool)
+    for condition in rule['and']:
+        mask = mask & _rule_mask(dict_fields, condition)
+    return mask
+
+
+def evaluate_rules(dict_fields, lst_compiled, sr_default):
+    """
+    Evalúa reglas compiladas sobre columnas completas: cada fila recibe la etiqueta de la primera regla que
+    cumple (np.select respeta el orden) o su valor por defecto.
+
+    Args:
+        dict_fields (dict): {campo: pd.Series normalizada}, todas con el mismo índice.
+        lst_compiled (list): Reglas compiladas (ver compile_rules).
+        sr_default (pd.Series): Valor de las filas sin coincidencias.
+
+    Returns:
+        pd.Series: Etiqueta de cada fila (mismo índice que sr_default).
+    """
+    # Las búsquedas por expresión regular se hacen sobre texto Arrow cuando está disponible
+    dict_fields = {field: sr.astype('str') for field, sr in dict_fields.items()}
+    lst_conditions = [_rule_mask(dict_fields, rule) for rule in lst_compiled]
+    arr_result = pd.Series(sr_default).to_numpy(dtype=object).copy()
+    if lst_conditions:
+        arr_matched = np.logical_or.reduce(lst_conditions)
+        arr_labels = np.select(lst_conditions, [rule['label'] for rule in lst_compiled], default='')
+        arr_result[arr_matched] = arr_labels[arr_matched]
+    return pd.Series(arr_result, index=pd.Series(sr_default).index, dtype=object)
+
+
+def _row_matches(dict_values, rule):
+    """Indica si los valores normalizados de una fila cumplen una regla compilada."""
+    value = dict_values[rule['field']]
+    if rule['match'] == 'prefix':
+        matched = value.startswith(rule['pattern'])
+    elif rule['match'] == 'equals':
+        matched = value in rule['pattern']
+    else:
+        matched = re.search(rule['pattern'], value) is not None
+    if matched and rule['exclude'] is not None:
+        matched = re.search(rule['exclude'], value) is None
+    return matched and all(_row_matches(dict_values, condition) for condition in rule['and'])
+
+
+def evaluate_rules_row(dict_values, lst_compiled, default):
+    """
+    Versión fila a fila de evaluate_rules: devuelve la etiqueta de la primera regla que cumplen los valores de
+    una fila, o el valor por defecto.
+
+    Args:
+        dict_values (dict): {campo: texto normalizado} con los campos que usan las reglas.
+        lst_compiled (list): Reglas compiladas (ver compile_rules).
+        default: Valor si ninguna regla se cumple.
+
+    Returns:
+        Etiqueta de la regla o el valor por defecto.
+    """
+    for rule in lst_compiled:
+        if _row_matches(dict_values, rule):
+            return rule['label']
+    return default
+
+
+def classify_corded_or_cordless(df_products, rules=None):
+    """
+    Versión vectorizada de corded_or_cordless_or_gas: clasifica todas las filas de una vez con las reglas
+    'corded_cordless' de la tabla y devuelve las mismas etiquetas que la función fila a fila.
+
+    Args:
+        df_products (pd.DataFrame): Productos con 'SKU', 'SKU Description', 'GPP Category Description',
+                                    'GPP Portfolio Description' y 'Corded / Cordless'.
+        rules (dict, optional): Tabla compilada. Por defecto la vigente (get_rules).
+
+    Returns:
+        pd.Series: 'CORDLESS', 'CORDED', 'GAS' o el valor original de 'Corded / Cordless'.
+    """
+    rules = rules or get_rules()
+    dict_fields = _rule_fields(df_products, _used_fields(rules['corded_cordless']))
+    return evaluate_rules(dict_fields, rules['corded_cordless'], df_products['Corded / Cordless'])
+
+
+def benchmark_corded_or_cordless(df_products, repeat=3):
+    """
+    Compara la clasificación fila a fila (DataFrame.apply con corded_or_cordless_or_gas) con la vectorizada:
+    mejor tiempo de cada una en 'repeat' ejecuciones y número de filas con etiquetas distintas.
+
+    Args:
+        df_products (pd.DataFrame): Productos (mismas columnas que classify_corded_or_cordless).
+        repeat (int, optional): Ejecuciones de cada versión. Por defecto 3.
+
+    Returns:
+        dict: {'rows', 'row_wise_s', 'vectorized_s', 'speedup', 'mismatches'}.
+    """
+    from Master_Products.column_processing import corded_or_cordless_or_gas
+
+    def row_wise():
+        return df_products.apply(
+            lambda row: corded_or_cordless_or_gas(row['SKU'], row['SKU Description'], row['GPP Category Description'],
+                                                  row['GPP Portfolio Description'], row['Corded / Cordless']), axis=1)
+
+    dict_times = {}
+    for name, function in (('row_wise_s', row_wise), ('vectorized_s', lambda: classify_corded_or_cordless(df_products))):
+        lst_times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            sr_result = function()
+            lst_times.append(time.perf_counter() - start)
+        dict_times[name] = (min(lst_times), sr_result)
+    sr_row_wise, sr_vectorized = dict_times['row_wise_s'][1], dict_times['vectorized_s'][1]
+    result = {
+        'rows': len(df_products),
+        'row_wise_s': round(dict_times['row_wise_s'][0], 4),
+        'vectorized_s': round(dict_times['vectorized_s'][0], 4),
+        'mismatches': int((sr_row_wise.astype(str) != sr_vectorized.astype(str)).sum()),
+    }
+    result['speedup'] = round(result['row_wise_s'] / max(result['vectorized_s'], 1e-9), 1)
+    print(f"Corded/Cordless: {result['rows']} filas | fila a fila {result['row_wise_s']}s | "
+          f"vectorizado {result['vectorized_s']}s | x{result['speedup']} | diferencias: {result['mismatches']}")
+    return result
+
+
+def _sku_without_suffix(sr_sku):
+    """SKU normalizado hasta la primera barra diagonal (ej. 'DCD791D2/BR' -> 'DCD791D2')."""
+    return sr_sku.astype('str').str.replace(r'(?s)/.*', '', regex=True)
+
+
+def _parse_batteries_qty(sr_qty, mask):
+    """
+    Cantidad de baterías como entero en las filas de mask: un valor con '-' equivale a 0 y el resto debe ser
+    un entero (como int() en assign_bare, un valor no numérico detiene el proceso).
+    """
+    sr_qty = pd.Series(sr_qty, dtype=object).astype(str)
+    arr_dash = sr_qty.str.contains('-', regex=False).to_numpy(dtype=bool)
+    sr_number = pd.to_numeric(sr_qty.str.strip().where(mask & ~arr_dash), errors='coerce')
+    arr_invalid = mask & ~arr_dash & (sr_number.isna() | (sr_number % 1 != 0)).to_numpy(dtype=bool)
+    if arr_invalid.any():
+        raise ValueError(f"Cantidad de baterías no válida: {sorted(set(sr_qty[arr_invalid]))[:10]}")
+    return np.where(arr_dash, 0, sr_number.fillna(0).to_numpy())
+
+
+def infer_product_attributes(df_products, rules=None):
+    """
+    Versión vectorizada de assing_qty_batteries, assing_voltaje, assign_bare y assign_sub_brand: calcula los
+    cuatro atributos sobre columnas completas, normalizando SKU, descripción y marca una sola vez, y devuelve
+    los mismos valores que las funciones fila a fila.
+
+    - Batteries Qty: último carácter del valor actual si el SKU termina en un sufijo de 'battery_sku_suffixes',
+      '0' si termina en 'B' y el valor actual en otro caso.
+    - Voltaje: primer voltaje de 'voltages' contenido en la descripción (salvo que contenga el voltaje excluido),
+      luego el valor actual si no es vacío ni '-', y '-' en otro caso.
+    - Bare: para CORDLESS 'Bare', 'Non Bare' o 'Bare + Batteries' según la nueva cantidad de baterías y si el SKU
+      termina en 'B'; None para el resto.
+    - Sub-Brand: etiqueta de la primera regla 'sub_brand' que se cumple (ej. 'FATMAX', 'IAR EXPERT', 'MASS') o '-'.
+
+    Args:
+        df_products (pd.DataFrame): Productos con 'SKU', 'SKU Description', 'Brand', 'Corded / Cordless' (ya asignado),
+                                    'Batteries Qty' y 'Voltaje'.
+        rules (dict, optional): Tabla compilada. Por defecto la vigente (get_rules).
+
+    Returns:
+        pd.DataFrame: Columnas LST_ATTRIBUTE_COLUMNS, con el mismo índice que df_products.
+    """
+    rules = rules or get_rules()
+    # --- NORMALIZACIÓN (una vez por columna) ---
+    dict_fields = _rule_fields(df_products, {'sku', 'description'} | _used_fields(rules['sub_brand']))
+    sr_sku = _sku_without_suffix(dict_fields['sku'])
+    sr_description = dict_fields['description'].astype('str')
+    arr_sku_bare = sr_sku.str.endswith('B').to_numpy(dtype=bool)
+
+    # --- BATTERIES QTY ---
+    arr_qty = df_products['Batteries Qty'].to_numpy(dtype=object).copy()
+    arr_suffix = sr_sku.str[-2:].isin(rules['battery_sku_suffixes']).to_numpy(dtype=bool)
+    arr_qty[arr_suffix] = pd.Series(arr_qty[arr_suffix], dtype=object).astype(str).str[-1].to_numpy(dtype=object)
+    arr_qty[~arr_suffix & arr_sku_bare] = '0'
+
+    # --- VOLTAJE ---
+    lst_conditions = [sr_description.str.contains(voltage, regex=False).to_numpy(dtype=bool)
+                      for voltage in rules['voltages']]
+    arr_found = np.logical_or.reduce(lst_conditions)
+    if rules['voltage_exclude']:
+        arr_found &= ~sr_description.str.contains(rules['voltage_exclude'], regex=False).to_numpy(dtype=bool)
+    arr_voltage = df_products['Voltaje'].to_numpy(dtype=object).copy()
+    arr_empty = np.equal(arr_voltage, None) | pd.Series(arr_voltage, dtype=object).astype(str).str.strip().isin(['', '-']).to_numpy(dtype=bool)
+    arr_voltage[arr_empty] = '-'
+    arr_voltage[arr_found] = np.select(lst_conditions, rules['voltages'], default='-').astype(object)[arr_found]
+
+    # --- BARE ---
+    arr_cordless = (df_products['Corded / Cordless'] == 'CORDLESS').to_numpy(dtype=bool)
+    arr_number = _parse_batteries_qty(arr_qty, arr_cordless)
+    arr_bare = np.select(
+        [~arr_cordless, arr_number == 0, (arr_number > 0) & ~arr_sku_bare, (arr_number > 0) & arr_sku_bare],
+        [None, 'Bare', 'Non Bare', 'Bare + Batteries'], default='-')
+
+    # --- SUB-BRAND ---
+    sr_sub_brand = evaluate_rules(dict_fields, rules['sub_brand'], pd.Series('-', index=df_products.index))
+
+    return pd.DataFrame({'Batteries Qty': arr_qty, 'Voltaje': arr_voltage, 'Bare': arr_bare,
+                         'Sub-Brand': sr_sub_brand.to_numpy(dtype=object)}, index=df_products.index, dtype=object)
+
+
+def benchmark_product_attributes(df_products, repeat=3):
+    """
+    Compara el cálculo fila a fila de Batteries Qty, Voltaje, Bare y Sub-Brand (DataFrame.apply, como en
+    column_processing.main) con infer_product_attributes: mejor tiempo de cada versión y filas distintas por columna.
+
+    Args:
+        df_products (pd.DataFrame): Productos (mismas columnas que infer_product_attributes).
+        repeat (int, optional): Ejecuciones de cada versión. Por defecto 3.
+
+    Returns:
+        dict: {'rows', 'row_wise_s', 'vectorized_s', 'speedup', 'mismatches': {columna: filas}}.
+    """
+    from Master_Products.column_processing import assing_qty_batteries, assing_voltaje, assign_bare, assign_sub_brand
+
+    def row_wise():
+        df = df_products.copy()
+        df['Batteries Qty'] = df.apply(
+            lambda row: assing_qty_batteries(row['SKU'], row['SKU Description'], row['Batteries Qty']), axis=1)
+        df['Voltaje'] = df.apply(lambda row: assing_voltaje(row['SKU Description'], row['Voltaje']), axis=1)
+        df['Bare'] = df.apply(
+            lambda row: assign_bare(row['SKU'], row['Batteries Qty'], row['Corded / Cordless']), axis=1)
+        df['Sub-Brand'] = df.apply(
+            lambda row: assign_sub_brand(row['SKU'], row['SKU Description'], row['Brand']), axis=1)
+        return df[LST_ATTRIBUTE_COLUMNS]
+
+    dict_times = {}
+    for name, function in (('row_wise_s', row_wise), ('vectorized_s', lambda: infer_product_attributes(df_products))):
+        lst_times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            df_result = function()
+            lst_times.append(time.perf_counter() - start)
+        dict_times[name] = (min(lst_times), df_result)
+    df_row_wise, df_vectorized = dict_times['row_wise_s'][1], dict_times['vectorized_s'][1]
+    result = {
+        'rows': len(df_products),
+        'row_wise_s': round(dict_times['row_wise_s'][0], 4),
+        'vectorized_s': round(dict_times['vectorized_s'][0], 4),
+        # Los nulos (None / NaN) se comparan como iguales
+        'mismatches': {col: int((df_row_wise[col].astype(object).fillna('<NULL>').astype(str)
+                                 != df_vectorized[col].astype(object).fillna('<NULL>').astype(str)).sum())
+                       for col in LST_ATTRIBUTE_COLUMNS},
+    }
+    result['speedup'] = round(result['row_wise_s'] / max(result['vectorized_s'], 1e-9), 1)
+    print(f"Atributos: {result['rows']} filas | fila a fila {result['row_wise_s']}s | "
+          f"vectorizado {result['vectorized_s']}s | x{result['speedup']} | diferencias: {result['mismatches']}")
+    return result
+
+
+def reclassify_products(df_products, rules_path=None):
+    """
+    Vuelve a clasificar un maestro completo (Corded / Cordless y luego Batteries Qty, Voltaje, Bare y Sub-Brand) con
+    la tabla de reglas vigente, ej. después de modificar 'classification_rules.json' en un proceso en ejecución.
+    Los nulos se tratan como '-', igual que en la generación del archivo de revisión.
+
+    Args:
+        df_products (pd.DataFrame): Maestro de productos con las columnas de classify_corded_or_cordless e
+                                    infer_product_attributes.
+        rules_path (str, optional): Ruta de la tabla de reglas. Por defecto DEFAULT_RULES_PATH.
+
+    Returns:
+        pd.DataFrame: Copia del maestro con las columnas reclasificadas.
+    """
+    rules = get_rules(rules_path)
+    df_products = df_products.fillna(value='-')
+    df_result = df_products.copy()
+    df_result['Corded / Cordless'] = classify_corded_or_cordless(df_result, rules=rules)
+    df_attributes = infer_product_attributes(df_result, rules=rules)
+    df_result[df_attributes.columns] = df_attributes
+    # Resumen de filas modificadas por columna
+    for col in ['Corded / Cordless'] + LST_ATTRIBUTE_COLUMNS:
+        changed = int((df_products[col].astype(object).fillna('<NULL>').astype(str)
+                       != df_result[col].astype(object).fillna('<NULL>').astype(str)).sum())
+        print(f"  {col}: {changed} filas modificadas")
+    print(f"Reclasificación completada con la tabla de reglas versión {rules['version']} ({rules['hash'][:12]}): "
+          f"{len(df_result)} filas")
+    return df_result
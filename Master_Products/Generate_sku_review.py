@@ -25,26 +25,37 @@ from typing import List, Union
 # Se importan las funciones de procesamiento de datos compartidas (read_files)
 # y la lógica de clasificación de productos (Master_Products/column_processing).
 from Fill_Rate.Process_ETL.Process_Files import asign_country_code, read_files
+from Shared_Information_for_Projects.Normalization import normalize_series
+from Shared_Information_for_Projects.Reference_Data import read_reference, REFERENCE_CACHE_DIR
+from Master_Products.Classification_Rules import classify_corded_or_cordless, infer_product_attributes
+from Fill_Rate.Process_ETL.Delta_Store import delta_periods, read_merged
 from Master_Products.column_processing import (obtain_new_products, assign_sku_base, assign_info_by_key,
-                              assign_gpp_by_portafolio, verify_psd, verify_gpp,
+                              load_sku_base_index, resolve_sku_base,
+                              assign_gpp_by_portafolio, build_portfolio_gpp_index, resolve_gpp_by_portfolio,
+                              verify_psd, verify_gpp,
                               corded_or_cordless_or_gas, assing_qty_batteries, assing_voltaje,
                               assign_bare, assign_sub_brand, review_sku_base_with_diferent_category)
-def consolidar_parquets(carpeta_path):
+def consolidar_parquets(carpeta_path, name='demand', fk_column='fk_date_country_clasification'):
     # Definir la ruta de la carpeta
     ruta = Path(carpeta_path)
     
     # Obtener lista de todos los archivos .parquet
     archivos = list(ruta.glob("*.parquet"))
+    # Periodos con deltas pendientes (modo 'delta' de Update): se leen combinando la base con sus deltas
+    lst_delta_periods = delta_periods(str(ruta), name)
+    archivos = [f for f in archivos if f.stem[len(name) + 1:] not in lst_delta_periods]
     
-    if not archivos:
+    if not archivos and not lst_delta_periods:
         print(f"No se encontraron archivos en {carpeta_path}")
         return None
 
-    print(f"Consolidando {len(archivos)} archivos...")
+    print(f"Consolidando {len(archivos)} archivos y {len(lst_delta_periods)} periodos con deltas...")
 
     # Leer cada archivo y guardarlo en una lista
     # Nota: Usamos copy() para asegurar que cada DF sea independiente
     lista_df = [pd.read_parquet(f) for f in archivos]
+    if lst_delta_periods:
+        lista_df.append(read_merged(str(ruta), name, lst_delta_periods, fk_column=fk_column))
     
     # Concatenar todos en un solo DataFrame
     df_final = pd.concat(lista_df, ignore_index=True)
@@ -85,16 +96,20 @@ def main():
         #-----------------------------
         #----  Cargo dataframes
         #-----------------------------
-        df_fill_rate=read_files(path_fill_rate_update)
-        df_sales=read_files(path_sales_update)
+        # Solo se materializan las columnas que usa obtain_new_products
+        lst_columns_fill_and_sales=['Country Material', 'Country Material Name','LAG Brand',
+                                    'GPP Division Code', 'GPP Division', 'GPP Category', 'GPP Portfolio']
+        df_fill_rate=read_files(path_fill_rate_update, columns=lst_columns_fill_and_sales)
+        df_sales=read_files(path_sales_update, columns=lst_columns_fill_and_sales)
         df_demand=consolidar_parquets(path_demand_update)
 
-        df_master_products=pd.read_excel(path_master_products, dtype=str, engine='openpyxl')
+        df_master_products=read_reference(path_master_products)
+        # El archivo de revisión se reescribe al final de este proceso: se lee sin la caché de referencia
         df_new_products=pd.read_excel(path_New_Products, dtype=str, engine='openpyxl')
 
-        df_gpp=pd.read_excel(path_gpp, dtype=str, engine='openpyxl',sheet_name='GPP')
-        df_brand=pd.read_excel(path_gpp, dtype=str, engine='openpyxl',sheet_name='Brand')
-        df_psd=pd.read_excel(path_psd, dtype=str, engine='openpyxl')
+        df_gpp=read_reference(path_gpp, sheet_name='GPP')
+        df_brand=read_reference(path_gpp, sheet_name='Brand')
+        df_psd=read_reference(path_psd)
         
         #---------------------------------------------------
         #--- Genero el archivo con los nuevos productos
@@ -106,8 +121,10 @@ def main():
         #----------------------------------------------------
 
         # Asigno el sku base a los nuevos productos    
-        sku_base_set = set(df_master_products['SKU Base'].dropna().unique())
-        df_new_products['SKU Base'] = df_new_products['SKU'].apply(lambda x: assign_sku_base(x, sku_base_set))
+        # Índice de SKUs base (guardado en la caché de referencia junto al maestro) y resolución vectorizada
+        df_sku_base_index = load_sku_base_index(df_master_products['SKU Base'],
+                                                os.path.join(os.path.dirname(path_master_products), REFERENCE_CACHE_DIR))
+        df_new_products['SKU Base'] = resolve_sku_base(df_new_products['SKU'], df_sku_base_index)
         
         # Genero dos dataframes, uno con sku base y otro sin sku base
         df_new_products_con_base = df_new_products[df_new_products['SKU Base'] != '-'].copy()
@@ -139,9 +156,9 @@ def main():
         #...................................................................
 
         # Asigno el gpp por medio del portafolio para los nuevos productos sin sku base
-        df_gpp['fk_GPP_Portfolio'] = df_gpp['GPP Portfolio Description'].str.strip().str.upper().str.replace(' ', '') 
-        df_new_products_sin_base['GPP'] = df_new_products_sin_base['GPP Portfolio Description'].apply(
-            lambda x: assign_gpp_by_portafolio(x, df_gpp['fk_GPP_Portfolio'].unique(), df_gpp))
+        df_gpp['fk_GPP_Portfolio'] = normalize_series(df_gpp['GPP Portfolio Description'], remove_spaces=True, as_str=False)
+        df_new_products_sin_base['GPP'] = resolve_gpp_by_portfolio(df_new_products_sin_base['GPP Portfolio Description'],
+                                                                   build_portfolio_gpp_index(df_gpp))
         
         # Asigno "-" a los gpp que no existen
         lst_gpp=(
@@ -225,24 +242,12 @@ def main():
         # Tratamiento de columnas corded / cordless, qyt batteries, voltaje,bare,sub-brand
         # ---------------------------------------------------------------------------------------
         #Asigno el corded o cordless a los nuevos productos
-        df_new_products_gpp['Corded / Cordless'] = df_new_products_gpp.apply(
-            lambda row: corded_or_cordless_or_gas(row['SKU'], row['SKU Description'], row['GPP Category Description'], row['GPP Portfolio Description'],
-                                            row['Corded / Cordless']), axis=1)
+        df_new_products_gpp['Corded / Cordless'] = classify_corded_or_cordless(df_new_products_gpp)
         
-        # Asigno la cantidad de baterías a los nuevos productos
-        df_new_products_gpp['Batteries Qty'] = df_new_products_gpp.apply(
-            lambda row: assing_qty_batteries(row['SKU'], row['SKU Description'], row['Batteries Qty']), axis=1)
-        
-        # Asigno el voltaje a los nuevos productos
-        df_new_products_gpp['Voltaje'] = df_new_products_gpp.apply(
-            lambda row: assing_voltaje(row['SKU Description'], row['Voltaje']), axis=1)
-        
-        # Asigno el valor de Bare a los nuevos productos
-        df_new_products_gpp['Bare'] = df_new_products_gpp.apply(
-            lambda row: assign_bare(row['SKU'], row['Batteries Qty'], row['Corded / Cordless']), axis=1)
-        #Asigno la sub-marca a los nuevos productos
-        df_new_products_gpp['Sub-Brand'] = df_new_products_gpp.apply(
-            lambda row: assign_sub_brand(row['SKU'], row['SKU Description'], row['Brand']), axis=1)
+        # Asigno la cantidad de baterías, el voltaje, el valor de Bare y la sub-marca a los nuevos productos
+        # (las cuatro columnas se calculan juntas sobre columnas completas; Bare usa las nuevas Batteries Qty y Corded / Cordless)
+        df_attributes = infer_product_attributes(df_new_products_gpp)
+        df_new_products_gpp[df_attributes.columns] = df_attributes
 
         #------------------------------------------------------------------
         # ---- SKU que deben ser revisados
@@ -10,6 +10,8 @@ import pandas as pd
 import numpy as np
 import sys
 
+from Shared_Information_for_Projects.Reference_Data import read_reference
+
 
 
 def update_file_hts(md_product,lst_columns_hts,df_hts):
@@ -77,8 +79,9 @@ def main():
         'Top Category', 'NPI Project', 'Categoria HTS', 'Familia HTS',
         'Sub Familia HTS', 'Clase HTS', 'NPI Project HTS',
         'Posicionamiento HTS']
+        # El archivo HTS se reescribe al final de este proceso: se lee sin la caché de referencia
         df_hts=pd.read_excel(path_hts, dtype=str, engine='openpyxl')
-        df_md_product=pd.read_excel(path_md_product, dtype=str, engine='openpyxl')
+        df_md_product=read_reference(path_md_product)
         
         df_filter_hts=update_file_hts(df_md_product,lst_columns_hts,df_hts)
         df_filter_hts.to_excel(path_hts, index=False)
@@ -8,6 +8,8 @@ Genera el archivo de trabajo PWT para la revisión manual.
 import pandas as pd
 import numpy as np
 import sys
+
+from Shared_Information_for_Projects.Reference_Data import read_reference
 def update_file_pwt(md_product,lst_columns_pwt,df_pwt):
     """
     Filtra el Maestro de Productos por la SBU 'PWT' y realiza una validación de calidad sobre sus columnas de clasificación
@@ -63,8 +65,9 @@ def main():
         lst_columns_pwt=['SKU', 'SKU Base', 'SKU Description', 'Brand', 'GPP SBU',
         'GPP Division Code', 'GPP Division Description',
         'GPP Category Description', 'GPP Portfolio Description','Group 1','Group 2']
+        # El archivo PWT se reescribe al final de este proceso: se lee sin la caché de referencia
         df_pwt=pd.read_excel(path_pwt, dtype=str, engine='openpyxl')
-        df_md_product=pd.read_excel(path_md_product, dtype=str, engine='openpyxl')
+        df_md_product=read_reference(path_md_product)
         
         df_update_pwt=update_file_pwt(df_md_product,lst_columns_pwt,df_pwt)
         df_update_pwt.to_excel(path_pwt, index=False)
@@ -11,6 +11,8 @@ información de Brand Group, Category Group y las clasificaciones HTS/PWT.
 import pandas as pd
 import numpy as np
 import  sys
+
+from Shared_Information_for_Projects.Reference_Data import read_reference
 # mapa de estandarización de marcas 
 BRAND_STANDARD_MAP = {
     "BLACK + DECKER": ["B+D", "BLACK&DECKER", "BLACKANDDECKER", "BLACK+DECKER®", "BLACK + DECKER","BLACK+DECKER"],
@@ -97,8 +99,9 @@ def update_master_products(path_md_product, path_sku_review, lst_col_md_product,
     """
     
     # --- LECTURA Y PREPROCESAMIENTO ---
+    # El Maestro de Productos se reescribe al final de este proceso: se lee sin la caché de referencia
     df_md_product = pd.read_excel(path_md_product, dtype=str, engine='openpyxl')
-    df_sku_review = pd.read_excel(path_sku_review, dtype=str, engine='openpyxl')
+    df_sku_review = read_reference(path_sku_review)
     
     df_sku_review['check_sku'] = df_sku_review['check_sku'].str.lower().str.strip().str.replace(' ', '')
     df_updates = df_sku_review[
@@ -193,10 +196,10 @@ def main():
         path_brand_gpp=MasterProductsPaths.INPUT_PROCESSED_GPP_BRAND_FILE # Usamos una variable para el archivo
 
         # ---  LECTURA DE FUENTES ---
-        df_hts = pd.read_excel(path_hts, dtype=str, engine='openpyxl')
-        df_pwt = pd.read_excel(path_pwt, dtype=str, engine='openpyxl')
-        df_brand = pd.read_excel(path_brand_gpp, sheet_name='Brand', dtype=str, engine='openpyxl')
-        df_gpp = pd.read_excel(path_brand_gpp, sheet_name='GPP', dtype=str, engine='openpyxl')
+        df_hts = read_reference(path_hts)
+        df_pwt = read_reference(path_pwt)
+        df_brand = read_reference(path_brand_gpp, sheet_name='Brand')
+        df_gpp = read_reference(path_brand_gpp, sheet_name='GPP')
 
         # ---  PROCESO ETL CENTRAL ---
         
@@ -10,14 +10,27 @@ de revisión para el analista.
 # Liberia
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 # Permite buscar y recuperar una lista de nombres de archivos que coinciden con un patrón específico.
 import glob
+import hashlib
 import os
 
 import pandas as pd
 from typing import List, Union
 
 from Fill_Rate.Process_ETL.Process_Files import asign_country_code, read_files
+from Shared_Information_for_Projects.Normalization import normalize_series
+from Shared_Information_for_Projects.Reference_Data import read_reference, REFERENCE_CACHE_DIR
+from Master_Products.Classification_Rules import (classify_corded_or_cordless, infer_product_attributes, get_rules,
+                                                  evaluate_rules_row)
+
+# Longitud mínima de un SKU base y máximo de caracteres que puede agregar un SKU a su SKU base
+MIN_SKU_BASE_LENGTH = 3
+MAX_SKU_SUFFIX_LENGTH = 11
+# Prefijo de la copia Parquet del índice de SKU Base en la caché de referencia
+SKU_BASE_INDEX_PREFIX = 'sku_base_index__'
 
 def obtain_new_products(df_fill_rate, df_sales, df_demand, df_new_products,df_master_products):
     """
@@ -107,6 +120,94 @@ def assign_sku_base(sku_completo, skus_base_set):
     # Si el bucle termina, no se encontró ningún prefijo que sea un SKU base
     return "-"
 
+def build_sku_base_index(sku_bases):
+    """
+    Construye el índice de SKUs base usado por resolve_sku_base: los valores únicos ordenados y su longitud.
+
+    Args:
+        sku_bases (iterable): Valores de 'SKU Base' del maestro histórico (los nulos y '-' se ignoran).
+
+    Returns:
+        pd.DataFrame: Columnas 'SKU Base' (texto, ordenado, sin duplicados) y 'length'.
+    """
+    sr_bases = pd.Series(list(sku_bases), dtype=object).dropna().astype(str)
+    sr_bases = sr_bases[(sr_bases != '-') & (sr_bases.str.len() >= MIN_SKU_BASE_LENGTH)]
+    df_index = pd.DataFrame({'SKU Base': np.sort(sr_bases.unique())})
+    df_index['length'] = df_index['SKU Base'].str.len().astype('int32')
+    return df_index
+
+
+def load_sku_base_index(sku_bases, cache_dir):
+    """
+    Devuelve el índice de SKUs base, reutilizando la copia Parquet guardada en cache_dir si los SKUs base
+    no cambiaron desde la ejecución anterior (la copia se identifica por un hash de los valores).
+
+    Args:
+        sku_bases (iterable): Valores de 'SKU Base' del maestro histórico.
+        cache_dir (str): Directorio de la caché (ej. '_cache_reference' junto al maestro).
+
+    Returns:
+        pd.DataFrame: Índice (ver build_sku_base_index).
+    """
+    lst_bases = sorted({str(value) for value in sku_bases if pd.notna(value)})
+    fingerprint = hashlib.sha256('\n'.join(lst_bases).encode('utf-8')).hexdigest()[:16]
+    cache_file = os.path.join(cache_dir, f"{SKU_BASE_INDEX_PREFIX}{fingerprint}.parquet")
+    if os.path.exists(cache_file):
+        try:
+            return pd.read_parquet(cache_file, engine='pyarrow')
+        except Exception as e:
+            print(f"  [ADVERTENCIA] No se pudo leer el índice de SKU Base '{cache_file}': {e}. Se reconstruye.")
+    df_index = build_sku_base_index(lst_bases)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        df_index.to_parquet(cache_file + '.tmp', index=False)
+        os.replace(cache_file + '.tmp', cache_file)
+        # Las copias de versiones anteriores del maestro ya no se usan
+        for old_file in glob.glob(os.path.join(cache_dir, SKU_BASE_INDEX_PREFIX + '*.parquet')):
+            if old_file != cache_file:
+                os.remove(old_file)
+    except OSError as e:
+        print(f"  [ADVERTENCIA] No se pudo guardar el índice de SKU Base en '{cache_dir}': {e}")
+    return df_index
+
+
+def resolve_sku_base(sr_skus, df_index):
+    """
+    Versión vectorizada de assign_sku_base para una Serie completa: para cada SKU devuelve el prefijo más largo
+    que es un SKU base conocido (entre la longitud total y max(3, longitud - 11)), o '-' si no hay ninguno.
+
+    En lugar de probar hasta 12 prefijos por SKU en Python, recorre solo las longitudes distintas de los SKUs
+    base del índice (de mayor a menor); en cada una recorta todos los SKUs pendientes a esa longitud y los busca
+    en el conjunto de SKUs base con una sola operación de pyarrow.compute.
+
+    Args:
+        sr_skus (pd.Series): SKUs a clasificar.
+        df_index (pd.DataFrame): Índice de SKUs base (ver build_sku_base_index / load_sku_base_index).
+
+    Returns:
+        pd.Series: SKU base de cada SKU (mismo índice que sr_skus).
+    """
+    sr_skus = pd.Series(sr_skus)
+    arr_bases = pa.array(df_index['SKU Base'].astype(str).to_numpy(dtype=object), type=pa.string())
+    mask_valid = sr_skus.notna().to_numpy()
+    arr_skus = pa.array(sr_skus[mask_valid].astype(str).to_numpy(dtype=object), type=pa.string())
+    arr_len = pc.utf8_length(arr_skus).to_numpy(zero_copy_only=False)
+    arr_result = np.full(len(arr_skus), '-', dtype=object)
+    arr_pending = np.ones(len(arr_skus), dtype=bool)
+    for length in sorted(df_index['length'].unique(), reverse=True):
+        # Candidatos: SKUs pendientes cuyo rango de prefijos válidos incluye esta longitud
+        arr_candidates = np.flatnonzero(arr_pending & (arr_len >= length) & (arr_len - MAX_SKU_SUFFIX_LENGTH <= length))
+        if len(arr_candidates) == 0:
+            continue
+        arr_prefix = pc.utf8_slice_codeunits(arr_skus.take(arr_candidates), 0, int(length))
+        arr_found = pc.is_in(arr_prefix, value_set=arr_bases).to_numpy(zero_copy_only=False)
+        arr_hits = arr_candidates[arr_found]
+        arr_result[arr_hits] = arr_prefix.filter(pa.array(arr_found)).to_numpy(zero_copy_only=False)
+        arr_pending[arr_hits] = False
+    sr_result = pd.Series('-', index=sr_skus.index, dtype=object)
+    sr_result[mask_valid] = arr_result
+    return sr_result
+
 def assign_info_by_key(
     df_target: pd.DataFrame, 
     df_source: pd.DataFrame, 
@@ -215,6 +316,50 @@ def assign_gpp_by_portafolio(portafolio, lst_portafolio,df_gpp):
             else:
                 return "-"
 
+def build_portfolio_gpp_index(df_gpp, portfolio_column='fk_GPP_Portfolio'):
+    """
+    Construye el índice de prefijos de portafolio usado por resolve_gpp_by_portfolio: cada prefijo (incluido el
+    vacío) de cada portafolio normalizado apunta al GPP del primer portafolio, en el orden de df_gpp, que empieza
+    con él. Es la misma coincidencia que assign_gpp_by_portafolio (primer portafolio que empieza con el texto
+    buscado y primer GPP de ese portafolio), resuelta de antemano para todos los prefijos posibles.
+
+    Args:
+        df_gpp (pd.DataFrame): Tabla GPP con la columna de portafolio normalizado y 'GPP'.
+        portfolio_column (str, optional): Columna del portafolio normalizado. Por defecto 'fk_GPP_Portfolio'.
+
+    Returns:
+        pd.Series: GPP indexado por prefijo de portafolio (índice único).
+    """
+    df_first = df_gpp.dropna(subset=[portfolio_column]).drop_duplicates(subset=[portfolio_column], keep='first')
+    dict_prefix = {}
+    for port, gpp in zip(df_first[portfolio_column].astype(str), df_first['GPP']):
+        for length in range(len(port) + 1):
+            # setdefault: un prefijo ya registrado pertenece a un portafolio anterior (primera coincidencia)
+            dict_prefix.setdefault(port[:length], gpp)
+    return pd.Series(list(dict_prefix.values()), index=pd.Index(list(dict_prefix.keys()), dtype=object), dtype=object)
+
+
+def resolve_gpp_by_portfolio(sr_portfolio, sr_index):
+    """
+    Versión vectorizada de assign_gpp_by_portafolio para una Serie completa: normaliza las descripciones de
+    portafolio (strip, mayúsculas, sin espacios) y las busca en el índice de prefijos con una sola operación.
+
+    Args:
+        sr_portfolio (pd.Series): Descripciones de portafolio de los SKUs sin SKU Base.
+        sr_index (pd.Series): Índice de prefijos (ver build_portfolio_gpp_index).
+
+    Returns:
+        pd.Series: GPP de cada SKU o '-' si ningún portafolio coincide (mismo índice que sr_portfolio).
+    """
+    sr_portfolio = pd.Series(sr_portfolio)
+    sr_query = sr_portfolio.astype(object).where(sr_portfolio.notna())
+    sr_query = sr_query.str.strip().str.upper().str.replace(' ', '', regex=False)
+    arr_position = sr_index.index.get_indexer(sr_query.to_numpy(dtype=object))
+    arr_result = np.where(arr_position >= 0, sr_index.to_numpy(dtype=object)[arr_position], '-')
+    arr_result[sr_query.isna().to_numpy()] = '-'
+    return pd.Series(arr_result, index=sr_portfolio.index, dtype=object)
+
+
 def verify_psd(sku, lst_psd):
     """
     Verifica si un SKU se encuentra en la lista compartida de PSD. Si es así, le asigna el código GPP específico de PSD;
@@ -260,46 +405,12 @@ def corded_or_cordless_or_gas(sku,description,category_description,portfolio_des
     portfolio_description = portfolio_description.strip().upper().replace(' ', '')
     category_portafolio = category_description + portfolio_description
 
-    lst_cdl_description = [
-        'CORDLESS', 'CDL', 'INALAMBRIC', 'BATTERY', 'BATT', 'BRUSHLESS', 'XR', 'MAX', 'LI-ION',
-        '2.4V', '3.6V', '3.8V', '4V', '4.8V', '6V', '7.2V', '8V', '9.6V', '10.8V', 
-        '12V', '14.4V', '16V', '18V', '20V', '24V', '36V', '40V', '54V', '60V',
-        'CHARGER', 'CARGADOR'
-    ]
-    lst_cdl_sku=['BDC','CMC','DWC','PCC','STC','DC']
-    lst_cdl_cat_por_description=['CDL','CORDLESS','20V','12V']
-
-    lst_crd_description=[
-        'CRD','CORDED','ALAMBRICO', 'ELECTRIC', 'WATT','AMPER', 'AMP',
-        'STATIONARY', 'BENCHTOP', 'COMPRESSOR',
-        '0W','110V', '120V', '220V', '230V','127V']
-    lst_crd_sku=['DWE','FME','BEW','KS']
-    lst_crd_cat_por_description=['CORDED','CRD']
-
-    lst_gas_description = [
-        'GAS', 'GASOLINE', 'GASOLINA', '0CC','1CC','2CC','3CC','4CC','5CC',
-        '6CC','7CC','8CC','9CC','10CC','0PSI']
-    # Prioridad 1: Verificar si el SKU inicia con los prefijos clave de 'Cordless' Corded
-    if any(sku.startswith(elemento) for elemento in lst_cdl_sku):
-        return 'CORDLESS'
-    if any(sku.startswith(elemento) for elemento in lst_crd_sku):
-        return 'CORDED'
-    # Prioridad 2: Verificar si la descripción contiene palabras clave de 'Cordless' o 'Corded'
-    if any(elemento in description for elemento in lst_crd_description):
-        return 'CORDED'
-    if any(elemento in description for elemento in lst_cdl_description) and not '220V' in description:
-        return 'CORDLESS'
-    
-    # Prioridad 3: Verificar si la categoría o portafolio contiene palabras clave de 'Cordless' o 'Corded'
-    if any(elemento in category_portafolio for elemento in lst_cdl_cat_por_description):
-        return 'CORDLESS'
-    if any(elemento in category_portafolio for elemento in lst_crd_cat_por_description):
-        return 'CORDED'
-    # Prioridad 4: Verificar si la descripcion indica que es un producto a gas     
-    if any(elemento in description for elemento in lst_gas_description):
-        return 'GAS'
+    # Las reglas 'corded_cordless' de la tabla vigente (Classification_Rules.get_rules) se evalúan en orden:
+    # prefijos del SKU, palabras clave de la descripción, de la categoría/portafolio y, por último, de gas
+    # (versión vectorizada para columnas completas: classify_corded_or_cordless)
+    dict_values = {'sku': sku, 'description': description, 'category_portfolio': category_portafolio}
     # Si no se encuentra ninguna coincidencia, retorna el valor original
-    return corded_or_cordless
+    return evaluate_rules_row(dict_values, get_rules()['corded_cordless'], corded_or_cordless)
 
 def assing_qty_batteries(sku, description, batteries_qty):
     """
@@ -318,17 +429,9 @@ def assing_qty_batteries(sku, description, batteries_qty):
     
     description = description.strip().upper().replace(' ', '')
     
-    # Lista de palabras clave para identificar la cantidad de baterías
-    lst_battery_keywords = ['S1','S2','C1','C2','E1','E2',
-                            'D1','D2','F1','F2','L1','L2',
-                            'G1','G2','M1','M2','Q1','Q2',
-                            'P1','P2','R1','R2','J1','J2',
-                            'R1','R2','T1','T2','W1','W2',
-                            'X1','X2','U1','U2','Y1','Y2','Z1','Z2'
-    ]
-    
-    # Verifica si la descripción contiene alguna palabra clave relacionada con baterías
-    if any(elemento in sku[-2:] for elemento in lst_battery_keywords):
+    # Los sufijos se leen de la tabla de reglas vigente (versión vectorizada: infer_product_attributes)
+    # Verifica si el SKU termina en alguno de los sufijos relacionados con baterías
+    if sku[-2:] in get_rules()['battery_sku_suffixes']:
         return str(batteries_qty[-1])
     if sku.endswith('B'):
         # Si el SKU termina con 'B', significa que no tiene batería
@@ -345,13 +448,12 @@ def assing_voltaje(description, voltaje):
         
     """
     description = description.strip().upper().replace(' ', '')
-    lst_voltajes = [
-        '2.4V', '3.6V', '3.8V', '4V', '4.8V', '6V', '7.2V', '8V', '9.6V', '10.8V', 
-        '12V', '14.4V', '16V', '18V', '20V', '24V', '36V', '40V', '54V', '60V','120V'
-    ]
-    for vol in lst_voltajes:
-        if vol in description and not('220V' in description):
-            return vol
+    # Los voltajes y el voltaje excluido se leen de la tabla de reglas vigente (versión vectorizada: infer_product_attributes)
+    rules = get_rules()
+    if not (rules['voltage_exclude'] and rules['voltage_exclude'] in description):
+        for vol in rules['voltages']:
+            if vol in description:
+                return vol
             
     # Si no se encuentra voltaje en la descripción, se devuelve el valor original
     if voltaje is not None and str(voltaje).strip() not in ['', '-']:
@@ -394,14 +496,10 @@ def assign_sub_brand(sku,description,brand):
 
     description = description.strip().upper().replace(' ', '')
     brand = brand.strip().upper().replace(' ', '')
-    if 'FATMA' in description:
-        return 'FATMAX'
-    elif sku.startswith('E') and brand == 'FACOM':
-        return 'IAR EXPERT'
-    elif sku.startswith('STA82'):
-        return 'MASS'
-    else:
-        return "-"  # Retorna la marca original si no se encuentra una sub-marca específica
+    # Reglas 'sub_brand' de la tabla vigente (versión vectorizada: infer_product_attributes)
+    dict_values = {'sku_raw': str(sku), 'description': description, 'brand': brand}
+    # Retorna '-' si no se encuentra una sub-marca específica
+    return evaluate_rules_row(dict_values, get_rules()['sub_brand'], "-")
 
 def review_sku_base_with_diferent_category(df_master_products,lst_colums_gpp):
 
@@ -472,12 +570,13 @@ def main():
     df_sales=read_files(path_sales_update)
     df_demand=read_files(path_demand_update)
 
-    df_master_products=pd.read_excel(path_master_products, dtype=str, engine='openpyxl')
+    df_master_products=read_reference(path_master_products)
+    # El archivo de revisión se reescribe al final de este proceso: se lee sin la caché de referencia
     df_new_products=pd.read_excel(path_New_Products, dtype=str, engine='openpyxl')
 
-    df_gpp=pd.read_excel(path_gpp, dtype=str, engine='openpyxl',sheet_name='GPP')
-    df_brand=pd.read_excel(path_gpp, dtype=str, engine='openpyxl',sheet_name='Brand')
-    df_psd=pd.read_excel(path_psd, dtype=str, engine='openpyxl')
+    df_gpp=read_reference(path_gpp, sheet_name='GPP')
+    df_brand=read_reference(path_gpp, sheet_name='Brand')
+    df_psd=read_reference(path_psd)
     
     #---------------------------------------------------
     #--- Genero el archivo con los nuevos productos
@@ -489,8 +588,10 @@ def main():
     #----------------------------------------------------
 
     # Asigno el sku base a los nuevos productos    
-    sku_base_set = set(df_master_products['SKU Base'].dropna().unique())
-    df_new_products['SKU Base'] = df_new_products['SKU'].apply(lambda x: assign_sku_base(x, sku_base_set))
+    # Índice de SKUs base (guardado en la caché de referencia junto al maestro) y resolución vectorizada
+    df_sku_base_index = load_sku_base_index(df_master_products['SKU Base'],
+                                            os.path.join(os.path.dirname(path_master_products), REFERENCE_CACHE_DIR))
+    df_new_products['SKU Base'] = resolve_sku_base(df_new_products['SKU'], df_sku_base_index)
     
     # Genero dos dataframes, uno con sku base y otro sin sku base
     df_new_products_con_base = df_new_products[df_new_products['SKU Base'] != '-'].copy()
@@ -522,9 +623,9 @@ def main():
     #...................................................................
 
     # Asigno el gpp por medio del portafolio para los nuevos productos sin sku base
-    df_gpp['fk_GPP_Portfolio'] = df_gpp['GPP Portfolio Description'].str.strip().str.upper().str.replace(' ', '') 
-    df_new_products_sin_base['GPP'] = df_new_products_sin_base['GPP Portfolio Description'].apply(
-        lambda x: assign_gpp_by_portafolio(x, df_gpp['fk_GPP_Portfolio'].unique(), df_gpp))
+    df_gpp['fk_GPP_Portfolio'] = normalize_series(df_gpp['GPP Portfolio Description'], remove_spaces=True, as_str=False)
+    df_new_products_sin_base['GPP'] = resolve_gpp_by_portfolio(df_new_products_sin_base['GPP Portfolio Description'],
+                                                               build_portfolio_gpp_index(df_gpp))
     
     # Asigno "-" a los gpp que no existen
     lst_gpp=(
@@ -604,24 +705,12 @@ def main():
     # Tratamiento de columnas corded / cordless, qyt batteries, voltaje,bare,sun brand
     # ---------------------------------------------------------------------------------------
     #Asigno el corded o cordless a los nuevos productos
-    df_new_products_gpp['Corded / Cordless'] = df_new_products_gpp.apply(
-        lambda row: corded_or_cordless_or_gas(row['SKU'], row['SKU Description'], row['GPP Category Description'], row['GPP Portfolio Description'],
-                                        row['Corded / Cordless']), axis=1)
-    
-    # Asigno la cantidad de baterías a los nuevos productos
-    df_new_products_gpp['Batteries Qty'] = df_new_products_gpp.apply(
-        lambda row: assing_qty_batteries(row['SKU'], row['SKU Description'], row['Batteries Qty']), axis=1)
-    
-    # Asigno el voltaje a los nuevos productos
-    df_new_products_gpp['Voltaje'] = df_new_products_gpp.apply(
-        lambda row: assing_voltaje(row['SKU Description'], row['Voltaje']), axis=1)
-    
-    # Asigno el valor de Bare a los nuevos productos
-    df_new_products_gpp['Bare'] = df_new_products_gpp.apply(
-        lambda row: assign_bare(row['SKU'], row['Batteries Qty'], row['Corded / Cordless']), axis=1)
-    #Asigno la sub-marca a los nuevos productos
-    df_new_products_gpp['Sub-Brand'] = df_new_products_gpp.apply(
-        lambda row: assign_sub_brand(row['SKU'], row['SKU Description'], row['Brand']), axis=1)
+    df_new_products_gpp['Corded / Cordless'] = classify_corded_or_cordless(df_new_products_gpp)
+    
+    # Asigno la cantidad de baterías, el voltaje, el valor de Bare y la sub-marca a los nuevos productos
+    # (las cuatro columnas se calculan juntas sobre columnas completas; Bare usa las nuevas Batteries Qty y Corded / Cordless)
+    df_attributes = infer_product_attributes(df_new_products_gpp)
+    df_new_products_gpp[df_attributes.columns] = df_attributes
 
     # Extraigo los sku base que tienen diferente sbu-category para su revision
     df_sku_base_review=review_sku_base_with_diferent_category(df_master_products,lst_colums_gpp)
@@ -35,6 +35,8 @@ Funciones Propias de este Módulo (Cálculos y Transformaciones Específicas):
     - LaunchYear_VR
     - assign_num_batteries
     - assign_NSV_NPI_w_Combo
+    - build_sales_lookups / enrich_sales: motor que calcula todas las columnas anteriores en una sola pasada.
+    - full_load_partitioned: carga completa por partes (un archivo fuente por proceso), con memoria acotada.
 '''
 
 #--------------------------------------------------
@@ -46,9 +48,17 @@ import numpy as np
 # Permite buscar y recuperar una lista de nombres de archivos que coinciden con un patrón específico.
 import glob
 import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
 
 # Importo funciones creadas que seran usadas nuevamente
 from Fill_Rate.Process_ETL.Process_Files import read_files, asign_country_code, process_columns, group_parquet,format_columns
+from Fill_Rate.Process_ETL.Delta_Store import discard_deltas
+from Fill_Rate.Process_ETL.Key_Index import key_index_name, build_key_index, KEY_INDEX_ROW_GROUP_SIZE
+from Fill_Rate.Process_ETL.Parquet_Commit import recover_parquet_dir, new_run_id, staging_path, commit_staged
+from Fill_Rate.Process_ETL.Parquet_Dataset import publish_dataset, PUBLISHED_PARTITION_COLS, DEFAULT_ROW_GROUP_SIZE
+from Shared_Information_for_Projects.Normalization import normalize_series, normalize_columns
+from Shared_Information_for_Projects.Reference_Data import read_reference, country_region_map, reference_index
 
 
 import pandas as pd # Asumo que pandas está importado
@@ -74,10 +84,10 @@ def assign_nsv(df_processed, df_md_product, df_gross_to_net,df_country):
     #  Estandarización y Renombre (Master Data)
     df_md_product=df_md_product.copy()
     df_md_product.rename(columns={'SKU':'SKU_x', 'Brand':'Brand_x', 'GPP SBU':'GPP SBU_x'}, inplace=True)
-    df_md_product['SKU_x'] = df_md_product['SKU_x'].astype(str).str.upper().str.strip()
+    df_md_product['SKU_x'] = normalize_series(df_md_product['SKU_x'])
     df_md_product.drop_duplicates(subset=['SKU_x'], inplace=True)
     # Aplicar estandarización a la clave de cruce del DataFrame principal
-    df_processed['fk_SKU'] = df_processed['fk_SKU'].astype(str).str.upper().str.strip()
+    normalize_columns(df_processed, ['fk_SKU'])
 
     # --- CRUCE 1: Obtener Brand y SBU del Master Product ---
     df_processed = pd.merge(
@@ -88,12 +98,10 @@ def assign_nsv(df_processed, df_md_product, df_gross_to_net,df_country):
         right_on='SKU_x',
     )
     # CRUCE 2: Obtener la region de venta, dado que gtonet tiene cca como pais(no cada uno de los paises)
-    df_country['CountryRegion']=df_country['Country']+'-'+df_country['Region']
-    df_country['CountryRegion']=df_country['CountryRegion'].str.upper().str.strip()
-    df_country = df_country.drop_duplicates(subset=['CountryRegion'], keep='first')
+    df_country_region = country_region_map(df_country).reset_index()
 
     df_processed=pd.merge(df_processed,
-                       df_country[['Country','Region']],
+                       df_country_region[['Country','Region']],
                        how='left',
                        left_on='fk_Country',
                        right_on='Country')
@@ -114,8 +122,8 @@ def assign_nsv(df_processed, df_md_product, df_gross_to_net,df_country):
                                    df_gross_to_net['SBU_y'])
     df_gross_to_net.drop_duplicates(subset=['fk_g2n_y'], inplace=True)
     
-    df_processed['fk_g2n'] = df_processed['fk_g2n'].str.upper().str.strip()
-    df_gross_to_net['fk_g2n_y'] = df_gross_to_net['fk_g2n_y'].str.upper().str.strip()
+    df_processed['fk_g2n'] = normalize_series(df_processed['fk_g2n'], as_str=False)
+    df_gross_to_net['fk_g2n_y'] = normalize_series(df_gross_to_net['fk_g2n_y'], as_str=False)
     
     # --- CRUCE 3: Obtener el G2N% ---
     df_processed = pd.merge(
@@ -187,14 +195,11 @@ def assign_NPI_New_Carryover(df_processed,df_npi,df_country):
         pd.DataFrame: El DataFrame modificado con las columnas 'New New/Carryover', 
                       'Incremental %', y 'NPI Incremental Sales $'.
     """
-    #Elimina duplicados en df_npi
-    df_country['CountryRegion']=df_country['Country']+'-'+df_country['Region']
-    df_country['CountryRegion']=df_country['CountryRegion'].str.upper().str.strip()
-    df_country = df_country.drop_duplicates(subset=['CountryRegion'], keep='first')
-    # Asignacion de la region segun pais
+    # Asignacion de la region segun pais (sin duplicados de País-Región)
+    df_country_region = country_region_map(df_country).reset_index()
     df_processed=pd.merge(
         df_processed,
-        df_country[['Country','Region']],
+        df_country_region[['Country','Region']],
         how='left',
         left_on='fk_Country',
         right_on='Country',
@@ -213,10 +218,10 @@ def assign_NPI_New_Carryover(df_processed,df_npi,df_country):
     df_processed['fk_NPI'] = (df_processed['fk_year_month'].astype(str) + '-'+
                              df_processed['fk_CountryRegion'] + '-'+
                              df_processed['fk_SKU'])
-    df_processed['fk_NPI'] = df_processed['fk_NPI'].str.upper().str.strip()
+    df_processed['fk_NPI'] = normalize_series(df_processed['fk_NPI'], as_str=False)
     #clave para cruzar sales con npi
     df_npi=df_npi.copy()
-    df_npi['fk_YearMonthCountrySku']=df_npi['fk_YearMonthCountrySku'].str.upper().str.strip()
+    df_npi['fk_YearMonthCountrySku']=normalize_series(df_npi['fk_YearMonthCountrySku'], as_str=False)
     
     #cruce para obtener New New/Carryover y Incremental %
     df_processed=pd.merge(
@@ -264,8 +269,8 @@ def LaunchYear_VR(df_processed,df_npi,df_country):
     df_npi_new = df_npi[mask_npi].copy()
     df_npi_new.rename(columns={'Fiscal Year':'Launch Year'}, inplace=True)
     df_npi_new=df_npi_new[['Launch Year','Region','SKU']].copy()
-    df_npi_new['Region']=df_npi_new['Region'].str.upper().str.strip()
-    df_npi_new['SKU']=df_npi_new['SKU'].str.upper().str.strip()
+    df_npi_new['Region']=normalize_series(df_npi_new['Region'], as_str=False)
+    df_npi_new['SKU']=normalize_series(df_npi_new['SKU'], as_str=False)
 
     #Ordenar y mantener solo el año de lanzamiento más reciente para cada Region-SKU único
     df_npi_new.sort_values(by='Launch Year', ascending=False, inplace=True)
@@ -275,17 +280,13 @@ def LaunchYear_VR(df_processed,df_npi,df_country):
     #llaves para cruzar ventas con npi
     df_npi_new['fk_RegionSku']=(df_npi_new['Region']+'-'+
                                 df_npi_new['SKU'])
-    df_npi_new['fk_RegionSku']=df_npi_new['fk_RegionSku'].str.upper().str.strip()
+    df_npi_new['fk_RegionSku']=normalize_series(df_npi_new['fk_RegionSku'], as_str=False)
     serie_new_map=df_npi_new.set_index('fk_RegionSku')['Launch Year']
 
     #============ TRATAMIENTO SALES =============================
 
     #===ASIGNACION DE REGION DE VENTA
-    #Elimina duplicados en df_country
-    df_country['CountryRegion']=df_country['Country']+'-'+df_country['Region']
-    df_country['CountryRegion']=df_country['CountryRegion'].str.upper().str.strip()
-    df_country = df_country.drop_duplicates(subset=['CountryRegion'], keep='first')
-    serie_regiones_map = df_country.set_index('Country')['Region']
+    serie_regiones_map = country_region_map(df_country)
     df_processed['Region'] = df_processed['fk_Country'].map(serie_regiones_map)
 
     # fk para saber si es un nuevo producto en algunos de los 3 años de interes
@@ -336,8 +337,8 @@ def assign_num_batteries(df_processed,df_md_product):
         pd.DataFrame: El DataFrame modificado con las columnas 'Batteries Qty' y 
                       'Num Batteries Sales'.
     """
-    df_processed['fk_SKU'] = df_processed['fk_SKU'].astype(str).str.upper().str.strip()
-    df_md_product['SKU'] = df_md_product['SKU'].astype(str).str.upper().str.strip()
+    normalize_columns(df_processed, ['fk_SKU'])
+    df_md_product['SKU'] = normalize_series(df_md_product['SKU'])
     df_processed=pd.merge(
         df_processed,
         df_md_product[['SKU','Batteries Qty']],
@@ -378,8 +379,8 @@ def assign_NSV_NPI_w_Combo(df_processed,df_filter_npi):
     df_processed['fk_YearCountrySku']=(df_processed['fk_year_month'].str[:4]+'-'+
                                        df_processed['fk_Country']+'-'+
                                        df_processed['fk_SKU'])
-    df_processed['fk_YearCountrySku']=df_processed['fk_YearCountrySku'].str.upper().str.strip()
-    df_filter_npi['fk_YearCountrySku']=df_filter_npi['fk_YearCountrySKU'].str.upper().str.strip()
+    df_processed['fk_YearCountrySku']=normalize_series(df_processed['fk_YearCountrySku'], as_str=False)
+    df_filter_npi['fk_YearCountrySku']=normalize_series(df_filter_npi['fk_YearCountrySKU'], as_str=False)
     df_processed=pd.merge(
         df_processed,
         df_filter_npi[['fk_YearCountrySku','Combo %']],
@@ -400,12 +401,480 @@ def assign_NSV_NPI_w_Combo(df_processed,df_filter_npi):
     return df_processed
 
 
+#====================================================
+#--- MOTOR DE ENRIQUECIMIENTO EN UNA PASADA
+#====================================================
+# Reemplaza la secuencia assign_nsv -> assign_selling_unit_price -> assign_NPI_New_Carryover ->
+# LaunchYear_VR -> assign_num_batteries -> assign_NSV_NPI_w_Combo: las tablas de referencia se
+# indexan una sola vez (build_sales_lookups) y cada cruce se resuelve con posiciones (get_indexer/take)
+# sobre las columnas necesarias, sin copiar la tabla de hechos en cada pd.merge.
+
+# Tipo de texto por defecto de la versión de pandas instalada ('str' en pandas 3, object en versiones anteriores)
+_DEFAULT_STR_DTYPE = pd.Series(['']).dtype
+
+def _build_lookup(keys, values):
+    """
+    Construye una tabla de búsqueda indexada por clave, conservando el orden y las claves repetidas
+    de la tabla original (como las vería pd.merge).
+
+    Args:
+        keys (pd.Series): Claves de cruce ya normalizadas.
+        values (dict): {nombre: pd.Series} con las columnas a traer en el cruce. Las columnas numéricas
+                       (float) se convierten una sola vez aquí en lugar de fila a fila en la tabla de hechos.
+
+    Returns:
+        dict: {'index': pd.Index, 'unique': bool, 'values': {nombre: np.ndarray}}.
+    """
+    index = pd.Index(keys)
+    return {'index': index,
+            'unique': index.is_unique,
+            'values': {name: (serie.to_numpy(dtype=np.float64) if serie.dtype.kind == 'f'
+                              else serie.to_numpy(dtype=object))
+                       for name, serie in values.items()}}
+
+def _lookup_positions(keys, lookup):
+    """
+    Resuelve un cruce left de keys contra una tabla de búsqueda.
+
+    Args:
+        keys (pd.Series): Claves de la tabla de hechos (filas actuales).
+        lookup (dict): Tabla creada con _build_lookup.
+
+    Returns:
+        tuple: (left_pos, right_pos). right_pos es la posición de la fila coincidente en la tabla (-1 si no hay);
+               left_pos es None si cada fila tiene a lo sumo una coincidencia, o las posiciones de las filas de
+               hechos repetidas cuando la tabla tiene claves duplicadas (misma multiplicación que pd.merge).
+    """
+    if lookup['unique']:
+        return None, lookup['index'].get_indexer(keys)
+    df_left = pd.DataFrame({'key': keys.to_numpy(), 'left': np.arange(len(keys))})
+    df_right = pd.DataFrame({'key': lookup['index'], 'right': np.arange(len(lookup['index']))})
+    df_pos = pd.merge(df_left, df_right, on='key', how='left')
+    return df_pos['left'].to_numpy(), df_pos['right'].fillna(-1).astype(np.int64).to_numpy()
+
+def _take_values(lookup, name, right_pos):
+    """Trae la columna name de la tabla de búsqueda para cada fila (NaN donde no hay coincidencia)."""
+    values = lookup['values'][name]
+    if len(values) == 0:
+        return pd.Series(np.nan, index=range(len(right_pos)), dtype=values.dtype)
+    result = values.take(np.maximum(right_pos, 0))
+    result[right_pos < 0] = np.nan
+    if values.dtype == object:
+        # Texto con el tipo de texto por defecto de pandas, para poder concatenarlo con las columnas de
+        # hechos aunque ninguna fila tenga coincidencia (una columna object con solo NaN no se concatena)
+        return pd.Series(result, dtype=object).astype(_DEFAULT_STR_DTYPE)
+    return pd.Series(result, dtype=values.dtype)
+
+def _index_md_product(df_md_product):
+    """Maestro de Productos (NSV): 'Brand' y 'GPP SBU' por SKU normalizado, sin duplicados."""
+    sku_md = normalize_series(df_md_product['SKU'])
+    mask_unique = ~sku_md.duplicated(keep='first')
+    return pd.DataFrame({'Brand': df_md_product.loc[mask_unique, 'Brand'].to_numpy(),
+                         'GPP SBU': df_md_product.loc[mask_unique, 'GPP SBU'].to_numpy()},
+                        index=pd.Index(sku_md[mask_unique], name='key'))
+
+def _index_batteries(df_md_product):
+    """Maestro de Productos (baterías): sin deduplicar, igual que assign_num_batteries."""
+    return pd.DataFrame({'Batteries Qty': pd.to_numeric(df_md_product['Batteries Qty'], errors='coerce')
+                                          .astype(float).to_numpy()},
+                        index=pd.Index(normalize_series(df_md_product['SKU']), name='key'))
+
+def _index_country(df_country):
+    """País -> Región con País y Región normalizados (como en asign_country_code), sin duplicados."""
+    df_country_region = pd.DataFrame({'Country': normalize_series(df_country['Country']),
+                                      'Region': normalize_series(df_country['Region'])})
+    return country_region_map(df_country_region).to_frame()
+
+def _index_g2n(df_gross_to_net):
+    """Gross To Net: se deduplica la clave cruda y luego se normaliza."""
+    fk_g2n = (df_gross_to_net['Date'].astype(str) + df_gross_to_net['Country'] +
+              df_gross_to_net['Brand'] + df_gross_to_net['SBU'])
+    mask_unique = ~fk_g2n.duplicated(keep='first')
+    return pd.DataFrame({'G2N%': df_gross_to_net.loc[mask_unique, 'G2N%'].astype(float).to_numpy()},
+                        index=pd.Index(normalize_series(fk_g2n[mask_unique], as_str=False), name='key'))
+
+def _index_npi(df_npi):
+    """NPI: New New/Carryover e Incremental % por fk_YearMonthCountrySku normalizado."""
+    return pd.DataFrame({'New New/Carryover': df_npi['New New/Carryover'].to_numpy(),
+                         'Incremental %': pd.to_numeric(df_npi['Incremental %'], errors='coerce')
+                                          .astype(float).to_numpy()},
+                        index=pd.Index(normalize_series(df_npi['fk_YearMonthCountrySku'], as_str=False), name='key'))
+
+def _index_npi_new(df_npi):
+    """NPI (Launch Year): año de lanzamiento más reciente por Región-SKU (ver LaunchYear_VR)."""
+    start_year = 2021
+    valid_years = list(range(start_year, start_year + 7))
+    mask_npi = (
+        (df_npi['New New/Carryover'] == 'New New') &
+        (df_npi['Fiscal Year'].astype(int).isin(valid_years))
+    )
+    df_npi_new = df_npi[mask_npi].copy()
+    df_npi_new.rename(columns={'Fiscal Year':'Launch Year'}, inplace=True)
+    df_npi_new=df_npi_new[['Launch Year','Region','SKU']].copy()
+    df_npi_new['Region']=normalize_series(df_npi_new['Region'], as_str=False)
+    df_npi_new['SKU']=normalize_series(df_npi_new['SKU'], as_str=False)
+    df_npi_new.sort_values(by='Launch Year', ascending=False, inplace=True)
+    df_npi_new.drop_duplicates(subset=['Region','SKU'],keep='first', inplace=True)
+    fk_region_sku = normalize_series(df_npi_new['Region'] + '-' + df_npi_new['SKU'], as_str=False)
+    return pd.DataFrame({'Launch Year': pd.to_numeric(df_npi_new['Launch Year'], errors='coerce')
+                                        .astype(float).to_numpy()},
+                        index=pd.Index(fk_region_sku, name='key'))
+
+def _index_combo(df_filter_npi):
+    """Combo % por fk_YearCountrySKU normalizado."""
+    return pd.DataFrame({'Combo %': pd.to_numeric(df_filter_npi['Combo %'], errors='coerce').astype(float).to_numpy()},
+                        index=pd.Index(normalize_series(df_filter_npi['fk_YearCountrySKU'], as_str=False), name='key'))
+
+def _lookup_from_index(df_index):
+    """Tabla de búsqueda (_build_lookup) a partir de un índice de reference_index."""
+    return _build_lookup(df_index.index, {name: df_index[name] for name in df_index.columns})
+
+def build_sales_lookups(df_md_product, df_gross_to_net, df_country, df_npi, df_filter_npi):
+    """
+    Construye las tablas de búsqueda indexadas que usa enrich_sales. Las claves se preparan con las
+    mismas reglas (normalización y deduplicación) que las funciones assign_* originales. Cada índice
+    por clave normalizada se construye una sola vez por contenido y se guarda en Parquet junto al
+    archivo maestro (ver Reference_Data.reference_index). Los DataFrames de entrada no se modifican.
+
+    Args:
+        df_md_product (pd.DataFrame): Maestro de Productos ('SKU', 'Brand', 'GPP SBU', 'Batteries Qty').
+        df_gross_to_net (pd.DataFrame): Tabla G2N ('Date', 'Country', 'Brand', 'SBU', 'G2N%').
+        df_country (pd.DataFrame): Maestro de Países ('Country', 'Region').
+        df_npi (pd.DataFrame): Maestro NPI ('fk_YearMonthCountrySku', 'New New/Carryover', 'Incremental %',
+                               'Fiscal Year', 'Region', 'SKU').
+        df_filter_npi (pd.DataFrame): Tabla Combo ('fk_YearCountrySKU', 'Combo %').
+
+    Returns:
+        dict: Tablas de búsqueda {'md_product', 'country', 'g2n', 'npi', 'npi_new', 'batteries', 'combo'}.
+    """
+    dict_indexes = {
+        'md_product': reference_index(df_md_product, ['SKU', 'Brand', 'GPP SBU'], 'sales_md_product',
+                                      _index_md_product),
+        'batteries': reference_index(df_md_product, ['SKU', 'Batteries Qty'], 'sales_batteries', _index_batteries),
+        'country': reference_index(df_country, ['Country', 'Region'], 'sales_country', _index_country),
+        'g2n': reference_index(df_gross_to_net, ['Date', 'Country', 'Brand', 'SBU', 'G2N%'], 'sales_g2n',
+                               _index_g2n),
+        'npi': reference_index(df_npi, ['fk_YearMonthCountrySku', 'New New/Carryover', 'Incremental %'],
+                               'sales_npi', _index_npi),
+        'npi_new': reference_index(df_npi, ['New New/Carryover', 'Fiscal Year', 'Region', 'SKU'], 'sales_npi_new',
+                                   _index_npi_new),
+        'combo': reference_index(df_filter_npi, ['fk_YearCountrySKU', 'Combo %'], 'sales_combo', _index_combo),
+    }
+    return {name: _lookup_from_index(df_index) for name, df_index in dict_indexes.items()}
+
+def _unique_rows(lst_series):
+    """
+    Factoriza la combinación de varias columnas alineadas.
+
+    Args:
+        lst_series (list): Series de igual longitud.
+
+    Returns:
+        tuple: (codes, first_pos). codes identifica la combinación de cada fila y first_pos la primera fila
+               de cada combinación, de modo que una clave calculada sobre las filas first_pos se expande a
+               todas las filas con .take(codes).
+    """
+    combined = np.zeros(len(lst_series[0]), dtype=np.int64)
+    for serie in lst_series:
+        codes, uniques = pd.factorize(serie, use_na_sentinel=False)
+        combined, _ = pd.factorize(combined * len(uniques) + codes)
+    n_unique = combined.max() + 1 if len(combined) else 0
+    first_pos = np.empty(n_unique, dtype=np.int64)
+    first_pos[combined[::-1]] = np.arange(len(combined))[::-1]
+    return combined, first_pos
+
+def _join(state, lst_components, build_key, lookup):
+    """
+    Aplica un cruce sobre el estado de enrich_sales. La clave se construye solo para las combinaciones
+    distintas de las columnas componentes (build_key recibe esas columnas reducidas) y las posiciones se
+    expanden a todas las filas. Si la tabla tiene claves repetidas, repite las filas afectadas
+    (state['rows'] y todas las columnas calculadas) igual que lo haría pd.merge.
+
+    Args:
+        state (dict): Estado de enrich_sales ({'rows', 'cols'}).
+        lst_components (list): Series componentes de la clave, alineadas con las filas actuales.
+        build_key (callable): Función que recibe las componentes (reducidas) y devuelve la clave de cruce.
+        lookup (dict): Tabla creada con _build_lookup.
 
-def main():
+    Returns:
+        np.ndarray: Posiciones de la tabla de búsqueda para cada fila actual (-1 si no hay coincidencia).
+    """
+    codes, first_pos = _unique_rows(lst_components)
+    key_unique = build_key(*[serie.iloc[first_pos].reset_index(drop=True) for serie in lst_components])
+    if lookup['unique']:
+        return lookup['index'].get_indexer(key_unique).take(codes)
+    left_pos, right_pos = _lookup_positions(key_unique.take(codes).reset_index(drop=True), lookup)
+    state['rows'] = left_pos if state['rows'] is None else state['rows'][left_pos]
+    for name, serie in state['cols'].items():
+        state['cols'][name] = serie.iloc[left_pos].reset_index(drop=True)
+    return right_pos
+
+def _column(state, df, name):
+    """Devuelve la columna name alineada con las filas actuales (calculada o de la tabla de hechos)."""
+    if name not in state['cols']:
+        serie = df[name] if state['rows'] is None else df[name].iloc[state['rows']]
+        state['cols'][name] = serie.reset_index(drop=True)
+    return state['cols'][name]
+
+def _to_numeric_by_value(serie):
+    """pd.to_numeric(errors='coerce') calculado una sola vez por valor distinto (columnas con pocos valores)."""
+    codes, uniques = pd.factorize(serie, use_na_sentinel=False)
+    numeric = pd.to_numeric(pd.Series(uniques, dtype=object), errors='coerce')
+    return pd.Series(numeric.to_numpy().take(codes), dtype=numeric.dtype)
+
+def enrich_sales(df_processed, dict_lookups):
+    """
+    Calcula en una sola pasada todas las columnas derivadas de Ventas, con el mismo resultado que la
+    secuencia assign_nsv, assign_selling_unit_price, assign_NPI_New_Carryover, LaunchYear_VR,
+    assign_num_batteries y assign_NSV_NPI_w_Combo (incluida la repetición de filas cuando una tabla de
+    referencia tiene claves duplicadas). Las claves de cruce se construyen solo para las combinaciones
+    distintas de sus componentes y no se agregan al resultado.
+
+    Args:
+        df_processed (pd.DataFrame): DataFrame de Ventas salido de process_columns.
+        dict_lookups (dict): Tablas de búsqueda creadas con build_sales_lookups.
+
+    Returns:
+        pd.DataFrame: Nuevo DataFrame con 'NSV', 'Selling Unit Price', 'New New/Carryover',
+                      'NPI Incremental Sales $', 'Launch Year', 'VR %', 'Num Batteries Sales' y
+                      'Net Sales NPI w/Combo'.
+    """
+    state = {'rows': None, 'cols': {}}
+    cols = state['cols']
+    def column(name):
+        return _column(state, df_processed, name)
+
+    # --- NSV: Maestro de Productos -> Región -> G2N%
+    cols['fk_SKU'] = normalize_series(column('fk_SKU'))
+    pos = _join(state, [cols['fk_SKU']], lambda sku: sku, dict_lookups['md_product'])
+    cols['_brand'] = _take_values(dict_lookups['md_product'], 'Brand', pos)
+    cols['_sbu'] = _take_values(dict_lookups['md_product'], 'GPP SBU', pos)
+    pos = _join(state, [column('fk_Country')], lambda country: country, dict_lookups['country'])
+    cols['_region'] = _take_values(dict_lookups['country'], 'Region', pos)
+    pos = _join(state, [column('fk_Date'), cols['_region'], cols['_brand'], cols['_sbu']],
+                lambda date, region, brand, sbu: normalize_series(date.astype(str) + region.str[:3] + brand + sbu,
+                                                                  as_str=False),
+                dict_lookups['g2n'])
+    g2n = _take_values(dict_lookups['g2n'], 'G2N%', pos).fillna(0)
+    cols['Total Sales'] = pd.to_numeric(column('Total Sales'), errors='coerce').fillna(0)
+    cols['NSV'] = cols['Total Sales'] * (1 - g2n)
+
+    # --- Selling Unit Price
+    cols['Units Sold'] = _to_numeric_by_value(column('Units Sold')).fillna(0).astype(int)
+    cols['Selling Unit Price'] = pd.Series(np.where(cols['Units Sold'] > 0,
+                                                    cols['Total Sales'] / cols['Units Sold'],
+                                                    0.0))
+
+    # --- New New/Carryover e Incremental %: para CCA y PUB el país de cruce es la región
+    pos = _join(state, [column('fk_Country')], lambda country: country, dict_lookups['country'])
+    cols['_region_npi'] = _take_values(dict_lookups['country'], 'Region', pos)
+    def build_fk_npi(year_month, country, region, sku):
+        country_region = pd.Series(np.select([region.isin(['CCA','PUB'])], [region], default=country),
+                                   dtype=object).astype(_DEFAULT_STR_DTYPE)
+        return normalize_series(year_month.astype(str) + '-' + country_region + '-' + sku, as_str=False)
+    pos = _join(state, [column('fk_year_month'), column('fk_Country'), cols['_region_npi'], cols['fk_SKU']],
+                build_fk_npi, dict_lookups['npi'])
+    cols['New New/Carryover'] = _take_values(dict_lookups['npi'], 'New New/Carryover', pos).fillna('Core')
+    incremental = _take_values(dict_lookups['npi'], 'Incremental %', pos).fillna(0)
+    cols['NSV'] = cols['NSV'].fillna(0).astype(float)
+    cols['NPI Incremental Sales $'] = cols['NSV'] * incremental
+
+    # --- Launch Year y VR %: NPI si el año de venta está entre 0 y 2 años después del lanzamiento
+    pos = _join(state, [cols['_region'], cols['fk_SKU']], lambda region, sku: region + '-' + sku,
+                dict_lookups['npi_new'])
+    npi_year = _take_values(dict_lookups['npi_new'], 'Launch Year', pos).astype('Int64')
+    sale_year = _to_numeric_by_value(column('fk_year_month').astype(str).str[:4]).astype('Int64')
+    diferencia_años = sale_year - npi_year
+    condicion_es_npi = diferencia_años.notna() & diferencia_años.between(0, 2)
+    valor_npi_str = 'npi' + npi_year.fillna(0).astype(int).astype(str)
+    cols['Launch Year'] = pd.Series(np.select([condicion_es_npi], [valor_npi_str], default="core"))
+    cols['VR %'] = pd.Series(np.where(cols['Launch Year'].str.lower().str.contains('npi'), "VR %", ""))
+
+    # --- Baterías vendidas
+    pos = _join(state, [cols['fk_SKU']], lambda sku: sku, dict_lookups['batteries'])
+    batteries = _take_values(dict_lookups['batteries'], 'Batteries Qty', pos).fillna(0).astype(int)
+    cols['Num Batteries Sales'] = batteries * cols['Units Sold']
+
+    # --- Net Sales NPI w/Combo
+    pos = _join(state, [column('fk_year_month'), column('fk_Country'), cols['fk_SKU']],
+                lambda year_month, country, sku: normalize_series(year_month.str[:4] + '-' + country + '-' + sku,
+                                                                  as_str=False),
+                dict_lookups['combo'])
+    combo = _take_values(dict_lookups['combo'], 'Combo %', pos).fillna(1)
+    cols['Net Sales NPI w/Combo'] = (cols['NSV'] * combo).fillna(0)
+
+    # --- Ensamblar el resultado: columnas originales (con las filas repetidas si hubo) + calculadas
+    if state['rows'] is None:
+        df_enriched = df_processed.reset_index(drop=True)
+    else:
+        df_enriched = df_processed.iloc[state['rows']].reset_index(drop=True)
+    df_enriched = df_enriched.assign(**{name: serie.to_numpy() for name, serie in cols.items()
+                                        if not name.startswith('_') and name in df_enriched.columns})
+    lst_new_columns = ['NSV', 'Selling Unit Price', 'New New/Carryover', 'NPI Incremental Sales $',
+                       'Launch Year', 'VR %', 'Num Batteries Sales', 'Net Sales NPI w/Combo']
+    df_new = pd.DataFrame({name: cols[name].to_numpy() for name in lst_new_columns}, index=df_enriched.index)
+    return pd.concat([df_enriched, df_new], axis=1)
+
+#====================================================
+# --- CARGA COMPLETA POR PARTES (EN PARALELO) ---
+#====================================================
+# Columnas de la carga de Sales (compartidas por la carga completa secuencial y por partes).
+# La carga completa guarda la clave sustituta y 'clasification': la clave legible se reconstruye con
+# Surrogate_Keys.rebuild_readable_key a partir de LST_KEY_COLUMNS (ver Key_Index.stores_readable_key)
+LST_COLUMNS_SALES = ['fk_Date','fk_year_month', 'fk_Country', 'fk_Sold_To_Customer_Code', 'fk_SKU',
+                     'clasification', 'sk_date_country_customer_clasification',
+                     'Total Sales', 'Total Cost', 'Units Sold']
+LST_COLUMNS_SALES_STR = ['fk_Date','fk_year_month', 'fk_Country', 'fk_Sold_To_Customer_Code', 'fk_SKU',
+                         'clasification', 'New New/Carryover',
+                         'Launch Year','VR %']
+LST_COLUMNS_SALES_FLOAT = ['Total Sales', 'Total Cost', 'Units Sold',
+                           'NSV','Selling Unit Price',
+                           'NPI Incremental Sales $',
+                           'Num Batteries Sales',
+                           'Net Sales NPI w/Combo']
+# Dimensiones con pocos valores distintos: se guardan como categóricas (diccionario en Parquet)
+LST_COLUMNS_SALES_CATEGORY = ['fk_Date','fk_year_month', 'fk_Country', 'fk_Sold_To_Customer_Code', 'fk_SKU',
+                              'clasification', 'New New/Carryover', 'Launch Year','VR %']
+LST_COLUMNS_SALES_KEY = ['sk_date_country_customer_clasification']
+# Opciones del dataset particionado de Sales (carga completa y actualizaciones, ver publish_dataset):
+# las consultas de ventas filtran por país, por eso se particiona también por fk_Country
+SALES_DATASET_OPTIONS = {'partition_cols': PUBLISHED_PARTITION_COLS + ['fk_Country'], 'compression': 'zstd',
+                         'row_group_size': DEFAULT_ROW_GROUP_SIZE}
+
+# Tablas de dimensión de solo lectura de cada proceso de la carga por partes (ver _init_full_load_worker)
+_WORKER_CONTEXT = {}
+
+def _init_full_load_worker(df_country, dict_lookups, use_cache=False):
+    """Inicializa un proceso de la carga por partes: las dimensiones se reciben una sola vez por proceso."""
+    _WORKER_CONTEXT['country'] = df_country
+    _WORKER_CONTEXT['lookups'] = dict_lookups
+    _WORKER_CONTEXT['use_cache'] = use_cache
+
+def _process_sales_file(filename, input_path, parts_dir, chunk_id):
+    """
+    Procesa un archivo fuente de Sales (lectura, país, columnas, enriquecimiento y formato) y escribe
+    un fragmento Parquet por periodo en parts_dir/<periodo>/<chunk_id>.parquet.
+
+    Returns:
+        dict: Totales de control del archivo (filas y ventas antes y después) y periodos escritos.
+    """
+    dict_stats = {'file': os.path.basename(filename), 'rows_init': 0, 'sales_init': 0.0,
+                  'rows_no_country': 0, 'sales_no_country': 0.0, 'rows_end': 0, 'sales_end': 0.0, 'periods': []}
+    df = read_files(input_path, max_workers=1, files=[filename], use_cache=_WORKER_CONTEXT['use_cache'])
+    if df is None or df.empty:
+        return dict_stats
+    dict_stats['rows_init'] = len(df)
+    dict_stats['sales_init'] = float(df['Total Sales'].astype(float).sum())
+
+    df = asign_country_code(df, _WORKER_CONTEXT['country'], export_unmatched=False)
+    mask_no_country = df['fk_Country'].isna()
+    dict_stats['rows_no_country'] = int(mask_no_country.sum())
+    dict_stats['sales_no_country'] = float(df.loc[mask_no_country, 'Total Sales'].astype(float).sum())
+
+    df = process_columns(df, LST_COLUMNS_SALES)
+    df = enrich_sales(df, _WORKER_CONTEXT['lookups'])
+    dict_stats['rows_end'] = len(df)
+    dict_stats['sales_end'] = float(df['Total Sales'].astype(float).sum())
+    df = format_columns(df, LST_COLUMNS_SALES_STR, LST_COLUMNS_SALES_FLOAT,
+                        LST_COLUMNS_SALES_CATEGORY, LST_COLUMNS_SALES_KEY)
+
+    for period, group in df.groupby('fk_year_month', observed=True):
+        period_dir = os.path.join(parts_dir, str(period))
+        os.makedirs(period_dir, exist_ok=True)
+        group = group.copy()
+        for col in LST_COLUMNS_SALES_CATEGORY:
+            group[col] = group[col].cat.remove_unused_categories()
+        group.to_parquet(os.path.join(period_dir, f"{chunk_id:05d}.parquet"), index=False)
+        dict_stats['periods'].append(str(period))
+    return dict_stats
+
+def _write_sales_period(period, parts_dir, staging, name='sales'):
+    """
+    Une los fragmentos de un periodo (en el orden de los archivos fuente) y escribe el archivo
+    '{name}_{periodo}.parquet' y su índice de claves en el directorio temporal de la ejecución.
+
+    Returns:
+        list: Rutas relativas de los archivos escritos.
+    """
+    lst_parts = sorted(glob.glob(os.path.join(parts_dir, period, '*.parquet')))
+    df_period = pd.concat([pd.read_parquet(part) for part in lst_parts], ignore_index=True)
+    # concat convierte a texto las categóricas con categorías distintas entre fragmentos
+    for col in LST_COLUMNS_SALES_CATEGORY:
+        df_period[col] = df_period[col].astype('category')
+    filename = f"{name}_{period}.parquet"
+    df_period.to_parquet(os.path.join(staging, filename), index=False, row_group_size=KEY_INDEX_ROW_GROUP_SIZE)
+    index_name = key_index_name(filename)
+    os.makedirs(os.path.join(staging, os.path.dirname(index_name)), exist_ok=True)
+    build_key_index(df_period[LST_COLUMNS_SALES_KEY[0]]).to_parquet(os.path.join(staging, index_name), index=False)
+    print(f"Guardando periodo {period} ({len(lst_parts)} fragmentos, {len(df_period)} registros)\n")
+    return [filename, index_name]
+
+def full_load_partitioned(input_path, output_path, df_country, dict_lookups, max_workers=None, name='sales',
+                          use_cache=False):
+    """
+    Carga completa de Sales por partes, con memoria acotada y todos los núcleos:
+    1. Cada archivo fuente se procesa en un proceso del pool (país, columnas, enrich_sales, formato) con las
+       dimensiones compartidas de solo lectura, y sus filas se escriben de inmediato como fragmentos por periodo.
+    2. Cada periodo se arma a partir de sus fragmentos (también en paralelo) como '{name}_{periodo}.parquet'.
+    3. Todos los archivos se confirman juntos (Parquet_Commit); los fragmentos se eliminan con el directorio temporal.
+    El resultado es el mismo que el de la carga secuencial (mismas filas y orden dentro de cada periodo).
+
+    Args:
+        input_path (str): Directorio de los archivos Excel históricos.
+        output_path (str): Directorio de los Parquet procesados.
+        df_country (pd.DataFrame): Maestro de países (asign_country_code).
+        dict_lookups (dict): Tablas de cruce de build_sales_lookups.
+        max_workers (int, optional): Número de procesos. Por defecto min(archivos, núcleos disponibles).
+        name (str, optional): Prefijo de los archivos. Por defecto 'sales'.
+        use_cache (bool, optional): Si es True los procesos usan la caché Parquet de read_files. Por defecto False:
+                                    la carga por partes no lee ni escribe la caché.
+
+    Returns:
+        dict: Totales de control de la carga ('rows_init', 'sales_init', 'rows_end', 'sales_end', ...).
+    """
+    lst_files = sorted(glob.glob(os.path.join(input_path, "*.xlsx")))
+    dict_totals = {'rows_init': 0, 'sales_init': 0.0, 'rows_no_country': 0, 'sales_no_country': 0.0,
+                   'rows_end': 0, 'sales_end': 0.0}
+    if not lst_files:
+        print(f"Advertencia: No se encontraron archivos .xlsx en '{input_path}'.")
+        return dict_totals
+    if max_workers is None:
+        max_workers = min(len(lst_files), os.cpu_count() or 1)
+
+    recover_parquet_dir(output_path)
+    run_id = new_run_id()
+    staging = staging_path(output_path, run_id)
+    parts_dir = os.path.join(staging, '_parts')
+    os.makedirs(parts_dir, exist_ok=True)
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_full_load_worker,
+                             initargs=(df_country, dict_lookups, use_cache)) as executor:
+        # 1. Un archivo fuente por tarea: cada una escribe sus fragmentos al terminar
+        lst_stats = list(executor.map(_process_sales_file, lst_files, [input_path] * len(lst_files),
+                                      [parts_dir] * len(lst_files), range(len(lst_files))))
+        lst_periods = sorted({period for dict_stats in lst_stats for period in dict_stats['periods']})
+        # 2. Un periodo por tarea
+        lst_written = list(executor.map(_write_sales_period, lst_periods, [parts_dir] * len(lst_periods),
+                                        [staging] * len(lst_periods), [name] * len(lst_periods)))
+
+    shutil.rmtree(parts_dir, ignore_errors=True)
+    commit_staged(output_path, run_id, [path for lst_paths in lst_written for path in lst_paths])
+    for dict_stats in lst_stats:
+        for key in dict_totals:
+            dict_totals[key] += dict_stats[key]
+    return dict_totals
+
+def main(partitioned=True, max_workers=None, dataset_options=None):
     """
     Función principal que orquesta el flujo ETL completo para los datos de Ventas (Sales).
     Define las rutas de entrada/salida y las columnas de métricas específicas
     ('Total Sales', 'Total Cost', 'Units Sold') antes de ejecutar el pipeline reutilizado.
+    Args:
+        partitioned (bool, optional): Si es True (por defecto) la carga se hace por partes en paralelo
+                                      (full_load_partitioned, memoria acotada); si es False, en un solo DataFrame.
+        max_workers (int, optional): Número de procesos de la carga por partes. Por defecto los núcleos disponibles.
+        dataset_options (dict, optional): Opciones del dataset particionado publicado (partition_cols, compression,
+                                          row_group_size, ... ver publish_dataset). Por defecto SALES_DATASET_OPTIONS.
     Returns: None: La función orquesta el proceso y no devuelve un valor.
     """
     print("=" * 55)
@@ -423,6 +892,37 @@ def main():
     filter_npi=SalesPaths.INPUT_PROCESSED_FILTER_NPI_FILE
     md_product_processed_file=SalesPaths.INPUT_PROCESSED_MASTER_PRODUCTS_FILE
     processed_parquet_dir = SalesPaths.OUTPUT_PROCESSED_PARQUETS_DIR
+    processed_dataset_dir = SalesPaths.OUTPUT_PROCESSED_DATASET_DIR
+    dataset_options = dataset_options or SALES_DATASET_OPTIONS
+    # Leer el archivo de códigos de país.
+    df_country = read_reference(country_code_file, sheet_name='Code Country Fillrate-Sales')
+    # Se normaliza una sola vez, antes de construir las tablas de cruce (fk_Country se compara con estos valores)
+    normalize_columns(df_country, df_country.columns)
+    df_md_product=read_reference(md_product_processed_file)
+    df_gross_to_net=read_reference(processed_gross_to_net)
+    df_npi=read_reference(npi, sheet_name='Database')
+    df_filter_npi=read_reference(filter_npi)
+    # Tablas de cruce de NSV, NPI, Launch Year / VR %, baterías y Combo (compartidas por todas las partes)
+    dict_lookups=build_sales_lookups(df_md_product, df_gross_to_net, df_country, df_npi, df_filter_npi)
+
+    #===============================
+    # --- CARGA POR PARTES (un archivo fuente por tarea, un archivo Parquet por periodo)
+    #===============================
+    if partitioned:
+        dict_totals = full_load_partitioned(sales_historic_raw_dir, processed_parquet_dir, df_country,
+                                            dict_lookups, max_workers=max_workers)
+        print(f"Número de filas de ventas sin country: {dict_totals['rows_no_country']}")
+        print(f"Suma de ventas sin país: {dict_totals['sales_no_country']}")
+        print(f'{"*"*55}')
+        print(f"longitud dataset crudo: {dict_totals['rows_init']} / procesado: {dict_totals['rows_end']}")
+        print(f"suma de ventas inicial: {dict_totals['sales_init']} / final: {dict_totals['sales_end']}")
+        print(f'{"*"*55}')
+        # La carga completa reemplaza la base: los deltas de actualizaciones anteriores quedan obsoletos
+        discard_deltas(processed_parquet_dir, 'sales')
+        publish_dataset(processed_parquet_dir, processed_dataset_dir, 'sales',
+                        key_column=LST_COLUMNS_SALES_KEY[0], **dataset_options)
+        return
+
     #===============================
     # --- Lectura de archivos 
     #===============================
@@ -430,18 +930,8 @@ def main():
     print(f'longitud archivos leidos: {len(df_consolidated)}')
     suma_init=df_consolidated["Total Sales"].astype(float).sum()
 
-    # Leer el archivo de códigos de país.
-    df_country = pd.read_excel(country_code_file,
-                               sheet_name='Code Country Fillrate-Sales', dtype=str, engine='openpyxl')
-    df_md_product=pd.read_excel(md_product_processed_file,dtype=str, engine='openpyxl')
-    df_gross_to_net=pd.read_excel(processed_gross_to_net,dtype=str, engine='openpyxl')
-    df_npi=pd.read_excel(npi,sheet_name='Database',dtype=str, engine='openpyxl')
-    df_filter_npi=pd.read_excel(filter_npi,dtype=str, engine='openpyxl')
-    
     # Definir las columnas relevantes para el procesamiento.    
-    lst_columns = ['fk_Date','fk_year_month', 'fk_Country', 'fk_Sold_To_Customer_Code', 'fk_SKU',
-                   'fk_date_country_customer_clasification',
-                   'Total Sales', 'Total Cost', 'Units Sold']
+    lst_columns = LST_COLUMNS_SALES
     df_consolidated = asign_country_code(df_consolidated, df_country)
     
     '''ESTA LINEA ES DE CONTROL PARA VER EL NUMERO DE REGISTROS SIN ASOCIACION DE PAIS Y CUANTO SUMA SU VENTA'''
@@ -465,20 +955,9 @@ def main():
     #=========================================================
     #--- ASIGNACIÓN COLUMNAS CALCULADAS
     #=========================================================
-    df_processed=assign_nsv(df_processed, df_md_product, df_gross_to_net,df_country)
-    print(f'longitud posterior a asignación NSV: {len(df_processed)}')
-
-    df_processed=assign_selling_unit_price(df_processed)
-    print(f'longitud posterior a asignación Selling Unit Price: {len(df_processed)}')
-    
-    df_processed=assign_NPI_New_Carryover(df_processed,df_npi,df_country)
-    print(f'longitud posterior a asignación NPI: {len(df_processed)}')
-    
-    df_processed=LaunchYear_VR(df_processed,df_npi,df_country)
-    
-    print(f'longitud dataset procesado con LaunchYear_VR: {len(df_processed)}')   
-    df_processed=assign_num_batteries(df_processed,df_md_product)
-    df_processed=assign_NSV_NPI_w_Combo(df_processed,df_filter_npi)
+    # NSV, Selling Unit Price, NPI, Launch Year / VR %, baterías y Combo en una sola pasada
+    df_processed=enrich_sales(df_processed, dict_lookups)
+    print(f'longitud posterior al enriquecimiento (NSV, NPI, Launch Year, baterías, Combo): {len(df_processed)}')
 
 
     suma_end=df_processed["Total Sales"].astype(float).sum()
@@ -505,19 +984,18 @@ def main():
     #====================================
     # --- Formato de columnas ---
     #====================================
-    lst_columns_srt = ['fk_Date','fk_year_month', 'fk_Country', 'fk_Sold_To_Customer_Code', 'fk_SKU',
-                   'fk_date_country_customer_clasification',
-                   'New New/Carryover',
-                   'Launch Year','VR %']
-    lst_columns_float = ['Total Sales', 'Total Cost', 'Units Sold',
-                         'NSV','Selling Unit Price',
-                         'NPI Incremental Sales $',
-                         'Num Batteries Sales',
-                         'Net Sales NPI w/Combo' 
-                         ]
-    df_processed=format_columns(df_processed,lst_columns_srt,lst_columns_float)
+    lst_columns_srt = LST_COLUMNS_SALES_STR
+    lst_columns_float = LST_COLUMNS_SALES_FLOAT
+    lst_columns_category = LST_COLUMNS_SALES_CATEGORY
+    lst_columns_key = LST_COLUMNS_SALES_KEY
+    df_processed=format_columns(df_processed,lst_columns_srt,lst_columns_float,lst_columns_category,lst_columns_key)
     #  --- ESCRITURA DE ARCHIVOS PARQUET SEGMENTADOS --  
-    group_parquet(df_processed, processed_parquet_dir,name='sales')
+    group_parquet(df_processed, processed_parquet_dir,name='sales', key_column='sk_date_country_customer_clasification')
+    # La carga completa reemplaza la base: los deltas de actualizaciones anteriores quedan obsoletos
+    discard_deltas(processed_parquet_dir, 'sales')
+    # --- PUBLICACIÓN DEL DATASET PARTICIONADO ---
+    publish_dataset(processed_parquet_dir, processed_dataset_dir, 'sales',
+                    key_column=LST_COLUMNS_SALES_KEY[0], **dataset_options)
     #group_parquet(df_processed, sales_historic_raw_dir,name='sales')
 
 # --- EJECUCION DEL SCRIPT ---
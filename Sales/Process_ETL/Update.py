@@ -14,16 +14,33 @@ import sys
 # La importación debe ser relativa al paquete actual.
 from Fill_Rate.Process_ETL.Process_Files import read_files, asign_country_code, process_columns, group_parquet,format_columns
 from Fill_Rate.Process_ETL.Update import read_parquets_to_update,update_parquets
-from Sales.Process_ETL.Process_Files import (assign_nsv,assign_selling_unit_price,assign_NPI_New_Carryover,
-                                             LaunchYear_VR,assign_num_batteries, assign_NSV_NPI_w_Combo)
-def main():
+from Fill_Rate.Process_ETL.Key_Index import upsert_partitions, stores_readable_key
+from Fill_Rate.Process_ETL.Delta_Store import (append_deltas, compact_deltas, validate_storage_mode,
+                                              DEFAULT_STORAGE_MODE, MAX_DELTAS_PER_PERIOD)
+from Fill_Rate.Process_ETL.Manifest import (manifest_path, load_manifest, save_manifest,
+                                            pending_files, summarize_files, record_files)
+from Fill_Rate.Process_ETL.Parquet_Dataset import publish_dataset
+from Sales.Process_ETL.Process_Files import build_sales_lookups, enrich_sales, SALES_DATASET_OPTIONS
+from Shared_Information_for_Projects.Reference_Data import read_reference
+def main(force=False, storage_mode=DEFAULT_STORAGE_MODE, dataset_options=None):
     """
     Orquesta el flujo de actualización incremental para los datos de Ventas.
-    El proceso incluye: 1) Carga y procesamiento de los nuevos archivos de actualización.
-    2) Determinación de los periodos 'fk_year_month' a actualizar. 3) Aplicación de la
-    lógica de 'Upsert' (reemplazo de registros). 4) Escritura final de los archivos Parquet.
+    El proceso incluye: 1) Carga y procesamiento de los archivos de actualización nuevos o
+    modificados según el manifiesto de archivos procesados.
+    2) Reemplazo de los registros en los archivos Parquet de cada periodo con su índice de claves
+    (upsert_partitions: solo se reescriben los row groups afectados). 3) Para los periodos sin índice
+    utilizable, lógica de 'Upsert' completa (update_parquets) y escritura de los archivos Parquet.
+    4) Publicación de los periodos actualizados en el dataset particionado. 5) Registro de los archivos
+    procesados en el manifiesto.
+    Args:
+        force (bool, optional): Si es True reprocesa todos los archivos ignorando el manifiesto. Por defecto False.
+        storage_mode (str, optional): 'upsert' (reemplazo de registros en la base) o 'delta' (deltas con lápidas,
+                                      compactados por Delta_Store). Por defecto DEFAULT_STORAGE_MODE.
+        dataset_options (dict, optional): Opciones del dataset particionado publicado (partition_cols, compression,
+                                          row_group_size, ... ver publish_dataset). Por defecto SALES_DATASET_OPTIONS.
     Returns: None: La función orquesta el proceso y no devuelve un valor.
     """
+    validate_storage_mode(storage_mode)
     print("=" * 55)
     print("--- 🔄 INICIANDO PROCESO: SALES UPDATE ETL ---")
     print("=" * 55)
@@ -39,27 +56,44 @@ def main():
 
         #sales_historic_processed_dir =SalesPaths.OUTPUT_PROCESSED_PARQUETS_DIR_PRUEBA
         sales_historic_processed_dir =SalesPaths.OUTPUT_PROCESSED_PARQUETS_DIR
+        sales_dataset_dir = SalesPaths.OUTPUT_PROCESSED_DATASET_DIR
         #===============================
         # --- Lectura de archivos 
         #===============================
-        df_update = read_files(sales_update_raw_dir)
-        df_country = pd.read_excel(country_code_file, sheet_name='Code Country Fillrate-Sales', dtype=str, engine='openpyxl')
+        path_manifest = manifest_path(sales_historic_processed_dir, 'sales')
+        manifest = {'files': {}} if force else load_manifest(path_manifest)
+        lst_pending, dict_hashes = pending_files(sales_update_raw_dir, manifest)
+        if not lst_pending:
+            save_manifest(path_manifest, manifest)
+            print("No hay archivos nuevos o modificados para actualizar. Finalizando proceso.")
+            return
+
+        df_update = read_files(sales_update_raw_dir, files=lst_pending, add_source_column=True)
+        df_country = read_reference(country_code_file, sheet_name='Code Country Fillrate-Sales')
         
-        df_md_product=pd.read_excel(md_product_processed_file,dtype=str, engine='openpyxl')
-        df_gross_to_net=pd.read_excel(processed_gross_to_net,dtype=str, engine='openpyxl')
-        df_npi=pd.read_excel(npi,dtype=str, engine='openpyxl')
-        df_filter_npi=pd.read_excel(filter_npi,dtype=str, engine='openpyxl')
+        df_md_product=read_reference(md_product_processed_file)
+        df_gross_to_net=read_reference(processed_gross_to_net)
+        df_npi=read_reference(npi)
+        df_filter_npi=read_reference(filter_npi)
        
         #=========================================================
         # --- PROCESAMIENTO DE ARCHIVOS DE ACTUALIZACIÓN ---
         #=========================================================
         # Definir las columnas relevantes para el procesamiento. 
 
+        # La clave legible solo se construye si los archivos históricos la guardan (filas sin clave sustituta)
+        fk_column = 'fk_date_country_customer_clasification' \
+            if stores_readable_key(sales_historic_processed_dir, 'sales',
+                                   'fk_date_country_customer_clasification') else None
+        lst_columns_fk = [fk_column] if fk_column is not None else []
         lst_columns = ['fk_Date','fk_year_month', 'fk_Country', 'fk_Sold_To_Customer_Code', 'fk_SKU',
-                    'fk_date_country_customer_clasification',
+                    'clasification', *lst_columns_fk, 'sk_date_country_customer_clasification',
                     'Total Sales', 'Total Cost', 'Units Sold']
 
+        # Archivos leídos sin error (incluso sin filas); los que fallaron se reintentan en la próxima ejecución
+        dict_stats = summarize_files(df_update) if df_update is not None else {}
         if df_update is None or df_update.empty:
+            save_manifest(path_manifest, record_files(manifest, dict_hashes, dict_stats))
             print("No hay archivos para actualizar. Finalizando proceso.")
             return
 
@@ -69,25 +103,14 @@ def main():
         #=========================================================
         #--- ASIGNACIÓN COLUMNAS CALCULADAS
         #=========================================================
-        df_update=assign_nsv(df_update,df_md_product,df_gross_to_net,df_country)
-        df_update=assign_selling_unit_price(df_update)
-        df_update=assign_NPI_New_Carryover(df_update,df_npi,df_country)
-        df_update=LaunchYear_VR(df_update,df_npi,df_country)
-        df_update=assign_num_batteries(df_update,df_md_product)
-        df_update=assign_NSV_NPI_w_Combo(df_update,df_filter_npi)
-        
-        #=========================================================
-        # --- LECTURA Y ACTUALIZACIÓN DE DATOS HISTÓRICOS ---
-        #=========================================================
-        lst_year_month_files_update = df_update['fk_year_month'].unique().tolist()
-        df_parquets_historic = read_parquets_to_update(sales_historic_processed_dir, lst_year_month_files_update,lst_columns)
-        df_final = update_parquets(df_parquets_historic, df_update,fk_column='fk_date_country_customer_clasification')
+        dict_lookups=build_sales_lookups(df_md_product,df_gross_to_net,df_country,df_npi,df_filter_npi)
+        df_update=enrich_sales(df_update,dict_lookups)
         
         #====================================
         # --- Formato de columnas ---
         #====================================
         lst_columns_srt = ['fk_Date','fk_year_month', 'fk_Country', 'fk_Sold_To_Customer_Code', 'fk_SKU',
-                    'fk_date_country_customer_clasification',
+                    'clasification', *lst_columns_fk,
                     'New New/Carryover',
                     'VR %','Launch Year']
         lst_columns_float = ['Total Sales', 'Total Cost', 'Units Sold',
@@ -95,10 +118,55 @@ def main():
                             'NPI Incremental Sales $',
                             'Num Batteries Sales',
                             'Net Sales NPI w/Combo']
-        df_final=format_columns(df_final,lst_columns_srt,lst_columns_float)
-        
-        # --- ESCRITURA DE LOS DATOS ACTUALIZADOS ---
-        group_parquet(df_final, sales_historic_processed_dir,name='sales')
+        lst_columns_category = ['fk_Date','fk_year_month', 'fk_Country', 'fk_Sold_To_Customer_Code', 'fk_SKU',
+                                'clasification', 'New New/Carryover', 'VR %','Launch Year']
+        lst_columns_key = ['sk_date_country_customer_clasification']
+
+        #=========================================================
+        # --- ACTUALIZACIÓN DE LOS PARQUET: ÍNDICE DE CLAVES O DELTAS ---
+        #=========================================================
+        df_update_formatted=format_columns(df_update,lst_columns_srt,lst_columns_float,lst_columns_category,lst_columns_key)
+        if storage_mode == 'delta':
+            # Modo delta: la actualización se agrega como deltas (registros + lápidas), ver Delta_Store
+            lst_periods = append_deltas(sales_historic_processed_dir, df_update_formatted, name='sales',
+                                        key_column='sk_date_country_customer_clasification',
+                                        fk_column=fk_column)
+            compact_deltas(sales_historic_processed_dir, 'sales', 'sk_date_country_customer_clasification',
+                           fk_column, periods=lst_periods,
+                           min_deltas=MAX_DELTAS_PER_PERIOD)
+            lst_year_month_files_update = []
+        else:
+            # Los deltas pendientes se incorporan a la base antes de reemplazar registros en ella
+            compact_deltas(sales_historic_processed_dir, 'sales', 'sk_date_country_customer_clasification',
+                           fk_column,
+                           periods=df_update_formatted['fk_year_month'].unique().tolist())
+            # Solo se reescriben los row groups con registros reemplazados (ver Key_Index)
+            lst_year_month_files_update = upsert_partitions(sales_historic_processed_dir, df_update_formatted,
+                                                            name='sales',
+                                                            key_column='sk_date_country_customer_clasification',
+                                                            fk_column=fk_column)
+
+        #=========================================================
+        # --- RUTA COMPLETA: periodos sin índice utilizable (ej. archivos sin clave sustituta) ---
+        #=========================================================
+        if lst_year_month_files_update:
+            df_update = df_update[df_update['fk_year_month'].isin(lst_year_month_files_update)]
+            df_parquets_historic = read_parquets_to_update(sales_historic_processed_dir, lst_year_month_files_update,lst_columns,
+                                                           name='sales')
+            df_final = update_parquets(df_parquets_historic, df_update,fk_column=fk_column,
+                                       sk_column='sk_date_country_customer_clasification')
+            df_final=format_columns(df_final,lst_columns_srt,lst_columns_float,lst_columns_category,lst_columns_key)
+            
+            # --- ESCRITURA DE LOS DATOS ACTUALIZADOS ---
+            group_parquet(df_final, sales_historic_processed_dir,name='sales',
+                          key_column='sk_date_country_customer_clasification')
+
+        # --- DATASET PARTICIONADO: se publican solo los periodos actualizados (base + deltas) ---
+        publish_dataset(sales_historic_processed_dir, sales_dataset_dir, 'sales',
+                        periods=df_update_formatted['fk_year_month'].unique().tolist(),
+                        key_column='sk_date_country_customer_clasification',
+                        fk_column=fk_column, **(dataset_options or SALES_DATASET_OPTIONS))
+        save_manifest(path_manifest, record_files(manifest, dict_hashes, dict_stats))
         print("Sales ETL Update completed successfully. ✅.")
         pass
     except Exception as e:
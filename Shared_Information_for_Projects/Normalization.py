@@ -0,0 +1,152 @@
+'''
+Módulo de normalización de texto compartido por los procesos ETL.
+Centraliza el patrón repetido `.astype(str).str.upper().str.strip()` (opcionalmente seguido de
+`.str.replace(' ', '')`) en un único kernel vectorizado que normaliza cada valor distinto una
+sola vez (factorize -> normalizar únicos -> take), lo que es mucho más rápido en columnas clave
+con alta repetición (SKU, país, cliente, periodo).
+
+Las columnas normalizadas quedan marcadas en `df.attrs['normalized_columns']`. La marca es solo una
+pista: pandas puede perder o propagar df.attrs (copias, concat, merge, assign), por lo que una
+columna marcada se verifica sobre sus valores distintos antes de omitirla, y la normalización es
+idempotente (normalizar dos veces da el mismo resultado). Una marca perdida solo cuesta una pasada
+más; una marca desactualizada no deja valores sin normalizar. Las funciones que sobrescriban o
+renombren una columna marcada usan unmark_columns / rename_marks para que la pista siga siendo útil.
+
+Contiene las siguientes funciones:
+- normalize_series: Normaliza una Serie (mayúsculas, sin espacios en los extremos y opcionalmente sin espacios).
+- normalize_columns: Normaliza columnas de un DataFrame en el lugar, omitiendo las ya normalizadas.
+- is_normalized: Indica si una columna está marcada como normalizada al nivel pedido.
+- values_normalized: Verifica sobre los valores distintos que una Serie ya está normalizada.
+- mark_columns / unmark_columns / rename_marks: Gestión de las marcas de normalización.
+'''
+
+#--------------------------------------------------
+#---------------- LIBRERIAS -----------------------
+#--------------------------------------------------
+import pandas as pd
+
+# Clave de df.attrs donde se guardan las marcas {columna: {'remove_spaces': bool, 'as_str': bool}}
+NORMALIZED_ATTR = 'normalized_columns'
+
+
+def normalize_series(serie, remove_spaces=False, as_str=True):
+    """
+    Normaliza una Serie de texto procesando cada valor distinto una sola vez. El resultado es
+    idéntico a `serie.astype(str).str.upper().str.strip()` (más `.str.replace(' ', '')` si
+    remove_spaces es True).
+
+    Args:
+        serie (pd.Series): Serie a normalizar.
+        remove_spaces (bool, optional): Si es True elimina todos los espacios. Por defecto False.
+        as_str (bool, optional): Si es True convierte primero a str (como .astype(str)); si es False
+                                 los nulos se conservan como en `.str.upper()`. Por defecto True.
+
+    Returns:
+        pd.Series: Serie normalizada con el mismo índice y nombre.
+    """
+    codes, uniques = pd.factorize(serie, use_na_sentinel=False)
+    normalized = pd.Series(uniques, dtype=object)
+    if as_str:
+        normalized = normalized.astype(str)
+    normalized = normalized.str.upper().str.strip()
+    if remove_spaces:
+        normalized = normalized.str.replace(' ', '')
+    result = normalized.take(codes)
+    result.index = serie.index
+    result.name = serie.name
+    return result
+
+
+def values_normalized(serie, remove_spaces=False, as_str=True):
+    """
+    Verifica que normalizar la Serie no cambiaría sus valores. Solo se procesan los valores distintos,
+    sin construir una columna nueva.
+
+    Args:
+        serie (pd.Series): Serie a verificar.
+        remove_spaces (bool, optional): Nivel pedido (ver normalize_series).
+        as_str (bool, optional): Nivel pedido (ver normalize_series).
+
+    Returns:
+        bool: True si la Serie ya está normalizada.
+    """
+    uniques = pd.Series(pd.unique(serie), dtype=object)
+    return normalize_series(uniques, remove_spaces=remove_spaces, as_str=as_str).equals(uniques)
+
+
+def is_normalized(df, column, remove_spaces=False, as_str=True):
+    """
+    Indica si una columna está marcada como normalizada al nivel pedido. La marca es una pista
+    (df.attrs puede perderse o propagarse); normalize_columns la confirma con values_normalized.
+
+    Args:
+        df (pd.DataFrame): DataFrame con la columna.
+        column (str): Nombre de la columna.
+        remove_spaces (bool, optional): Nivel pedido (ver normalize_series).
+        as_str (bool, optional): Nivel pedido (ver normalize_series).
+
+    Returns:
+        bool: True si la columna está marcada con un nivel igual o superior al pedido.
+    """
+    mark = df.attrs.get(NORMALIZED_ATTR, {}).get(column)
+    if mark is None or column not in df.columns:
+        return False
+    return ((mark['remove_spaces'] or not remove_spaces) and
+            (mark['as_str'] or not as_str))
+
+
+def mark_columns(df, columns, remove_spaces=False, as_str=True):
+    """Marca columnas como normalizadas al nivel indicado."""
+    marks = dict(df.attrs.get(NORMALIZED_ATTR, {}))
+    for col in columns:
+        marks[col] = {'remove_spaces': remove_spaces, 'as_str': as_str}
+    df.attrs[NORMALIZED_ATTR] = marks
+
+
+def unmark_columns(df, columns=None):
+    """
+    Elimina la marca de normalización de las columnas indicadas (o de todas si columns es None).
+    Debe llamarse cuando una columna marcada se sobrescribe con otros valores.
+    """
+    if columns is None:
+        df.attrs.pop(NORMALIZED_ATTR, None)
+        return
+    marks = dict(df.attrs.get(NORMALIZED_ATTR, {}))
+    for col in columns:
+        marks.pop(col, None)
+    df.attrs[NORMALIZED_ATTR] = marks
+
+
+def rename_marks(df, mapping):
+    """
+    Traslada las marcas de normalización después de renombrar columnas con df.rename(columns=mapping).
+    """
+    marks = dict(df.attrs.get(NORMALIZED_ATTR, {}))
+    for old_name, new_name in mapping.items():
+        if old_name in marks:
+            marks[new_name] = marks.pop(old_name)
+    df.attrs[NORMALIZED_ATTR] = marks
+
+
+def normalize_columns(df, columns, remove_spaces=False, as_str=True):
+    """
+    Normaliza en el lugar las columnas indicadas de un DataFrame y las marca como normalizadas.
+    Las columnas marcadas con un nivel suficiente se omiten solo si sus valores ya están normalizados
+    (values_normalized); el resultado no depende de las marcas.
+
+    Args:
+        df (pd.DataFrame): DataFrame a modificar.
+        columns (list): Columnas a normalizar.
+        remove_spaces (bool, optional): Si es True elimina todos los espacios. Por defecto False.
+        as_str (bool, optional): Ver normalize_series. Por defecto True.
+
+    Returns:
+        pd.DataFrame: El mismo DataFrame, con las columnas normalizadas.
+    """
+    lst_columns = list(columns)
+    for col in lst_columns:
+        if is_normalized(df, col, remove_spaces, as_str) and values_normalized(df[col], remove_spaces, as_str):
+            continue
+        df[col] = normalize_series(df[col], remove_spaces=remove_spaces, as_str=as_str)
+    mark_columns(df, lst_columns, remove_spaces, as_str)
+    return df
@@ -0,0 +1,176 @@
+'''
+Módulo de datos de referencia (dimensiones) compartido por los procesos ETL.
+Centraliza la lectura de los archivos maestros (Country Codes, Master Products, Gross_to_Net, NPI, ...)
+que Sales, Demand, Master Customers y Master Products leían y re-indexaban por separado:
+
+- Cada libro/hoja se parsea una sola vez: la copia Parquet se guarda en '_cache_reference' junto al
+  archivo fuente (ver Fill_Rate.Process_ETL.Excel_Cache) y, dentro de la misma ejecución, se memoriza
+  en memoria. Ambas cachés se identifican por el hash del contenido del archivo más su fecha de
+  modificación, por lo que un archivo reescrito nunca se sirve desde una versión anterior.
+- Está pensado para entradas de referencia que el proceso que las lee no modifica. Los archivos que un
+  módulo lee y reescribe en la misma ejecución (HTS, PWT, Maestro de Productos en Update_md_products,
+  Maestro de Clientes, archivo de revisión de productos) se leen directamente con pd.read_excel.
+- Los índices por clave normalizada (ej. País -> Región, tablas de cruce de build_sales_lookups) se
+  construyen una sola vez por contenido y se guardan en Parquet en el mismo '_cache_reference' del
+  archivo del que proviene el DataFrame. La procedencia (df.attrs) es solo una pista para ubicar el
+  índice: la huella del contenido de las columnas usadas decide si el índice guardado sirve.
+
+Las funciones devuelven copias, por lo que los llamadores pueden modificar los DataFrames
+(renombrar, normalizar en el lugar) sin afectar a otros módulos.
+
+Contiene las siguientes funciones:
+- read_reference: Lee una hoja de un archivo maestro (dtype=str) con caché en memoria y en Parquet.
+- reference_index: Índice por clave normalizada de un DataFrame de referencia, en memoria y en Parquet.
+- country_region_map: Serie País -> Región sin duplicados de País-Región (usada por Sales).
+- clear_reference_cache: Vacía la caché en memoria.
+'''
+
+#--------------------------------------------------
+#---------------- LIBRERIAS -----------------------
+#--------------------------------------------------
+import pandas as pd
+
+import glob
+import hashlib
+import os
+
+from Fill_Rate.Process_ETL.Excel_Cache import read_excel_cached, cache_key, CACHE_SEPARATOR
+from Shared_Information_for_Projects.Normalization import normalize_series
+
+# Nombre del directorio de caché creado junto a cada archivo maestro
+REFERENCE_CACHE_DIR = '_cache_reference'
+
+# Atributo (df.attrs) con la ruta del archivo del que se leyó un DataFrame de referencia
+REFERENCE_SOURCE_ATTR = 'reference_source'
+# Versiones (huellas de contenido distintas) que se conservan en Parquet por archivo e índice
+MAX_INDEX_VERSIONS = 4
+
+# Caché en memoria: {(ruta, hoja, clave de contenido): DataFrame} y {(nombre, huella): DataFrame}
+_DICT_FRAMES = {}
+_DICT_INDEXES = {}
+
+
+def _file_signature(filename, sheet_name):
+    """Identifica la versión de un archivo/hoja por su ruta absoluta y su clave de caché (hash del contenido + mtime)."""
+    return (os.path.abspath(filename), sheet_name, cache_key(filename))
+
+
+def _cache_dir(filename):
+    """Directorio de caché Parquet de un archivo maestro."""
+    return os.path.join(os.path.dirname(os.path.abspath(filename)), REFERENCE_CACHE_DIR)
+
+
+def read_reference(filename, sheet_name=0):
+    """
+    Lee una hoja de un archivo maestro como texto (igual que pd.read_excel(filename, dtype=str)).
+    La primera lectura de cada versión del archivo se guarda en Parquet y en memoria; las siguientes
+    (en este u otro módulo) no vuelven a parsear el Excel. Cualquier cambio en el contenido del archivo
+    genera una nueva versión.
+
+    Args:
+        filename (str): Ruta del archivo Excel.
+        sheet_name (str or int, optional): Hoja a leer. Por defecto la primera (0).
+
+    Returns:
+        pd.DataFrame: Copia del contenido de la hoja.
+    """
+    signature = _file_signature(filename, sheet_name)
+    if signature not in _DICT_FRAMES:
+        # Se descartan las versiones anteriores del mismo archivo/hoja
+        for old_signature in [key for key in _DICT_FRAMES if key[:2] == signature[:2]]:
+            del _DICT_FRAMES[old_signature]
+        df = read_excel_cached(filename, _cache_dir(filename), sheet_name=sheet_name)
+        df.attrs[REFERENCE_SOURCE_ATTR] = os.path.abspath(filename)
+        _DICT_FRAMES[signature] = df
+    return _DICT_FRAMES[signature].copy()
+
+
+def _frame_fingerprint(df):
+    """Huella del contenido de un DataFrame (columnas, tipos de valor y filas en orden)."""
+    sha = hashlib.sha256(repr(list(df.columns)).encode('utf-8'))
+    sha.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return sha.hexdigest()[:24]
+
+
+def reference_index(df, columns, name, build):
+    """
+    Devuelve el índice por clave normalizada que build construye a partir de df[columns]. El índice se
+    construye una sola vez por contenido: se memoriza en memoria y, si df proviene de read_reference,
+    se guarda en Parquet en el '_cache_reference' de su archivo para las siguientes ejecuciones.
+    El índice guardado se identifica por name y por la huella de df[columns], por lo que un DataFrame
+    modificado por el llamador (ej. normalizado o filtrado) nunca recibe el índice de otro contenido.
+
+    Args:
+        df (pd.DataFrame): Tabla de referencia.
+        columns (list): Columnas de df que usa build (las únicas que forman la huella).
+        name (str): Nombre del índice; identifica también la definición de build.
+        build (callable): Función df[columns] -> pd.DataFrame indexado por la clave normalizada.
+
+    Returns:
+        pd.DataFrame: Copia del índice.
+    """
+    df_source = df[list(columns)]
+    fingerprint = _frame_fingerprint(df_source)
+    signature = (name, fingerprint)
+    if signature in _DICT_INDEXES:
+        return _DICT_INDEXES[signature].copy()
+
+    source = df.attrs.get(REFERENCE_SOURCE_ATTR)
+    prefix = (f"{os.path.basename(source)}{CACHE_SEPARATOR}idx-{name}{CACHE_SEPARATOR}"
+              if source is not None else None)
+    index_file = os.path.join(_cache_dir(source), f"{prefix}{fingerprint}.parquet") if source is not None else None
+
+    # --- ÍNDICE PERSISTIDO EN PARQUET ---
+    df_index = None
+    if index_file is not None and os.path.exists(index_file):
+        try:
+            df_index = pd.read_parquet(index_file, engine='pyarrow')
+        except Exception as e:
+            print(f"  [ADVERTENCIA] Índice corrupto para {os.path.basename(source)}, se reconstruye: {e}")
+
+    # --- CONSTRUCCIÓN DEL ÍNDICE ---
+    if df_index is None:
+        df_index = build(df_source)
+        if index_file is not None:
+            try:
+                os.makedirs(os.path.dirname(index_file), exist_ok=True)
+                tmp_file = index_file + '.tmp'
+                df_index.to_parquet(tmp_file, engine='pyarrow')
+                os.replace(tmp_file, index_file)
+                # Se conservan las versiones más recientes (ej. la tabla cruda y la normalizada)
+                pattern = os.path.join(os.path.dirname(index_file), glob.escape(prefix) + '*.parquet')
+                lst_old = sorted(glob.glob(pattern), key=os.path.getmtime, reverse=True)
+                for old_file in lst_old[MAX_INDEX_VERSIONS:]:
+                    os.remove(old_file)
+            except Exception as e:
+                print(f"  [ADVERTENCIA] No se pudo guardar el índice de {os.path.basename(source)}: {e}")
+
+    _DICT_INDEXES[signature] = df_index
+    return df_index.copy()
+
+
+def _country_region_frame(df_country):
+    """Región indexada por País, sin duplicados de País-Región (primera aparición)."""
+    country_region = normalize_series(df_country['Country'] + '-' + df_country['Region'], as_str=False)
+    mask_unique = ~country_region.duplicated(keep='first')
+    return df_country.loc[mask_unique].set_index('Country')[['Region']]
+
+
+def country_region_map(df_country):
+    """
+    Construye la Serie País -> Región usada en los cruces de Sales, eliminando los duplicados de
+    País-Región (primera aparición), igual que assign_nsv, assign_NPI_New_Carryover y LaunchYear_VR.
+
+    Args:
+        df_country (pd.DataFrame): Maestro de Países con 'Country' y 'Region'.
+
+    Returns:
+        pd.Series: Región indexada por País (índice persistido, ver reference_index).
+    """
+    return reference_index(df_country, ['Country', 'Region'], 'country_region', _country_region_frame)['Region']
+
+
+def clear_reference_cache():
+    """Vacía la caché en memoria (los archivos Parquet persistidos se conservan)."""
+    _DICT_FRAMES.clear()
+    _DICT_INDEXES.clear()
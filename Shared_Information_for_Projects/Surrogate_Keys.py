@@ -0,0 +1,101 @@
+'''
+Módulo de claves sustitutas (surrogate keys) compartido por los procesos ETL.
+Reemplaza las claves compuestas construidas concatenando texto fila a fila
+(ej. 'fk_date_country_customer_clasification') por un hash entero de 64 bits calculado a partir
+de las columnas componentes. El hash es estable entre ejecuciones (no depende del orden de las
+filas ni de la sesión), por lo que puede guardarse en los Parquet y usarse en upserts,
+deduplicaciones y cruces. Las columnas componentes se guardan junto a la clave sustituta, de modo que
+la clave legible se puede reconstruir desde los Parquet cuando se necesite (rebuild_readable_key).
+
+Cada componente se normaliza (mayúsculas, sin espacios en los extremos, nulos como '') antes del
+hash, por lo que la clave no depende de mayúsculas ni espacios. La clave debe calcularse sobre los
+valores originales, ANTES de format_columns: format_columns pasa el texto a minúsculas y elimina las
+subcadenas 'nan' (ej. 'BANANA' -> 'baa'), y sobre esos valores se obtendría otra clave. process_columns
+la calcula antes de formatear tanto en la carga completa como en las actualizaciones; la clave no se
+puede recalcular a partir de los componentes guardados en los Parquet.
+
+Contiene las siguientes funciones:
+- build_surrogate_key: Calcula la clave entera (UInt64) a partir de las columnas componentes.
+- build_readable_key: Construye la clave legible concatenando las columnas componentes.
+- rebuild_readable_key: Reconstruye la clave legible a partir de los componentes guardados en los Parquet.
+'''
+
+#--------------------------------------------------
+#---------------- LIBRERIAS -----------------------
+#--------------------------------------------------
+import pandas as pd
+import numpy as np
+
+from Shared_Information_for_Projects.Normalization import normalize_series
+
+# Multiplicador para combinar los hash de cada componente (primo de 64 bits de FNV-1a)
+_HASH_PRIME = np.uint64(0x100000001B3)
+
+
+def _hash_component(serie):
+    """
+    Calcula el hash de 64 bits de cada valor normalizado de una columna, procesando cada valor
+    distinto una sola vez (factorize -> hash de los únicos -> take).
+    """
+    codes, uniques = pd.factorize(serie, use_na_sentinel=False)
+    canonical = normalize_series(pd.Series(uniques, dtype=object)).fillna('')
+    return pd.util.hash_array(canonical.to_numpy(dtype=object)).take(codes)
+
+
+def build_surrogate_key(df, columns):
+    """
+    Calcula una clave sustituta entera de 64 bits a partir de las columnas componentes.
+    Las columnas deben tener los valores originales (antes de format_columns, ver el docstring del módulo).
+
+    Args:
+        df (pd.DataFrame): DataFrame con las columnas componentes.
+        columns (list): Columnas que forman la clave, en orden (el orden forma parte de la clave).
+
+    Returns:
+        pd.Series: Serie 'UInt64' con el mismo índice que df.
+    """
+    key = np.zeros(len(df), dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for col in columns:
+            key = (key ^ _hash_component(df[col])) * _HASH_PRIME
+    return pd.Series(key, index=df.index, dtype='UInt64')
+
+
+def build_readable_key(df, columns, sep='-'):
+    """
+    Construye la clave legible concatenando las columnas componentes (mayúsculas y sin espacios en
+    los extremos), equivalente a la concatenación usada históricamente en process_columns.
+
+    Args:
+        df (pd.DataFrame): DataFrame con las columnas componentes.
+        columns (list): Columnas que forman la clave, en orden.
+        sep (str, optional): Separador entre componentes. Por defecto '-'.
+
+    Returns:
+        pd.Series: Serie de texto con la clave legible.
+    """
+    key = df[columns[0]]
+    for col in columns[1:]:
+        key = key + sep + df[col]
+    return normalize_series(key, as_str=False)
+
+
+def rebuild_readable_key(df, columns, sep='-'):
+    """
+    Reconstruye la clave legible a partir de las columnas componentes guardadas en los Parquet (ya
+    formateadas por format_columns). El resultado tiene el formato con el que se guardaba la clave
+    legible (build_readable_key + format_columns: minúsculas), por lo que se puede comparar con las
+    claves de archivos anteriores después de normalize_series.
+
+    Args:
+        df (pd.DataFrame): Registros leídos de los Parquet, con las columnas componentes.
+        columns (list): Columnas que forman la clave, en orden (ej. Process_Files.LST_KEY_COLUMNS).
+        sep (str, optional): Separador entre componentes. Por defecto '-'.
+
+    Returns:
+        pd.Series: Serie de texto con la clave legible.
+    """
+    key = df[columns[0]].astype(str)
+    for col in columns[1:]:
+        key = key + sep + df[col].astype(str)
+    return key.str.lower()
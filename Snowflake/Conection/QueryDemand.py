@@ -2,28 +2,34 @@
 Módulo de orquestación para la extracción de datos de Demanda desde Snowflake.
 Utiliza los componentes de conexión (Conection) para realizar consultas 
 al Data Warehouse y obtener el histórico de Forecast actualizado.
+El resultado se descarga en lotes Arrow y se escribe en streaming en 'QueryDemand/',
+un archivo por periodo fiscal (ver Stream_Parquet).
 """
 
 import snowflake.connector
 
-from .Conection import conectar_snowflake_sso, query
-    
-def main():
-    """
-    Orquesta el flujo de extracción de datos de Demanda.
-    El proceso incluye:
-     1) Conexión a Snowflake vía SSO.
-     2) Ejecución de query con filtros de periodo fiscal actual.
-     3) Carga de resultados en DataFrame.
-    Returns: None: La función orquesta el proceso y no devuelve un valor.
-    """
-    from config_paths import DemandPaths
-    demand_update_raw_dir = DemandPaths.INPUT_RAW_UPDATE_DIR
-    print("=" * 55)
-    print("--- 🔄 INICIANDO PROCESO: DEMAND DATA EXTRACTION ---")
-    print("=" * 55)
-    conexion=conectar_snowflake_sso(Database="PROD_MARTS",Schema="DEMAND")
-    sql="""
+from datetime import date
+from functools import partial
+
+from .Conection import conectar_snowflake_sso
+from .Stream_Parquet import query_batches, stream_to_parquet
+from .Sliced_Query import (fiscal_period_slices, demand_group_slices, sliced_query_batches,
+                           DEFAULT_MAX_CONCURRENCY)
+
+# Demand groups incluidos en la extracción
+LST_DEMAND_GROUPS = ['ARDIST','AREASY','ARECOMM','ARFZ','ARHYPER','ARINTERCO','AROTHER',
+                     'ARSODIMAC','CHARDISTFZ','MRARAFIL','MRAROTH','MRUROTH','BRARDIST',
+                     'BRATA','BRATASP','BRCON','BRCONSP','BRECO','BRECOSP','BRHC','BRHCSP',
+                     'BRMDRSP','BRMRO','BRMROSP','BROTHER','BROTHSP','BRVAR','BRVARSP','BRB2CSP',
+                     'MRCA','MRGC','MROTHER','MRPAN','MRCCFNL','CHECOMM','CHINTERCO','CHMDR',
+                     'CHOTHER','CHSODIMAC','MRCHMDR','MRCHOTH','CHTRAD','CHIND','COECOMM',
+                     'COMDR','COOTHER','COSODIMAC','MRCOAFIL','MRCOOTH','MRECOTH','BRECEXP',
+                     'MRECFNL','BNDSAWSEG','MRMXOTH','MXFNL','MXHD','MXINTERCO','MXMDR',
+                     'MXOD','MXOM','MXOTHER','MXTRAD','MXWM','BRINTERCO','MRPEMDR','MRPEOTH',
+                     'PEIND','PEINTERCO','PEMDR','PEOTHER','PESODIMAC','BRMDR','CHARPUBFZ','BRARPUB','COFNL','PEECOMM']
+
+# Consulta de Forecast; '{slice_filter}' restringe cada porción en la extracción por porciones
+SQL_DEMAND = """
         SELECT
             FISCAL_PERIOD as "Fiscal Period",
             FYR_ID as "Fiscal Year",
@@ -42,25 +48,72 @@ def main():
       WHERE FISCAL_PERIOD >= MONTH(CURRENT_DATE()) 
       AND FYR_ID >= YEAR(CURRENT_DATE()) 
      AND FYR_ID <=YEAR(CURRENT_DATE())+1
-     AND DMD_GRP_KEY IN ('ARDIST','AREASY','ARECOMM','ARFZ','ARHYPER','ARINTERCO','AROTHER',
-                        'ARSODIMAC','CHARDISTFZ','MRARAFIL','MRAROTH','MRUROTH','BRARDIST',
-                        'BRATA','BRATASP','BRCON','BRCONSP','BRECO','BRECOSP','BRHC','BRHCSP',
-                        'BRMDRSP','BRMRO','BRMROSP','BROTHER','BROTHSP','BRVAR','BRVARSP','BRB2CSP',
-                        'MRCA','MRGC','MROTHER','MRPAN','MRCCFNL','CHECOMM','CHINTERCO','CHMDR',
-                        'CHOTHER','CHSODIMAC','MRCHMDR','MRCHOTH','CHTRAD','CHIND','COECOMM',
-                        'COMDR','COOTHER','COSODIMAC','MRCOAFIL','MRCOOTH','MRECOTH','BRECEXP',
-                        'MRECFNL','BNDSAWSEG','MRMXOTH','MXFNL','MXHD','MXINTERCO','MXMDR',
-                        'MXOD','MXOM','MXOTHER','MXTRAD','MXWM','BRINTERCO','MRPEMDR','MRPEOTH',
-                        'PEIND','PEINTERCO','PEMDR','PEOTHER','PESODIMAC','BRMDR','CHARPUBFZ','BRARPUB','COFNL','PEECOMM')
-
+     AND """ + demand_group_slices(LST_DEMAND_GROUPS, batch_size=len(LST_DEMAND_GROUPS))[0] + """
+     AND {slice_filter}
         """
 
-    df_queryDemand=query(conexion,sql)
-    df_queryDemand.to_parquet(demand_update_raw_dir / 'QueryDemand.parquet', index=False)
+# Modos de extracción: una sola consulta, o porciones por periodo fiscal / por lotes de demand groups
+EXTRACTION_MODES = ('single', 'period', 'group')
+
+
+def demand_slices(mode, today=None, group_batch_size=10):
+    """
+    Filtros de las porciones de la consulta de Demand según el modo de extracción.
+    Las porciones por periodo cubren los mismos periodos que el filtro de la consulta
+    (periodo >= mes actual, año actual y siguiente).
+
+    Args:
+        mode (str): 'single', 'period' o 'group'.
+        today (date, optional): Fecha de referencia. Por defecto la fecha actual.
+        group_batch_size (int, optional): Demand groups por porción en el modo 'group'. Por defecto 10.
+
+    Returns:
+        list: Filtros SQL de las porciones.
+    """
+    if mode not in EXTRACTION_MODES:
+        raise ValueError(f"Modo de extracción '{mode}' no válido. Opciones: {EXTRACTION_MODES}")
+    today = today or date.today()
+    if mode == 'period':
+        return fiscal_period_slices([(year, period) for year in (today.year, today.year + 1)
+                                     for period in range(today.month, 13)])
+    if mode == 'group':
+        return demand_group_slices(LST_DEMAND_GROUPS, batch_size=group_batch_size)
+    return ['1 = 1']
+
+
+def main(mode='single', max_concurrency=DEFAULT_MAX_CONCURRENCY):
+    """
+    Orquesta el flujo de extracción de datos de Demanda.
+    El proceso incluye:
+     1) Conexión a Snowflake vía SSO.
+     2) Ejecución de query con filtros de periodo fiscal actual: en una sola consulta ('single') o dividida en
+        porciones asíncronas por periodo fiscal ('period') o por lotes de demand groups ('group'), ver Sliced_Query.
+     3) Escritura en streaming de los lotes Arrow en un Parquet por periodo fiscal ('QueryDemand_YYYY-MM.parquet').
+    Args:
+        mode (str, optional): Modo de extracción (EXTRACTION_MODES). Por defecto 'single'.
+        max_concurrency (int, optional): Porciones en ejecución simultánea en los modos por porciones.
+                                         Por defecto DEFAULT_MAX_CONCURRENCY.
+    Returns: None: La función orquesta el proceso y no devuelve un valor.
+    """
+    from config_paths import DemandPaths
+    demand_update_raw_dir = DemandPaths.INPUT_RAW_UPDATE_DIR
+    print("=" * 55)
+    print("--- 🔄 INICIANDO PROCESO: DEMAND DATA EXTRACTION ---")
+    print("=" * 55)
+    lst_slices = demand_slices(mode)
+    connection_factory = partial(conectar_snowflake_sso, Database="PROD_MARTS", Schema="DEMAND")
+    if mode == 'single':
+        batches = query_batches(connection_factory(), SQL_DEMAND.format(slice_filter=lst_slices[0]))
+    else:
+        batches = sliced_query_batches(connection_factory, SQL_DEMAND, lst_slices, max_concurrency=max_concurrency)
+
+    # Los lotes se escriben a medida que llegan: el resultado completo nunca está en memoria
+    stats = stream_to_parquet(batches, demand_update_raw_dir / 'QueryDemand', name='QueryDemand',
+                              partition_columns=['Fiscal Year', 'Fiscal Period'])
+    print(f"Registros extraídos: {stats['rows']} en {stats['batches']} lotes y {len(stats['files'])} periodos")
     #print(df_queryDemand.head())
     print("--- 🔄 PROCESO FINALIZADO: DEMAND DATA EXTRACTION ---")
 
 
 if __name__ == "__main__":
     main()
-    
\ No newline at end of file
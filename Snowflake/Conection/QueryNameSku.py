@@ -2,21 +2,40 @@
 Módulo de orquestación para la extracción de datos de DIM PRODUCT desde Snowflake.
 Utiliza los componentes de conexión (Conection) para realizar consultas 
 al Data Warehouse y obtener el histórico de Forecast actualizado.
+En modo 'watermark' solo se descargan los productos modificados desde la última extracción y se
+combinan con el Parquet local por SKU y sistema (ver Watermark).
 """
 
 import snowflake.connector
 
-from .Conection import conectar_snowflake_sso, query
-    
-def main():
+from .Conection import conectar_snowflake_sso
+from .Stream_Parquet import query_batches, stream_to_parquet
+from .Watermark import load_watermark, save_watermark, clear_watermark, watermark_from_store, incremental_pull
+
+# Columna de DIM_PRODUCT con la fecha de última modificación del registro (marca de agua)
+WATERMARK_COLUMN = 'LAST_MODIFIED_DATE'
+# Alias de la columna de modificación en el Parquet y clave de los productos en el almacén
+WATERMARK_ALIAS = 'Last Modified'
+LST_KEY_COLUMNS = ['SKU', 'System']
+# Modos de extracción: completa o incremental por marca de agua
+EXTRACTION_MODES = ('full', 'watermark')
+
+
+def main(mode='full'):
     """
-    Orquesta el flujo de extracción de datos de Demanda.
+    Orquesta el flujo de extracción de datos de DIM PRODUCT.
     El proceso incluye:
      1) Conexión a Snowflake vía SSO.
-     2) Ejecución de query con filtros de periodo fiscal actual.
-     3) Carga de resultados en DataFrame.
+     2) Modo 'full': descarga completa en streaming con la consulta original (sin la columna de modificación).
+     3) Modo 'watermark': descarga de los productos modificados desde la marca de agua y merge con el
+        Parquet local por SKU y sistema; sin marca de agua previa se hace una descarga completa que incluye
+        la columna de modificación y se registra la marca de agua.
+    Args:
+        mode (str, optional): Modo de extracción (EXTRACTION_MODES). Por defecto 'full'.
     Returns: None: La función orquesta el proceso y no devuelve un valor.
     """
+    if mode not in EXTRACTION_MODES:
+        raise ValueError(f"Modo de extracción '{mode}' no válido. Opciones: {EXTRACTION_MODES}")
     from config_paths import MasterProductsPaths
     SkuName_update_raw_dir = MasterProductsPaths.INPUT_RAW_SkuName_FILE
     print("=" * 55)
@@ -44,14 +63,38 @@ def main():
             gpp_portfolio_id as "Portafolio Code",
             gpp_portfolio_desc as "Portafolio Description",
 
-            FINAL_GPP_DESC_SYS as "System"
+            FINAL_GPP_DESC_SYS as "System"{watermark_select}
 
         FROM PROD_EDW.DIMENSIONS.DIM_PRODUCT
         WHERE FINAL_GPP_DESC_SYS IN ('SAPC11','SAPE03','QADAR','SAPBYD','QADCH','QADPE','QADBR')
+        {watermark_where}
     """
 
-    df_queryDemand=query(conexion,sql)
-    df_queryDemand.to_parquet(SkuName_update_raw_dir, index=False)
+    if mode == 'full':
+        # --- EXTRACCIÓN COMPLETA: los lotes se escriben a medida que llegan en un único archivo (sin partición)
+        stats = stream_to_parquet(query_batches(conexion, sql.format(watermark_select='', watermark_where='')),
+                                  SkuName_update_raw_dir.parent, name=SkuName_update_raw_dir.stem)
+        print(f"Registros extraídos: {stats['rows']} en {stats['batches']} lotes")
+        if stats['rows']:
+            # El almacén ya no tiene la columna de modificación: la próxima ejecución incremental parte de cero
+            clear_watermark(SkuName_update_raw_dir)
+    else:
+        # La columna de modificación (y el filtro por marca de agua) solo se agregan en modo 'watermark'
+        sql_watermark = sql.format(watermark_select=f',\n            {WATERMARK_COLUMN} as "{WATERMARK_ALIAS}"',
+                                   watermark_where='AND {watermark_filter}')
+        if load_watermark(SkuName_update_raw_dir) is not None:
+            # --- EXTRACCIÓN INCREMENTAL: solo los productos modificados desde la última extracción ---
+            stats = incremental_pull(conexion, sql_watermark, SkuName_update_raw_dir, LST_KEY_COLUMNS,
+                                     WATERMARK_COLUMN, watermark_alias=WATERMARK_ALIAS)
+            print(f"Registros modificados: {stats['rows']} | total en el almacén: {stats['total']}")
+        else:
+            # --- CARGA INICIAL: descarga completa con la columna de modificación y registro de la marca de agua
+            stats = stream_to_parquet(query_batches(conexion, sql_watermark.format(watermark_filter='1 = 1')),
+                                      SkuName_update_raw_dir.parent, name=SkuName_update_raw_dir.stem)
+            print(f"Registros extraídos: {stats['rows']} en {stats['batches']} lotes")
+            if stats['rows']:
+                save_watermark(SkuName_update_raw_dir,
+                               watermark_from_store(SkuName_update_raw_dir, WATERMARK_ALIAS), rows=stats['rows'])
     #print(df_queryDemand.head())
     print("--- 🔄 PROCESO FINALIZADO: MASTER PRODUCTS DATA EXTRACTION ---")
 
@@ -0,0 +1,181 @@
+"""
+Módulo de extracción en porciones (slices) paralelas desde Snowflake.
+Divide una consulta grande en varias consultas pequeñas (por periodo fiscal o por lote de demand groups),
+las envía de forma asíncrona (execute_async + identificador de consulta) y descarga sus resultados en
+paralelo con un límite de concurrencia configurable:
+
+- Cada porción se ejecuta en su propio cursor; el servidor resuelve varias a la vez.
+- Los lotes Arrow de cada porción se entregan a medida que se descargan, a través de una cola acotada, listos
+  para stream_to_parquet (ver Stream_Parquet): ninguna porción se acumula completa en memoria.
+- Una porción que falla antes de entregar su primer lote (error de la consulta o de la ejecución) se reintenta
+  sola, sin repetir las demás. Si falla después, reintentarla duplicaría los registros ya entregados, por lo que
+  la extracción se aborta (stream_to_parquet descarta entonces todo lo escrito en staging).
+- La conexión se cierra al terminar, al fallar o al abandonar la extracción.
+
+La conexión se obtiene de una función (connection_factory), por lo que las pruebas pueden usar una
+conexión local que implemente cursor(), get_query_status_throw_if_error e is_still_running.
+
+Contiene las siguientes funciones:
+- fiscal_period_slices: Porciones por año y periodo fiscal.
+- demand_group_slices: Porciones por lotes de demand groups.
+- sliced_query_batches: Ejecuta las porciones en paralelo y devuelve sus lotes Arrow.
+"""
+
+#--------------------------------------------------
+#---------------- LIBRERIAS -----------------------
+#--------------------------------------------------
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .Stream_Parquet import STREAM_QUEUE_SIZE
+
+# Consultas en ejecución/descarga simultánea por defecto
+DEFAULT_MAX_CONCURRENCY = 4
+# Reintentos por porción antes de abortar la extracción
+DEFAULT_MAX_RETRIES = 2
+# Segundos entre consultas del estado de una consulta asíncrona
+POLL_INTERVAL = 1.0
+# Segundos de espera de una porción con la cola llena antes de revisar si la extracción se canceló
+_PUT_TIMEOUT = 0.1
+
+
+def fiscal_period_slices(lst_year_period, year_column='FYR_ID', period_column='FISCAL_PERIOD'):
+    """
+    Construye una porción (filtro SQL) por cada par año-periodo fiscal.
+
+    Args:
+        lst_year_period (list): Pares (año, periodo), ej. [(2025, 3), (2025, 4)].
+        year_column (str, optional): Columna del año fiscal. Por defecto 'FYR_ID'.
+        period_column (str, optional): Columna del periodo fiscal. Por defecto 'FISCAL_PERIOD'.
+
+    Returns:
+        list: Filtros SQL, ej. ['FYR_ID = 2025 AND FISCAL_PERIOD = 3', ...].
+    """
+    return [f"{year_column} = {int(year)} AND {period_column} = {int(period)}" for year, period in lst_year_period]
+
+
+def demand_group_slices(lst_groups, batch_size=10, group_column='DMD_GRP_KEY'):
+    """
+    Construye una porción (filtro SQL) por cada lote de demand groups.
+
+    Args:
+        lst_groups (list): Códigos de demand group.
+        batch_size (int, optional): Demand groups por porción. Por defecto 10.
+        group_column (str, optional): Columna del demand group. Por defecto 'DMD_GRP_KEY'.
+
+    Returns:
+        list: Filtros SQL, ej. ["DMD_GRP_KEY IN ('ARDIST','AREASY')", ...].
+    """
+    lst_slices = []
+    for start in range(0, len(lst_groups), batch_size):
+        str_groups = ", ".join("'" + str(group).replace("'", "''") + "'" for group in lst_groups[start:start + batch_size])
+        lst_slices.append(f"{group_column} IN ({str_groups})")
+    return lst_slices
+
+
+def _put(result_queue, message, stop):
+    """Entrega un mensaje a la cola de resultados; espera si está llena y desiste si la extracción se canceló."""
+    while not stop.is_set():
+        try:
+            result_queue.put(message, timeout=_PUT_TIMEOUT)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _run_slice(conexion, sql, poll_interval, slice_filter, result_queue, stop):
+    """
+    Ejecuta una porción: la envía con execute_async, espera a que termine consultando su estado por el
+    identificador de consulta y entrega sus lotes Arrow a la cola de resultados a medida que se descargan,
+    seguidos de ('done', filas) o, si falla, de ('error', excepción).
+    """
+    cs = conexion.cursor()
+    rows = 0
+    try:
+        cs.execute_async(sql)
+        query_id = cs.sfqid
+        # get_query_status_throw_if_error lanza la excepción si la consulta falló en el servidor
+        while conexion.is_still_running(conexion.get_query_status_throw_if_error(query_id)):
+            if stop.is_set():
+                return
+            time.sleep(poll_interval)
+        cs.get_results_from_sfqid(query_id)
+        for batch in cs.fetch_arrow_batches() or []:
+            if batch.num_rows:
+                if not _put(result_queue, (slice_filter, 'batch', batch), stop):
+                    return
+                rows += batch.num_rows
+        _put(result_queue, (slice_filter, 'done', rows), stop)
+    except Exception as e:
+        _put(result_queue, (slice_filter, 'error', e), stop)
+    finally:
+        cs.close()
+
+
+def sliced_query_batches(connection_factory, sql_template, lst_slices, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                         max_retries=DEFAULT_MAX_RETRIES, poll_interval=POLL_INTERVAL, queue_size=STREAM_QUEUE_SIZE):
+    """
+    Ejecuta una consulta dividida en porciones de forma asíncrona y concurrente, y devuelve los lotes Arrow
+    de todas las porciones a medida que se descargan. Una porción que falla sin haber entregado lotes se
+    reintenta individualmente; si agota sus reintentos, o falla después de entregar lotes, se cancelan las
+    pendientes y se lanza el error (stream_to_parquet descarta entonces la extracción completa).
+
+    Args:
+        connection_factory (callable): Función sin argumentos que devuelve una conexión (ej. conectar_snowflake_sso
+                                       con sus parámetros fijados). Se llama una vez; las porciones usan cursores
+                                       propios y la conexión se cierra al terminar.
+        sql_template (str): Consulta con el marcador '{slice_filter}' en su WHERE (ej. 'WHERE ... AND {slice_filter}').
+        lst_slices (list): Filtros SQL de cada porción (ver fiscal_period_slices / demand_group_slices).
+        max_concurrency (int, optional): Porciones en ejecución a la vez. Por defecto DEFAULT_MAX_CONCURRENCY.
+        max_retries (int, optional): Reintentos por porción. Por defecto DEFAULT_MAX_RETRIES.
+        poll_interval (float, optional): Segundos entre consultas de estado. Por defecto POLL_INTERVAL.
+        queue_size (int, optional): Lotes descargados en espera de ser consumidos. Por defecto STREAM_QUEUE_SIZE.
+
+    Returns:
+        generator: pa.Table por cada lote recibido.
+    """
+    conexion = connection_factory()
+    if conexion is None:
+        raise ConnectionError("No se pudo establecer la conexión para la extracción por porciones.")
+    dict_attempts = {slice_filter: 0 for slice_filter in lst_slices}
+    dict_rows = {slice_filter: 0 for slice_filter in lst_slices}
+    result_queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    try:
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            def submit(slice_filter):
+                dict_attempts[slice_filter] += 1
+                sql = sql_template.format(slice_filter=f"({slice_filter})")
+                executor.submit(_run_slice, conexion, sql, poll_interval, slice_filter, result_queue, stop)
+
+            try:
+                for slice_filter in lst_slices:
+                    submit(slice_filter)
+                pending = len(lst_slices)
+                while pending:
+                    slice_filter, kind, payload = result_queue.get()
+                    if kind == 'batch':
+                        dict_rows[slice_filter] += payload.num_rows
+                        yield payload
+                    elif kind == 'done':
+                        pending -= 1
+                        print(f"  Porción '{slice_filter}' completada: {payload} registros")
+                    elif dict_rows[slice_filter]:
+                        raise RuntimeError(f"La porción '{slice_filter}' falló después de entregar "
+                                           f"{dict_rows[slice_filter]} registros: {payload}") from payload
+                    elif dict_attempts[slice_filter] > max_retries:
+                        raise RuntimeError(f"La porción '{slice_filter}' falló tras "
+                                           f"{dict_attempts[slice_filter]} intentos: {payload}") from payload
+                    else:
+                        print(f"  [ADVERTENCIA] Reintentando la porción '{slice_filter}' "
+                              f"(intento {dict_attempts[slice_filter] + 1}): {payload}")
+                        submit(slice_filter)
+            finally:
+                # Las porciones en curso dejan de descargar y las que no empezaron no se ejecutan
+                stop.set()
+                executor.shutdown(wait=True, cancel_futures=True)
+    finally:
+        conexion.close()
@@ -0,0 +1,244 @@
+"""
+Módulo de extracción en streaming desde Snowflake hacia archivos Parquet.
+En lugar de cargar el resultado completo en memoria con fetch_pandas_all (ver Conection.query),
+recorre los lotes Arrow del cursor (fetch_arrow_batches) y los escribe a medida que llegan,
+repartidos en un archivo por partición (ej. por periodo fiscal para Demand):
+
+- La memoria queda acotada por el tamaño de un lote y la cola de escritura, no por el resultado.
+- La escritura se hace en un hilo aparte, por lo que se solapa con la descarga del siguiente lote.
+- Los archivos se escriben en '_staging' y se confirman juntos con el protocolo de Parquet_Commit:
+  una extracción interrumpida no deja archivos truncados ni mezcla particiones de dos ejecuciones.
+
+Las funciones solo usan la interfaz del cursor (execute / fetch_arrow_batches), por lo que pueden
+probarse con un cursor local que entregue lotes Arrow.
+
+Contiene las siguientes funciones:
+- query_batches: Ejecuta una consulta y devuelve sus lotes Arrow uno a uno.
+- stream_to_parquet: Escribe lotes Arrow en archivos Parquet particionados.
+"""
+
+#--------------------------------------------------
+#---------------- LIBRERIAS -----------------------
+#--------------------------------------------------
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+import glob
+import os
+import queue
+import shutil
+import threading
+
+from Fill_Rate.Process_ETL.Parquet_Commit import recover_parquet_dir, new_run_id, staging_path, commit_staged
+
+# Lotes en espera entre la descarga y la escritura (limita la memoria usada)
+STREAM_QUEUE_SIZE = 4
+# Lotes que se retienen como máximo para resolver el tipo de las columnas nulas del primer lote
+STREAM_SCHEMA_BATCHES = 8
+# Marca de fin de la cola de escritura
+_END_OF_STREAM = object()
+
+
+def query_batches(conexion, sql: str):
+    """
+    Ejecuta una consulta SQL y devuelve sus resultados como lotes Arrow, sin materializar el resultado completo.
+
+    Args:
+        conexion: Objeto de conexión activo de Snowflake (o cualquier objeto con cursor()).
+        sql (str): Cadena de texto con la consulta SQL a ejecutar.
+
+    Returns:
+        generator: pa.Table por cada lote recibido del servidor.
+    """
+    # --- EJECUCIÓN DE CONSULTA ---
+    cs = conexion.cursor()
+    try:
+        cs.execute(sql)
+        # fetch_arrow_batches puede devolver None si la consulta no tiene resultados
+        for batch in cs.fetch_arrow_batches() or []:
+            if batch.num_rows:
+                yield batch
+    finally:
+        cs.close()
+
+
+def _normalize_schema(schema):
+    """
+    Esquema estable para todos los lotes: Snowflake ajusta el ancho de los enteros (int8, int16, ...)
+    al rango de cada lote, por lo que los enteros se amplían a int64 y los decimales a float64.
+    """
+    lst_fields = []
+    for field in schema:
+        if pa.types.is_integer(field.type):
+            field = field.with_type(pa.int64())
+        elif pa.types.is_decimal(field.type):
+            field = field.with_type(pa.float64())
+        lst_fields.append(field.with_nullable(True))
+    return pa.schema(lst_fields)
+
+
+def _resolve_schema(lst_tables, final=False):
+    """
+    Esquema de escritura a partir de los primeros lotes. Una columna sin valores en un lote llega con tipo null
+    (Arrow no puede deducir su tipo), por lo que los esquemas de los lotes se unifican y el tipo null se promueve
+    al tipo que tenga la columna en otro lote. Mientras quede alguna columna null se devuelve None (hay que
+    esperar más lotes), salvo con final=True: las columnas que siguen sin valores se escriben como texto, al que
+    se puede convertir cualquier tipo que aparezca después.
+
+    Args:
+        lst_tables (list): Lotes recibidos hasta el momento (pa.Table).
+        final (bool, optional): No quedan más lotes por esperar. Por defecto False.
+
+    Returns:
+        pa.Schema: Esquema de escritura, o None si todavía hay columnas sin tipo.
+    """
+    schema = pa.unify_schemas([_normalize_schema(table.schema) for table in lst_tables], promote_options='permissive')
+    lst_null = [field.name for field in schema if pa.types.is_null(field.type)]
+    if not lst_null:
+        return schema
+    if not final:
+        return None
+    print(f"[ADVERTENCIA] Columnas sin valores en los primeros {len(lst_tables)} lotes; se escriben como texto: {lst_null}")
+    return pa.schema([field.with_type(pa.string()) if pa.types.is_null(field.type) else field for field in schema])
+
+
+def _format_partition_value(value):
+    """Valor de partición para el nombre del archivo: enteros con dos dígitos (ej. periodo 3 -> '03')."""
+    if value is None:
+        return 'NULL'
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, int):
+        return f"{value:02d}"
+    return str(value).strip().replace(os.sep, '_')
+
+
+def _split_batch(table, partition_columns):
+    """Divide un lote en (sufijo de partición, sub-tabla) según los valores de las columnas de partición."""
+    if not partition_columns:
+        yield None, table
+        return
+    df_keys = table.select(partition_columns).group_by(partition_columns).aggregate([]).to_pylist()
+    for dict_key in df_keys:
+        mask = None
+        for col in partition_columns:
+            value = dict_key[col]
+            condition = pc.is_null(table[col]) if value is None else pc.equal(table[col], value)
+            mask = condition if mask is None else pc.and_(mask, condition)
+        suffix = '-'.join(_format_partition_value(dict_key[col]) for col in partition_columns)
+        yield suffix, table.filter(mask)
+
+
+def stream_to_parquet(batches, output_path, name, partition_columns=None, queue_size=STREAM_QUEUE_SIZE,
+                      **writer_options):
+    """
+    Escribe lotes Arrow en archivos Parquet a medida que llegan. Con partition_columns se genera un archivo
+    '{name}_{valores}.parquet' por partición (ej. 'QueryDemand_2025-03.parquet') y los archivos '{name}_*.parquet'
+    de particiones que ya no vienen en el resultado se eliminan en la misma confirmación; sin partition_columns
+    se genera un único archivo '{name}.parquet'. Si la consulta no devuelve registros no se modifica nada.
+
+    Cada lote se divide por partición y se agrega como row group al escritor abierto de su archivo (un
+    pq.ParquetWriter por partición), de modo que ningún archivo se acumula en memoria. Los lotes pasan por una
+    cola acotada hacia un hilo de escritura, que escribe mientras se descarga el lote siguiente. El esquema se fija
+    con los primeros lotes (ver _resolve_schema): una columna sin valores (tipo null) en el primer lote toma el tipo
+    que tenga en los lotes siguientes.
+
+    Args:
+        batches (iterable): Lotes pa.Table (ej. query_batches).
+        output_path (str): Directorio de salida.
+        name (str): Nombre base de los archivos (ej. 'QueryDemand').
+        partition_columns (list, optional): Columnas de partición (ej. ['Fiscal Year', 'Fiscal Period']). Por defecto None.
+        queue_size (int, optional): Lotes en espera de escritura. Por defecto STREAM_QUEUE_SIZE.
+        **writer_options: Opciones de pq.ParquetWriter (ej. compression).
+
+    Returns:
+        dict: {'batches': int, 'rows': int, 'files': {archivo: filas}}.
+    """
+    output_path = str(output_path)
+    os.makedirs(output_path, exist_ok=True)
+    recover_parquet_dir(output_path)
+    run_id = new_run_id()
+    staging = staging_path(output_path, run_id)
+    os.makedirs(staging, exist_ok=True)
+
+    dict_writers, dict_rows = {}, {}
+    stats = {'batches': 0, 'rows': 0, 'files': dict_rows}
+    write_queue = queue.Queue(maxsize=queue_size)
+    lst_errors = []
+
+    def write_batch(table, schema):
+        # Cada lote se divide por partición y se agrega al escritor de su archivo
+        table = table.cast(schema)
+        for suffix, part in _split_batch(table, partition_columns):
+            filename = f"{name}.parquet" if suffix is None else f"{name}_{suffix}.parquet"
+            if filename not in dict_writers:
+                dict_writers[filename] = pq.ParquetWriter(os.path.join(staging, filename), schema, **writer_options)
+                dict_rows[filename] = 0
+            dict_writers[filename].write_table(part)
+            dict_rows[filename] += part.num_rows
+
+    def writer_loop():
+        # --- HILO DE ESCRITURA: consume los lotes de la cola hasta la marca de fin ---
+        # Los primeros lotes se retienen (como máximo STREAM_SCHEMA_BATCHES) hasta conocer el tipo de todas las columnas
+        schema, lst_first = None, []
+        while True:
+            table = write_queue.get()
+            end_of_stream = table is _END_OF_STREAM
+            if not lst_errors:
+                try:
+                    if schema is not None and not end_of_stream:
+                        write_batch(table, schema)
+                    elif schema is None:
+                        if not end_of_stream:
+                            lst_first.append(table)
+                        final = end_of_stream or len(lst_first) >= STREAM_SCHEMA_BATCHES
+                        schema = _resolve_schema(lst_first, final=final) if lst_first else None
+                        if schema is not None:
+                            for pending in lst_first:
+                                write_batch(pending, schema)
+                            lst_first = []
+                except Exception as e:
+                    lst_errors.append(e)
+            if end_of_stream:
+                return
+
+    writer = threading.Thread(target=writer_loop, name=f"stream-{name}", daemon=True)
+    writer.start()
+    try:
+        # --- DESCARGA: cada lote se entrega al hilo de escritura apenas llega ---
+        for table in batches:
+            if lst_errors:
+                break
+            write_queue.put(table)
+            stats['batches'] += 1
+            stats['rows'] += table.num_rows
+    except BaseException:
+        write_queue.put(_END_OF_STREAM)
+        writer.join()
+        for parquet_writer in dict_writers.values():
+            parquet_writer.close()
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    write_queue.put(_END_OF_STREAM)
+    writer.join()
+    for parquet_writer in dict_writers.values():
+        parquet_writer.close()
+    if lst_errors:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise lst_errors[0]
+
+    # --- CONFIRMACIÓN: todas las particiones reemplazan a las anteriores en una sola operación ---
+    lst_files = sorted(dict_rows)
+    if not lst_files:
+        # Un resultado vacío no reemplaza la extracción anterior
+        shutil.rmtree(staging, ignore_errors=True)
+        print(f"[ADVERTENCIA] La consulta no devolvió registros; se conservan los archivos '{name}' existentes.")
+        return stats
+    lst_delete = []
+    if partition_columns:
+        lst_delete = [os.path.basename(path)
+                      for path in glob.glob(os.path.join(output_path, glob.escape(name) + '_*.parquet'))
+                      if os.path.basename(path) not in dict_rows]
+    commit_staged(output_path, run_id, lst_files, lst_delete)
+    return stats
@@ -0,0 +1,175 @@
+"""
+Módulo de extracción incremental por marca de agua (watermark) desde Snowflake.
+En lugar de descargar la tabla completa en cada ejecución, consulta solo las filas modificadas desde la
+última extracción exitosa (columna de fecha de modificación >= marca de agua) y las combina con el
+almacén local (un archivo Parquet) por su clave:
+
+- La marca de agua es el valor máximo de la columna de modificación ya incorporado al almacén y se guarda
+  en '_watermark_<archivo>.json', junto al Parquet, solo después de confirmar el nuevo almacén.
+- La comparación usa '>=': las filas con la misma fecha que la marca de agua se vuelven a descargar y el
+  merge por clave las deja una sola vez (la operación es idempotente).
+- Las filas eliminadas en el origen no se detectan; una extracción completa periódica las depura.
+
+Contiene las siguientes funciones:
+- watermark_path: Ruta del archivo de la marca de agua de un almacén.
+- load_watermark: Lee la marca de agua registrada.
+- save_watermark: Guarda la marca de agua de forma atómica.
+- clear_watermark: Elimina la marca de agua (tras una extracción completa sin columna de modificación).
+- watermark_from_store: Marca de agua de un almacén recién extraído por completo.
+- merge_by_key: Reemplaza en el almacén las filas modificadas, por clave.
+- incremental_pull: Descarga las filas modificadas y actualiza el almacén y la marca de agua.
+"""
+
+#--------------------------------------------------
+#---------------- LIBRERIAS -----------------------
+#--------------------------------------------------
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+import json
+import os
+from datetime import datetime
+
+from Fill_Rate.Process_ETL.Parquet_Commit import write_parquet_files_atomic
+from .Stream_Parquet import query_batches
+
+
+def watermark_path(store_path):
+    """Ruta del archivo de la marca de agua de un almacén, ej. '_watermark_QuerySkuName.json'."""
+    store_path = str(store_path)
+    return os.path.join(os.path.dirname(store_path), f"_watermark_{os.path.splitext(os.path.basename(store_path))[0]}.json")
+
+
+def load_watermark(store_path):
+    """
+    Lee la marca de agua de un almacén.
+
+    Args:
+        store_path (str): Ruta del Parquet del almacén.
+
+    Returns:
+        str: Marca de agua (texto ISO) o None si no existe, no se puede leer o falta el almacén.
+    """
+    path = watermark_path(store_path)
+    if not os.path.exists(path) or not os.path.exists(store_path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('watermark')
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"  [ADVERTENCIA] No se pudo leer la marca de agua '{path}': {e}. Se hará una extracción completa.")
+        return None
+
+
+def save_watermark(store_path, watermark, rows=None):
+    """
+    Guarda la marca de agua de un almacén (archivo temporal + renombrado).
+
+    Args:
+        store_path (str): Ruta del Parquet del almacén.
+        watermark (str): Nueva marca de agua (texto ISO).
+        rows (int, optional): Filas descargadas en la ejecución, como referencia. Por defecto None.
+
+    Returns:
+        None: La función escribe el archivo.
+    """
+    path = watermark_path(store_path)
+    record = {'watermark': watermark, 'rows': rows, 'time': datetime.now().isoformat(timespec='seconds')}
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(record, f, ensure_ascii=False, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def clear_watermark(store_path):
+    """Elimina la marca de agua de un almacén, si existe; la siguiente extracción incremental será completa."""
+    path = watermark_path(store_path)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _max_watermark(table, watermark_column):
+    """Valor máximo (texto ISO) de la columna de modificación de una tabla Arrow, o None si está vacía."""
+    if table.num_rows == 0:
+        return None
+    value = pc.max(table[watermark_column]).as_py()
+    if value is None:
+        return None
+    return value.isoformat(sep=' ') if hasattr(value, 'isoformat') else str(value)
+
+
+def watermark_from_store(store_path, watermark_column):
+    """
+    Calcula la marca de agua de un almacén a partir de su columna de modificación (ej. tras una extracción
+    completa). Solo se lee esa columna del Parquet.
+
+    Args:
+        store_path (str): Ruta del Parquet del almacén.
+        watermark_column (str): Columna con la fecha de modificación.
+
+    Returns:
+        str: Marca de agua (texto ISO) o None si el almacén está vacío.
+    """
+    return _max_watermark(pq.read_table(store_path, columns=[watermark_column]), watermark_column)
+
+
+def merge_by_key(df_store, df_changes, key_columns):
+    """
+    Combina las filas modificadas con el almacén: las filas del almacén cuya clave aparece en df_changes se
+    reemplazan por las nuevas; las claves nuevas se agregan.
+
+    Args:
+        df_store (pd.DataFrame): Almacén actual.
+        df_changes (pd.DataFrame): Filas modificadas (mismas columnas).
+        key_columns (list): Columnas clave (ej. ['SKU', 'System']).
+
+    Returns:
+        pd.DataFrame: Almacén actualizado.
+    """
+    if df_changes.empty:
+        return df_store
+    # Una clave modificada varias veces en el intervalo: se conserva la última versión recibida
+    df_changes = df_changes.drop_duplicates(subset=key_columns, keep='last')
+    idx_store = pd.MultiIndex.from_frame(df_store[key_columns].astype(str))
+    idx_changes = pd.MultiIndex.from_frame(df_changes[key_columns].astype(str))
+    df_kept = df_store[~idx_store.isin(idx_changes)]
+    return pd.concat([df_kept, df_changes[df_store.columns]], ignore_index=True)
+
+
+def incremental_pull(conexion, sql_template, store_path, key_columns, watermark_column, watermark_alias=None,
+                     watermark=None):
+    """
+    Descarga las filas modificadas desde la marca de agua y actualiza el almacén local.
+
+    Args:
+        conexion: Conexión activa (o cualquier objeto con cursor(), ver query_batches).
+        sql_template (str): Consulta con el marcador '{watermark_filter}' en su WHERE.
+        store_path (str): Ruta del Parquet del almacén (debe existir).
+        key_columns (list): Columnas clave del almacén.
+        watermark_column (str): Columna de origen con la fecha de modificación (usada en el filtro).
+        watermark_alias (str, optional): Nombre de esa columna en el resultado. Por defecto watermark_column.
+        watermark (str, optional): Marca de agua desde la que se descarga. Por defecto la registrada (load_watermark).
+
+    Returns:
+        dict: {'rows': filas descargadas, 'total': filas del almacén, 'watermark': nueva marca de agua}.
+    """
+    watermark = watermark or load_watermark(store_path)
+    if watermark is None:
+        raise ValueError(f"El almacén '{store_path}' no tiene marca de agua; se requiere una extracción completa.")
+    sql = sql_template.format(watermark_filter=f"{watermark_column} >= TO_TIMESTAMP_NTZ('{watermark}')")
+    lst_batches = list(query_batches(conexion, sql))
+    df_store = pd.read_parquet(store_path, engine='pyarrow')
+    if lst_batches:
+        table_changes = pa.concat_tables(lst_batches, promote_options='permissive')
+        new_watermark = _max_watermark(table_changes, watermark_alias or watermark_column) or watermark
+        df_changes = table_changes.to_pandas()
+    else:
+        new_watermark, df_changes = watermark, df_store.iloc[0:0]
+    print(f"Filas modificadas desde {watermark}: {len(df_changes)}")
+    if not df_changes.empty:
+        df_store = merge_by_key(df_store, df_changes, key_columns)
+        # Escritura atómica del almacén (ver Parquet_Commit) antes de avanzar la marca de agua
+        write_parquet_files_atomic([(os.path.basename(str(store_path)), df_store)], os.path.dirname(str(store_path)))
+    save_watermark(store_path, new_watermark, rows=len(df_changes))
+    return {'rows': len(df_changes), 'total': len(df_store), 'watermark': new_watermark}
@@ -40,7 +40,9 @@ PATHS_CONFIG = {
             "Mothly_Update": RAW_DATA_DIR / 'Demand' / 'Mothly_Update'
         },
         "Processed": {
-            "OUTPUT_DIR_PROCESSED_PARQUETS": PROCESSED_DATAFLOW_DIR / 'Demand'
+            "OUTPUT_DIR_PROCESSED_PARQUETS": PROCESSED_DATAFLOW_DIR / 'Demand',
+            # Dataset particionado 'year=YYYY/month=MM' (ver Parquet_Dataset.publish_dataset)
+            "OUTPUT_DIR_PROCESSED_DATASET": PROCESSED_DATAFLOW_DIR / 'Demand_Dataset'
             }
     },
     
@@ -51,7 +53,9 @@ PATHS_CONFIG = {
             "Mothly_Update": RAW_DATA_DIR / 'Fill Rate' / 'Mothly_Update'
         },
         "Processed": {
-            "OUTPUT_DIR_PROCESSED_PARQUETS": PROCESSED_DATAFLOW_DIR / 'Fill_Rate'
+            "OUTPUT_DIR_PROCESSED_PARQUETS": PROCESSED_DATAFLOW_DIR / 'Fill_Rate',
+            # Dataset particionado 'year=YYYY/month=MM' (ver Parquet_Dataset.publish_dataset)
+            "OUTPUT_DIR_PROCESSED_DATASET": PROCESSED_DATAFLOW_DIR / 'Fill_Rate_Dataset'
         }
     },
     
@@ -62,7 +66,9 @@ PATHS_CONFIG = {
             "Mothly_Update": RAW_DATA_DIR / 'Sales' / 'Mothly_Update'            
         },
         "Processed": {
-            "OUTPUT_DIR_PROCESSED_PARQUETS": PROCESSED_DATAFLOW_DIR / 'Sales'            
+            "OUTPUT_DIR_PROCESSED_PARQUETS": PROCESSED_DATAFLOW_DIR / 'Sales',
+            # Dataset particionado 'year=YYYY/month=MM/fk_Country=..' (ver Parquet_Dataset.publish_dataset)
+            "OUTPUT_DIR_PROCESSED_DATASET": PROCESSED_DATAFLOW_DIR / 'Sales_Dataset'
         }
     },
 
@@ -124,6 +130,7 @@ class DemandPaths:
     # --- OUTPUTS ------
     #___________________
     OUTPUT_PROCESSED_PARQUETS_DIR: Path = PATHS_CONFIG['Demand']['Processed']['OUTPUT_DIR_PROCESSED_PARQUETS']
+    OUTPUT_PROCESSED_DATASET_DIR: Path = PATHS_CONFIG['Demand']['Processed']['OUTPUT_DIR_PROCESSED_DATASET']
     
 DEMAND_PATHS = DemandPaths()
 
@@ -141,6 +148,7 @@ class FillRatePaths:
     # --- OUTPUTS ------
     #___________________
     OUTPUT_PROCESSED_PARQUETS_DIR: Path = PATHS_CONFIG['FillRate']['Processed']['OUTPUT_DIR_PROCESSED_PARQUETS']
+    OUTPUT_PROCESSED_DATASET_DIR: Path = PATHS_CONFIG['FillRate']['Processed']['OUTPUT_DIR_PROCESSED_DATASET']
     
 FILLRATE_PATHS = FillRatePaths()
 
@@ -163,6 +171,7 @@ class SalesPaths:
     # --- OUTPUTS -------
     #___________________
     OUTPUT_PROCESSED_PARQUETS_DIR: Path = PATHS_CONFIG['Sales']['Processed']['OUTPUT_DIR_PROCESSED_PARQUETS']
+    OUTPUT_PROCESSED_DATASET_DIR: Path = PATHS_CONFIG['Sales']['Processed']['OUTPUT_DIR_PROCESSED_DATASET']
     
 SALES_PATHS = SalesPaths()
 
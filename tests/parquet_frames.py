@@ -0,0 +1,25 @@
+"""
+Datos de prueba compartidos por las pruebas de archivos Parquet por periodo (Key_Index, Delta_Store,
+Parquet_Dataset): filas con clave sustituta (KEY), clave legible (FK) y una métrica ('Qty').
+"""
+
+import pandas as pd
+
+KEY, FK = 'sk_key', 'fk_key'
+
+
+def frame(lst_rows, with_fk=True):
+    """
+    DataFrame de un proceso a partir de tuplas (periodo, clave sustituta, clave legible, Qty), con los
+    tipos que escribe group_parquet: clave sustituta 'UInt64' y periodo categórico.
+    Con with_fk=False se omite la clave legible (archivos de la carga completa actual).
+    """
+    df = pd.DataFrame(lst_rows, columns=['fk_year_month', KEY, FK, 'Qty'])
+    df[KEY] = df[KEY].astype('UInt64')
+    df['fk_year_month'] = df['fk_year_month'].astype('category')
+    return df if with_fk else df.drop(columns=FK)
+
+
+def current_rows(df, key=FK):
+    """Registros vigentes [key, 'Qty'] ordenados por key, para comparar resultados sin depender del orden."""
+    return df.sort_values(key).reset_index(drop=True)[[key, 'Qty']].astype({'Qty': float})
@@ -0,0 +1,90 @@
+"""
+Pruebas de la cadena de clasificación de productos (Classification_Rules): la versión vectorizada y las
+funciones fila a fila de column_processing dan el mismo resultado y ambas siguen la tabla de reglas vigente.
+"""
+
+import json
+import shutil
+
+import pandas as pd
+import pytest
+
+import Master_Products.Classification_Rules as Classification_Rules
+from Master_Products.Classification_Rules import (classify_corded_or_cordless, infer_product_attributes,
+                                                  clear_rules_cache, LST_ATTRIBUTE_COLUMNS)
+from Master_Products.column_processing import (corded_or_cordless_or_gas, assing_qty_batteries, assing_voltaje,
+                                               assign_bare, assign_sub_brand)
+
+
+@pytest.fixture
+def df_products():
+    return pd.DataFrame({
+        'SKU': ['DCD791D2', 'DWE4120', 'STA82001', 'E.112', 'CMCF800B', 'ABC123', 'XYZ9', 'DCB205/BR', 'GX100'],
+        'SKU Description': ['20V MAX DRILL', 'GRINDER 220V', 'MASS TOOL', 'FACOM KEY', 'FATMAX 20V DRILL',
+                            'CORDLESS 220V LAMP', 'BENCHTOP SAW 120V', '20V BATTERY', 'GASOLINE 2CC BLOWER'],
+        'Brand': ['DEWALT', 'DEWALT', 'STANLEY', 'FACOM', 'CRAFTSMAN', 'BLACK+DECKER', 'DEWALT', 'DEWALT', 'DEWALT'],
+        'GPP Category Description': ['DRILLS', 'GRINDERS', 'HAND TOOLS', 'HAND TOOLS', 'DRILLS', 'LIGHTS', 'SAWS',
+                                     'BATTERIES', 'OUTDOOR'],
+        'GPP Portfolio Description': ['20V DRILL', '-', '-', '-', '-', 'CDL LIGHTS', '-', '-', '-'],
+        'Corded / Cordless': ['-'] * 9,
+        'Batteries Qty': ['2', '-', '-', '-', '-', '-', '-', '-', '-'],
+        'Voltaje': ['-', '-', '-', '-', '-', '-', '-', '-', '36V'],
+    })
+
+
+def _row_wise(df):
+    df = df.copy()
+    df['Corded / Cordless'] = df.apply(
+        lambda row: corded_or_cordless_or_gas(row['SKU'], row['SKU Description'], row['GPP Category Description'],
+                                              row['GPP Portfolio Description'], row['Corded / Cordless']), axis=1)
+    df['Batteries Qty'] = df.apply(
+        lambda row: assing_qty_batteries(row['SKU'], row['SKU Description'], row['Batteries Qty']), axis=1)
+    df['Voltaje'] = df.apply(lambda row: assing_voltaje(row['SKU Description'], row['Voltaje']), axis=1)
+    df['Bare'] = df.apply(lambda row: assign_bare(row['SKU'], row['Batteries Qty'], row['Corded / Cordless']), axis=1)
+    df['Sub-Brand'] = df.apply(lambda row: assign_sub_brand(row['SKU'], row['SKU Description'], row['Brand']), axis=1)
+    return df[['Corded / Cordless'] + LST_ATTRIBUTE_COLUMNS]
+
+
+def _vectorized(df):
+    df = df.copy()
+    df['Corded / Cordless'] = classify_corded_or_cordless(df)
+    df[LST_ATTRIBUTE_COLUMNS] = infer_product_attributes(df)
+    return df[['Corded / Cordless'] + LST_ATTRIBUTE_COLUMNS]
+
+
+def _as_text(df):
+    return df.astype(object).where(df.notna(), '<NULL>').astype(str)
+
+
+def test_row_wise_and_vectorized_chains_match(df_products):
+    df_expected = _row_wise(df_products)
+    pd.testing.assert_frame_equal(_as_text(_vectorized(df_products)), _as_text(df_expected))
+    assert df_expected['Corded / Cordless'].tolist() == ['CORDLESS', 'CORDED', '-', '-', 'CORDLESS', 'CORDED',
+                                                         'CORDED', 'CORDLESS', 'GAS']
+    assert df_expected['Batteries Qty'].tolist() == ['2', '-', '-', '-', '0', '-', '-', '-', '-']
+    assert df_expected['Voltaje'].tolist() == ['20V', '-', '-', '-', '20V', '-', '20V', '20V', '36V']
+    assert _as_text(df_expected)['Bare'].tolist() == ['Non Bare', '<NULL>', '<NULL>', '<NULL>', 'Bare', '<NULL>', '<NULL>', 'Bare',
+                                                      '<NULL>']
+    assert df_expected['Sub-Brand'].tolist() == ['-', '-', 'MASS', 'IAR EXPERT', 'FATMAX', '-', '-', '-', '-']
+
+
+def test_rule_table_changes_reach_both_paths(df_products, tmp_path, monkeypatch):
+    path = tmp_path / 'classification_rules.json'
+    shutil.copy(Classification_Rules.DEFAULT_RULES_PATH, path)
+    monkeypatch.setattr(Classification_Rules, 'DEFAULT_RULES_PATH', str(path))
+    clear_rules_cache()
+    try:
+        dict_table = json.loads(path.read_text(encoding='utf-8'))
+        dict_table['version'] = 2
+        dict_table['voltages']['exclude'] = '120V'
+        dict_table['sub_brand'][2]['keywords'] = ['STA8']
+        dict_table['sub_brand'][2]['label'] = 'MASS PRO'
+        path.write_text(json.dumps(dict_table), encoding='utf-8')
+
+        df_expected = _row_wise(df_products)
+        pd.testing.assert_frame_equal(_as_text(_vectorized(df_products)), _as_text(df_expected))
+        assert df_expected['Voltaje'].tolist()[6] == '-'
+        assert df_expected['Sub-Brand'].tolist()[2] == 'MASS PRO'
+        assert Classification_Rules.get_rules()['version'] == 2
+    finally:
+        clear_rules_cache()
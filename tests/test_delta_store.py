@@ -0,0 +1,56 @@
+"""
+Pruebas del almacenamiento delta (Delta_Store): la lectura combinada (merge-on-read) y la compactación
+dan el mismo resultado que reemplazar los registros en la base.
+"""
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+import Fill_Rate.Process_ETL.Delta_Store as Delta_Store
+from Fill_Rate.Process_ETL.Delta_Store import (append_deltas, read_merged, compact_deltas, delta_periods,
+                                               list_deltas, validate_storage_mode)
+from Fill_Rate.Process_ETL.Key_Index import key_index_name
+from parquet_frames import KEY, FK, frame, current_rows
+
+
+@pytest.fixture
+def store(tmp_path):
+    # Base de 2026-01 con una fila anterior a la clave sustituta (sk nulo) que se reemplaza por su clave legible
+    frame([('2026-01', 1, 'a', 1.0), ('2026-01', 2, 'b', 2.0), ('2026-01', None, 'c', 3.0)]).to_parquet(
+        tmp_path / 'sales_2026-01.parquet', index=False)
+    return tmp_path
+
+
+def test_merge_on_read_and_compaction_match_upsert(store, monkeypatch):
+    append_deltas(str(store), frame([('2026-01', 2, 'b', 20.0), ('2026-01', 3, 'c', 30.0),
+                                      ('2026-02', 4, 'd', 4.0)]), 'sales', KEY, FK)
+    append_deltas(str(store), frame([('2026-02', 4, 'd', 40.0), ('2026-01', 5, 'e', 5.0)]), 'sales', KEY, FK)
+
+    assert delta_periods(str(store), 'sales') == ['2026-01', '2026-02']
+    assert len(list_deltas(str(store), 'sales', '2026-01')) == 2
+    df_expected = pd.DataFrame({FK: ['a', 'b', 'c', 'd', 'e'], 'Qty': [1.0, 20.0, 30.0, 40.0, 5.0]})
+    df_merged = read_merged(str(store), 'sales', ['2026-01', '2026-02'], KEY, FK)
+    pd.testing.assert_frame_equal(current_rows(df_merged), df_expected)
+
+    monkeypatch.setattr(Delta_Store, 'KEY_INDEX_ROW_GROUP_SIZE', 2)
+    assert compact_deltas(str(store), 'sales', KEY, FK) == ['2026-01', '2026-02']
+    assert delta_periods(str(store), 'sales') == []
+    df_base = pd.concat([pd.read_parquet(store / 'sales_2026-01.parquet'),
+                         pd.read_parquet(store / 'sales_2026-02.parquet')], ignore_index=True)
+    pd.testing.assert_frame_equal(current_rows(df_base), df_expected)
+    # La compactación escribe con el tamaño de row group del índice de claves y regenera el índice
+    assert pq.ParquetFile(store / 'sales_2026-01.parquet').metadata.num_row_groups == 2
+    assert (store / key_index_name('sales_2026-01.parquet')).exists()
+
+
+def test_compaction_respects_min_deltas(store):
+    append_deltas(str(store), frame([('2026-01', 1, 'a', 10.0)]), 'sales', KEY, FK)
+    assert compact_deltas(str(store), 'sales', KEY, FK, min_deltas=2) == []
+    assert delta_periods(str(store), 'sales') == ['2026-01']
+
+
+def test_unknown_storage_mode_is_rejected():
+    assert validate_storage_mode('delta') == 'delta'
+    with pytest.raises(ValueError, match='no válido'):
+        validate_storage_mode('merge')
@@ -0,0 +1,73 @@
+"""
+Pruebas de la carga completa de Fill Rate (Process_Files.main): la lectura por lotes (iter_read_files)
+produce los mismos registros que la lectura consolidada con read_files.
+"""
+
+from functools import partial
+
+import pandas as pd
+
+import config_paths
+import Fill_Rate.Process_ETL.Process_Files as Process_Files
+from Fill_Rate.Process_ETL.Process_Files import (read_files, asign_country_code, process_columns,
+                                                 format_columns, iter_read_files)
+
+LST_COLUMNS = ['fk_Date', 'fk_year_month', 'fk_Country', 'fk_Sold_To_Customer_Code', 'fk_SKU',
+               'clasification', 'sk_date_country_customer_clasification',
+               'Fill Rate First Pass Order Qty', 'Fill Rate First Pass Invoice Qty',
+               'Fill Rate First Pass Order $', 'Fill Rate First Pass Invoice $']
+LST_STR = ['fk_Date', 'fk_year_month', 'fk_Country', 'fk_Sold_To_Customer_Code', 'fk_SKU', 'clasification']
+LST_FLOAT = ['Fill Rate First Pass Order Qty', 'Fill Rate First Pass Invoice Qty',
+             'Fill Rate First Pass Order $', 'Fill Rate First Pass Invoice $']
+LST_CATEGORY = ['fk_Date', 'fk_year_month', 'fk_Country', 'fk_Sold_To_Customer_Code', 'fk_SKU', 'clasification']
+
+
+def _raw(lst_periods, customer):
+    return pd.DataFrame({
+        'Fiscal Year': ['2025'] * len(lst_periods), 'Fiscal Period': lst_periods,
+        'Country Code': ['co'] * len(lst_periods), 'Destination Country': [' col '] * len(lst_periods),
+        'Sold-To-Customer Code': [customer] * len(lst_periods), 'Global Material': ['dcd771'] * len(lst_periods),
+        'GPP Division': ['ptd'] * len(lst_periods), 'GPP Category': ['drills'] * len(lst_periods),
+        'GPP Portfolio': ['cordless'] * len(lst_periods),
+        'Fill Rate First Pass Order Qty': [str(i) for i in range(len(lst_periods))],
+        'Fill Rate First Pass Invoice Qty': ['1'] * len(lst_periods),
+        'Fill Rate First Pass Order $': ['2.5'] * len(lst_periods),
+        'Fill Rate First Pass Invoice $': [''] * len(lst_periods),
+    })
+
+
+def _sorted(df):
+    df = df[LST_COLUMNS].astype({col: str for col in LST_CATEGORY})
+    return df.sort_values(['fk_year_month', 'fk_Sold_To_Customer_Code', 'Fill Rate First Pass Order Qty'],
+                          ignore_index=True)
+
+
+def test_batched_full_load_matches_consolidated_read(tmp_path, monkeypatch):
+    raw_dir, out_dir = tmp_path / 'raw', tmp_path / 'Fill_Rate'
+    raw_dir.mkdir()
+    _raw(['1', '2', '2'], 'c1').to_excel(raw_dir / 'fill_rate_a.xlsx', index=False)
+    _raw(['1', '3', '3', '3'], 'c2').to_excel(raw_dir / 'fill_rate_b.xlsx', index=False)
+    country_file = tmp_path / 'country.xlsx'
+    pd.DataFrame({'Country Code Concat': ['COCOL'], 'Country': ['Colombia']}).to_excel(
+        country_file, sheet_name='Code Country Fillrate-Sales', index=False)
+
+    monkeypatch.setattr(config_paths.FillRatePaths, 'INPUT_RAW_HISTORIC_DIR', raw_dir)
+    monkeypatch.setattr(config_paths.FillRatePaths, 'INPUT_PROCESSED_COUNTRY_CODES_FILE', country_file)
+    monkeypatch.setattr(config_paths.FillRatePaths, 'OUTPUT_PROCESSED_PARQUETS_DIR', out_dir)
+    monkeypatch.setattr(config_paths.FillRatePaths, 'OUTPUT_PROCESSED_DATASET_DIR', tmp_path / 'Fill_Rate_Dataset')
+    # Lotes de 2 filas: cada archivo se procesa en varios lotes
+    monkeypatch.setattr(Process_Files, 'iter_read_files', partial(iter_read_files, chunk_size=2))
+    Process_Files.main()
+
+    df_country = pd.read_excel(country_file, sheet_name='Code Country Fillrate-Sales', dtype=str)
+    df_expected = read_files(str(raw_dir), max_workers=1, use_cache=False)
+    df_expected = asign_country_code(df_expected, df_country, export_unmatched=False)
+    df_expected = format_columns(process_columns(df_expected, LST_COLUMNS), LST_STR, LST_FLOAT, LST_CATEGORY,
+                                 ['sk_date_country_customer_clasification'])
+
+    df_written = pd.concat([pd.read_parquet(out_dir / f'fill_rate_2025-0{period}.parquet') for period in '123'],
+                           ignore_index=True)
+    pd.testing.assert_frame_equal(_sorted(df_written), _sorted(df_expected))
+    assert (tmp_path / 'Fill_Rate_Dataset' / 'year=2025' / 'month=03').is_dir()
+    # La carga completa guarda la clave sustituta y los componentes de la clave legible, no la clave legible
+    assert 'fk_date_country_customer_clasification' not in df_written.columns
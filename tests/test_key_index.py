@@ -0,0 +1,52 @@
+"""
+Pruebas del upsert por índice de claves (Key_Index.upsert_partitions): el resultado es el mismo que
+reemplazar los registros con update_parquets, reescribiendo solo los row groups afectados.
+"""
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from Fill_Rate.Process_ETL.Key_Index import upsert_partitions, read_key_index, key_index_name
+from Fill_Rate.Process_ETL.Update import update_parquets
+from parquet_frames import KEY, FK, frame, current_rows
+
+
+def test_upsert_matches_update_parquets_and_rewrites_only_affected_row_groups(tmp_path):
+    df_base = frame([('2026-01', key, None, float(key)) for key in range(1, 7)], with_fk=False)
+    df_base.to_parquet(tmp_path / 'sales_2026-01.parquet', index=False, row_group_size=2)
+    df_update = frame([('2026-01', 3, None, 30.0), ('2026-01', 9, None, 9.0), ('2026-02', 1, None, 100.0)],
+                      with_fk=False)
+
+    assert upsert_partitions(str(tmp_path), df_update, 'sales', KEY, row_group_size=2) == []
+
+    df_expected = update_parquets(df_base, df_update[df_update['fk_year_month'] == '2026-01'], fk_column=None,
+                                  sk_column=KEY)
+    df_written = pd.read_parquet(tmp_path / 'sales_2026-01.parquet')
+    pd.testing.assert_frame_equal(current_rows(df_written, KEY), current_rows(df_expected, KEY))
+    # Periodo nuevo: se escribe con su índice
+    assert pd.read_parquet(tmp_path / 'sales_2026-02.parquet')['Qty'].tolist() == [100.0]
+    assert (tmp_path / key_index_name('sales_2026-02.parquet')).exists()
+    # El índice del archivo reescrito corresponde a su contenido
+    df_index = read_key_index(str(tmp_path / 'sales_2026-01.parquet'), KEY)
+    assert sorted(df_index['key'].tolist()) == sorted(df_written[KEY].tolist())
+    assert pq.ParquetFile(tmp_path / 'sales_2026-01.parquet').metadata.num_row_groups == 4
+
+
+def test_legacy_rows_are_replaced_by_readable_key(tmp_path):
+    # Filas anteriores a la clave sustituta: sk nulo y clave legible en minúsculas (format_columns)
+    df_base = frame([('2026-01', None, 'co-a', 1.0), ('2026-01', 2, 'co-b', 2.0)])
+    df_base.to_parquet(tmp_path / 'sales_2026-01.parquet', index=False)
+    df_update = frame([('2026-01', 1, 'CO-A', 10.0)])
+
+    assert upsert_partitions(str(tmp_path), df_update, 'sales', KEY, fk_column=FK) == []
+    df_written = pd.read_parquet(tmp_path / 'sales_2026-01.parquet')
+    assert current_rows(df_written, KEY)['Qty'].tolist() == [10.0, 2.0]
+
+
+def test_files_without_surrogate_key_use_full_path(tmp_path):
+    frame([('2026-01', None, 'co-a', 1.0)]).drop(columns=KEY).to_parquet(
+        tmp_path / 'sales_2026-01.parquet', index=False)
+    df_update = frame([('2026-01', 1, 'CO-A', 10.0)])
+
+    assert upsert_partitions(str(tmp_path), df_update, 'sales', KEY, fk_column=FK) == ['2026-01']
+    assert pd.read_parquet(tmp_path / 'sales_2026-01.parquet')['Qty'].tolist() == [1.0]
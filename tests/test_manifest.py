@@ -0,0 +1,63 @@
+"""
+Pruebas del manifiesto de archivos procesados (Manifest): se registran todos los archivos leídos con éxito,
+también los que no tienen filas, y no los que fallaron.
+"""
+
+import pandas as pd
+
+from Fill_Rate.Process_ETL.Manifest import (manifest_path, load_manifest, save_manifest, pending_files,
+                                            summarize_files, record_files)
+
+
+def test_failed_files_are_not_recorded_and_are_retried(tmp_path):
+    for name in ('a.xlsx', 'b.xlsx'):
+        (tmp_path / name).write_bytes(name.encode())
+    path = manifest_path(str(tmp_path), 'sales')
+    manifest = load_manifest(path)
+    lst_pending, dict_hashes = pending_files(str(tmp_path), manifest)
+    assert [p.split('/')[-1] for p in lst_pending] == ['a.xlsx', 'b.xlsx']
+
+    # Solo a.xlsx se leyó (b.xlsx falló en read_files y no tiene filas en el DataFrame)
+    df_update = pd.DataFrame({'source_file': ['a.xlsx', 'a.xlsx'], 'Fiscal Year': ['2025', '2025'],
+                              'Fiscal Period': ['3', '4']})
+    save_manifest(path, record_files(manifest, dict_hashes, summarize_files(df_update)))
+
+    manifest = load_manifest(path)
+    assert set(manifest['files']) == {'a.xlsx'}
+    assert manifest['files']['a.xlsx']['rows'] == 2
+    assert manifest['files']['a.xlsx']['periods'] == ['2025-03', '2025-04']
+    lst_pending, _ = pending_files(str(tmp_path), manifest)
+    assert [p.split('/')[-1] for p in lst_pending] == ['b.xlsx']
+
+
+def test_files_without_rows_are_recorded(tmp_path):
+    from Fill_Rate.Process_ETL.Process_Files import read_files
+
+    pd.DataFrame({'Fiscal Year': ['2025'], 'Fiscal Period': ['3']}).to_excel(tmp_path / 'a.xlsx', index=False)
+    pd.DataFrame(columns=['Fiscal Year', 'Fiscal Period']).to_excel(tmp_path / 'b.xlsx', index=False)
+    path = manifest_path(str(tmp_path), 'sales')
+    manifest = load_manifest(path)
+    lst_pending, dict_hashes = pending_files(str(tmp_path), manifest)
+
+    df_update = read_files(str(tmp_path), files=lst_pending, max_workers=1, use_cache=False, add_source_column=True)
+    save_manifest(path, record_files(manifest, dict_hashes, summarize_files(df_update)))
+    manifest = load_manifest(path)
+    assert manifest['files']['a.xlsx']['periods'] == ['2025-03']
+    # b.xlsx no tiene filas, pero se leyó sin error: se registra y no se vuelve a procesar
+    assert (manifest['files']['b.xlsx']['rows'], manifest['files']['b.xlsx']['periods']) == (0, [])
+    assert pending_files(str(tmp_path), manifest)[0] == []
+
+
+def test_update_without_rows_records_the_files(tmp_path):
+    from Fill_Rate.Process_ETL.Process_Files import read_files
+
+    pd.DataFrame(columns=['Fiscal Year', 'Fiscal Period']).to_excel(tmp_path / 'b.xlsx', index=False)
+    path = manifest_path(str(tmp_path), 'sales')
+    manifest = load_manifest(path)
+    lst_pending, dict_hashes = pending_files(str(tmp_path), manifest)
+
+    # Mismo registro que la salida anticipada de los Update cuando df_update está vacío
+    df_update = read_files(str(tmp_path), files=lst_pending, max_workers=1, use_cache=False, add_source_column=True)
+    assert df_update.empty
+    save_manifest(path, record_files(manifest, dict_hashes, summarize_files(df_update)))
+    assert load_manifest(path)['files']['b.xlsx']['rows'] == 0
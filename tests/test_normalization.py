@@ -0,0 +1,52 @@
+"""
+Pruebas de la normalización compartida (Normalization): las marcas de df.attrs son solo una pista y
+el resultado no depende de que pandas las conserve o las propague.
+"""
+
+import numpy as np
+import pandas as pd
+
+from Shared_Information_for_Projects.Normalization import (normalize_series, normalize_columns, is_normalized,
+                                                           values_normalized)
+from Fill_Rate.Process_ETL.Process_Files import process_columns
+
+
+def test_normalization_is_idempotent():
+    serie = pd.Series([' co ', 'Pe', None, 'co', 'a b '])
+    once = normalize_series(serie)
+    pd.testing.assert_series_equal(normalize_series(once), once)
+    once_fk = normalize_series(serie, remove_spaces=True, as_str=False)
+    pd.testing.assert_series_equal(normalize_series(once_fk, remove_spaces=True, as_str=False), once_fk)
+
+
+def test_stale_mark_does_not_skip_normalization():
+    df = pd.DataFrame({'fk_Country': [' co ', 'pe']})
+    normalize_columns(df, ['fk_Country'])
+    assert is_normalized(df, 'fk_Country')
+    # assign propaga df.attrs: la marca queda desactualizada para los valores nuevos
+    df_stale = df.assign(fk_Country=[' mx ', 'cl'])
+    assert is_normalized(df_stale, 'fk_Country')
+    assert not values_normalized(df_stale['fk_Country'])
+    normalize_columns(df_stale, ['fk_Country'])
+    assert df_stale['fk_Country'].tolist() == ['MX', 'CL']
+
+
+def test_result_does_not_depend_on_marks():
+    df_marked = pd.DataFrame({'fk_SKU': [' dcd771 ', 'DW088', np.nan]})
+    normalize_columns(df_marked, ['fk_SKU'])
+    df_unmarked = df_marked.copy()
+    df_unmarked.attrs.clear()
+    normalize_columns(df_marked, ['fk_SKU'])
+    normalize_columns(df_unmarked, ['fk_SKU'])
+    pd.testing.assert_series_equal(df_marked['fk_SKU'], df_unmarked['fk_SKU'])
+    assert df_marked['fk_SKU'].tolist()[:2] == ['DCD771', 'DW088']
+
+
+def test_surrogate_key_stays_integer_without_marks():
+    df = pd.DataFrame({'Fiscal Year': ['2025'], 'Fiscal Period': ['1'], 'fk_Country': ['co'],
+                       'Sold-To-Customer Code': ['c1'], 'Global Material': ['dcd771'], 'GPP Division': ['ptd'],
+                       'GPP Category': ['drills'], 'GPP Portfolio': ['cordless'], 'Qty': ['1']})
+    df_processed = process_columns(df, ['fk_year_month', 'fk_Country', 'fk_SKU',
+                                        'sk_date_country_customer_clasification', 'Qty'])
+    assert str(df_processed['sk_date_country_customer_clasification'].dtype) == 'UInt64'
+    assert df_processed['fk_SKU'].tolist() == ['DCD771']
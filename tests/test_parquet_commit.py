@@ -0,0 +1,89 @@
+"""
+Pruebas de la escritura atómica (Parquet_Commit): commit_staged reemplaza y elimina archivos en una sola
+confirmación y recover_parquet_dir completa las ejecuciones preparadas y descarta las incompletas.
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+import Fill_Rate.Process_ETL.Parquet_Commit as Parquet_Commit
+from Fill_Rate.Process_ETL.Parquet_Commit import (new_run_id, staging_path, read_commit_log, commit_staged,
+                                                  recover_parquet_dir, STAGING_DIR)
+
+
+def _stage(output_path, run_id, dict_qty):
+    """Escribe en el directorio temporal de run_id un archivo por nombre: {nombre: cantidad}."""
+    staging = staging_path(str(output_path), run_id)
+    os.makedirs(staging, exist_ok=True)
+    for filename, qty in dict_qty.items():
+        pd.DataFrame({'Qty': [qty]}).to_parquet(os.path.join(staging, filename), index=False)
+    return list(dict_qty)
+
+
+def _qty(path):
+    return pd.read_parquet(path)['Qty'].tolist()
+
+
+def test_commit_replaces_adds_and_deletes_files(tmp_path):
+    for filename, qty in (('sales_2026-01.parquet', 1.0), ('sales_2026-02.parquet', 2.0)):
+        pd.DataFrame({'Qty': [qty]}).to_parquet(tmp_path / filename, index=False)
+    run_id = new_run_id()
+    lst_files = _stage(tmp_path, run_id, {'sales_2026-01.parquet': 10.0, 'sales_2026-03.parquet': 3.0})
+
+    commit_staged(str(tmp_path), run_id, lst_files, ['sales_2026-02.parquet'])
+    assert _qty(tmp_path / 'sales_2026-01.parquet') == [10.0]
+    assert _qty(tmp_path / 'sales_2026-03.parquet') == [3.0]
+    assert not (tmp_path / 'sales_2026-02.parquet').exists()
+    assert not os.path.exists(staging_path(str(tmp_path), run_id))
+    assert [(record['run_id'], record['status']) for record in read_commit_log(str(tmp_path))] == \
+        [(run_id, 'prepared'), (run_id, 'committed')]
+
+
+def test_prepared_run_is_completed_and_orphan_staging_is_discarded(tmp_path, monkeypatch):
+    pd.DataFrame({'Qty': [1.0]}).to_parquet(tmp_path / 'sales_2026-01.parquet', index=False)
+    pd.DataFrame({'Qty': [2.0]}).to_parquet(tmp_path / 'sales_2026-02.parquet', index=False)
+    run_id = new_run_id()
+    lst_files = _stage(tmp_path, run_id, {'sales_2026-01.parquet': 10.0, 'sales_2026-03.parquet': 3.0})
+
+    # El proceso muere después de registrar 'prepared' y de mover solo el primer archivo
+    def _crash(output_path, run_id, lst_files, lst_delete):
+        os.replace(os.path.join(staging_path(output_path, run_id), lst_files[0]),
+                   os.path.join(output_path, lst_files[0]))
+        raise KeyboardInterrupt
+    monkeypatch.setattr(Parquet_Commit, '_apply', _crash)
+    with pytest.raises(KeyboardInterrupt):
+        commit_staged(str(tmp_path), run_id, lst_files, ['sales_2026-02.parquet'])
+    monkeypatch.undo()
+    # Otra ejecución interrumpida antes de 'prepared': sus archivos nunca se confirmaron
+    orphan_id = new_run_id()
+    _stage(tmp_path, orphan_id, {'sales_2026-01.parquet': 99.0})
+
+    assert recover_parquet_dir(str(tmp_path)) == {'recovered': [run_id], 'rolled_back': [orphan_id]}
+    assert _qty(tmp_path / 'sales_2026-01.parquet') == [10.0]
+    assert _qty(tmp_path / 'sales_2026-03.parquet') == [3.0]
+    assert not (tmp_path / 'sales_2026-02.parquet').exists()
+    assert os.listdir(tmp_path / STAGING_DIR) == []
+    record = read_commit_log(str(tmp_path))[-1]
+    assert (record['run_id'], record['status'], record['recovered']) == (run_id, 'committed', True)
+    # Una segunda recuperación no tiene nada pendiente
+    assert recover_parquet_dir(str(tmp_path)) == {'recovered': [], 'rolled_back': []}
+
+
+def test_missing_prepared_file_is_reported(tmp_path):
+    run_id = new_run_id()
+    os.makedirs(staging_path(str(tmp_path), run_id))
+    with pytest.raises(FileNotFoundError):
+        Parquet_Commit._apply(str(tmp_path), run_id, ['sales_2026-01.parquet'], [])
+
+
+def test_commit_log_is_compacted(tmp_path, monkeypatch):
+    monkeypatch.setattr(Parquet_Commit, 'MAX_LOG_RECORDS', 4)
+    for qty in (1.0, 2.0, 3.0):
+        run_id = new_run_id()
+        commit_staged(str(tmp_path), run_id, _stage(tmp_path, run_id, {'sales_2026-01.parquet': qty}))
+    lst_records = read_commit_log(str(tmp_path))
+    assert len(lst_records) == 4
+    assert (lst_records[-1]['run_id'], lst_records[-1]['status']) == (run_id, 'committed')
+    assert _qty(tmp_path / 'sales_2026-01.parquet') == [3.0]
@@ -0,0 +1,68 @@
+"""
+Pruebas de la publicación del dataset particionado (Parquet_Dataset.publish_dataset): el dataset
+contiene los mismos registros vigentes que los archivos planos con sus deltas.
+"""
+
+import pandas as pd
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from Fill_Rate.Process_ETL.Delta_Store import append_deltas
+from Fill_Rate.Process_ETL.Parquet_Dataset import publish_dataset, stored_periods
+from parquet_frames import KEY, FK, frame
+
+
+def _read_dataset(dataset_path):
+    df = ds.dataset(str(dataset_path), format='parquet', partitioning='hive').to_table().to_pandas()
+    return df.sort_values(FK).reset_index(drop=True)
+
+
+def test_publish_matches_flat_files_and_deltas(tmp_path):
+    flat, dataset = tmp_path / 'Fill_Rate', tmp_path / 'Fill_Rate_Dataset'
+    flat.mkdir()
+    frame([('2025-12', 1, 'a', 1.0), ('2025-12', 2, 'b', 2.0)]).to_parquet(flat / 'fill_rate_2025-12.parquet')
+    frame([('2026-01', 3, 'c', 3.0)]).to_parquet(flat / 'fill_rate_2026-01.parquet')
+    # El periodo 2026-02 solo existe como delta
+    append_deltas(str(flat), frame([('2025-12', 2, 'b', 20.0), ('2026-02', 4, 'd', 4.0)]), 'fill_rate', KEY, FK)
+
+    assert stored_periods(str(flat), 'fill_rate') == ['2025-12', '2026-01', '2026-02']
+    assert publish_dataset(str(flat), str(dataset), 'fill_rate', key_column=KEY, fk_column=FK) == \
+        ['2025-12', '2026-01', '2026-02']
+    assert (dataset / 'year=2026' / 'month=02').is_dir()
+    df = _read_dataset(dataset)
+    assert df[FK].tolist() == ['a', 'b', 'c', 'd']
+    assert df['Qty'].tolist() == [1.0, 20.0, 3.0, 4.0]
+    assert df['year'].astype(str).tolist() == ['2025', '2025', '2026', '2026']
+
+
+def test_publish_replaces_updated_periods_and_prunes_on_full_load(tmp_path):
+    flat, dataset = tmp_path / 'Demand', tmp_path / 'Demand_Dataset'
+    flat.mkdir()
+    frame([('2026-01', 1, 'a', 1.0)]).to_parquet(flat / 'demand_2026-01.parquet')
+    frame([('2026-02', 2, 'b', 2.0)]).to_parquet(flat / 'demand_2026-02.parquet')
+    publish_dataset(str(flat), str(dataset), 'demand')
+
+    # Actualización de un periodo: solo se reescribe su carpeta, sin duplicar registros
+    frame([('2026-01', 1, 'a', 10.0), ('2026-01', 3, 'c', 3.0)]).to_parquet(flat / 'demand_2026-01.parquet')
+    assert publish_dataset(str(flat), str(dataset), 'demand', periods=['2026-01']) == ['2026-01']
+    assert _read_dataset(dataset)['Qty'].tolist() == [10.0, 2.0, 3.0]
+
+    # Carga completa sin el periodo 2026-02: su carpeta se elimina del dataset
+    (flat / 'demand_2026-02.parquet').unlink()
+    publish_dataset(str(flat), str(dataset), 'demand')
+    assert not (dataset / 'year=2026' / 'month=02').exists()
+    assert _read_dataset(dataset)[FK].tolist() == ['a', 'c']
+
+
+def test_publish_with_sales_options_partitions_by_country(tmp_path):
+    from Sales.Process_ETL.Process_Files import SALES_DATASET_OPTIONS
+    flat, dataset = tmp_path / 'Sales', tmp_path / 'Sales_Dataset'
+    flat.mkdir()
+    frame([('2026-01', 1, 'a', 1.0), ('2026-01', 2, 'b', 2.0)]).assign(fk_Country=['co', 'pe']).to_parquet(
+        flat / 'sales_2026-01.parquet')
+    publish_dataset(str(flat), str(dataset), 'sales', key_column=KEY, **SALES_DATASET_OPTIONS)
+
+    lst_files = sorted(dataset.glob('year=2026/month=01/fk_Country=*/*.parquet'))
+    assert [path.parent.name for path in lst_files] == ['fk_Country=co', 'fk_Country=pe']
+    assert pq.ParquetFile(lst_files[0]).metadata.row_group(0).column(0).compression == 'ZSTD'
+    assert _read_dataset(dataset)['Qty'].tolist() == [1.0, 2.0]
@@ -0,0 +1,66 @@
+"""
+Pruebas de la capa de datos de referencia (Reference_Data): un archivo reescrito nunca se sirve desde la caché,
+aunque conserve el tamaño y la fecha de modificación, y los índices por clave normalizada se guardan en Parquet
+y solo se reutilizan para el mismo contenido.
+"""
+
+import os
+
+import pandas as pd
+
+from Shared_Information_for_Projects.Reference_Data import read_reference, clear_reference_cache, country_region_map
+
+
+def test_rewritten_file_with_same_size_and_mtime_is_reread(tmp_path):
+    path = tmp_path / 'Country_Codes.xlsx'
+    pd.DataFrame({'Country': ['CHILE'], 'Region': ['SOUTH']}).to_excel(path, index=False)
+    clear_reference_cache()
+    try:
+        df_first = read_reference(str(path))
+        assert df_first['Region'].tolist() == ['SOUTH']
+        # Los llamadores reciben copias
+        df_first.loc[0, 'Region'] = 'CHANGED'
+        assert read_reference(str(path))['Region'].tolist() == ['SOUTH']
+
+        stat = os.stat(path)
+        pd.DataFrame({'Country': ['CHILE'], 'Region': ['NORTH']}).to_excel(path, index=False)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        assert os.stat(path).st_mtime_ns == stat.st_mtime_ns
+        assert read_reference(str(path))['Region'].tolist() == ['NORTH']
+    finally:
+        clear_reference_cache()
+
+
+def test_country_region_index_is_persisted_and_checked_against_content(tmp_path):
+    path = tmp_path / 'Country_Codes.xlsx'
+    pd.DataFrame({'Country': ['CHILE', 'CHILE', 'PERU'], 'Region': ['SOUTH', 'SOUTH', 'ANDEAN']}).to_excel(
+        path, index=False)
+    clear_reference_cache()
+    try:
+        df_country = read_reference(str(path))
+        assert country_region_map(df_country).to_dict() == {'CHILE': 'SOUTH', 'PERU': 'ANDEAN'}
+        assert len(list((tmp_path / '_cache_reference').glob('*idx-country_region*.parquet'))) == 1
+
+        clear_reference_cache()
+        assert country_region_map(read_reference(str(path))).to_dict() == {'CHILE': 'SOUTH', 'PERU': 'ANDEAN'}
+        # Un DataFrame modificado por el llamador conserva la procedencia pero no recibe el índice guardado
+        df_changed = read_reference(str(path))
+        df_changed.loc[2, 'Region'] = 'NORTH'
+        assert country_region_map(df_changed).to_dict() == {'CHILE': 'SOUTH', 'PERU': 'NORTH'}
+    finally:
+        clear_reference_cache()
+
+
+def test_content_hash_is_reused_while_the_file_is_unchanged(tmp_path, monkeypatch):
+    import Fill_Rate.Process_ETL.Excel_Cache as Excel_Cache
+
+    path = tmp_path / 'Country_Codes.xlsx'
+    pd.DataFrame({'Country': ['CHILE'], 'Region': ['SOUTH']}).to_excel(path, index=False)
+    lst_calls = []
+    monkeypatch.setattr(Excel_Cache, 'file_hash', lambda filename: lst_calls.append(filename) or 'hash')
+    key = Excel_Cache.cache_key(str(path))
+    assert Excel_Cache.cache_key(str(path)) == key
+    assert len(lst_calls) == 1
+    path.write_bytes(path.read_bytes())
+    Excel_Cache.cache_key(str(path))
+    assert len(lst_calls) == 2
@@ -0,0 +1,120 @@
+"""
+Pruebas del motor de enriquecimiento de Sales (build_sales_lookups / enrich_sales): mismo resultado que la
+secuencia assign_nsv -> ... -> assign_NSV_NPI_w_Combo y región CCA/PUB resuelta aunque el maestro de países
+llegue sin normalizar.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from Sales.Process_ETL.Process_Files import (build_sales_lookups, enrich_sales, assign_nsv,
+                                             assign_selling_unit_price, assign_NPI_New_Carryover, LaunchYear_VR,
+                                             assign_num_batteries, assign_NSV_NPI_w_Combo)
+from Shared_Information_for_Projects.Normalization import normalize_columns
+
+LST_NEW_COLUMNS = ['NSV', 'Selling Unit Price', 'New New/Carryover', 'NPI Incremental Sales $',
+                   'Launch Year', 'VR %', 'Num Batteries Sales', 'Net Sales NPI w/Combo']
+
+
+@pytest.fixture
+def references():
+    # Maestro de países tal como se lee del Excel (mayúsculas/espacios sin normalizar)
+    df_country = pd.DataFrame({'Country': [' guatemala', 'Costa Rica', 'Mexico ', 'Panama'],
+                               'Region': ['cca', 'CCA ', 'mex', 'pub']})
+    df_md_product = pd.DataFrame({'SKU': ['DCD1', 'DCD2', 'DCD3'], 'Brand': ['DEWALT', 'DEWALT', 'STANLEY'],
+                                  'GPP SBU': ['PTA', 'PTA', 'HTS'], 'Batteries Qty': ['2', '0', '1']})
+    df_gross_to_net = pd.DataFrame({'Date': ['20240101', '20240101', '20240101'], 'Country': ['CCA', 'MEX', 'PUB'],
+                                    'Brand': ['DEWALT', 'DEWALT', 'STANLEY'], 'SBU': ['PTA', 'PTA', 'HTS'],
+                                    'G2N%': ['0.1', '0.2', '0.3']})
+    df_npi = pd.DataFrame({'fk_YearMonthCountrySku': ['2024-01-CCA-DCD1', '2024-01-MEXICO-DCD2', '2024-01-PUB-DCD3'],
+                           'New New/Carryover': ['New New', 'Carryover', 'New New'],
+                           'Incremental %': ['0.5', '0.2', '0.4'], 'Fiscal Year': ['2023', '2020', '2024'],
+                           'Region': ['CCA', 'MEX', 'PUB'], 'SKU': ['DCD1', 'DCD2', 'DCD3']})
+    df_filter_npi = pd.DataFrame({'fk_YearCountrySKU': ['2024-GUATEMALA-DCD1'], 'Combo %': ['0.8']})
+    return df_country, df_md_product, df_gross_to_net, df_npi, df_filter_npi
+
+
+@pytest.fixture
+def df_sales():
+    # Filas con fk_Country ya normalizado (salida de asign_country_code / process_columns)
+    return pd.DataFrame({'fk_Date': ['20240101'] * 5, 'fk_year_month': ['2024-01'] * 5,
+                         'fk_Country': ['GUATEMALA', 'COSTA RICA', 'MEXICO', 'PANAMA', 'CHILE'],
+                         'fk_SKU': ['dcd1', 'DCD1', 'DCD2', 'DCD3', 'DCD1'],
+                         'Total Sales': ['100', '200', '300', '400', '500'],
+                         'Units Sold': ['1', '2', '3', '4', '5']})
+
+
+def legacy_chain(df_sales, df_country, df_md_product, df_gross_to_net, df_npi, df_filter_npi):
+    """Secuencia original de funciones assign_* (con el maestro de países normalizado, como en user-009)."""
+    df_country = normalize_columns(df_country.copy(), df_country.columns)
+    df = df_sales.copy()
+    df = assign_nsv(df, df_md_product.copy(), df_gross_to_net.copy(), df_country)
+    df = assign_selling_unit_price(df)
+    df = assign_NPI_New_Carryover(df, df_npi.copy(), df_country)
+    df = LaunchYear_VR(df, df_npi.copy(), df_country)
+    df = assign_num_batteries(df, df_md_product.copy())
+    return assign_NSV_NPI_w_Combo(df, df_filter_npi.copy())
+
+
+def test_enrich_sales_matches_legacy_chain(references, df_sales):
+    df_expected = legacy_chain(df_sales, *references)
+    df_result = enrich_sales(df_sales.copy(), build_sales_lookups(references[1], references[2], references[0],
+                                                                  references[3], references[4]))
+    assert len(df_result) == len(df_expected)
+    for col in LST_NEW_COLUMNS:
+        expected, result = df_expected[col].to_numpy(), df_result[col].to_numpy()
+        if df_expected[col].dtype.kind == 'f':
+            np.testing.assert_allclose(result.astype(float), expected.astype(float), err_msg=col)
+        else:
+            assert list(map(str, result)) == list(map(str, expected)), col
+
+
+def test_cca_and_pub_rows_get_their_region_with_raw_country_master(references, df_sales):
+    df_country, df_md_product, df_gross_to_net, df_npi, df_filter_npi = references
+    dict_lookups = build_sales_lookups(df_md_product, df_gross_to_net, df_country, df_npi, df_filter_npi)
+    df_result = enrich_sales(df_sales.copy(), dict_lookups).set_index('fk_Country')
+
+    # CCA: el cruce NPI usa la región como país y el G2N la región CCA
+    assert df_result.loc['GUATEMALA', 'New New/Carryover'] == 'New New'
+    assert df_result.loc['COSTA RICA', 'New New/Carryover'] == 'New New'
+    assert df_result.loc['GUATEMALA', 'NSV'] == pytest.approx(90.0)
+    assert df_result.loc['GUATEMALA', 'Launch Year'] == 'npi2023'
+    # PUB
+    assert df_result.loc['PANAMA', 'New New/Carryover'] == 'New New'
+    assert df_result.loc['PANAMA', 'NSV'] == pytest.approx(280.0)
+    # País sin región: sin G2N ni NPI
+    assert df_result.loc['CHILE', 'New New/Carryover'] == 'Core'
+    assert df_result.loc['CHILE', 'NSV'] == pytest.approx(500.0)
+    # El maestro de países recibido no se modifica
+    assert df_country['Country'].tolist() == [' guatemala', 'Costa Rica', 'Mexico ', 'Panama']
+
+
+def test_lookups_are_served_from_persisted_indexes(references, df_sales, tmp_path, monkeypatch):
+    import Sales.Process_ETL.Process_Files as Process_Files
+    from Shared_Information_for_Projects.Reference_Data import read_reference, clear_reference_cache
+
+    lst_paths = [tmp_path / f'reference_{i}.xlsx' for i in range(len(references))]
+    for df, path in zip(references, lst_paths):
+        df.to_excel(path, index=False)
+    clear_reference_cache()
+    try:
+        df_country, df_md_product, df_gross_to_net, df_npi, df_filter_npi = [read_reference(str(path))
+                                                                               for path in lst_paths]
+        df_expected = enrich_sales(df_sales.copy(), build_sales_lookups(df_md_product, df_gross_to_net, df_country,
+                                                                        df_npi, df_filter_npi))
+        assert len(list((tmp_path / '_cache_reference').glob('*idx-sales_*.parquet'))) == 7
+
+        # Nueva ejecución: los índices se leen de Parquet, sin reconstruirlos
+        clear_reference_cache()
+        for name in ['_index_md_product', '_index_batteries', '_index_country', '_index_g2n', '_index_npi',
+                     '_index_npi_new', '_index_combo']:
+            monkeypatch.setattr(Process_Files, name, lambda df: pytest.fail('índice reconstruido'))
+        df_country, df_md_product, df_gross_to_net, df_npi, df_filter_npi = [read_reference(str(path))
+                                                                               for path in lst_paths]
+        df_result = enrich_sales(df_sales.copy(), build_sales_lookups(df_md_product, df_gross_to_net, df_country,
+                                                                      df_npi, df_filter_npi))
+    finally:
+        clear_reference_cache()
+    for col in LST_NEW_COLUMNS:
+        assert list(map(str, df_result[col])) == list(map(str, df_expected[col])), col
@@ -0,0 +1,128 @@
+"""
+Pruebas de la extracción por porciones (Sliced_Query) con una conexión local: entrega en streaming de los lotes,
+reintento de porciones fallidas, aborto sin duplicados y cierre de la conexión.
+"""
+
+import threading
+
+import pyarrow as pa
+import pytest
+
+from Snowflake.Conection.Sliced_Query import sliced_query_batches, fiscal_period_slices
+from Snowflake.Conection.Stream_Parquet import stream_to_parquet
+
+SQL_TEMPLATE = "SELECT * FROM DEMAND WHERE {slice_filter}"
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute_async(self, sql):
+        self.sql = sql
+        self.sfqid = sql
+        self.connection.register(sql)
+
+    def get_results_from_sfqid(self, query_id):
+        self.query_id = query_id
+
+    def fetch_arrow_batches(self):
+        return self.connection.dict_fetch[self.query_id]()
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """Conexión local: dict_fetch asigna a cada consulta una función que devuelve sus lotes (o lanza un error)."""
+
+    def __init__(self, dict_fetch, dict_failures=None):
+        self.dict_fetch = dict_fetch
+        self.dict_failures = dict(dict_failures or {})
+        self.lst_executed = []
+        self.closed = False
+        self.lock = threading.Lock()
+
+    def register(self, sql):
+        with self.lock:
+            self.lst_executed.append(sql)
+            if self.dict_failures.get(sql):
+                self.dict_failures[sql] -= 1
+                raise RuntimeError('consulta rechazada')
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def get_query_status_throw_if_error(self, query_id):
+        return 'SUCCESS'
+
+    def is_still_running(self, status):
+        return False
+
+    def close(self):
+        self.closed = True
+
+
+def _sql(slice_filter):
+    return SQL_TEMPLATE.format(slice_filter=f"({slice_filter})")
+
+
+def _batch(year, period, qty):
+    return pa.table({'Fiscal Year': [year] * len(qty), 'Fiscal Period': [period] * len(qty), 'Qty': qty})
+
+
+def test_batches_are_streamed_before_the_slice_finishes():
+    released = threading.Event()
+
+    def fetch():
+        yield _batch(2026, 3, [1, 2])
+        # El segundo lote solo se descarga después de que el consumidor recibió el primero
+        assert released.wait(timeout=5)
+        yield _batch(2026, 3, [3])
+
+    lst_slices = fiscal_period_slices([(2026, 3)])
+    conexion = FakeConnection({_sql(lst_slices[0]): fetch})
+    batches = sliced_query_batches(lambda: conexion, SQL_TEMPLATE, lst_slices, poll_interval=0)
+    first = next(batches)
+    assert first.num_rows == 2
+    released.set()
+    assert [batch.num_rows for batch in batches] == [1]
+    assert conexion.closed
+
+
+def test_failed_slice_is_retried_and_written_once(tmp_path):
+    lst_slices = fiscal_period_slices([(2026, 3), (2026, 4)])
+    dict_fetch = {_sql(lst_slices[0]): lambda: iter([_batch(2026, 3, [1, 2]), _batch(2026, 3, [3])]),
+                  _sql(lst_slices[1]): lambda: iter([_batch(2026, 4, [4])])}
+    conexion = FakeConnection(dict_fetch, dict_failures={_sql(lst_slices[1]): 1})
+
+    stats = stream_to_parquet(sliced_query_batches(lambda: conexion, SQL_TEMPLATE, lst_slices, poll_interval=0),
+                              tmp_path, name='QueryDemand', partition_columns=['Fiscal Year', 'Fiscal Period'])
+
+    assert conexion.lst_executed.count(_sql(lst_slices[1])) == 2
+    assert stats['rows'] == 4
+    assert stats['files'] == {'QueryDemand_2026-03.parquet': 3, 'QueryDemand_2026-04.parquet': 1}
+    assert conexion.closed
+
+
+def test_slice_failing_after_delivering_batches_aborts_without_retry(tmp_path):
+    def fetch():
+        yield _batch(2026, 3, [1])
+        raise ConnectionError('descarga interrumpida')
+
+    lst_slices = fiscal_period_slices([(2026, 3)])
+    conexion = FakeConnection({_sql(lst_slices[0]): fetch})
+    with pytest.raises(RuntimeError, match='después de entregar 1 registros'):
+        stream_to_parquet(sliced_query_batches(lambda: conexion, SQL_TEMPLATE, lst_slices, poll_interval=0),
+                          tmp_path, name='QueryDemand', partition_columns=['Fiscal Year', 'Fiscal Period'])
+    assert conexion.lst_executed == [_sql(lst_slices[0])]
+    assert not list(tmp_path.glob('*.parquet'))
+    assert conexion.closed
+
+
+def test_slice_exhausting_retries_raises_and_closes_connection():
+    lst_slices = fiscal_period_slices([(2026, 3)])
+    conexion = FakeConnection({_sql(lst_slices[0]): lambda: iter([])}, dict_failures={_sql(lst_slices[0]): 5})
+    with pytest.raises(RuntimeError, match='tras 3 intentos'):
+        list(sliced_query_batches(lambda: conexion, SQL_TEMPLATE, lst_slices, max_retries=2, poll_interval=0))
+    assert conexion.closed
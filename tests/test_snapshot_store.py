@@ -0,0 +1,83 @@
+"""
+Pruebas de la carga incremental por snapshots (Snapshot_Store): solo se reescriben los periodos que cambiaron,
+también los modificados fuera del snapshot o con deltas pendientes, y el historial se compara y se poda.
+"""
+
+import pandas as pd
+
+from Fill_Rate.Process_ETL.Delta_Store import append_deltas
+from Fill_Rate.Process_ETL.Snapshot_Store import (write_incremental, read_snapshot_history, read_snapshot,
+                                                  compare_snapshots)
+
+KEY_COLUMNS = ['fk_year_month', 'fk_SKU']
+
+
+def _forecast(dict_qty):
+    """Foto completa con una fila por periodo y SKU: {(periodo, sku): cantidad}."""
+    df = pd.DataFrame([(period, sku, index, qty) for index, ((period, sku), qty) in enumerate(dict_qty.items())],
+                      columns=['fk_year_month', 'fk_SKU', 'sk_key', 'FCST_QTY'])
+    df['sk_key'] = df['sk_key'].astype('UInt64')
+    df['fk_year_month'] = df['fk_year_month'].astype('category')
+    return df
+
+
+DICT_BASE = {('2026-01', 'a'): 1.0, ('2026-02', 'a'): 2.0, ('2026-02', 'b'): 3.0, ('2026-03', 'a'): 4.0}
+
+
+def test_only_changed_periods_are_rewritten_and_removed_periods_are_deleted(tmp_path):
+    result = write_incremental(_forecast(DICT_BASE), tmp_path, 'demand')
+    assert result['changed'] == ['2026-01', '2026-02', '2026-03']
+
+    # Misma foto: ningún periodo cambia y no se registra un snapshot nuevo
+    result = write_incremental(_forecast(DICT_BASE), tmp_path, 'demand')
+    assert result == {'snapshot_id': None, 'changed': [], 'unchanged': ['2026-01', '2026-02', '2026-03'],
+                      'removed': []}
+    assert len(read_snapshot_history(str(tmp_path), 'demand')) == 1
+
+    # Nueva versión del forecast: cambia 2026-02 y ya no viene 2026-03
+    mtime_unchanged = (tmp_path / 'demand_2026-01.parquet').stat().st_mtime_ns
+    dict_new = {('2026-01', 'a'): 1.0, ('2026-02', 'a'): 2.0, ('2026-02', 'b'): 30.0}
+    result = write_incremental(_forecast(dict_new), tmp_path, 'demand')
+    assert (result['changed'], result['unchanged'], result['removed']) == (['2026-02'], ['2026-01'], ['2026-03'])
+    assert (tmp_path / 'demand_2026-01.parquet').stat().st_mtime_ns == mtime_unchanged
+    assert not (tmp_path / 'demand_2026-03.parquet').exists()
+    assert pd.read_parquet(tmp_path / 'demand_2026-02.parquet')['FCST_QTY'].tolist() == [2.0, 30.0]
+
+    # La comparación solo incluye las claves de los periodos que cambiaron
+    df_compare = compare_snapshots(tmp_path, 'demand', KEY_COLUMNS, ['FCST_QTY'])
+    df_compare['fk_year_month'] = df_compare['fk_year_month'].astype(str)
+    assert df_compare[KEY_COLUMNS + ['FCST_QTY_diff']].values.tolist() == [['2026-02', 'b', 27.0],
+                                                                           ['2026-03', 'a', -4.0]]
+    # La versión anterior se reconstruye desde los snapshots
+    assert read_snapshot(tmp_path, 'demand', snapshot_id=-2)['FCST_QTY'].tolist() == [1.0, 2.0, 3.0, 4.0]
+
+
+def test_file_changed_outside_the_snapshot_is_rewritten(tmp_path):
+    write_incremental(_forecast(DICT_BASE), tmp_path, 'demand')
+    # Otro proceso (ej. Update) reescribe el periodo 2026-01 después del snapshot
+    _forecast({('2026-01', 'a'): 100.0}).to_parquet(tmp_path / 'demand_2026-01.parquet', index=False)
+
+    result = write_incremental(_forecast(DICT_BASE), tmp_path, 'demand')
+    assert result['changed'] == ['2026-01']
+    assert pd.read_parquet(tmp_path / 'demand_2026-01.parquet')['FCST_QTY'].tolist() == [1.0]
+
+
+def test_period_with_pending_deltas_is_rewritten(tmp_path):
+    write_incremental(_forecast(DICT_BASE), tmp_path, 'demand')
+    append_deltas(str(tmp_path), _forecast({('2026-03', 'a'): 40.0}), 'demand', 'sk_key')
+
+    result = write_incremental(_forecast(DICT_BASE), tmp_path, 'demand')
+    assert (result['changed'], result['unchanged']) == (['2026-03'], ['2026-01', '2026-02'])
+
+
+def test_snapshots_beyond_the_limit_are_pruned(tmp_path):
+    for qty in (1.0, 2.0, 3.0):
+        write_incremental(_forecast({('2026-01', 'a'): qty, ('2026-02', 'a'): 5.0}), tmp_path, 'demand',
+                          max_snapshots=2)
+
+    lst_history = read_snapshot_history(str(tmp_path), 'demand')
+    assert len(lst_history) == 2
+    # Solo se conservan los archivos que usan los snapshots del historial
+    assert len(list((tmp_path / '_snapshots' / 'demand_2026-01').glob('*.parquet'))) == 2
+    assert len(list((tmp_path / '_snapshots' / 'demand_2026-02').glob('*.parquet'))) == 1
+    assert read_snapshot(tmp_path, 'demand', snapshot_id=0)['FCST_QTY'].tolist() == [2.0, 5.0]
@@ -0,0 +1,88 @@
+"""
+Pruebas de la extracción en streaming a Parquet (Stream_Parquet) con un cursor local que entrega lotes Arrow:
+varios lotes, columnas nulas en el primer lote, enteros de distinto ancho y particiones por periodo.
+"""
+
+import glob
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import Snowflake.Conection.Stream_Parquet as Stream_Parquet
+from Snowflake.Conection.Stream_Parquet import query_batches, stream_to_parquet
+
+
+class FakeCursor:
+    def __init__(self, lst_batches):
+        self.lst_batches = lst_batches
+        self.closed = False
+
+    def execute(self, sql):
+        self.sql = sql
+
+    def fetch_arrow_batches(self):
+        return iter(self.lst_batches)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    def __init__(self, lst_batches):
+        self.cs = FakeCursor(lst_batches)
+
+    def cursor(self):
+        return self.cs
+
+
+def _batches():
+    # Primer lote: 'Comment' sin valores (tipo null) y 'Qty' int8; el tipo real de 'Comment' llega en el tercero
+    return [
+        pa.table({'Fiscal Period': pa.array([3, 3], pa.int8()), 'Qty': pa.array([1, 2], pa.int8()),
+                  'Comment': pa.nulls(2)}),
+        pa.table({'Fiscal Period': pa.array([3, 4], pa.int16()), 'Qty': pa.array([300, 4], pa.int16()),
+                  'Comment': pa.nulls(2)}),
+        pa.table({'Fiscal Period': pa.array([4], pa.int8()), 'Qty': pa.array([5], pa.int8()),
+                  'Comment': pa.array(['late'])}),
+        pa.table({'Fiscal Period': pa.array([4], pa.int64()), 'Qty': pa.array([70000], pa.int64()),
+                  'Comment': pa.nulls(1)}),
+    ]
+
+
+def test_null_typed_first_batch_is_promoted_and_partitioned(tmp_path):
+    conexion = FakeConnection(_batches())
+    stats = stream_to_parquet(query_batches(conexion, 'SELECT 1'), tmp_path, name='QueryDemand',
+                              partition_columns=['Fiscal Period'])
+
+    assert conexion.cs.closed
+    assert stats['batches'] == 4 and stats['rows'] == 6
+    assert stats['files'] == {'QueryDemand_03.parquet': 3, 'QueryDemand_04.parquet': 3}
+    assert sorted(os.path.basename(p) for p in glob.glob(str(tmp_path / '*.parquet'))) == \
+        ['QueryDemand_03.parquet', 'QueryDemand_04.parquet']
+    schema = pq.read_schema(tmp_path / 'QueryDemand_04.parquet')
+    assert schema.field('Comment').type == pa.string()
+    assert schema.field('Qty').type == pa.int64()
+    df = pd.read_parquet(tmp_path / 'QueryDemand_04.parquet')
+    assert df['Qty'].tolist() == [4, 5, 70000]
+    assert df['Comment'].tolist()[1] == 'late'
+
+
+def test_column_without_values_is_written_as_text(tmp_path, monkeypatch):
+    monkeypatch.setattr(Stream_Parquet, 'STREAM_SCHEMA_BATCHES', 2)
+    lst_batches = [pa.table({'SKU': ['A'], 'Comment': pa.nulls(1)}), pa.table({'SKU': ['B'], 'Comment': pa.nulls(1)}),
+                   pa.table({'SKU': ['C'], 'Comment': pa.array([7], pa.int64())})]
+    stats = stream_to_parquet(iter(lst_batches), tmp_path, name='QuerySkuName')
+
+    assert stats['rows'] == 3
+    table = pq.read_table(tmp_path / 'QuerySkuName.parquet')
+    assert table.schema.field('Comment').type == pa.string()
+    assert table['Comment'].to_pylist() == [None, None, '7']
+
+
+def test_empty_result_keeps_previous_files(tmp_path):
+    pd.DataFrame({'SKU': ['A']}).to_parquet(tmp_path / 'QuerySkuName.parquet')
+    stats = stream_to_parquet(query_batches(FakeConnection([]), 'SELECT 1'), tmp_path, name='QuerySkuName')
+    assert stats['rows'] == 0
+    assert pd.read_parquet(tmp_path / 'QuerySkuName.parquet')['SKU'].tolist() == ['A']
@@ -0,0 +1,57 @@
+"""
+Pruebas de las claves sustitutas (Surrogate_Keys): la clave legible se reconstruye desde un periodo
+guardado y los archivos de la carga completa no necesitan la clave legible.
+"""
+
+import pandas as pd
+
+from Fill_Rate.Process_ETL.Process_Files import process_columns, format_columns, group_parquet, LST_KEY_COLUMNS
+from Fill_Rate.Process_ETL.Key_Index import stores_readable_key
+from Shared_Information_for_Projects.Surrogate_Keys import build_surrogate_key, rebuild_readable_key
+
+FK, SK = 'fk_date_country_customer_clasification', 'sk_date_country_customer_clasification'
+LST_STR = ['fk_year_month', 'fk_Country', 'fk_Sold_To_Customer_Code', 'clasification']
+
+
+def _raw():
+    return pd.DataFrame({'Fiscal Year': ['2025', '2025', '2025'], 'Fiscal Period': ['1', '1', '2'],
+                         'fk_Country': ['CO', 'PE', 'CO'], 'Sold-To-Customer Code': ['C1', 'C2', 'BANANA'],
+                         'Global Material': ['DCD771', 'DW088', 'DCD771'], 'GPP Division': ['PTD', 'PTD', 'HTAS'],
+                         'GPP Category': ['DRILLS', 'LASERS', 'STORAGE'],
+                         'GPP Portfolio': ['CORDLESS', 'CORDED', 'BOXES'], 'Qty': ['1', '2', '3']})
+
+
+def test_readable_key_is_rebuilt_from_a_stored_period(tmp_path):
+    # Clave legible como se guardaba antes (process_columns + format_columns)
+    df_expected = process_columns(_raw(), LST_STR + [FK, SK, 'Qty'])
+    df_expected = format_columns(df_expected, LST_STR + [FK], ['Qty'], LST_STR, [SK])
+
+    # Carga completa actual: solo la clave sustituta y sus componentes
+    df_stored = process_columns(_raw(), LST_STR + [SK, 'Qty'])
+    df_stored = format_columns(df_stored, LST_STR, ['Qty'], LST_STR, [SK])
+    group_parquet(df_stored, str(tmp_path), name='sales', key_column=SK)
+    assert not stores_readable_key(str(tmp_path), 'sales', FK)
+
+    df_period = pd.read_parquet(tmp_path / 'sales_2025-02.parquet')
+    sr_expected = df_expected.loc[df_expected['fk_year_month'] == '2025-02', FK]
+    assert rebuild_readable_key(df_period, LST_KEY_COLUMNS).tolist() == sr_expected.tolist() == \
+        ['2025-02-co-baa-htas-storage-boxes']
+    # La clave sustituta guardada es la calculada sobre los valores originales
+    assert df_period[SK].tolist() == build_surrogate_key(_raw().assign(
+        fk_year_month='2025-02', fk_Sold_To_Customer_Code='BANANA', clasification='HTAS-STORAGE-BOXES').iloc[[2]],
+        LST_KEY_COLUMNS).tolist()
+
+
+def test_surrogate_key_ignores_case_and_spaces_but_not_format_columns():
+    df = pd.DataFrame({'a': ['co', ' CO ', 'baa'], 'b': ['BANANA', 'banana', 'BANANA']})
+    lst_keys = build_surrogate_key(df, ['a', 'b']).tolist()
+    assert lst_keys[0] == lst_keys[1]
+    # format_columns altera los valores ('BANANA' -> 'baa'): la clave debe calcularse antes de formatear
+    assert build_surrogate_key(pd.DataFrame({'b': ['BANANA']}), ['b']).tolist() != \
+        build_surrogate_key(pd.DataFrame({'b': ['baa']}), ['b']).tolist()
+
+
+def test_files_with_readable_key_are_detected(tmp_path):
+    pd.DataFrame({'fk_year_month': ['2026-01'], FK: ['2026-01-co-c1-x'], 'Qty': [1.0]}).to_parquet(
+        tmp_path / 'sales_2026-01.parquet', index=False)
+    assert stores_readable_key(str(tmp_path), 'sales', FK)
@@ -0,0 +1,98 @@
+"""
+Pruebas de la extracción incremental por marca de agua (Watermark) con un conector local que entrega
+lotes Arrow: avance de la marca de agua, merge por clave y reanudación tras una descarga fallida.
+"""
+
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from Snowflake.Conection.Watermark import load_watermark, save_watermark, watermark_from_store, incremental_pull
+
+SQL_TEMPLATE = "SELECT * FROM DIM_PRODUCT WHERE {watermark_filter}"
+LST_KEYS = ['SKU', 'System']
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, sql):
+        self.connection.lst_sql.append(sql)
+
+    def fetch_arrow_batches(self):
+        for batch in self.connection.lst_batches:
+            if isinstance(batch, Exception):
+                raise batch
+            yield batch
+
+    def close(self):
+        self.connection.closed_cursors += 1
+
+
+class FakeConnection:
+    def __init__(self, lst_batches):
+        self.lst_batches = lst_batches
+        self.lst_sql = []
+        self.closed_cursors = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+def _batch(lst_rows):
+    return pa.Table.from_pylist([{'SKU': sku, 'System': system, 'Name': name, 'Last Modified': datetime.fromisoformat(ts)}
+                                 for sku, system, name, ts in lst_rows])
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = tmp_path / 'QuerySkuName.parquet'
+    _batch([('A1', 'SAPC11', 'Drill', '2026-01-01 00:00:00'),
+            ('B2', 'QADAR', 'Saw', '2026-01-02 00:00:00')]).to_pandas().to_parquet(path, index=False)
+    save_watermark(path, watermark_from_store(path, 'Last Modified'), rows=2)
+    return path
+
+
+def test_watermark_advances_and_changes_are_merged_by_key(store):
+    assert load_watermark(store) == '2026-01-02 00:00:00'
+    conexion = FakeConnection([_batch([('B2', 'QADAR', 'Saw 20V', '2026-01-03 00:00:00')]),
+                               _batch([('C3', 'SAPE03', 'Grinder', '2026-01-04 10:30:00')])])
+
+    stats = incremental_pull(conexion, SQL_TEMPLATE, store, LST_KEYS, 'LAST_MODIFIED_DATE',
+                             watermark_alias='Last Modified')
+
+    assert "LAST_MODIFIED_DATE >= TO_TIMESTAMP_NTZ('2026-01-02 00:00:00')" in conexion.lst_sql[0]
+    assert conexion.closed_cursors == 1
+    assert stats == {'rows': 2, 'total': 3, 'watermark': '2026-01-04 10:30:00'}
+    assert load_watermark(store) == '2026-01-04 10:30:00'
+    df_store = pd.read_parquet(store).set_index('SKU')
+    assert df_store['Name'].to_dict() == {'A1': 'Drill', 'B2': 'Saw 20V', 'C3': 'Grinder'}
+
+
+def test_failed_pull_keeps_store_and_watermark_and_resumes(store):
+    df_before = pd.read_parquet(store)
+    conexion = FakeConnection([_batch([('A1', 'SAPC11', 'Drill 12V', '2026-01-05 00:00:00')]),
+                               ConnectionError('conexión interrumpida')])
+    with pytest.raises(ConnectionError):
+        incremental_pull(conexion, SQL_TEMPLATE, store, LST_KEYS, 'LAST_MODIFIED_DATE',
+                         watermark_alias='Last Modified')
+    assert load_watermark(store) == '2026-01-02 00:00:00'
+    pd.testing.assert_frame_equal(pd.read_parquet(store), df_before)
+
+    # La reanudación parte de la misma marca de agua; la fila de borde (>=) se vuelve a descargar sin duplicarse
+    conexion = FakeConnection([_batch([('B2', 'QADAR', 'Saw', '2026-01-02 00:00:00'),
+                                       ('A1', 'SAPC11', 'Drill 12V', '2026-01-05 00:00:00')])])
+    stats = incremental_pull(conexion, SQL_TEMPLATE, store, LST_KEYS, 'LAST_MODIFIED_DATE',
+                             watermark_alias='Last Modified')
+    assert "TO_TIMESTAMP_NTZ('2026-01-02 00:00:00')" in conexion.lst_sql[0]
+    assert stats['total'] == 2 and stats['watermark'] == '2026-01-05 00:00:00'
+    df_store = pd.read_parquet(store).set_index('SKU')
+    assert df_store['Name'].to_dict() == {'A1': 'Drill 12V', 'B2': 'Saw'}
+
+    # Sin cambios: la marca de agua no retrocede
+    stats = incremental_pull(FakeConnection([]), SQL_TEMPLATE, store, LST_KEYS, 'LAST_MODIFIED_DATE',
+                             watermark_alias='Last Modified')
+    assert stats['rows'] == 0 and load_watermark(store) == '2026-01-05 00:00:00'